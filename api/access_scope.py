@@ -0,0 +1,88 @@
+import dataclasses
+import typing
+
+from django.core.cache import cache
+
+from main.utils import increment_cache_counter
+
+from .models import Country, Profile, UserCountry
+from .utils import is_user_ifrc
+
+USER_ACCESS_SCOPE_CACHE_KEY_PREFIX = "user-access-scope"
+USER_ACCESS_SCOPE_VERSION_CACHE_KEY = "user-access-scope-version"
+USER_ACCESS_SCOPE_CACHE_TIMEOUT = 60 * 60  # 1 hour (Changes which don't send signals, eg: Country.region)
+
+
+@dataclasses.dataclass(frozen=True)
+class UserAccessScope:
+    """
+    What the user can see for the visibility aware models (See api.visibility_class)
+    country_ids: UserCountry and Profile.country of the user (Used by the IFRC_NS visibility)
+    region_ids: Regions of these countries
+    """
+
+    is_authenticated: bool = False
+    is_guest: bool = False
+    is_ifrc: bool = False
+    country_ids: typing.Tuple[int, ...] = ()
+    region_ids: typing.Tuple[int, ...] = ()
+
+    @property
+    def is_public_only(self) -> bool:
+        return not self.is_authenticated or self.is_guest
+
+
+ANONYMOUS_ACCESS_SCOPE = UserAccessScope()
+
+
+def _get_cache_key(user_id) -> str:
+    version = cache.get(USER_ACCESS_SCOPE_VERSION_CACHE_KEY, 0)
+    return f"{USER_ACCESS_SCOPE_CACHE_KEY_PREFIX}:{version}:{user_id}"
+
+
+def _compute_user_access_scope(user) -> UserAccessScope:
+    country_ids = set(UserCountry.objects.filter(user=user.id).values_list("country", flat=True))
+    profile = Profile.objects.filter(user=user.id).values("limit_access_to_guest", "country").first() or {}
+    country_ids.add(profile.get("country"))
+    country_ids.discard(None)
+    region_ids = set(Country.objects.filter(id__in=country_ids, region__isnull=False).values_list("region", flat=True))
+    return UserAccessScope(
+        is_authenticated=True,
+        is_guest=bool(profile.get("limit_access_to_guest")),
+        is_ifrc=is_user_ifrc(user),
+        country_ids=tuple(sorted(country_ids)),
+        region_ids=tuple(sorted(region_ids)),
+    )
+
+
+def get_user_access_scope(user) -> UserAccessScope:
+    """
+    Access scope of the user: computed once per request (stored in the user instance) and cached across the requests
+    The cache is cleared by the UserCountry, Profile and permission changes (See api.receivers)
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ACCESS_SCOPE
+    access_scope = getattr(user, "_access_scope", None)
+    if access_scope is None:
+        cache_key = _get_cache_key(user.pk)
+        access_scope = cache.get(cache_key)
+        if access_scope is None:
+            access_scope = _compute_user_access_scope(user)
+            cache.set(cache_key, access_scope, USER_ACCESS_SCOPE_CACHE_TIMEOUT)
+        user._access_scope = access_scope
+    return access_scope
+
+
+def clear_user_access_scope(*user_ids):
+    cache.delete_many([_get_cache_key(user_id) for user_id in user_ids if user_id is not None])
+
+
+def clear_user_access_scope_memo(user):
+    # The user instance can be used after the change (eg: same instance across the requests in the tests)
+    if user is not None and hasattr(user, "_access_scope"):
+        del user._access_scope
+
+
+def clear_all_user_access_scopes():
+    # Eg: Group permissions are changed, the cached scopes of the previous version are no longer used
+    increment_cache_counter(USER_ACCESS_SCOPE_VERSION_CACHE_KEY)
@@ -4,7 +4,6 @@ from django.contrib.auth.models import Group, User
 from django.db import models
 from django.db.models import (
     Avg,
-    Case,
     Count,
     ExpressionWrapper,
     F,
@@ -12,10 +11,7 @@ from django.db.models import (
     Prefetch,
     Q,
     Subquery,
-    Sum,
-    When,
 )
-from django.db.models.fields import IntegerField
 from django.db.models.functions import Coalesce, TruncMonth
 from django.http import Http404
 from django.shortcuts import get_object_or_404
@@ -61,19 +57,28 @@ from deployments.models import ERU, Personnel
 from deployments.serializers import ListDeployedERUByEventSerializer
 from main.enums import GlobalEnumSerializer, get_enum_values
 from main.filters import NullsLastOrderingFilter
+from main.pagination import LimitOffsetOrCursorPagination
 from main.permissions import DenyGuestUserMutationPermission, DenyGuestUserPermission
 from main.utils import is_tableau
 from per.models import Overview
 from per.serializers import CountryLatestOverviewSerializer
 
+from .access_scope import get_user_access_scope
 from .exceptions import BadRequest
+from .key_figures import (
+    COUNTRY_FIGURE_START_DATE_WINDOW,
+    aggregate_figures,
+    get_country_figure_aggregates,
+    get_country_figure_qs,
+    get_key_figure_rollup,
+)
 from .models import (
     Action,
     Admin2,
     Appeal,
     AppealDocument,
     AppealHistory,
-    AppealType,
+    AppealKeyFigureRollup,
     Country,
     CountryKeyDocument,
     CountryKeyFigure,
@@ -98,7 +103,6 @@ from .models import (
     SituationReportType,
     Snippet,
     SupportedActivity,
-    UserCountry,
     VisibilityChoices,
 )
 from .serializers import (  # AppealSerializer,; Tableau Serializers; AppealTableauSerializer,; Go Historical
@@ -159,7 +163,7 @@ from .serializers import (  # AppealSerializer,; Tableau Serializers; AppealTabl
     UserMeSerializer,
     UserSerializer,
 )
-from .utils import generate_field_report_title, is_user_ifrc
+from .utils import generate_field_report_title
 
 
 class DeploymentsByEventViewset(viewsets.ReadOnlyModelViewSet):
@@ -286,39 +290,20 @@ class RegionViewset(viewsets.ReadOnlyModelViewSet):
         We implement the IFRC_NS conditional by computing the set of region IDs the user is linked to via UserCountry/Profile
         and excluding IFRC_NS snippets for regions not in that set.
         """
-        from .models import (
-            Country,
-            Profile,
-            RegionSnippet,
-            UserCountry,
-            VisibilityChoices,
-        )
-        from .utils import is_user_ifrc
+        from .models import RegionSnippet, VisibilityChoices
 
-        user = getattr(self.request, "user", None)
+        access_scope = get_user_access_scope(getattr(self.request, "user", None))
 
-        if not user or not user.is_authenticated:
+        if access_scope.is_public_only:
             snip_qs = RegionSnippet.objects.filter(visibility=VisibilityChoices.PUBLIC)
+        elif access_scope.is_ifrc:
+            snip_qs = RegionSnippet.objects.all()
         else:
-            profile = getattr(user, "profile", None)
-            if profile and profile.limit_access_to_guest:
-                snip_qs = RegionSnippet.objects.filter(visibility=VisibilityChoices.PUBLIC)
-            elif is_user_ifrc(user):
-                snip_qs = RegionSnippet.objects.all()
-            else:
-                # User-linked countries (Profile.country is optional)
-                user_country_ids = UserCountry.objects.filter(user=user.id).values_list("country", flat=True)
-                profile_country_ids = Profile.objects.filter(user=user.id).values_list("country", flat=True)
-                combined_country_ids = list(user_country_ids.union(profile_country_ids))
-                # Regions the user is associated with via countries
-                allowed_region_ids_for_ifrc_ns = Country.objects.filter(
-                    id__in=combined_country_ids, region__isnull=False
-                ).values_list("region_id", flat=True)
-                snip_qs = RegionSnippet.objects.exclude(visibility=VisibilityChoices.IFRC)
-                # Exclude IFRC_NS snippets whose region not in allowed set
-                snip_qs = snip_qs.exclude(
-                    Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(region_id__in=allowed_region_ids_for_ifrc_ns)
-                )
+            # Regions the user is associated with via countries (UserCountry/Profile)
+            allowed_region_ids_for_ifrc_ns = access_scope.region_ids
+            snip_qs = RegionSnippet.objects.exclude(visibility=VisibilityChoices.IFRC)
+            # Exclude IFRC_NS snippets whose region not in allowed set
+            snip_qs = snip_qs.exclude(Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(region_id__in=allowed_region_ids_for_ifrc_ns))
 
         return self.queryset.prefetch_related(models.Prefetch("snippets", queryset=snip_qs))
 
@@ -385,72 +370,20 @@ class CountryViewset(viewsets.ReadOnlyModelViewSet):
     def get_country_figure(self, request, pk):
         country = self.get_object()
 
-        now = timezone.now()
-        start_date_from = request.GET.get("start_date_from", timezone.now() + timedelta(days=-2 * 365))
-        start_date_to = request.GET.get("start_date_to", timezone.now())
-
-        appeal_conditions = Q(atype=AppealType.APPEAL) | Q(atype=AppealType.INTL)
+        start_date_from = request.GET.get("start_date_from")
+        start_date_to = request.GET.get("start_date_to")
+        if start_date_from is None and start_date_to is None:
+            # NOTE: Default window is served from the daily rollup
+            rollup = get_key_figure_rollup(AppealKeyFigureRollup.Scope.COUNTRY, country.id)
+            return Response(CountryKeyFigureSerializer(rollup.country_figures).data)
 
-        all_appealhistory = AppealHistory.objects.select_related("appeal").filter(
-            country=country,
-            appeal__code__isnull=False,
-            valid_from__lt=now,  # TODO: Allow user to provide this?
-            valid_to__gt=now,  # TODO: Allow user to provide this?
-        )
-        if start_date_from and start_date_to:
-            all_appealhistory = all_appealhistory.filter(
-                start_date__gte=start_date_from,
-                start_date__lte=start_date_to,
-            )
-
-        appeals_aggregated = all_appealhistory.annotate(
-            appeal_with_dref=Count(
-                Case(
-                    When(Q(atype=AppealType.DREF), then=1),
-                    output_field=IntegerField(),
-                )
-            ),
-            appeal_without_dref=Count(Case(When(appeal_conditions, then=1), output_field=IntegerField())),
-            total_population=(
-                Case(
-                    When(appeal_conditions | Q(atype=AppealType.DREF), then=F("num_beneficiaries")),
-                    output_field=IntegerField(),
-                )
-            ),
-            amount_requested_all=(
-                Case(
-                    When(appeal_conditions, then=F("amount_requested")),
-                    output_field=IntegerField(),
-                )
-            ),
-            amordref=(
-                Case(
-                    When(appeal_conditions | Q(atype=AppealType.DREF), then=F("amount_requested")),
-                    output_field=IntegerField(),
-                )
-            ),
-            amof=(
-                Case(
-                    When(appeal_conditions, then=F("amount_funded")),
-                    output_field=IntegerField(),
-                )
-            ),
-            amofdref=(
-                Case(
-                    When(appeal_conditions | Q(atype=AppealType.DREF), then=F("amount_funded")),
-                    output_field=IntegerField(),
-                )
-            ),
-            emergencies_count=Count(F("appeal__event_id"), distinct=True),
-        ).aggregate(
-            active_drefs=Sum("appeal_with_dref"),
-            active_appeals=Sum("appeal_without_dref"),
-            target_population=Sum("total_population"),
-            amount_requested=Sum("amount_requested_all"),
-            amount_requested_dref_included=Sum("amordref"),
-            amount_funded=Sum("amof"),
-            amount_funded_dref_included=Sum("amofdref"),
-            emergencies=Sum("emergencies_count"),
+        now = timezone.now()
+        start_date_from = start_date_from or now - COUNTRY_FIGURE_START_DATE_WINDOW
+        start_date_to = start_date_to or now
+        appeals_aggregated = aggregate_figures(
+            # TODO: Allow user to provide the date?
+            get_country_figure_qs(now, start_date_from, start_date_to).filter(country=country),
+            get_country_figure_aggregates(),
         )
         return Response(CountryKeyFigureSerializer(appeals_aggregated).data)
 
@@ -723,6 +656,8 @@ class Admin2Viewset(viewsets.ReadOnlyModelViewSet):
 
 
 class EventViewset(ReadOnlyVisibilityViewset):
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
     ordering_fields = (
         "disaster_start_date",
         "created_at",
@@ -812,19 +747,15 @@ class EventViewset(ReadOnlyVisibilityViewset):
                     Prefetch("field_reports", queryset=FieldReport.objects.prefetch_related("countries", "contacts")),
                     Prefetch("featured_documents", queryset=EventFeaturedDocument.objects.order_by("-id")),
                 ]
-                if self.request.user.is_authenticated and not self.request.user.profile.limit_access_to_guest:
-                    if is_user_ifrc(self.request.user):
+                access_scope = get_user_access_scope(self.request.user)
+                if not access_scope.is_public_only:
+                    if access_scope.is_ifrc:
                         instance = Event.objects.prefetch_related(*prefetches).get(pk=pk)
                     else:
-                        user_countries = (
-                            UserCountry.objects.filter(user=request.user.id)
-                            .values("country")
-                            .union(Profile.objects.filter(user=request.user.id).values("country"))
-                        )
                         instance = (
                             Event.objects.prefetch_related(*prefetches)
                             .exclude(visibility=VisibilityChoices.IFRC)
-                            .exclude(Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(countries__id__in=user_countries))
+                            .exclude(Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(countries__id__in=access_scope.country_ids))
                             .get(pk=pk)
                         )
                 else:
@@ -934,6 +865,9 @@ class AppealViewset(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = AppealHistorySerializer
     ordering_fields = "__all__"
     filterset_class = AppealHistoryFilter
+    pagination_class = LimitOffsetOrCursorPagination
+    # NOTE: AppealHistory has no created_at, ids are assigned in the creation order
+    cursor_ordering = ("-id",)
     search_fields = (
         "appeal__name",
         "code",
@@ -955,12 +889,7 @@ class AppealViewset(mixins.ListModelMixin, viewsets.GenericViewSet):
     # Overwrite to exclude the events which require confirmation
     def list(self, request, *args, **kwargs):
         date = request.GET.get("date", timezone.now())
-        queryset = self.filter_queryset(
-            self.get_queryset().filter(
-                valid_from__lt=date,
-                valid_to__gt=date,
-            )
-        )
+        queryset = self.filter_queryset(self.get_queryset().as_of(date))
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -1050,6 +979,8 @@ class FieldReportViewset(ReadOnlyVisibilityViewsetMixin, viewsets.ModelViewSet):
     )  # for /docs
     ordering_fields = ("summary", "event", "dtype", "created_at", "updated_at")
     filterset_class = FieldReportFilter
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-created_at", "-id")
     permission_classes = [DenyGuestUserMutationPermission]
     queryset = FieldReport.objects.select_related("dtype", "event", "event__dtype").prefetch_related(
         "actions_taken",
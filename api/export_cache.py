@@ -0,0 +1,111 @@
+import datetime
+import hashlib
+import json
+import typing
+
+from django.db.models import Max
+from django.utils import timezone
+from reversion.models import Version
+
+from dref.models import Dref, DrefFinalReport, DrefOperationalUpdate
+from eap.models import EAPRegistration, FullEAP, SimplifiedEAP
+from main.utils import get_cache_counters, increment_cache_counter
+from per.models import FormPrioritization, Overview, PerAssessment, PerWorkPlan
+
+from .logger import logger
+from .models import Export
+
+EXPORT_CACHE_HIT_METRIC_KEY = "pdf-export-cache-hit"
+EXPORT_CACHE_MISS_METRIC_KEY = "pdf-export-cache-miss"
+
+
+def _get_per_timestamps(overview_id) -> typing.List[typing.Optional[datetime.datetime]]:
+    timestamps = list(Overview.objects.filter(id=overview_id).values_list("updated_at", flat=True))
+    # NOTE: PER children don't have a modified timestamp, using their latest revision instead
+    for model in (PerAssessment, FormPrioritization, PerWorkPlan):
+        object_ids = [str(pk) for pk in model.objects.filter(overview=overview_id).values_list("id", flat=True)]
+        if object_ids:
+            timestamps.append(
+                Version.objects.get_for_model(model)
+                .filter(object_id__in=object_ids)
+                .aggregate(last_revision_at=Max("revision__date_created"))["last_revision_at"]
+            )
+    return timestamps
+
+
+def _get_eap_timestamps(eap_model, registration_id) -> typing.List[typing.Optional[datetime.datetime]]:
+    return [
+        *EAPRegistration.objects.filter(id=registration_id).values_list("modified_at", flat=True),
+        eap_model.objects.filter(eap_registration=registration_id).aggregate(last_modified_at=Max("modified_at"))[
+            "last_modified_at"
+        ],
+    ]
+
+
+def get_export_timestamps(export_type, export_id) -> typing.List[typing.Optional[datetime.datetime]]:
+    """Modified timestamps of the objects rendered in the export"""
+    if export_type == Export.ExportType.DREF:
+        return list(Dref.objects.filter(id=export_id).values_list("modified_at", flat=True))
+    if export_type == Export.ExportType.OPS_UPDATE:
+        return list(DrefOperationalUpdate.objects.filter(id=export_id).values_list("modified_at", flat=True))
+    if export_type == Export.ExportType.FINAL_REPORT:
+        return list(DrefFinalReport.objects.filter(id=export_id).values_list("modified_at", flat=True))
+    if export_type == Export.ExportType.PER:
+        return _get_per_timestamps(export_id)
+    if export_type == Export.ExportType.SIMPLIFIED_EAP:
+        return _get_eap_timestamps(SimplifiedEAP, export_id)
+    if export_type == Export.ExportType.FULL_EAP:
+        return _get_eap_timestamps(FullEAP, export_id)
+    return []
+
+
+def get_export_fingerprint(export_type, export_id, url, language) -> typing.Optional[str]:
+    """
+    Same fingerprint -> Same PDF
+    NOTE: url includes the export options (is_pga, version, diff, ...)
+    Returns None if the export can't be cached
+    """
+    timestamps = get_export_timestamps(export_type, export_id)
+    if not timestamps or None in timestamps:
+        return None
+    payload = json.dumps(
+        [export_type, url, language, [timestamp.isoformat() for timestamp in timestamps]],
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def use_cached_export(export: Export, count_miss=True) -> bool:
+    """
+    Complete the export using the PDF of a previous export with the same fingerprint
+    NOTE: Only the user's own exports are used, the content of the PDF can depend on the user's permissions
+    """
+    if not export.fingerprint:
+        return False
+    cached_export = (
+        Export.objects.filter(
+            fingerprint=export.fingerprint,
+            requested_by=export.requested_by_id,
+            status=Export.ExportStatus.COMPLETED,
+        )
+        .exclude(pk=export.pk)
+        .exclude(pdf_file="")
+        .exclude(pdf_file__isnull=True)
+        .order_by("-completed_at")
+        .first()
+    )
+    if cached_export is None:
+        if count_miss:
+            increment_cache_counter(EXPORT_CACHE_MISS_METRIC_KEY)
+        return False
+
+    logger.info(f"Using cached export: {cached_export.pk} for export: {export.pk}")
+    export.pdf_file.name = cached_export.pdf_file.name
+    export.status = Export.ExportStatus.COMPLETED
+    export.completed_at = timezone.now()
+    export.save(update_fields=["pdf_file", "status", "completed_at"])
+    increment_cache_counter(EXPORT_CACHE_HIT_METRIC_KEY)
+    return True
+
+
+def get_export_cache_metrics() -> dict:
+    return get_cache_counters(hit=EXPORT_CACHE_HIT_METRIC_KEY, miss=EXPORT_CACHE_MISS_METRIC_KEY)
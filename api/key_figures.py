@@ -0,0 +1,332 @@
+import datetime
+import threading
+import typing
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Sum, When
+from django.utils import timezone
+
+from api.models import (
+    Appeal,
+    AppealHistory,
+    AppealKeyFigureRollup,
+    AppealType,
+    Country,
+    Region,
+)
+
+Scope = AppealKeyFigureRollup.Scope
+
+# Window used by the country page figures (Same as the default used by CountryViewset.get_country_figure)
+COUNTRY_FIGURE_START_DATE_WINDOW = datetime.timedelta(days=2 * 365)
+# Stored rollups of the current day older than this are recomputed
+CURRENT_DAY_ROLLUP_MAX_AGE = datetime.timedelta(minutes=10)
+
+ROLLUP_UPDATE_FIELDS = ["header_figures", "country_figures", "area_figures", "computed_at"]
+
+
+def get_appeal_history_qs(date) -> models.QuerySet[AppealHistory]:
+    """AppealHistory rows valid at the given datetime"""
+    return AppealHistory.objects.as_of(date).filter(appeal__code__isnull=False)
+
+
+def get_header_figure_aggregates(date) -> dict:
+    """Aggregates used by the key-figures header (AggregateHeaderFigures)"""
+    is_active = Q(end_date__gte=date) & Q(start_date__lte=date)
+    is_appeal = Q(atype=AppealType.APPEAL) | Q(atype=AppealType.INTL)
+    is_active_appeal = is_appeal & is_active
+    return dict(
+        # Active Appeals with DREF type
+        active_drefs=Count(Case(When(Q(atype=AppealType.DREF) & is_active, then=1), output_field=models.IntegerField())),
+        # Active Appeals with type Emergency Appeal or International Appeal
+        active_appeals=Count(Case(When(is_active_appeal, then=1), output_field=models.IntegerField())),
+        # Total Appeals count which are not DREF
+        total_appeals=Count(Case(When(is_appeal, then=1), output_field=models.IntegerField())),
+        # Active Appeals' target population
+        target_population=Sum(Case(When(is_active, then=F("num_beneficiaries")), output_field=models.IntegerField())),
+        # Active Appeals' requested amount, which are not DREF
+        amount_requested=Sum(Case(When(is_active_appeal, then=F("amount_requested")), output_field=models.IntegerField())),
+        amount_requested_dref_included=Sum(Case(When(is_active, then=F("amount_requested")), output_field=models.IntegerField())),
+        # Active Appeals' funded amount, which are not DREF
+        amount_funded=Sum(Case(When(is_active_appeal, then=F("amount_funded")), output_field=models.IntegerField())),
+        amount_funded_dref_included=Sum(Case(When(is_active, then=F("amount_funded")), output_field=models.IntegerField())),
+    )
+
+
+def get_country_figure_aggregates() -> dict:
+    """Aggregates used by the country page (CountryViewset.get_country_figure)"""
+    is_appeal = Q(atype=AppealType.APPEAL) | Q(atype=AppealType.INTL)
+    is_appeal_or_dref = is_appeal | Q(atype=AppealType.DREF)
+    return dict(
+        active_drefs=Count(Case(When(Q(atype=AppealType.DREF), then=1), output_field=models.IntegerField())),
+        active_appeals=Count(Case(When(is_appeal, then=1), output_field=models.IntegerField())),
+        target_population=Sum(Case(When(is_appeal_or_dref, then=F("num_beneficiaries")), output_field=models.IntegerField())),
+        amount_requested=Sum(Case(When(is_appeal, then=F("amount_requested")), output_field=models.IntegerField())),
+        amount_requested_dref_included=Sum(
+            Case(When(is_appeal_or_dref, then=F("amount_requested")), output_field=models.IntegerField())
+        ),
+        amount_funded=Sum(Case(When(is_appeal, then=F("amount_funded")), output_field=models.IntegerField())),
+        amount_funded_dref_included=Sum(
+            Case(When(is_appeal_or_dref, then=F("amount_funded")), output_field=models.IntegerField())
+        ),
+        emergencies=Count("appeal__event_id"),
+    )
+
+
+def get_area_figure_aggregates() -> dict:
+    """Aggregates used by AreaAggregate (Appeal)"""
+    return dict(
+        num_beneficiaries=Sum("num_beneficiaries"),
+        amount_requested=Sum("amount_requested"),
+        amount_funded=Sum("amount_funded"),
+        count=Count("id"),
+    )
+
+
+def get_country_figure_qs(date, start_date_from, start_date_to) -> models.QuerySet[AppealHistory]:
+    qs = get_appeal_history_qs(date)
+    if start_date_from and start_date_to:
+        qs = qs.filter(
+            start_date__gte=start_date_from,
+            start_date__lte=start_date_to,
+        )
+    return qs
+
+
+# NOTE: Aggregates are computed with a prefix to avoid conflicts with the model fields (eg: amount_requested)
+FIGURE_ALIAS_PREFIX = "figure__"
+
+
+def _prefixed(aggregates: dict) -> dict:
+    return {f"{FIGURE_ALIAS_PREFIX}{key}": value for key, value in aggregates.items()}
+
+
+def _unprefixed(data: dict) -> dict:
+    return {key[len(FIGURE_ALIAS_PREFIX) :]: value for key, value in data.items() if key.startswith(FIGURE_ALIAS_PREFIX)}
+
+
+def aggregate_figures(qs: models.QuerySet, aggregates: dict) -> dict:
+    return _unprefixed(qs.aggregate(**_prefixed(aggregates)))
+
+
+def _end_of_day(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time.max, tzinfo=datetime.timezone.utc)
+
+
+def _aggregate_by(
+    qs: models.QuerySet,
+    group_field: typing.Optional[str],
+    aggregates: dict,
+    ids: typing.Optional[typing.Iterable[int]],
+) -> dict[int, dict]:
+    """
+    Returns {scope_id: figures} using a single query
+    ids: None -> All available scopes
+    """
+    if group_field is None:
+        return {0: aggregate_figures(qs, aggregates)}
+    empty_figures = aggregate_figures(qs.none(), aggregates)
+    data = {}
+    if ids is not None:
+        if not ids:
+            return {}
+        qs = qs.filter(**{f"{group_field}__in": ids})
+        data = {scope_id: dict(empty_figures) for scope_id in ids}
+    # NOTE: order_by() is required after values() to skip the Meta.ordering in GROUP BY (modeltranslation)
+    for row in qs.values(group_field).annotate(**_prefixed(aggregates)).order_by():
+        scope_id = row[group_field]
+        if scope_id is not None:
+            data[scope_id] = _unprefixed(row)
+    return data
+
+
+def compute_key_figure_rollups(
+    day: typing.Optional[datetime.date] = None,
+    country_ids: typing.Optional[typing.Iterable[int]] = None,
+    region_ids: typing.Optional[typing.Iterable[int]] = None,
+) -> list[AppealKeyFigureRollup]:
+    """
+    Compute (without saving) the rollups for the given day (Default: today)
+    country_ids/region_ids: None -> All, Otherwise only the provided scopes (global is always included)
+    """
+    now = timezone.now()
+    day = day or now.date()
+    # NOTE: Current day is computed using the current time, other days are computed at the end of the day
+    is_current_day = day == now.date()
+    date = now if is_current_day else _end_of_day(day)
+    if country_ids is not None:
+        country_ids = set(country_ids)
+    if region_ids is not None:
+        region_ids = set(region_ids)
+
+    figures = defaultdict(dict)
+
+    def _set(scope, field, data):
+        for scope_id, scope_figures in data.items():
+            figures[(scope, scope_id)][field] = scope_figures
+
+    history_qs = get_appeal_history_qs(date)
+    header_aggregates = get_header_figure_aggregates(date)
+    _set(Scope.GLOBAL, "header_figures", _aggregate_by(history_qs, None, header_aggregates, None))
+    _set(Scope.REGION, "header_figures", _aggregate_by(history_qs, "country__region", header_aggregates, region_ids))
+    _set(Scope.COUNTRY, "header_figures", _aggregate_by(history_qs, "country", header_aggregates, country_ids))
+
+    if is_current_day:
+        # NOTE: These doesn't support point-in-time, so only computed for the current day
+        country_figure_qs = get_country_figure_qs(date, date - COUNTRY_FIGURE_START_DATE_WINDOW, date)
+        _set(
+            Scope.COUNTRY,
+            "country_figures",
+            _aggregate_by(country_figure_qs, "country", get_country_figure_aggregates(), country_ids),
+        )
+        area_aggregates = get_area_figure_aggregates()
+        _set(Scope.REGION, "area_figures", _aggregate_by(Appeal.objects.all(), "region", area_aggregates, region_ids))
+        _set(Scope.COUNTRY, "area_figures", _aggregate_by(Appeal.objects.all(), "country", area_aggregates, country_ids))
+
+    # Scopes without any data are stored as empty figures
+    empty_figures = {
+        "header_figures": aggregate_figures(AppealHistory.objects.none(), header_aggregates),
+        "country_figures": aggregate_figures(AppealHistory.objects.none(), get_country_figure_aggregates()),
+        "area_figures": aggregate_figures(Appeal.objects.none(), get_area_figure_aggregates()),
+    }
+    scope_figure_fields = {
+        Scope.GLOBAL: ["header_figures"],
+        Scope.REGION: ["header_figures", "area_figures"],
+        Scope.COUNTRY: ["header_figures", "country_figures", "area_figures"],
+    }
+    rollups = []
+    for (scope, scope_id), scope_figures in figures.items():
+        if is_current_day:
+            for field in scope_figure_fields[scope]:
+                scope_figures.setdefault(field, empty_figures[field])
+        else:
+            scope_figures.setdefault("header_figures", empty_figures["header_figures"])
+        rollups.append(
+            AppealKeyFigureRollup(
+                scope=scope,
+                scope_id=scope_id,
+                day=day,
+                computed_at=date,
+                **scope_figures,
+            )
+        )
+    return rollups
+
+
+def refresh_key_figure_rollups(
+    day: typing.Optional[datetime.date] = None,
+    country_ids: typing.Optional[typing.Iterable[int]] = None,
+    region_ids: typing.Optional[typing.Iterable[int]] = None,
+) -> list[AppealKeyFigureRollup]:
+    """
+    Compute and upsert the rollups (See compute_key_figure_rollups)
+    """
+    rollups = compute_key_figure_rollups(day=day, country_ids=country_ids, region_ids=region_ids)
+    AppealKeyFigureRollup.objects.bulk_create(
+        rollups,
+        update_conflicts=True,
+        unique_fields=["scope", "scope_id", "day"],
+        update_fields=ROLLUP_UPDATE_FIELDS,
+    )
+    return rollups
+
+
+def is_key_figure_rollup_fresh(rollup: AppealKeyFigureRollup, now: typing.Optional[datetime.datetime] = None) -> bool:
+    """
+    Current day: computed within CURRENT_DAY_ROLLUP_MAX_AGE (appeals starting/ending during the day don't send signals)
+    Past days: computed at the end of the day (Rows stored during the day are stale once the day is over)
+    """
+    now = now or timezone.now()
+    if rollup.day == now.date():
+        return rollup.computed_at >= now - CURRENT_DAY_ROLLUP_MAX_AGE
+    return rollup.computed_at >= _end_of_day(rollup.day)
+
+
+def _is_stored_scope(scope: Scope, scope_id: int) -> bool:
+    if scope == Scope.GLOBAL:
+        return scope_id == 0
+    if scope == Scope.REGION:
+        return Region.objects.filter(pk=scope_id).exists()
+    return Country.objects.filter(pk=scope_id).exists()
+
+
+def get_key_figure_rollup(
+    scope: Scope,
+    scope_id: int = 0,
+    day: typing.Optional[datetime.date] = None,
+) -> AppealKeyFigureRollup:
+    """
+    Returns the stored rollup for the scope if it is fresh (See is_key_figure_rollup_fresh), otherwise computes it
+    NOTE: Only the current day of the existing scopes are stored here (Same rows refreshed by the backend),
+    other days are stored by refresh_appeal_key_figures and computed without saving until then
+    """
+    now = timezone.now()
+    today = now.date()
+    day = day or today
+    if day <= today:
+        rollup = AppealKeyFigureRollup.objects.filter(scope=scope, scope_id=scope_id, day=day).first()
+        if rollup is not None and is_key_figure_rollup_fresh(rollup, now=now):
+            return rollup
+
+    scope_kwargs = dict(
+        country_ids=[scope_id] if scope == Scope.COUNTRY else [],
+        region_ids=[scope_id] if scope == Scope.REGION else [],
+    )
+    if day == today and not settings.DJANGO_READ_ONLY and _is_stored_scope(scope, scope_id):
+        rollups = refresh_key_figure_rollups(day=day, **scope_kwargs)
+    else:
+        rollups = compute_key_figure_rollups(day=day, **scope_kwargs)
+    return next(rollup for rollup in rollups if rollup.scope == scope and rollup.scope_id == scope_id)
+
+
+def finalize_key_figure_rollups(day: datetime.date) -> list[AppealKeyFigureRollup]:
+    """
+    Recompute the rollups of a past day at the end of the day if any of them was stored during the day
+    """
+    if not AppealKeyFigureRollup.objects.filter(day=day, computed_at__lt=_end_of_day(day)).exists():
+        return []
+    return refresh_key_figure_rollups(day=day)
+
+
+# -- Incremental refresh
+_deferred_refresh = threading.local()
+
+
+@contextmanager
+def defer_key_figure_rollup_refresh():
+    """
+    Collect the rollup refresh requests and refresh all the touched scopes at once at the end
+    Used by bulk operations (eg: ingest_appeals) to avoid refreshing the rollups for each appeal
+    """
+    if getattr(_deferred_refresh, "scopes", None) is not None:
+        # Already deferred by the outer block
+        yield
+        return
+    _deferred_refresh.scopes = (set(), set())
+    try:
+        yield
+        country_ids, region_ids = _deferred_refresh.scopes
+    finally:
+        _deferred_refresh.scopes = None
+    if country_ids or region_ids:
+        refresh_key_figure_rollups(country_ids=country_ids, region_ids=region_ids)
+
+
+def schedule_key_figure_rollup_refresh(
+    country_ids: typing.Iterable[typing.Optional[int]],
+    region_ids: typing.Iterable[typing.Optional[int]],
+):
+    """
+    Refresh the current day rollups of the given scopes (and global) after the transaction is committed
+    """
+    country_ids = {_id for _id in country_ids if _id is not None}
+    region_ids = {_id for _id in region_ids if _id is not None}
+    deferred_scopes = getattr(_deferred_refresh, "scopes", None)
+    if deferred_scopes is not None:
+        deferred_scopes[0].update(country_ids)
+        deferred_scopes[1].update(region_ids)
+        return
+    transaction.on_commit(lambda: refresh_key_figure_rollups(country_ids=country_ids, region_ids=region_ids))
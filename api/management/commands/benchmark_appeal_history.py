@@ -0,0 +1,91 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.key_figures import aggregate_figures, get_header_figure_aggregates
+from api.models import APPEAL_HISTORY_OPEN_VALID_TO, AppealHistory, AppealType, Country
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the header figures (AggregateHeaderFigures) of a large synthetic AppealHistory"
+        " using the valid_from/valid_to filters and AppealHistory.objects.as_of (The synthetic data is rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--appeals", type=int, default=5000, help="Number of synthetic appeals")
+        parser.add_argument("--versions", type=int, default=20, help="Number of history rows per appeal")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of times each query is run")
+
+    def create_history(self, appeals_n, versions_n):
+        country_ids = list(Country.objects.values_list("id", flat=True)[:200])
+        if not country_ids:
+            raise CommandError("At least one country is required")
+        now = timezone.now()
+        history = []
+        for appeal_index in range(appeals_n):
+            valid_from = now - datetime.timedelta(days=random.randint(versions_n, 10 * 365))
+            start_date = valid_from - datetime.timedelta(days=random.randint(0, 30))
+            for version in range(versions_n):
+                if version == versions_n - 1:
+                    valid_to = APPEAL_HISTORY_OPEN_VALID_TO
+                else:
+                    valid_to = min(valid_from + datetime.timedelta(days=random.randint(1, 30)), now)
+                history.append(
+                    AppealHistory(
+                        aid=f"benchmark-{appeal_index}",
+                        code=f"BM{appeal_index:06}",
+                        atype=random.choice(AppealType.values),
+                        country_id=random.choice(country_ids),
+                        num_beneficiaries=random.randint(0, 100000),
+                        amount_requested=random.randint(0, 10**7),
+                        amount_funded=random.randint(0, 10**7),
+                        start_date=start_date,
+                        end_date=start_date + datetime.timedelta(days=random.randint(30, 365)),
+                        valid_from=valid_from,
+                        valid_to=valid_to,
+                    )
+                )
+                valid_from = valid_to
+        AppealHistory.objects.bulk_create(history, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {AppealHistory._meta.db_table}")
+        return len(history)
+
+    def measure(self, get_qs, date, repeat):
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            figures = aggregate_figures(get_qs(date), get_header_figure_aggregates(date))
+            durations.append(time.perf_counter() - start)
+        return figures, min(durations)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows_n = self.create_history(options["appeals"], options["versions"])
+            self.stdout.write(f"Synthetic AppealHistory rows: {rows_n}")
+
+            now = timezone.now()
+            # NOTE: Same as api.key_figures.get_appeal_history_qs, without appeal__code__isnull (No appeals are created)
+            queries = {
+                "valid_from/valid_to": lambda date: AppealHistory.objects.filter(valid_from__lt=date, valid_to__gt=date),
+                "as_of": lambda date: AppealHistory.objects.as_of(date),
+            }
+            self.stdout.write("Date                         Filters (s)   as_of (s)   Speedup")
+            for date in [
+                now + datetime.timedelta(hours=1),
+                *[now - datetime.timedelta(days=days) for days in (30, 365, 5 * 365)],
+            ]:
+                results = {name: self.measure(get_qs, date, options["repeat"]) for name, get_qs in queries.items()}
+                if results["valid_from/valid_to"][0] != results["as_of"][0]:
+                    raise CommandError(f"as_of figures are different for: {date}")
+                legacy_duration, as_of_duration = results["valid_from/valid_to"][1], results["as_of"][1]
+                self.stdout.write(
+                    f"{date.isoformat()[:26]:<28} {legacy_duration:>11.3f} {as_of_duration:>11.3f}"
+                    f" {legacy_duration / as_of_duration:>9.1f}x"
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.scrape_pdfs import convert_pdf_to_text_blocks
+from api.scrapers.config import M_KEYS, S_KEYS, SF_KEYS
+from api.scrapers.extractor.fixtures import EPOA_TEXTS
+from api.scrapers.extractor.fuzzy import FuzzyWindowIndex
+
+
+class Command(BaseCommand):
+    help = "Compare the fuzzy key search of the PDF extractors with and without the window pruning"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pdf", action="append", default=[], help="PDF file (default: api.scrapers.extractor.fixtures.EPOA_TEXTS)"
+        )
+        parser.add_argument("--repeat", type=int, default=10, help="Number of times the text blocks are repeated")
+
+    def get_documents(self, options):
+        if not options["pdf"]:
+            return [("EPOA_TEXTS", EPOA_TEXTS)]
+        documents = []
+        for path in options["pdf"]:
+            with open(path, "rb") as fp:
+                documents.append((path, convert_pdf_to_text_blocks(fp.read())["texts"]))
+        return documents
+
+    def handle(self, *args, **options):
+        search_texts = [
+            *[[key.split()] for keys in M_KEYS.values() for key in keys],
+            *[
+                ["{} {}".format(sector_key, field_key).split() for field in SF_KEYS for field_key in SF_KEYS[field]]
+                for sector_keys in S_KEYS.values()
+                for sector_key in sector_keys
+            ],
+        ]
+        self.stdout.write("Document                          Blocks   All windows (s)   Pruned (s)   Speedup")
+        for name, texts in self.get_documents(options):
+            texts = texts * options["repeat"]
+            durations = {}
+            results = {}
+            for prune in (False, True):
+                window_index = FuzzyWindowIndex(texts)
+                start = time.perf_counter()
+                results[prune] = [window_index.search(search_text, prune=prune) for search_text in search_texts]
+                durations[prune] = time.perf_counter() - start
+            if results[False] != results[True]:
+                raise CommandError(f"Pruned search results are different for: {name}")
+            self.stdout.write(
+                f"{name[-32:]:<32} {len(texts):>7} {durations[False]:>17.3f} {durations[True]:>12.3f}"
+                f" {durations[False] / durations[True]:>9.1f}x"
+            )
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.test.utils import CaptureQueriesContext
+from factory.django import mute_signals
+
+from api.models import Appeal, AppealType, Country, DisasterType, Event, FieldReport
+from api.weekly_digest import WeeklyDigestBuilder
+from deployments.models import ERU, ERUOwner, Personnel, PersonnelDeployment
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the query count and wall time of the weekly digest for a synthetic week"
+        " (data is rolled back and the model signals are muted)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20, help="Number of featured events")
+        parser.add_argument("--appeals", type=int, default=100)
+        parser.add_argument("--personnel", type=int, default=200)
+        parser.add_argument("--field-reports", type=int, default=200)
+
+    def create_synthetic_week(self, options):
+        country = Country.objects.create(name="Benchmark country", society_name="Benchmark society")
+        dtype = DisasterType.objects.create(name="Benchmark", summary="Benchmark")
+        now = datetime.now(timezone.utc)
+        events = Event.objects.bulk_create(
+            [
+                Event(name=f"Benchmark event {i}", disaster_start_date=now, dtype=dtype, is_featured=True)
+                for i in range(options["events"])
+            ]
+        )
+        Appeal.objects.bulk_create(
+            [
+                Appeal(
+                    aid=f"benchmark-{i}",
+                    name=f"Benchmark appeal {i}",
+                    atype=i % len(AppealType),
+                    country=country,
+                    event=events[i % len(events)] if events else None,
+                    amount_requested=1000,
+                    amount_funded=500,
+                    num_beneficiaries=100,
+                    end_date=now + timedelta(days=30),
+                )
+                for i in range(options["appeals"])
+            ]
+        )
+        eru_owner = ERUOwner.objects.create(national_society_country=country)
+        ERU.objects.bulk_create([ERU(eru_owner=eru_owner, event=event, units=2) for event in events])
+        deployments = PersonnelDeployment.objects.bulk_create(
+            [PersonnelDeployment(country_deployed_to=country, event_deployed_to=event) for event in [*events, None]]
+        )
+        # NOTE: bulk_create is not supported for multi-table inherited models
+        for i in range(options["personnel"]):
+            Personnel.objects.create(
+                type=Personnel.TypeChoices.RR,
+                deployment=deployments[i % len(deployments)],
+                country_from=country,
+                name=f"Benchmark person {i}",
+                start_date=now,
+            )
+        for i in range(options["field_reports"]):
+            field_report = FieldReport.objects.create(dtype=dtype, summary=f"Benchmark field report {i}")
+            field_report.countries.add(country)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # NOTE: The receivers have side effects outside of the database (eg: ERP, caches), skip them for the synthetic data
+            with mute_signals(pre_save, post_save, m2m_changed):
+                self.create_synthetic_week(options)
+
+            now = datetime.now(timezone.utc)
+            builder = WeeklyDigestBuilder(since=now - timedelta(days=7), now=now)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                digest = builder.build()
+                duration = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Highlights: {len(digest['highlighted_ops'])}, "
+            f"Latest ops: {len(digest['latest_ops'])}, "
+            f"Latest deployments: {len(digest['latest_deployments'])}, "
+            f"Latest field reports: {len(digest['latest_field_reports'])}"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Queries: {len(queries)}, Wall time: {duration * 1000:.1f}ms"))
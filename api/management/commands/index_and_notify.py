@@ -1,10 +1,11 @@
 import html
 from datetime import datetime, timedelta, timezone
+from functools import cached_property
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
-from django.db.models import DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models import DurationField, ExpressionWrapper, F, Q
 from django.db.models.query import QuerySet
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -22,7 +23,8 @@ from api.models import (
     Event,
     FieldReport,
 )
-from deployments.models import ERU, Personnel, PersonnelDeployment
+from api.weekly_digest import WeeklyDigestBuilder
+from deployments.models import PersonnelDeployment
 from main.sentry import SentryMonitor
 from main.utils import logger_context
 from notifications.hello import get_hello
@@ -75,6 +77,45 @@ RTYPE_NAMES = {
 }
 
 
+class SubscriberIndex:
+    """
+    Active users' subscriptions, loaded once per run using a single query.
+    Recipients of all the new records are then resolved in memory.
+    """
+
+    def __init__(self):
+        self.emails = {}  # user_id -> email
+        self.type_users = {}  # (rtype, stype) -> {user_id}
+        self.rtype_users = {}  # rtype -> {user_id}
+        self.lookup_users = {}  # lookup_id -> {user_id}
+        subscriptions = Subscription.objects.filter(user__is_active=True).values_list(
+            "user_id",
+            "user__email",
+            "rtype",
+            "stype",
+            "lookup_id",
+        )
+        for user_id, email, rtype, stype, lookup_id in subscriptions.iterator():
+            self.emails[user_id] = email
+            self.type_users.setdefault((rtype, stype), set()).add(user_id)
+            self.rtype_users.setdefault(rtype, set()).add(user_id)
+            if lookup_id:
+                self.lookup_users.setdefault(lookup_id, set()).add(user_id)
+        self.country_regions = dict(Country.objects.values_list("id", "region_id"))
+
+    def get_type_users(self, rtype, stype):
+        return self.type_users.get((rtype, stype), set())
+
+    def get_rtype_users(self, *rtypes):
+        return set().union(*(self.rtype_users.get(rtype, set()) for rtype in rtypes))
+
+    def get_lookup_users(self, lookup_ids):
+        return set().union(*(self.lookup_users.get(lookup_id, set()) for lookup_id in lookup_ids))
+
+    def get_emails(self, user_ids):
+        return list({self.emails[user_id] for user_id in user_ids})
+
+
 class Command(BaseCommand):
     help = "Index and send notifications about new/changed records"
 
@@ -98,57 +139,42 @@ class Command(BaseCommand):
     def diff_1_week(self):
         return datetime.now(timezone.utc) - time_1_week
 
+    @cached_property
+    def subscriber_index(self):
+        return SubscriberIndex()
+
+    def get_record_values(self, records, field):
+        """Distinct (not null) values of the field across the records, using a single query"""
+        if not isinstance(records, QuerySet):
+            records = list(records)
+            if not records:
+                return set()
+            records = type(records[0]).objects.filter(pk__in=[record.pk for record in records])
+        return set(records.values_list(field, flat=True).distinct().order_by()) - {None}
+
+    def get_lookup_ids(self, country_ids):
+        country_regions = self.subscriber_index.country_regions
+        regions = {country_regions.get(country_id) for country_id in country_ids} - {None}
+        return ["c%s" % id for id in country_ids], ["r%s" % id for id in regions]
+
     def gather_country_and_region(self, records):
         # Appeals only, since these have a single country/region
-        countries = []
-        regions = []
-        for record in records:
-            if record.country is not None:
-                countries.append("c%s" % record.country.id)
-                if record.country.region is not None:
-                    regions.append("r%s" % record.country.region.id)
-        countries = list(set(countries))
-        regions = list(set(regions))
-        return countries, regions
+        return self.get_lookup_ids(self.get_record_values(records, "country"))
 
     def gather_countries_and_regions(self, records):
         # Applies to emergencies and field reports, which have a
         # many-to-many relationship to countries and regions
-        countries = []
-        for record in records:
-            if record.countries is not None:
-                countries += [country.id for country in record.countries.all()]
-        countries = list(set(countries))
-        qs = Country.objects.filter(pk__in=countries)
-        regions = ["r%s" % country.region.id for country in qs if country.region is not None]
-        countries = ["c%s" % id for id in countries]
-        return countries, regions
+        return self.get_lookup_ids(self.get_record_values(records, "countries"))
 
     def gather_event_countries_and_regions(self, records):
         # Applies to surgealerts, which have a
         # many-to-many relationship to countries and regions through event table
-        countries = []
-        for record in records:
-            if record.event is not None and record.event.countries is not None:
-                countries += [country.id for country in record.event.countries.all()]
-        countries = list(set(countries))
-        qs = Country.objects.filter(pk__in=countries)
-        regions = ["r%s" % country.region.id for country in qs if country.region is not None]
-        countries = ["c%s" % id for id in countries]
-        return countries, regions
+        return self.get_lookup_ids(self.get_record_values(records, "event__countries"))
 
     def gather_eventdt_countries_and_regions(self, records):
         # Applies to deployments_personneldeployments, which have a
         # many-to-many relationship to countries and regions through event_deployed_to
-        countries = []
-        for record in records:
-            if record.event_deployed_to.countries is not None:
-                countries += [country.id for country in record.event_deployed_to.countries.all()]
-        countries = list(set(countries))
-        qs = Country.objects.filter(pk__in=countries)
-        regions = ["r%s" % country.region.id for country in qs if country.region is not None]
-        countries = ["c%s" % id for id in countries]
-        return countries, regions
+        return self.get_lookup_ids(self.get_record_values(records, "event_deployed_to__countries"))
 
     def fix_types_for_subs(self, rtype, stype=SubscriptionType.NEW):
         # Correction for the new notification types:
@@ -162,74 +188,49 @@ class Command(BaseCommand):
 
     def gather_subscribers(self, records, rtype, stype):
         rtype_of_subscr, stype = self.fix_types_for_subs(rtype, stype)
+        index = self.subscriber_index
 
         # Gather the email addresses of users who should be notified
         if self.is_digest_mode():
-            subscribers = User.objects.filter(subscription__rtype=RecordType.WEEKLY_DIGEST, is_active=True).values("email")
             # In digest mode we do not care about other circumstances, just get every subscriber's email.
-            emails = list(set([subscriber["email"] for subscriber in subscribers]))
-            return emails
-        else:
-            # Start with any users subscribed directly to this record type.
-            subscribers = User.objects.filter(
-                subscription__rtype=rtype_of_subscr, subscription__stype=stype, is_active=True
-            ).values("email")
-            emails = list(set([subscriber["email"] for subscriber in subscribers]))
-
-        # For FOLLOWED_EVENTs we do not collect other generic (d*, country, region) subscriptions.
-        if rtype_of_subscr != RecordType.FOLLOWED_EVENT:
-            subscribers_no_geo_dtype = (
-                User.objects.filter(subscription__rtype=rtype_of_subscr, subscription__stype=stype, is_active=True)
-                .exclude(subscription__rtype__in=[RecordType.COUNTRY, RecordType.REGION, RecordType.DTYPE])
-                .values("email")
-            )
-            emailset_no_geo_dtype = {subscriber["email"] for subscriber in subscribers_no_geo_dtype}
+            return index.get_emails(index.get_rtype_users(RecordType.WEEKLY_DIGEST))
 
-            subscribers_geo = (
-                User.objects.filter(subscription__rtype=rtype_of_subscr, subscription__stype=stype, is_active=True)
-                .filter(subscription__rtype__in=[RecordType.COUNTRY, RecordType.REGION])
-                .values("email")
-            )
-            emailset_geo = {subscriber["email"] for subscriber in subscribers_geo}
+        # Start with any users subscribed directly to this record type.
+        subscribers = index.get_type_users(rtype_of_subscr, stype)
 
-            subscribers_dtype = (
-                User.objects.filter(subscription__rtype=rtype_of_subscr, subscription__stype=stype, is_active=True)
-                .filter(subscription__rtype=RecordType.DTYPE)
-                .values("email")
-            )
-            emailset_dtype = {subscriber["email"] for subscriber in subscribers_dtype}
-
-            if rtype_of_subscr == RecordType.NEW_OPERATIONS:
-                countries, regions = self.gather_country_and_region(records)
-            elif rtype_of_subscr == RecordType.SURGE_ALERT:
-                countries, regions = self.gather_event_countries_and_regions(records)
-            elif rtype_of_subscr == RecordType.SURGE_DEPLOYMENT_MESSAGES:
-                countries, regions = self.gather_eventdt_countries_and_regions(records)
-            else:
-                countries, regions = self.gather_countries_and_regions(records)
+        # For FOLLOWED_EVENTs we do not collect other generic (d*, country, region) subscriptions.
+        if rtype_of_subscr == RecordType.FOLLOWED_EVENT:
+            return index.get_emails(subscribers)
+
+        subscribers_no_geo_dtype = subscribers - index.get_rtype_users(RecordType.COUNTRY, RecordType.REGION, RecordType.DTYPE)
+        subscribers_geo = subscribers & index.get_rtype_users(RecordType.COUNTRY, RecordType.REGION)
+        subscribers_dtype = subscribers & index.get_rtype_users(RecordType.DTYPE)
+
+        if rtype_of_subscr == RecordType.NEW_OPERATIONS:
+            countries, regions = self.gather_country_and_region(records)
+        elif rtype_of_subscr == RecordType.SURGE_ALERT:
+            countries, regions = self.gather_event_countries_and_regions(records)
+        elif rtype_of_subscr == RecordType.SURGE_DEPLOYMENT_MESSAGES:
+            countries, regions = self.gather_eventdt_countries_and_regions(records)
+        else:
+            countries, regions = self.gather_countries_and_regions(records)
 
-            if rtype_of_subscr == RecordType.SURGE_ALERT:
-                dtypes = list(set(["d%s" % record.event.dtype.id for record in records if record.event.dtype is not None]))
-            elif rtype_of_subscr == RecordType.SURGE_DEPLOYMENT_MESSAGES:
-                dtypes = list(set(["d%s" % rec.event_deployed_to.dtype.id for rec in records if rec.event_deployed_to.dtype]))
-            else:
-                dtypes = list(set(["d%s" % record.dtype.id for record in records if record.dtype is not None]))
+        if rtype_of_subscr == RecordType.SURGE_ALERT:
+            dtypes = self.get_record_values(records, "event__dtype")
+        elif rtype_of_subscr == RecordType.SURGE_DEPLOYMENT_MESSAGES:
+            dtypes = self.get_record_values(records, "event_deployed_to__dtype")
+        else:
+            dtypes = self.get_record_values(records, "dtype")
+        dtypes = ["d%s" % id for id in dtypes]
 
-            geo = countries + regions
-            if len(geo):
-                emailset_geo = emailset_geo & {
-                    subscriber["email"]
-                    for subscriber in User.objects.filter(subscription__lookup_id__in=geo, is_active=True).values("email")
-                }
+        geo = countries + regions
+        if len(geo):
+            subscribers_geo = subscribers_geo & index.get_lookup_users(geo)
 
-            if len(dtypes):
-                emailset_dtype = emailset_dtype & {
-                    subscriber["email"]
-                    for subscriber in User.objects.filter(subscription__lookup_id__in=dtypes, is_active=True).values("email")
-                }
+        if len(dtypes):
+            subscribers_dtype = subscribers_dtype & index.get_lookup_users(dtypes)
 
-            emails = list(emailset_no_geo_dtype | emailset_geo | emailset_dtype)
-        return emails
+        return index.get_emails(subscribers_no_geo_dtype | subscribers_geo | subscribers_dtype)
 
     def get_template(self, rtype=99):
         # older: return 'email/generic_notification.html'
@@ -344,122 +345,8 @@ class Command(BaseCommand):
             display += "s"
         return display
 
-    def get_weekly_digest_data(self, field):
-        today = datetime.now(timezone.utc)
-        if field == "dref":
-            return Appeal.objects.filter(end_date__gt=today, atype=0).count()
-        elif field == "ea":
-            return Appeal.objects.filter(end_date__gt=today, atype=1).count()
-        elif field == "fund":
-            amount_req = (
-                Appeal.objects.filter(Q(end_date__gt=today, atype=1) | Q(end_date__gt=today, atype=2)).aggregate(
-                    Sum("amount_requested")
-                )["amount_requested__sum"]
-                or 0
-            )
-            amount_fund = (
-                Appeal.objects.filter(Q(end_date__gt=today, atype=1) | Q(end_date__gt=today, atype=2)).aggregate(
-                    Sum("amount_funded")
-                )["amount_funded__sum"]
-                or 0
-            )
-            percent = float(round(amount_fund / amount_req, 3) * 100) if amount_req != 0 else 0
-            return percent
-        elif field == "budget":
-            amount = Appeal.objects.filter(end_date__gt=today).aggregate(Sum("amount_requested"))["amount_requested__sum"] or 0
-            rounded_amount = round(amount / 1000000, 2)
-            return rounded_amount
-        elif field == "pop":
-            people = Appeal.objects.filter(end_date__gt=today).aggregate(Sum("num_beneficiaries"))["num_beneficiaries__sum"] or 0
-            rounded_people = round(people / 1000000, 2)
-            return rounded_people
-
-    def get_weekly_digest_latest_ops(self):
-        dig_time = self.diff_1_week()
-        ops = Appeal.objects.filter(created_at__gte=dig_time).order_by("-created_at")
-        ret_ops = []
-        for op in ops:
-            op_to_add = {
-                "op_event_id": op.event_id,
-                "op_country": Country.objects.values_list("name", flat=True).get(id=op.country_id) if op.country_id else "",
-                "op_name": op.name,
-                "op_created_at": op.created_at,
-                "op_funding": float(op.amount_requested),
-            }
-            ret_ops.append(op_to_add)
-        return ret_ops
-
-    def get_weekly_digest_latest_deployments(self):
-        dig_time = self.diff_1_week()
-        ret_data = []
-
-        # Surge Alerts
-        # surge_list = list(SurgeAlert.objects.filter(created_at__gte=dig_time).order_by('-created_at'))
-        # if surge_list:
-        #     for alert in surge_list:
-        #         event = Event.objects.get(id=alert.event_id) if alert.event_id != None else None
-        #         alert_to_add = {
-        #             'type': 'Alert',
-        #             'operation': alert.operation,
-        #            'event_url': (
-        #                '{}/emergencies/{}'.format(settings.GO_WEB_URL, event.id) if event else
-        #                settings.GO_WEB_URL,
-        #            ),
-        #             'society_from': '',
-        #             'deployed_to': '',
-        #             'name': '',
-        #             'role': '',
-        #             'appeal': '',
-        #         }
-        #         ret_data.append(alert_to_add)
-
-        # Surge Deployments
-        personnel_list = Personnel.objects.filter(start_date__gte=dig_time).order_by("start_date")
-        for pers in personnel_list:
-            deployment = PersonnelDeployment.objects.get(id=pers.deployment_id)
-            event = Event.objects.get(id=deployment.event_deployed_to_id) if deployment.event_deployed_to_id is not None else None
-            country_from = Country.objects.get(id=pers.country_from_id) if pers.country_from_id is not None else None
-            dep_to_add = {
-                "operation": event.name if event else "",
-                "event_url": ("{}/emergencies/{}".format(settings.GO_WEB_URL, event.id) if event else settings.GO_WEB_URL),
-                "society_from": country_from.society_name if country_from else "",
-                "name": pers.name,
-                "role": pers.role,
-                "start_date": pers.start_date,
-                "end_date": pers.end_date,
-            }
-            ret_data.append(dep_to_add)
-
-        return ret_data
-
-    def get_weekly_digest_highlights(self):
-        dig_time = self.diff_1_week()
-        events = Event.objects.filter(is_featured=True, updated_at__gte=dig_time).order_by("-updated_at")
-        ret_highlights = []
-        for ev in events:
-            amount_requested = (
-                Appeal.objects.filter(event_id=ev.id).aggregate(Sum("amount_requested"))["amount_requested__sum"] or "--"
-            )
-            amount_funded = Appeal.objects.filter(event_id=ev.id).aggregate(Sum("amount_funded"))["amount_funded__sum"] or "--"
-            coverage = "--"
-
-            if amount_funded != "--" and amount_requested != "--":
-                coverage = round(amount_funded / amount_requested, 1) if amount_requested != 0 else 0
-
-            data_to_add = {
-                "hl_id": ev.id,
-                "hl_name": ev.name,
-                "hl_last_update": ev.updated_at,
-                "hl_people": (
-                    Appeal.objects.filter(event_id=ev.id).aggregate(Sum("num_beneficiaries"))["num_beneficiaries__sum"] or "--"
-                ),
-                "hl_funding": amount_requested,
-                "hl_deployed_eru": ERU.objects.filter(event_id=ev.id).aggregate(Sum("units"))["units__sum"] or "--",
-                "hl_deployed_sp": PersonnelDeployment.objects.filter(event_deployed_to_id=ev.id).count(),
-                "hl_coverage": coverage,
-            }
-            ret_highlights.append(data_to_add)
-        return ret_highlights
+    def get_weekly_digest(self):
+        return WeeklyDigestBuilder(since=self.diff_1_week(), now=datetime.now(timezone.utc)).build()
 
     def get_actions_taken(self, frid):
         ret_actions_taken = {
@@ -484,20 +371,6 @@ class Command(BaseCommand):
                 ret_actions_taken["FDRN"].append(action_to_add)
         return ret_actions_taken
 
-    def get_weekly_latest_frs(self):
-        dig_time = self.diff_1_week()
-        ret_fr_list = []
-        fr_list = list(FieldReport.objects.filter(created_at__gte=dig_time).order_by("-created_at"))
-        for fr in fr_list:
-            fr_data = {
-                "id": fr.id,
-                "country": fr.countries.all()[0].name if fr.countries else None,
-                "summary": fr.summary,
-                "created_at": fr.created_at,
-            }
-            ret_fr_list.append(fr_data)
-        return ret_fr_list
-
     def get_fieldreport_keyfigures(self, num_list):
         """Return the first non-None element from num_list as float, or None if all are None."""
         for num in num_list:
@@ -691,15 +564,7 @@ class Command(BaseCommand):
         elif rtype == RecordType.WEEKLY_DIGEST:
             rec_obj = {
                 "resource_uri": settings.GO_WEB_URL,
-                "active_dref": self.get_weekly_digest_data("dref"),
-                "active_ea": self.get_weekly_digest_data("ea"),
-                "funding_coverage": self.get_weekly_digest_data("fund"),
-                "budget": self.get_weekly_digest_data("budget"),
-                "population": self.get_weekly_digest_data("pop"),
-                "highlighted_ops": self.get_weekly_digest_highlights(),
-                "latest_ops": self.get_weekly_digest_latest_ops(),
-                "latest_deployments": self.get_weekly_digest_latest_deployments(),
-                "latest_field_reports": self.get_weekly_latest_frs(),
+                **self.get_weekly_digest(),
             }
         elif rtype == RecordType.SURGE_ALERT:
             rec_obj = {
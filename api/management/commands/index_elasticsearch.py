@@ -1,53 +1,140 @@
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
 from elasticsearch.client import IndicesClient
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import parallel_bulk
 
 from api.esconnection import ES_CLIENT
 from api.indexes import ES_PAGE_NAME, GenericMapping, GenericSetting
 from api.logger import logger
 from api.models import Appeal, Country, Event, FieldReport, Region
-from utils.elasticsearch import construct_es_data
+from utils.elasticsearch import construct_es_data, set_es_reindex_target
+
+# Bulk requests are bigger than the default requests, ES_CLIENT timeout is too short for them
+BULK_REQUEST_TIMEOUT = 60
 
 
 class Command(BaseCommand):
     help = "Create a new elasticsearch index and bulk-index existing objects"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reindex",
+            action="store_true",
+            help=(
+                f"Index into a new versioned index and then atomically point the {ES_PAGE_NAME} alias to it"
+                " (Search keeps using the current index until then)"
+            ),
+        )
+        parser.add_argument("--chunk-size", type=int, default=500, help="Number of documents per bulk request")
+        parser.add_argument("--workers", type=int, default=4, help="Number of threads sending bulk requests")
+
     def handle(self, *args, **options):
-        logger.info("Recreating indices")
-        self.recreate_index(ES_PAGE_NAME, GenericMapping, GenericSetting)
+        chunk_size = options["chunk_size"]
+        workers = options["workers"]
+        reindex = options["reindex"]
 
-        logger.info("Indexing regions")
-        self.push_table_to_index(model=Region)
+        if reindex:
+            index_name = f"{ES_PAGE_NAME}_{timezone.now():%Y%m%d%H%M%S}"
+            logger.info(f"Creating index {index_name}")
+            self.create_index(index_name, GenericMapping, GenericSetting)
+            # Changes made during the rebuild are also sent to the new index (See utils.elasticsearch.bulk_es_actions)
+            set_es_reindex_target(index_name)
+        else:
+            index_name = ES_PAGE_NAME
+            logger.info("Recreating indices")
+            self.recreate_index(index_name, GenericMapping, GenericSetting)
 
-        logger.info("Indexing countries")
-        self.push_table_to_index(model=Country)
+        try:
+            report = []
+            for label, queryset in (
+                ("regions", Region.objects.all()),
+                ("countries", Country.objects.filter(in_search=True)),
+                ("events", Event.objects.filter(parent_event__isnull=True).prefetch_related("countries")),
+                ("appeals", Appeal.objects.select_related("event", "country")),
+                ("field reports", FieldReport.objects.prefetch_related("countries")),
+            ):
+                logger.info(f"Indexing {label}")
+                report.append((label, *self.push_table_to_index(queryset, index_name, chunk_size, workers)))
 
-        logger.info("Indexing events")
-        self.push_table_to_index(model=Event)
+            self.print_report(report)
 
-        logger.info("Indexing appeals")
-        self.push_table_to_index(model=Appeal)
+            if reindex:
+                failed = sum(errors for _, _, errors, _ in report)
+                if failed:
+                    IndicesClient(client=ES_CLIENT).delete(index=index_name)
+                    raise CommandError(f"{failed} documents failed to index, keeping the current index. Deleted {index_name}")
+                self.swap_alias(index_name)
+        finally:
+            if reindex:
+                set_es_reindex_target(None)
 
-        logger.info("Indexing field reports")
-        self.push_table_to_index(model=FieldReport)
+    def create_index(self, index_name, index_mapping, index_setting):
+        indices_client = IndicesClient(client=ES_CLIENT)
+        indices_client.create(index=index_name, body=index_setting)
+        indices_client.put_mapping(doc_type="page", index=index_name, body=index_mapping)
 
     def recreate_index(self, index_name, index_mapping, index_setting):
         indices_client = IndicesClient(client=ES_CLIENT)
-        if indices_client.exists(index_name):
+        if indices_client.exists_alias(name=index_name):
+            # Created using --reindex
+            for aliased_index_name in indices_client.get_alias(name=index_name):
+                indices_client.delete(index=aliased_index_name)
+        elif indices_client.exists(index_name):
             indices_client.delete(index=index_name)
-        indices_client.create(index=index_name, body=index_setting)
-        indices_client.put_mapping(doc_type="page", index=index_name, body=index_mapping)
+        self.create_index(index_name, index_mapping, index_setting)
 
-    def push_table_to_index(self, model):
-        if model.__name__ == "Event":
-            query = model.objects.filter(parent_event__isnull=True)
-        elif model.__name__ == "Country":
-            query = model.objects.filter(in_search=True)
-        else:
-            query = model.objects.all()
-        data = [construct_es_data(s, is_create=True) for s in list(query)]
-        created, errors = bulk(client=ES_CLIENT, actions=data)
+    def swap_alias(self, index_name):
+        indices_client = IndicesClient(client=ES_CLIENT)
+        indices_client.refresh(index=index_name)
+        old_index_names = []
+        actions = [{"add": {"index": index_name, "alias": ES_PAGE_NAME}}]
+        if indices_client.exists_alias(name=ES_PAGE_NAME):
+            old_index_names = list(indices_client.get_alias(name=ES_PAGE_NAME))
+            actions.insert(0, {"remove": {"indices": old_index_names, "alias": ES_PAGE_NAME}})
+        elif indices_client.exists(ES_PAGE_NAME):
+            # First run: ES_PAGE_NAME is still a concrete index, replace it with the alias
+            actions.insert(0, {"remove_index": {"index": ES_PAGE_NAME}})
+        indices_client.update_aliases(body={"actions": actions})
+        logger.info(f"Alias {ES_PAGE_NAME} now points to {index_name}")
+        for old_index_name in old_index_names:
+            indices_client.delete(index=old_index_name)
+            logger.info(f"Deleted old index {old_index_name}")
+
+    def push_table_to_index(self, queryset, index_name, chunk_size, workers):
+        def _actions():
+            for record in queryset.iterator(chunk_size=chunk_size):
+                data = construct_es_data(record, is_create=True)
+                data["_index"] = index_name
+                yield data
+
+        created, errors = 0, []
+        start = time.monotonic()
+        for ok, info in parallel_bulk(
+            client=ES_CLIENT,
+            actions=_actions(),
+            thread_count=workers,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            request_timeout=BULK_REQUEST_TIMEOUT,
+        ):
+            if ok:
+                created += 1
+            elif info.get("create", {}).get("status") == 409:
+                # Already indexed by a change made during the rebuild (Newer than the document read here)
+                created += 1
+            else:
+                errors.append(info)
+        duration = time.monotonic() - start
         logger.info("Created %s records" % created)
         if len(errors):
             logger.error("Produced the following errors:")
             logger.error("[%s]" % ", ".join(map(str, errors)))
+        return created, len(errors), duration
+
+    def print_report(self, report):
+        self.stdout.write("Model            Documents     Failed   Seconds   Docs/sec")
+        for label, created, failed, duration in report:
+            docs_per_second = created / duration if duration else 0
+            self.stdout.write(f"{label:<16} {created:>9} {failed:>10} {duration:>9.2f} {docs_per_second:>10.1f}")
@@ -12,6 +12,7 @@ from sentry_sdk.crons import monitor
 
 from api.create_cron import create_cron_record
 from api.fixtures.dtype_map import DISASTER_TYPE_MAPPING
+from api.key_figures import defer_key_figure_rollup_refresh
 from api.logger import logger
 from api.models import (
     Appeal,
@@ -294,22 +295,7 @@ class Command(BaseCommand):
 
         return fields
 
-    @monitor(monitor_slug=SentryMonitor.INGEST_APPEALS)
-    def handle(self, *args, **options):
-        logger.info("Starting appeals ingest")
-        start_appeals_count = Appeal.objects.all().count()
-        try:
-            new, modified, bilaterals = self.get_new_or_modified_appeals()
-        except Exception as ex:
-            logger.error(f"Getting Appeals and AppealBilaterals failed: {str(ex)}")
-            return
-        if new is None or modified is None or bilaterals is None:
-            logger.error("Appeals ingest aborted due to upstream API errors.")
-            return
-        logger.info(f"{start_appeals_count} current appeals")
-        logger.info(f"Creating {len(new)} new appeals")
-        logger.info(f"Updating {len(modified)} existing appeals that MIGHT have been modified")
-
+    def save_appeals(self, new, modified, bilaterals):
         errors = []
         num_created = 0
         for i, r in enumerate(new):
@@ -347,6 +333,27 @@ class Command(BaseCommand):
                 logger.error(str(ex)[:100])
                 logger.error(err_text)
                 errors.append(err_text)
+        return num_created, num_updated, errors
+
+    @monitor(monitor_slug=SentryMonitor.INGEST_APPEALS)
+    def handle(self, *args, **options):
+        logger.info("Starting appeals ingest")
+        start_appeals_count = Appeal.objects.all().count()
+        try:
+            new, modified, bilaterals = self.get_new_or_modified_appeals()
+        except Exception as ex:
+            logger.error(f"Getting Appeals and AppealBilaterals failed: {str(ex)}")
+            return
+        if new is None or modified is None or bilaterals is None:
+            logger.error("Appeals ingest aborted due to upstream API errors.")
+            return
+        logger.info(f"{start_appeals_count} current appeals")
+        logger.info(f"Creating {len(new)} new appeals")
+        logger.info(f"Updating {len(modified)} existing appeals that MIGHT have been modified")
+
+        # NOTE: Appeal key figures are refreshed once for all the touched countries/regions
+        with defer_key_figure_rollup_refresh():
+            num_created, num_updated, errors = self.save_appeals(new, modified, bilaterals)
 
         if errors:
             create_cron_record(CRON_NAME, "\n".join(errors), CronJobStatus.WARNED, len(errors))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sentry_sdk.crons import monitor
+
+from api.key_figures import finalize_key_figure_rollups, refresh_key_figure_rollups
+from api.logger import logger
+from main.sentry import SentryMonitor
+
+
+class Command(BaseCommand):
+    help = "Refresh the appeal key figures rollup (AppealKeyFigureRollup) for all the scopes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--day",
+            type=datetime.date.fromisoformat,
+            help="Day to refresh (YYYY-MM-DD), Default: today",
+        )
+
+    @monitor(monitor_slug=SentryMonitor.REFRESH_APPEAL_KEY_FIGURES)
+    def handle(self, *args, **options):
+        # NOTE: Appeal changes refreshes the affected scopes,
+        # this makes sure appeals starting/ending during the day are also reflected
+        rollups = refresh_key_figure_rollups(day=options["day"])
+        logger.info(f"Refreshed {len(rollups)} appeal key figure rollups")
+        if options["day"] is None:
+            # Rollups stored during the previous day are recomputed at the end of that day
+            yesterday = timezone.now().date() - datetime.timedelta(days=1)
+            rollups = finalize_key_figure_rollups(yesterday)
+            logger.info(f"Finalized {len(rollups)} appeal key figure rollups of {yesterday}")
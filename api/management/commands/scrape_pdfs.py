@@ -1,5 +1,10 @@
 # Officially a work of Navin (toggle-corp/ifrc), modified some parts for Django Admin usage
+import hashlib
+import os
 import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from io import BytesIO
 
 import requests
@@ -7,6 +12,7 @@ import urllib3
 import xmltodict
 from bs4 import BeautifulSoup as bsoup
 from django.core.management.base import BaseCommand
+from django.db import connections, transaction
 from pdfminer.converter import HTMLConverter
 from pdfminer.layout import LAParams
 from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
@@ -92,6 +98,13 @@ PDF_TYPES = (
     ("ea", EA_FIELDS),
 )
 
+PDF_TYPE_MODELS = {
+    "epoa": EmergencyOperationsDataset,
+    "ou": EmergencyOperationsPeopleReached,
+    "fr": EmergencyOperationsFR,
+    "ea": EmergencyOperationsEA,
+}
+
 HEADERS = {"user-agent": "Mozilla/5.0 (X11; Linux x86_64; rv:63.0) Gecko/20100101 Firefox/63.0"}
 
 TYPE_URLS = {
@@ -102,9 +115,60 @@ TYPE_URLS = {
 }
 
 
+def convert_pdf_to_html(pdf_data):
+    """Returns the HTML and the number of pages of the PDF"""
+    pdf_rm = PDFResourceManager()
+    bytesio = BytesIO()
+    laparams = LAParams()
+    html_conv = HTMLConverter(pdf_rm, bytesio, codec="utf-8", laparams=laparams)
+    pdf_intr = PDFPageInterpreter(pdf_rm, html_conv)
+
+    pages = 0
+    for page in PDFPage.get_pages(pdf_data, set(), maxpages=0, caching=False, check_extractable=True):
+        pdf_intr.process_page(page)
+        pages += 1
+
+    text = bytesio.getvalue().decode()
+    html, errors = tidy_document(text)
+    html = re.sub(r"\s\s+", " ", html)
+
+    html_conv.close()
+    bytesio.close()
+
+    return html, pages
+
+
+def convert_pdf_to_text_blocks(pdf_content):
+    """
+    CPU bound, runs in the scrape_pdfs worker processes
+    Returns the text blocks of the PDF with the stats of the conversion
+    """
+    start = time.monotonic()
+    html, pages = convert_pdf_to_html(BytesIO(pdf_content))
+    soup = bsoup(html, "html.parser")
+    texts = []
+    for div in soup.find_all("div"):
+        text = []
+        for span in div.find_all(["span", "a"]):
+            text.append(" ".join(span.get_text().split()))
+        texts.append(" ".join(text).strip())
+
+    return {
+        "texts": texts,
+        "pages": pages,
+        "seconds": time.monotonic() - start,
+        "worker": os.getpid(),
+    }
+
+
 class Command(BaseCommand):
     help = "Scrape data from PDFs (only which are not already in the database)"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Number of processes used to convert the PDFs")
+        parser.add_argument("--download-workers", type=int, default=4, help="Number of concurrent PDF downloads")
+        parser.add_argument("--batch-size", type=int, default=100, help="Number of records saved per query")
+
     def get_documents(self, pdf_type):
         def get_documents_for(url, d_type, db_set):
             response = requests.get(url)
@@ -140,59 +204,100 @@ class Command(BaseCommand):
 
         return get_documents_for(TYPE_URLS[pdf_type], pdf_type, db_set)
 
-    def convert_pdf_to_html(self, pdf_data):
-        pdf_rm = PDFResourceManager()
-        bytesio = BytesIO()
-        laparams = LAParams()
-        html_conv = HTMLConverter(pdf_rm, bytesio, codec="utf-8", laparams=laparams)
-        pdf_intr = PDFPageInterpreter(pdf_rm, html_conv)
-
-        for page in PDFPage.get_pages(pdf_data, set(), maxpages=0, caching=False, check_extractable=True):
-            pdf_intr.process_page(page)
+    def get_known_hashes(self, pdf_type):
+        model = PDF_TYPE_MODELS[pdf_type]
+        return set(model.objects.filter(raw_file_hash__isnull=False).values_list("raw_file_hash", flat=True))
 
-        text = bytesio.getvalue().decode()
-        html, errors = tidy_document(text)
-        html = re.sub(r"\s\s+", " ", html)
-
-        html_conv.close()
-        bytesio.close()
+    def read_pdf_into_memory(self, url):
+        response = self.http.request("GET", url, headers=HEADERS)
+        return response.data
 
-        return html
+    def scrape_documents(self, documents, known_hashes):
+        """
+        Pipeline: Download (threads, shared connection pool) -> PDF to text blocks (worker processes)
+        Yields (document, content hash, text blocks or exception) as the documents are converted
+        NOTE: Documents with an already scraped content (known_hashes) are skipped
+        """
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloader, self.get_converter() as converter:
+            downloads = {downloader.submit(self.read_pdf_into_memory, doc[0]): doc for doc in documents}
+            conversions = {}
+            for future in as_completed(downloads):
+                doc = downloads[future]
+                try:
+                    pdf_content = future.result()
+                except Exception as ex:
+                    yield doc, None, ex
+                    continue
+                content_hash = hashlib.sha256(pdf_content).hexdigest()
+                if content_hash in known_hashes:
+                    logger.info(f"Skipping unchanged document: {doc[0]}")
+                    self.skipped_count += 1
+                    continue
+                known_hashes.add(content_hash)
+                conversions[converter.submit(convert_pdf_to_text_blocks, pdf_content)] = (doc, content_hash)
 
-    def convert_pdf_to_text_blocks(self, pdf_data):
-        html = self.convert_pdf_to_html(pdf_data)
-        soup = bsoup(html, "html.parser")
-        texts = []
-        for div in soup.find_all("div"):
-            text = []
-            for span in div.find_all(["span", "a"]):
-                text.append(" ".join(span.get_text().split()))
-            texts.append(" ".join(text).strip())
+            for future in as_completed(conversions):
+                doc, content_hash = conversions[future]
+                try:
+                    result = future.result()
+                except Exception as ex:
+                    yield doc, content_hash, ex
+                    continue
+                worker_stats = self.worker_stats[result["worker"]]
+                worker_stats["documents"] += 1
+                worker_stats["pages"] += result["pages"]
+                worker_stats["seconds"] += result["seconds"]
+                yield doc, content_hash, result["texts"]
 
-        return texts
+    def get_converter(self):
+        if self.workers > 1:
+            # NOTE: Forked workers shouldn't share the parent's DB connections
+            connections.close_all()
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=1)
 
-    def read_pdf_into_memory(self, url):
-        http = urllib3.PoolManager()
-        response = http.request("GET", url, headers=HEADERS)
-        pdf_data = BytesIO(response.data)
+    def save_records(self, label, records):
+        """Save the records in batches, falling back to one by one to find the failing records"""
+        errors = []
+        logger.info(f"Adding new {label} records to DB (count: {len(records)})")
+        for i in range(0, len(records), self.batch_size):
+            batch = records[i : i + self.batch_size]
+            try:
+                with transaction.atomic():
+                    type(batch[0]).objects.bulk_create(batch)
+                continue
+            except Exception:
+                logger.warning(f"Couldn't add the {label} batch, adding the records one by one", exc_info=True)
+            for record in batch:
+                try:
+                    with transaction.atomic():
+                        record.save()
+                except Exception as ex:
+                    logger.error(f"Couldn't add {label}: {record.raw_file_name} ({record.raw_file_url}). Exception: {str(ex)}")
+                    errors.append(f"Save to DB failed for: {record.raw_file_url}")
+        return errors
 
-        return pdf_data
+    def print_worker_report(self):
+        self.stdout.write(f"Skipped unchanged documents: {self.skipped_count}")
+        self.stdout.write("Worker      Documents     Pages   Seconds  Pages/sec")
+        for worker, stats in self.worker_stats.items():
+            pages_per_second = stats["pages"] / stats["seconds"] if stats["seconds"] else 0
+            self.stdout.write(
+                f"{worker:<10} {stats['documents']:>10} {stats['pages']:>9} {stats['seconds']:>9.2f} {pages_per_second:>10.1f}"
+            )
 
     def clean_data_and_save(self, scraped_data):
         epoa_to_add = []
         ou_to_add = []
         fr_to_add = []
         ea_to_add = []
-        epoa_errors = []
-        ou_errors = []
-        fr_errors = []
-        ea_errors = []
 
         for data in scraped_data:
             if data["d_type"] == "epoa":
                 new_epoa = EmergencyOperationsDataset(
                     raw_file_name=data["filename"],
                     raw_file_url=data["url"],
+                    raw_file_hash=data["hash"],
                     raw_appeal_launch_date=data["meta"].get(_mfd.appeal_launch_date),
                     raw_appeal_number=data["meta"].get(_mfd.appeal_number),
                     raw_category_allocated=data["meta"].get(_mfd.category_allocated),
@@ -377,6 +482,7 @@ class Command(BaseCommand):
                 new_ou = EmergencyOperationsPeopleReached(
                     raw_file_name=data["filename"],
                     raw_file_url=data["url"],
+                    raw_file_hash=data["hash"],
                     raw_appeal_number=data["meta"].get(_mfd.appeal_number),
                     raw_date_of_issue=data["meta"].get(_mfd.date_of_issue),
                     raw_epoa_update_num=data["meta"].get(_mfd.epoa_update_num),
@@ -515,6 +621,7 @@ class Command(BaseCommand):
                 new_fr = EmergencyOperationsFR(
                     raw_file_name=data["filename"],
                     raw_file_url=data["url"],
+                    raw_file_hash=data["hash"],
                     raw_appeal_number=data["meta"].get(_mfd.appeal_number),
                     raw_date_of_disaster=data["meta"].get(_mfd.date_of_disaster),
                     raw_date_of_issue=data["meta"].get(_mfd.date_of_issue),
@@ -667,6 +774,7 @@ class Command(BaseCommand):
                 new_ea = EmergencyOperationsEA(
                     raw_file_name=data["filename"],
                     raw_file_url=data["url"],
+                    raw_file_hash=data["hash"],
                     raw_appeal_ends=data["meta"].get(_mfd.appeal_ends),
                     raw_appeal_launch_date=data["meta"].get(_mfd.appeal_launch_date),
                     raw_appeal_number=data["meta"].get(_mfd.appeal_number),
@@ -830,70 +938,46 @@ class Command(BaseCommand):
                 )
                 ea_to_add.append(new_ea)
 
-        # # None of the records get inserted if any of them fails, but it would be faster this way
-        # logger.info('Adding new EPoA records to DB (count: {})'.format(len(epoa_to_add)))
-        # EmergencyOperationsDataset.objects.bulk_create(epoa_to_add)
-        # logger.info('Adding new OU records to DB (count: {})'.format(len(ou_to_add)))
-        # EmergencyOperationsPeopleReached.objects.bulk_create(ou_to_add)
-        # logger.info('Adding new FR records to DB (count: {})'.format(len(fr_to_add)))
-        # EmergencyOperationsFR.objects.bulk_create(fr_to_add)
-        # logger.info('Adding new EA records to DB (count: {})'.format(len(ea_to_add)))
-        # EmergencyOperationsEA.objects.bulk_create(ea_to_add)
-
-        logger.info("Adding new EPoA records to DB (count: {})".format(len(epoa_to_add)))
-        for epoa_rec in epoa_to_add:
-            try:
-                epoa_rec.save()
-            except Exception as ex:
-                logger.error(f"Couldn't add EPoA: {epoa_rec.raw_file_name} ({epoa_rec.raw_file_url}). Exception: {str(ex)}")
-                epoa_errors.append(f"Save to DB failed for: {epoa_rec.raw_file_url}")
-
-        logger.info(f"Adding new OU records to DB (count: {len(ou_to_add)})")
-        for ou_rec in ou_to_add:
-            try:
-                ou_rec.save()
-            except Exception as ex:
-                logger.error(f"Couldn't add OU: {ou_rec.raw_file_name} ({ou_rec.raw_file_url}). Exception: {str(ex)}")
-                ou_errors.append(f"Save to DB failed for: {ou_rec.raw_file_url}")
-
-        logger.info(f"Adding new FR records to DB (count: {len(fr_to_add)})")
-        for fr_rec in fr_to_add:
-            try:
-                fr_rec.save()
-            except Exception as ex:
-                logger.error(f"Couldn't add FR: {fr_rec.raw_file_name} ({fr_rec.raw_file_url}). Exception: {str(ex)}")
-                fr_errors.append(f"Save to DB failed for: {fr_rec.raw_file_url}")
-
-        logger.info(f"Adding new EA records to DB (count: {len(ea_to_add)})")
-        for ea_rec in ea_to_add:
-            try:
-                ea_rec.save()
-            except Exception as ex:
-                logger.error(f"Couldn't add EA: {ea_rec.raw_file_name} ({ea_rec.raw_file_url}). Exception: {str(ex)}")
-                ea_errors.append(f"Save to DB failed for: {ea_rec.raw_file_url}")
+        epoa_errors = self.save_records("EPoA", epoa_to_add)
+        ou_errors = self.save_records("OU", ou_to_add)
+        fr_errors = self.save_records("FR", fr_to_add)
+        ea_errors = self.save_records("EA", ea_to_add)
         return epoa_errors, ou_errors, fr_errors, ea_errors
 
     def handle(self, *args, **options):
         logger.info("Starting PDF scraping.")
+        self.workers = options["workers"]
+        self.download_workers = options["download_workers"]
+        self.batch_size = options["batch_size"]
+        # Shared connection pool for all the downloads
+        self.http = urllib3.PoolManager(maxsize=self.download_workers)
+        self.worker_stats = defaultdict(lambda: {"documents": 0, "pages": 0, "seconds": 0.0})
+        self.skipped_count = 0
+
         processed_data = []
-        epoa_errs = []
-        ou_errs = []
-        fr_errs = []
-        ea_errs = []
+        documents_count = 0
+        scraping_errors = {pdf_type: [] for pdf_type, _ in PDF_TYPES}
+        saving_errors = {pdf_type: [] for pdf_type, _ in PDF_TYPES}
+
+        def save_processed_data():
+            for pdf_type, errors in zip(("epoa", "ou", "fr", "ea"), self.clean_data_and_save(processed_data)):
+                saving_errors[pdf_type].extend(errors)
+            processed_data.clear()
 
         # Loop through the data types (epoa, ou, etc)
         for pdf_type, fields in PDF_TYPES:
             logger.info("Getting document list.")
             urls_with_filenames = self.get_documents(pdf_type)
+            documents_count += len(urls_with_filenames)
             logger.info(
                 "Count of new {pdftype} documents: {doc_count}".format(pdftype=pdf_type, doc_count=len(urls_with_filenames))
             )
             logger.info("Starting to process PDFs.")
 
-            for doc in urls_with_filenames:
+            for doc, content_hash, texts in self.scrape_documents(urls_with_filenames, self.get_known_hashes(pdf_type)):
                 try:
-                    pdf_data = self.read_pdf_into_memory(doc[0])
-                    texts = self.convert_pdf_to_text_blocks(pdf_data)
+                    if isinstance(texts, Exception):
+                        raise texts
                     m_texts = texts[: texts.index("Page 2")]
                     m_extractor = MetaFieldExtractor(m_texts, fields)
                     s_extractor = SectorFieldExtractor(texts, SECTORS, SECTOR_FIELDS)
@@ -904,64 +988,54 @@ class Command(BaseCommand):
                         {
                             "url": doc[0],
                             "filename": doc[1],
+                            "hash": content_hash,
                             "meta": m_data,
                             "sector": s_data,
                             "d_type": doc[2],
                         }
                     )
                 except Exception as ex:
-                    err_msg = f"Scraping failed for: {doc[0]}. Exception: {str(ex)}\n"
-                    if pdf_type == "epoa":
-                        epoa_errs.append(err_msg)
-                    elif pdf_type == "ou":
-                        ou_errs.append(err_msg)
-                    elif pdf_type == "fr":
-                        fr_errs.append(err_msg)
-                    elif pdf_type == "ea":
-                        ea_errs.append(err_msg)
+                    scraping_errors[pdf_type].append(f"Scraping failed for: {doc[0]}. Exception: {str(ex)}\n")
+                if len(processed_data) >= self.batch_size:
+                    save_processed_data()
 
+        save_processed_data()
         logger.info("Processing PDFs finished.")
+        self.print_worker_report()
 
-        epoa_str_errs = "\n".join(epoa_errs)
-        ou_str_errs = "\n".join(ou_errs)
-        fr_str_errs = "\n".join(fr_errs)
-        ea_str_errs = "\n".join(ea_errs)
-        errors_count = len(epoa_errs) + len(ou_errs) + len(fr_errs) + len(ea_errs)
-        scraped_count = len(urls_with_filenames) - errors_count
+        errors_count = sum(len(errors) for errors in scraping_errors.values())
+        scraped_count = documents_count - self.skipped_count - errors_count
 
         all_error_msgs = ""
         if errors_count:
             all_error_msgs = f"""
                 \nScraping errors --- ({errors_count})
-                {('EPOA errors:' + epoa_str_errs) if epoa_str_errs else ''}
-                {('OU errors:' + ou_str_errs) if ou_str_errs else ''}
-                {('FR errors:' + fr_str_errs) if fr_str_errs else ''}
-                {('EA errors:' + ea_str_errs) if ea_str_errs else ''}
+                {self.format_errors(scraping_errors)}
             """
 
         cron_msg = f"Done scraping PDF-s --- ({scraped_count}) {all_error_msgs}"
 
-        logger.info("Starting data-cleaning.")
-        epoa_errors, ou_errors, fr_errors, ea_errors = self.clean_data_and_save(processed_data)
-        errors_count = len(epoa_errors) + len(ou_errors) + len(fr_errors) + len(ea_errors)
+        errors_count = sum(len(errors) for errors in saving_errors.values())
 
         all_error_msgs = ""
         if errors_count:
             all_error_msgs = f"""
                 \nSaving errors --- ({errors_count})
-                {('EPOA errors:' + epoa_errors) if epoa_errors else ''}
-                {('OU errors:' + ou_errors) if ou_errors else ''}
-                {('FR errors:' + fr_errors) if fr_errors else ''}
-                {('EA errors:' + ea_errors) if ea_errors else ''}
+                {self.format_errors(saving_errors)}
             """
 
         cron_msg += f"\nDone saving records to DB --- ({scraped_count - errors_count}) {all_error_msgs}"
         cron_body = {
             "name": "scrape_pdfs",
             "message": cron_msg,
-            "num_result": len(urls_with_filenames),
+            "num_result": documents_count,
             "status": CronJobStatus.SUCCESSFUL,
         }
         CronJob.sync_cron(cron_body)
 
         logger.info("Finished the PDF scraping.")
+
+    def format_errors(self, errors_by_pdf_type):
+        return "\n".join(
+            f"{pdf_type.upper()} errors:" + "\n".join(errors) for pdf_type, errors in errors_by_pdf_type.items() if errors
+        )
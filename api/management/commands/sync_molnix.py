@@ -1,13 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from dateutil import parser as date_parser
 from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
+from modeltranslation.utils import build_localized_fieldname
 from sentry_sdk.crons import monitor
 
 from api.create_cron import create_cron_record
 from api.logger import logger
 from api.models import Country, CronJobStatus, Event
 from api.molnix_utils import MolnixApi
+from api.response_cache import invalidate_response_cache
 from deployments.models import MolnixTag, MolnixTagGroup, Personnel, PersonnelDeployment
 from main.sentry import SentryMonitor
 from notifications.models import (
@@ -18,6 +23,48 @@ from notifications.models import (
 )
 
 CRON_NAME = "sync_molnix"
+# Number of concurrent requests to the Molnix API (tag groups, positions, deployments)
+MOLNIX_API_WORKERS = 8
+BULK_BATCH_SIZE = 500
+
+
+def get_localized_fields(*fields):
+    # NOTE: bulk_update only writes the listed columns (modeltranslation doesn't add the language columns)
+    return [build_localized_fieldname(field, lang) for field in fields for lang, _ in settings.LANGUAGES]
+
+
+MOLNIX_TAG_UPDATE_FIELDS = ["name", "description", "tag_type", "tag_category"]
+SURGE_ALERT_UPDATE_FIELDS = [
+    "event",
+    "atype",
+    "category",
+    "message",
+    "molnix_status",
+    "country",
+    "opens",
+    "closes",
+    "start",
+    "end",
+    "created_at",
+    *get_localized_fields("message"),
+]
+PERSONNEL_UPDATE_FIELDS = [
+    "deployment",
+    "molnix_status",
+    "is_active",
+    "type",
+    "start_date",
+    "end_date",
+    "name",
+    "role",
+    "country_to",
+    "country_from",
+    "surge_alert",
+    "appraisal_received",
+    "gender",
+    "location",
+    *get_localized_fields("role"),
+]
 
 """
     Some NS names coming from Molnix are mapped to "countries" (!)
@@ -88,7 +135,44 @@ def get_unique_tags(deployments, open_positions):
     return tags
 
 
-def add_tags(molnix_tags, api):
+def fetch_concurrently(fetch, ids, max_workers=MOLNIX_API_WORKERS):
+    """
+    Call the Molnix API for each id using a thread pool
+    Returns {id: response}
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(ids))) as executor:
+        return dict(zip(ids, executor.map(fetch, ids)))
+
+
+def get_unique_map(items, key):
+    """
+    Map the items by key, keys matching multiple items are mapped to None
+    (Same as the previous .get lookups failing with MultipleObjectsReturned)
+    """
+    unique_map = {}
+    for item in items:
+        item_key = key(item)
+        unique_map[item_key] = None if item_key in unique_map else item
+    return unique_map
+
+
+def get_first_map(queryset, key):
+    """Map the records by key, keeping the first record (by id) of the duplicates"""
+    first_map = {}
+    for item in queryset.order_by("id"):
+        first_map.setdefault(key(item), item)
+    return first_map
+
+
+def add_tags(molnix_tags, api, max_workers=MOLNIX_API_WORKERS):
+    """
+    Create/Update the MolnixTags and their groups
+    The tag groups are fetched concurrently and the tags/groups are written in bulk
+    Returns the MolnixTags by molnix_id
+    """
     modality = ["In Person", "Remote"]
     region = ["ASIAP", "AMER", "AFRICA", "MENA", "EURO"]
     scope = ["REGIONAL", "GLOBAL"]
@@ -128,17 +212,49 @@ def add_tags(molnix_tags, api):
         "WASH",
     ]
 
+    tag_groups_by_tag = fetch_concurrently(
+        api.get_tag_groups,
+        [molnix_tag["id"] for molnix_tag in molnix_tags if molnix_tag["id"]],
+        max_workers=max_workers,
+    )
+
+    # Tag groups
+    molnix_groups = {(g["id"], g["name"]): g for groups in tag_groups_by_tag.values() for g in groups}
+    tag_groups = get_first_map(
+        MolnixTagGroup.objects.filter(molnix_id__in={molnix_id for molnix_id, _ in molnix_groups}),
+        lambda tag_group: (tag_group.molnix_id, tag_group.name),
+    )
+    new_tag_groups = [
+        MolnixTagGroup(molnix_id=molnix_id, name=name) for molnix_id, name in molnix_groups.keys() - tag_groups.keys()
+    ]
+    MolnixTagGroup.objects.bulk_create(new_tag_groups, batch_size=BULK_BATCH_SIZE)
+    now = timezone.now()
+    for tag_group in new_tag_groups:
+        tag_group.created_at = molnix_groups[(tag_group.molnix_id, tag_group.name)]["created_at"]
+        tag_groups[(tag_group.molnix_id, tag_group.name)] = tag_group
+    for key in molnix_groups:
+        # NOTE: updated_at is auto_now (Molnix's updated_at was always overwritten by save)
+        tag_groups[key].updated_at = now
+    MolnixTagGroup.objects.bulk_update(
+        [tag_groups[key] for key in molnix_groups],
+        ["created_at", "updated_at"],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+    # Tags
+    tags = get_first_map(
+        MolnixTag.objects.filter(molnix_id__in=[molnix_tag["id"] for molnix_tag in molnix_tags]),
+        lambda tag: tag.molnix_id,
+    )
+    new_tags = []
+    existing_tags = []
     for molnix_tag in molnix_tags:
-        tag, created = MolnixTag.objects.get_or_create(molnix_id=molnix_tag["id"])
-        tag_groups = api.get_tag_groups(molnix_tag["id"]) if molnix_tag["id"] else []
-        for g in tag_groups:
-            tag_group, created = MolnixTagGroup.objects.get_or_create(molnix_id=g["id"], name=g["name"])
-            if created:
-                tag_group.created_at = g["created_at"]
-            tag_group.updated_at = g["updated_at"]
-            tag_group.save()
-            tag.groups.add(tag_group)
-        tag.molnix_id = molnix_tag["id"]
+        tag = tags.get(molnix_tag["id"])
+        if tag is None:
+            tag = tags[molnix_tag["id"]] = MolnixTag(molnix_id=molnix_tag["id"])
+            new_tags.append(tag)
+        else:
+            existing_tags.append(tag)
         tag.name = n = molnix_tag["name"]
         tag.description = molnix_tag["description"]
         if tag.description is None:
@@ -166,7 +282,21 @@ def add_tags(molnix_tags, api):
                 )
             )
         )
-        tag.save()
+    MolnixTag.objects.bulk_create(new_tags, batch_size=BULK_BATCH_SIZE)
+    MolnixTag.objects.bulk_update(existing_tags, MOLNIX_TAG_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+
+    # NOTE: Same as tag.groups.add, existing groups of the tags are not removed
+    tag_group_through = MolnixTag.groups.through
+    tag_group_through.objects.bulk_create(
+        [
+            tag_group_through(molnixtag_id=tags[tag_id].id, molnixtaggroup_id=tag_groups[(g["id"], g["name"])].id)
+            for tag_id, groups in tag_groups_by_tag.items()
+            for g in groups
+        ],
+        ignore_conflicts=True,
+        batch_size=BULK_BATCH_SIZE,
+    )
+    return tags
 
 
 def skip_this(tags):
@@ -179,10 +309,23 @@ def skip_this(tags):
     return False
 
 
-def get_go_event(tags):
+def get_event_ids(tags):
+    """Event ids of the `OP-<event_id>` tags (used to prefetch the events)"""
+    event_ids = set()
+    for tag in tags:
+        if tag["name"].startswith("OP-"):
+            try:
+                event_ids.add(int(tag["name"].replace("OP-", "").strip()))
+            except ValueError:
+                pass
+    return event_ids
+
+
+def get_go_event(tags, events):
     """
     Returns a GO Event object, by looking for a tag like `OP-<event_id>` or
     None if there is not a valid OP- tag on the Position
+    events: Prefetched events by id (See MolnixLookups)
     """
     event = None
     for tag in tags:
@@ -193,9 +336,8 @@ def get_go_event(tags):
             except Exception:
                 logger.warning("%s tag is not a valid OP- tag" % event_id)
                 continue
-            try:
-                event = Event.objects.get(id=event_id_int)
-            except Exception:
+            event = events.get(event_id_int)
+            if event is None:
                 logger.warning("Emergency with ID %d not found" % event_id_int)
                 prt("Emergency not found", 0, event_id_int)
                 continue
@@ -203,21 +345,61 @@ def get_go_event(tags):
     return event
 
 
-def get_go_country(countries, country_id):
+def get_go_country(countries, country_id, countries_by_iso):
     """
     Given a Molnix country ID, returns GO country id
+    countries_by_iso: Prefetched independent countries by iso (See MolnixLookups)
     """
     if country_id not in countries:
         return None
     iso = countries[country_id]
-    try:
-        country = Country.objects.get(iso=iso, independent=True)
-    except Exception:
+    country = countries_by_iso.get(iso)
+    if country is None:
         logger.warning("Country with unknown ISO: %s" % iso)
-        return None
     return country
 
 
+class MolnixLookups:
+    """
+    In-memory maps of the GO records used by the sync (by molnix_id, event and country)
+    Loaded with a constant number of queries, independent of the number of positions and deployments
+    """
+
+    def __init__(self, countries, tags_by_molnix_id, molnix_records):
+        """
+        countries: Molnix country id -> iso (See MolnixApi.get_countries)
+        tags_by_molnix_id: See add_tags
+        molnix_records: Positions and deployments (used to prefetch their events)
+        """
+        self.countries = countries
+        self.tags_by_molnix_id = tags_by_molnix_id
+        self.events = {}
+        self.deployments_by_event = {}
+        self.load_events(molnix_records)
+        all_countries = list(Country.objects.all())
+        independent_countries = [country for country in all_countries if country.independent]
+        self.countries_by_iso = get_unique_map(independent_countries, lambda country: country.iso)
+        self.countries_by_society_name = get_unique_map(independent_countries, lambda country: country.society_name)
+        self.countries_by_name = get_unique_map(all_countries, lambda country: country.name_en)
+
+    def load_events(self, molnix_records):
+        """Load the events of the records (and their molnix PersonnelDeployment) which are not loaded yet"""
+        event_ids = {event_id for record in molnix_records for event_id in get_event_ids(record["tags"])} - self.events.keys()
+        if not event_ids:
+            return
+        events = Event.objects.filter(id__in=event_ids).prefetch_related("countries__region").in_bulk()
+        self.events.update(events)
+        self.deployments_by_event.update(
+            get_unique_map(
+                PersonnelDeployment.objects.filter(is_molnix=True, event_deployed_to__in=events.keys()),
+                lambda deployment: deployment.event_deployed_to_id,
+            )
+        )
+
+    def get_country(self, country_id):
+        return get_go_country(self.countries, country_id, self.countries_by_iso)
+
+
 def get_datetime(datetime_string):
     """
     Return a python datetime from a date-time string from the API
@@ -246,77 +428,120 @@ def get_status_message(positions_messages, deployments_messages, positions_warni
     return msg
 
 
-def add_tags_to_obj(obj, tags):
-    _ids = [int(t["id"]) for t in tags]
-    tags = list(MolnixTag.objects.filter(molnix_id__in=_ids))  # Fetch all at once
-    if len(tags) != len(_ids):  # Show warning if all tags are not available
-        missing_tag_ids = list(set(_ids) - set([tag.id for tag in tags]))
-        logger.warning(f"Missing _ids: {missing_tag_ids}")
-        # or   ^^^^^^^ logger.error if we need to add molnix tags manually.
-    obj.molnix_tags.set(tags)  # Add new ones, remove old ones
-
-
-def sync_deployments(molnix_deployments, molnix_api, countries):
+def set_molnix_tags(model, tags_by_object_id, tags_by_molnix_id):
+    """
+    Same as obj.molnix_tags.set for many objects at once (Add new ones, remove old ones)
+    tags_by_object_id: {object pk: Molnix tags}
+    """
+    field = model._meta.get_field("molnix_tags")
+    through = field.remote_field.through
+    object_field, tag_field = field.m2m_column_name(), field.m2m_reverse_name()
+
+    object_tags = set()
+    for object_id, tags in tags_by_object_id.items():
+        _ids = [int(t["id"]) for t in tags]
+        missing_tag_ids = [_id for _id in _ids if _id not in tags_by_molnix_id]
+        if missing_tag_ids:  # Show warning if all tags are not available
+            logger.warning(f"Missing _ids: {missing_tag_ids}")
+            # or   ^^^^^^^ logger.error if we need to add molnix tags manually.
+        object_tags.update((object_id, tags_by_molnix_id[_id].id) for _id in _ids if _id in tags_by_molnix_id)
+
+    existing_object_tags = {
+        (object_id, tag_id): pk
+        for pk, object_id, tag_id in through.objects.filter(**{f"{object_field}__in": list(tags_by_object_id)}).values_list(
+            "id", object_field, tag_field
+        )
+    }
+    removed_ids = [pk for object_tag, pk in existing_object_tags.items() if object_tag not in object_tags]
+    if removed_ids:
+        through.objects.filter(id__in=removed_ids).delete()
+    through.objects.bulk_create(
+        [
+            through(**{object_field: object_id, tag_field: tag_id})
+            for object_id, tag_id in object_tags - existing_object_tags.keys()
+        ],
+        batch_size=BULK_BATCH_SIZE,
+    )
+
+
+def sync_deployments(molnix_deployments, molnix_api, lookups, max_workers=MOLNIX_API_WORKERS):
     molnix_ids = [d["id"] for d in molnix_deployments]
     warnings = []
     messages = []
     successful_creates = 0
     successful_updates = 0
+
+    # Deployments without position_id (changed structure §), fetching their details concurrently
+    deployments_details = fetch_concurrently(
+        molnix_api.get_deployment,
+        [md["id"] for md in molnix_deployments if "position_id" not in md],
+        max_workers=max_workers,
+    )
+    for md in molnix_deployments:
+        if "position_id" not in md:
+            md |= deployments_details[md["id"]]["deployment"]
+    lookups.load_events(molnix_deployments)
+
     # Ensure there are PersonnelDeployment instances for every unique emergency
-    events = [get_go_event(d["tags"]) for d in molnix_deployments]
-    event_ids = [ev.id for ev in events if ev]
-    unique_event_ids = list(set(event_ids))
-    for event_id in unique_event_ids:
-        if PersonnelDeployment.objects.filter(is_molnix=True, event_deployed_to=event_id).count() == 0:
-            event = Event.objects.get(pk=event_id)
-            p = PersonnelDeployment()
-            p.event_deployed_to = event
-
-            if p.event_deployed_to.countries.all().count() > 0:
-                # Since different personnel deployed to the same emergency
-                # can be deployed to different countries affected by the emergency,
-                # we should no longer use country_deployed_to from PersonnelDeployment,
-                # rather get the country for each deployed person directly from the
-                # Personnel model for each deployed person.
-                # FIXME: we should look to deprecate usage of this field entirely.
-                p.country_deployed_to = p.event_deployed_to.countries.all()[0]
-                p.region_deployed_to = p.event_deployed_to.countries.all()[0].region
-            else:
-                warning = "Event id %d without country" % p.event_deployed_to.id
-                prt("Event without country", 0, p.event_deployed_to.id)
-                logger.warning(warning)
-                warnings.append(warning)
-                continue
+    events = [get_go_event(d["tags"], lookups.events) for d in molnix_deployments]
+    unique_events = {ev.id: ev for ev in events if ev}
+    new_deployments = []
+    for event_id, event in sorted(unique_events.items()):
+        if event_id in lookups.deployments_by_event:
+            continue
+        p = PersonnelDeployment()
+        p.event_deployed_to = event
+
+        event_countries = list(event.countries.all())
+        if len(event_countries) > 0:
+            # Since different personnel deployed to the same emergency
+            # can be deployed to different countries affected by the emergency,
+            # we should no longer use country_deployed_to from PersonnelDeployment,
+            # rather get the country for each deployed person directly from the
+            # Personnel model for each deployed person.
+            # FIXME: we should look to deprecate usage of this field entirely.
+            p.country_deployed_to = event_countries[0]
+            p.region_deployed_to = event_countries[0].region
+        else:
+            warning = "Event id %d without country" % p.event_deployed_to.id
+            prt("Event without country", 0, p.event_deployed_to.id)
+            logger.warning(warning)
+            warnings.append(warning)
+            continue
+
+        p.is_molnix = True
+        new_deployments.append(p)
+    PersonnelDeployment.objects.bulk_create(new_deployments, batch_size=BULK_BATCH_SIZE)
+    lookups.deployments_by_event.update({p.event_deployed_to_id: p for p in new_deployments})
 
-            p.is_molnix = True
-            p.save()
+    personnel_by_molnix_id = get_first_map(Personnel.objects.filter(molnix_id__in=molnix_ids), lambda p: p.molnix_id)
+    surge_alerts = get_unique_map(
+        SurgeAlert.objects.filter(molnix_id__in={md["position_id"] for md in molnix_deployments if md.get("position_id")}),
+        lambda surge_alert: surge_alert.molnix_id,
+    )
+    synced_personnel = {}
+    personnel_tags = {}
 
     # Create Personnel objects
     for md in molnix_deployments:  # LOOP1
-        if "position_id" not in md:  # changed structure §
-            md2 = molnix_api.get_deployment(md["id"])
-            md |= md2["deployment"]
         if skip_this(md["tags"]):
             warning = "Deployment id %d skipped due to No-GO" % md["id"]
             logger.warning(warning)
             warnings.append(warning)
             continue
-        try:
-            personnel = Personnel.objects.get(molnix_id=md["id"])
-            created = False
-        except Exception:
+        personnel = personnel_by_molnix_id.get(md["id"])
+        created = personnel is None
+        if created:
             personnel = Personnel(molnix_id=md["id"])
-            created = True
         # print('personnel found', personnel)
-        event = get_go_event(md["tags"])
+        event = get_go_event(md["tags"], lookups.events)
         if not event:
             warning = "Deployment id %d does not have a valid Emergency tag." % md["id"]
             logger.warning(warning)
             warnings.append(warning)
             continue
-        try:
-            deployment = PersonnelDeployment.objects.get(is_molnix=True, event_deployed_to=event)
-        except Exception:
+        deployment = lookups.deployments_by_event.get(event.id)
+        if deployment is None:
             warning = "Did not import Deployment with Molnix ID %d. Invalid Event." % md["id"]
             logger.warning(warning)
             warnings.append(warning)
@@ -324,22 +549,21 @@ def sync_deployments(molnix_deployments, molnix_api, countries):
             continue
 
         surge_alert = None
-        try:
-            # Should not happen after the "changed structure §" fix:
-            if "position_id" not in md:
-                warning = "%d deployment did not find SurgeAlert in lack of Molnix position_id" % md["id"]
-                logger.warning(warning)
-                warnings.append(warning)
-                prt("Deployment did not find SurgeAlert in lack of position_id", md["id"])
-                continue
-            elif md["position_id"]:
-                surge_alert = SurgeAlert.objects.get(molnix_id=md["position_id"])
-        except Exception:
-            warning = "%d deployment did not find SurgeAlert with Molnix position_id %d." % (md["id"], md["position_id"])
+        # Should not happen after the "changed structure §" fix:
+        if "position_id" not in md:
+            warning = "%d deployment did not find SurgeAlert in lack of Molnix position_id" % md["id"]
             logger.warning(warning)
             warnings.append(warning)
-            prt("Deployment did not find SurgeAlert", md["id"], md["position_id"])
+            prt("Deployment did not find SurgeAlert in lack of position_id", md["id"])
             continue
+        elif md["position_id"]:
+            surge_alert = surge_alerts.get(md["position_id"])
+            if surge_alert is None:
+                warning = "%d deployment did not find SurgeAlert with Molnix position_id %d." % (md["id"], md["position_id"])
+                logger.warning(warning)
+                warnings.append(warning)
+                prt("Deployment did not find SurgeAlert", md["id"], md["position_id"])
+                continue
 
         appraisal_received = "appraisals" in md and bool(len(md["appraisals"]))
 
@@ -382,7 +606,7 @@ def sync_deployments(molnix_deployments, molnix_api, countries):
         personnel.end_date = get_datetime(md["end"])
         personnel.name = md["person"]["fullname"]
         personnel.role = md["title"]
-        country_to = get_go_country(countries, md["country_id"])
+        country_to = lookups.get_country(md["country_id"])
         if not country_to:
             warning = "Position (id %d) does not have a valid Country To (%s)" % (md["id"], md["country_id"])
             prt("Position does not have a valid Country To", md["id"])
@@ -403,19 +627,15 @@ def sync_deployments(molnix_deployments, molnix_api, countries):
             # We over-ride the matching for some NS names from Molnix
             if incoming_name in NS_MATCHING_OVERRIDES:
                 country_name = NS_MATCHING_OVERRIDES[incoming_name]
-                try:
-                    country_from = Country.objects.get(name_en=country_name)
-                except Exception:
+                country_from = lookups.countries_by_name.get(country_name)
+                if country_from is None:
                     warning = "Mismatch in NS name: %s" % md["incoming"]["name"]
                     logger.warning(warning)
                     warnings.append(warning)
             else:
-                try:
-                    country_from = Country.objects.get(society_name=incoming_name, independent=True)
-                    # maybe somewhen:  .filter(society_name__iexact=incoming_name, independent=True).first()
-                except Exception:
-                    # FIXME: Catch possibility of .get() returning multiple records
-                    # even though that should ideally never happen
+                country_from = lookups.countries_by_society_name.get(incoming_name)
+                # maybe somewhen:  match society_name case insensitively
+                if country_from is None:
                     warning = "NS Name not found for Deployment ID: %d with secondment_incoming %s" % (
                         md["id"],
                         md["incoming"]["name"],
@@ -431,23 +651,34 @@ def sync_deployments(molnix_deployments, molnix_api, countries):
 
         personnel.country_from = country_from
 
-        personnel.save()
-        add_tags_to_obj(personnel, md["tags"])
+        personnel_by_molnix_id[md["id"]] = personnel
+        synced_personnel[md["id"]] = personnel
+        personnel_tags[md["id"]] = md["tags"]
         if created:
             successful_creates += 1
         else:
             successful_updates += 1
-    all_active_personnel = Personnel.objects.filter(is_active=True, molnix_id__isnull=False)
-    active_personnel_ids = [a.molnix_id for a in all_active_personnel]
-    inactive_ids = list(set(active_personnel_ids) - set(molnix_ids))
-    marked_inactive = len(inactive_ids)
-    # Mark Personnel entries no longer in Molnix as inactive:
 
-    for id in inactive_ids:
-        personnel = Personnel.objects.get(molnix_id=id)
-        personnel.molnix_status = "deleted"
-        personnel.is_active = False
-        personnel.save()
+    # NOTE: bulk_create is not supported for multi-table inherited models (Personnel -> DeployedPerson)
+    existing_personnel = [personnel for personnel in synced_personnel.values() if personnel.pk]
+    for personnel in synced_personnel.values():
+        if not personnel.pk:
+            personnel.save()
+    Personnel.objects.bulk_update(existing_personnel, PERSONNEL_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+    set_molnix_tags(
+        Personnel,
+        {synced_personnel[molnix_id].pk: tags for molnix_id, tags in personnel_tags.items()},
+        lookups.tags_by_molnix_id,
+    )
+
+    # Mark Personnel entries no longer in Molnix as inactive:
+    marked_inactive = (
+        Personnel.objects.filter(is_active=True, molnix_id__isnull=False)
+        .exclude(molnix_id__in=molnix_ids)
+        .update(molnix_status="deleted", is_active=False)
+    )
+    # NOTE: The bulk writes don't send post_save
+    invalidate_response_cache(Personnel)
 
     messages = [
         "Successfully created: %d" % successful_creates,
@@ -458,13 +689,23 @@ def sync_deployments(molnix_deployments, molnix_api, countries):
     return messages, warnings, successful_creates
 
 
-def sync_open_positions(molnix_positions, molnix_api, countries):
+def set_surge_alert_created_at(alert, now):
+    """Same as SurgeAlert.save (bulk_create/bulk_update don't call it)"""
+    if (not alert.id and not alert.created_at) or (alert.created_at > now):
+        alert.created_at = now
+
+
+def sync_open_positions(molnix_positions, molnix_api, lookups, max_workers=MOLNIX_API_WORKERS):
     molnix_ids = [p["id"] for p in molnix_positions]
     warnings = []
     messages = []
     successful_creates = 0
     successful_updates = 0
+    now = timezone.now()
 
+    alerts_by_molnix_id = get_first_map(SurgeAlert.objects.filter(molnix_id__in=molnix_ids), lambda alert: alert.molnix_id)
+    synced_alerts = {}
+    alerts_tags = {}
     for position in molnix_positions:  # LOOP2
         logger.warning("× " + str(position["id"]))
         if skip_this(position["tags"]):
@@ -472,15 +713,17 @@ def sync_open_positions(molnix_positions, molnix_api, countries):
             logger.warning(warning)
             warnings.append(warning)
             continue
-        event = get_go_event(position["tags"])
-        country = get_go_country(countries, position["country_id"])
+        country = lookups.get_country(position["country_id"])
         if not country:
             warning = "Position id %d does not have a valid Country, we import it with an empty one" % position["id"]
             logger.warning(warning)
             warnings.append(warning)
             # Do not skip these countryless positions, remove "continue" from code.
-        go_alert, created = SurgeAlert.objects.get_or_create(molnix_id=position["id"])
-        event = get_go_event(position["tags"])
+        go_alert = alerts_by_molnix_id.get(position["id"])
+        created = go_alert is None
+        if created:
+            go_alert = SurgeAlert(molnix_id=position["id"])
+        event = get_go_event(position["tags"], lookups.events)
         if event:
             go_alert.event = event
             # When no Emergency (= event) found, we do not overwrite the previously (maybe) existing one
@@ -504,33 +747,57 @@ def sync_open_positions(molnix_positions, molnix_api, countries):
         go_alert.closes = get_datetime(position["closes"])
         go_alert.start = get_datetime(position["start"])
         go_alert.end = get_datetime(position["end"])
-        go_alert.save()
-        add_tags_to_obj(go_alert, position["tags"])
+        set_surge_alert_created_at(go_alert, now)
+        alerts_by_molnix_id[position["id"]] = go_alert
+        synced_alerts[position["id"]] = go_alert
+        alerts_tags[position["id"]] = position["tags"]
         if created:
             successful_creates += 1
         else:
             successful_updates += 1
 
+    existing_alerts = [alert for alert in synced_alerts.values() if alert.pk]
+    SurgeAlert.objects.bulk_create(
+        [alert for alert in synced_alerts.values() if not alert.pk],
+        batch_size=BULK_BATCH_SIZE,
+    )
+    SurgeAlert.objects.bulk_update(existing_alerts, SURGE_ALERT_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+    set_molnix_tags(
+        SurgeAlert,
+        {synced_alerts[molnix_id].pk: tags for molnix_id, tags in alerts_tags.items()},
+        lookups.tags_by_molnix_id,
+    )
+
     # Find existing active alerts that are not in the current list from Molnix
-    existing_alerts = SurgeAlert.objects.filter(molnix_status=SurgeAlertStatus.OPEN).exclude(molnix_id__isnull=True)
-    existing_alert_ids = [e.molnix_id for e in existing_alerts]
-    inactive_alerts = list(set(existing_alert_ids) - set(molnix_ids))
+    inactive_alerts = list(
+        SurgeAlert.objects.filter(molnix_status=SurgeAlertStatus.OPEN)
+        .exclude(molnix_id__isnull=True)
+        .exclude(molnix_id__in=molnix_ids)
+    )
 
     # Mark alerts that are no longer in Molnix as inactive
-    for alert in SurgeAlert.objects.filter(molnix_id__in=inactive_alerts):
-        # We need to check the position ID in Molnix
+    # We need to check the position ID in Molnix
+    inactive_positions = fetch_concurrently(
+        molnix_api.get_position,
+        [alert.molnix_id for alert in inactive_alerts],
+        max_workers=max_workers,
+    )
+    for alert in inactive_alerts:
         # If the status is "unfilled", we don't mark the position as inactive,
         # just set status to unfilled
-        position = molnix_api.get_position(alert.molnix_id)
+        position = inactive_positions[alert.molnix_id]
         if not position:
             warnings.append("Position id %d not found in Molnix API" % alert.molnix_id)
         if position and position["status"]:
             alert.molnix_status = SurgeAlert.parse_molnix_status(position["status"])
         if position and position["closes"]:
             alert.closes = get_datetime(position["closes"])
-        alert.save()
+        set_surge_alert_created_at(alert, now)
+    SurgeAlert.objects.bulk_update(inactive_alerts, ["molnix_status", "closes", "created_at"], batch_size=BULK_BATCH_SIZE)
+    # NOTE: The bulk writes don't send post_save
+    invalidate_response_cache(SurgeAlert)
 
-    marked_inactive = len(inactive_alerts)
+    marked_inactive = len({alert.molnix_id for alert in inactive_alerts})
     messages = [
         "Successfully created: %d" % successful_creates,
         "Successfully updated: %d" % successful_updates,
@@ -543,6 +810,14 @@ def sync_open_positions(molnix_positions, molnix_api, countries):
 class Command(BaseCommand):
     help = "Sync data from Molnix API to GO db"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=MOLNIX_API_WORKERS,
+            help="Number of concurrent requests to the Molnix API",
+        )
+
     @monitor(monitor_slug=SentryMonitor.SYNC_MOLNIX)
     @transaction.atomic
     def handle(self, *args, **options):
@@ -573,11 +848,17 @@ class Command(BaseCommand):
         try:
             logger.info("Processing tags")
             used_tags = get_unique_tags(deployments, open_positions)
-            add_tags(used_tags, molnix)  # FIXME 2nd arg: a workaround to be able to get the group details inside.
+            # FIXME 2nd arg: a workaround to be able to get the group details inside.
+            tags_by_molnix_id = add_tags(used_tags, molnix, max_workers=options["workers"])
+            lookups = MolnixLookups(countries, tags_by_molnix_id, [*open_positions, *deployments])
             logger.info("Processed tags, syncing positions")
-            positions_messages, positions_warnings, positions_created = sync_open_positions(open_positions, molnix, countries)
+            positions_messages, positions_warnings, positions_created = sync_open_positions(
+                open_positions, molnix, lookups, max_workers=options["workers"]
+            )
             logger.info("Synced positions, syncing deployments")
-            deployments_messages, deployments_warnings, deployments_created = sync_deployments(deployments, molnix, countries)
+            deployments_messages, deployments_warnings, deployments_created = sync_deployments(
+                deployments, molnix, lookups, max_workers=options["workers"]
+            )
             logger.info("Synced deployments)")
         except Exception as ex:
             msg = "Unknown Error occurred: %s" % str(ex)
@@ -0,0 +1,43 @@
+import time
+
+from haystack import connections as haystack_connections
+from haystack.exceptions import NotHandled
+from haystack.management.commands.update_index import (
+    Command as HaystackUpdateIndexCommand,
+)
+from haystack.utils.app_loading import haystack_get_models
+
+
+class Command(HaystackUpdateIndexCommand):
+    """
+    haystack's update_index with a throughput report
+    NOTE: Use --age/--minutes/--start to only index the recently updated records (See api.search_indexes.UpdatedFieldIndexMixin)
+    """
+
+    def handle(self, **options):
+        self.report = []
+        super().handle(**options)
+        self.print_report()
+
+    def get_documents_count(self, label, using):
+        unified_index = haystack_connections[using].get_unified_index()
+        count = 0
+        for model in haystack_get_models(label):
+            try:
+                index = unified_index.get_index(model)
+            except NotHandled:
+                continue
+            count += index.build_queryset(using=using, start_date=self.start_date, end_date=self.end_date).count()
+        return count
+
+    def update_backend(self, label, using):
+        documents = self.get_documents_count(label, using)
+        start = time.monotonic()
+        super().update_backend(label, using)
+        self.report.append((label, using, documents, time.monotonic() - start))
+
+    def print_report(self):
+        self.stdout.write("App              Backend      Documents   Seconds   Docs/sec")
+        for label, using, documents, duration in self.report:
+            docs_per_second = documents / duration if duration else 0
+            self.stdout.write(f"{label:<16} {using:<12} {documents:>9} {duration:>9.2f} {docs_per_second:>10.1f}")
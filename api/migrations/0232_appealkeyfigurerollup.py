@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0231_alter_export_export_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AppealKeyFigureRollup",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("scope", models.IntegerField(choices=[(0, "Global"), (1, "Region"), (2, "Country")], verbose_name="scope")),
+                ("scope_id", models.IntegerField(default=0, verbose_name="scope id")),
+                ("day", models.DateField(verbose_name="day")),
+                ("header_figures", models.JSONField(default=dict, verbose_name="header figures")),
+                ("country_figures", models.JSONField(default=dict, verbose_name="country figures")),
+                ("area_figures", models.JSONField(default=dict, verbose_name="area figures")),
+                ("computed_at", models.DateTimeField(verbose_name="computed at")),
+            ],
+            options={
+                "verbose_name": "appeal key figure rollup",
+                "verbose_name_plural": "appeal key figure rollups",
+                "unique_together": {("scope", "scope_id", "day")},
+            },
+        ),
+    ]
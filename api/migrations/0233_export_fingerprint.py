@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0232_appealkeyfigurerollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="export",
+            name="fingerprint",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True, verbose_name="Fingerprint"),
+        ),
+    ]
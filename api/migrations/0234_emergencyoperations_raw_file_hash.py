@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0233_export_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="emergencyoperationsdataset",
+            name="raw_file_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="emergencyoperationsea",
+            name="raw_file_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="emergencyoperationsfr",
+            name="raw_file_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="emergencyoperationspeoplereached",
+            name="raw_file_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0234_emergencyoperations_raw_file_hash"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["-created_at", "-id"], name="api_event_created_at_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="fieldreport",
+            index=models.Index(fields=["-created_at", "-id"], name="api_fieldreport_created_id_idx"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:34
+
+import datetime
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+import api.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0235_event_fieldreport_created_at_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appealhistory",
+            index=django.contrib.postgres.indexes.GistIndex(
+                api.models.TsTzRange(
+                    "valid_from",
+                    django.db.models.functions.comparison.Greatest("valid_from", "valid_to"),
+                    django.contrib.postgres.fields.ranges.RangeBoundary(inclusive_lower=False),
+                ),
+                name="api_appealhistory_validity_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appealhistory",
+            index=models.Index(
+                condition=models.Q(("valid_to", datetime.datetime(2200, 1, 1, 0, 0, tzinfo=datetime.timezone.utc))),
+                fields=["valid_from"],
+                name="api_appealhistory_current_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="appealhistory",
+            index=models.Index(fields=["aid"], name="api_appealhistory_aid_idx"),
+        ),
+    ]
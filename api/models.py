@@ -13,7 +13,8 @@ from django.contrib.auth.signals import (
 
 # from django.db import models
 from django.contrib.gis.db import models
-from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField, RangeBoundary
+from django.contrib.postgres.indexes import GistIndex
 from django.core.validators import (
     FileExtensionValidator,
     MaxValueValidator,
@@ -22,6 +23,7 @@ from django.core.validators import (
     validate_slug,
 )
 from django.db.models import Q
+from django.db.models.functions import Greatest
 
 # from django.db.models import Prefetch
 from django.dispatch import receiver
@@ -855,6 +857,10 @@ class Event(models.Model):
             "-disaster_start_date",
             "id",
         )
+        indexes = [
+            # Used by the cursor pagination (See EventViewset.cursor_ordering)
+            models.Index(fields=["-created_at", "-id"], name="api_event_created_at_id_idx"),
+        ]
         verbose_name = _("emergency")
         verbose_name_plural = _("emergencies")
 
@@ -2038,6 +2044,45 @@ def appeal_document_path(instance, filename):
     return "appeals/%s/%s" % (instance.appeal, filename)
 
 
+class TsTzRange(models.Func):
+    function = "TSTZRANGE"
+    output_field = DateTimeRangeField()
+
+
+# valid_to of the current AppealHistory rows
+APPEAL_HISTORY_OPEN_VALID_TO = datetime(2200, 1, 1, tzinfo=pytz.utc)
+
+
+def get_appeal_history_validity_range():
+    """
+    (valid_from, valid_to) of AppealHistory as a range, same as used by the GiST index
+    NOTE: GREATEST: Empty range for the invalid rows (valid_to < valid_from or null valid_to) instead of an error
+    """
+    return TsTzRange("valid_from", Greatest("valid_from", "valid_to"), RangeBoundary(inclusive_lower=False))
+
+
+class AppealHistoryQuerySet(models.QuerySet):
+    def current(self):
+        """Rows which are not yet replaced by a newer row"""
+        return self.filter(valid_to=APPEAL_HISTORY_OPEN_VALID_TO)
+
+    def as_of(self, date):
+        """
+        Rows valid at the given datetime (valid_from < date < valid_to)
+        - now <= date < APPEAL_HISTORY_OPEN_VALID_TO: Only the current rows can be valid (closed rows have valid_to <= now)
+        - Otherwise: Uses the validity range (See get_appeal_history_validity_range)
+        """
+        date = models.DateTimeField().to_python(date)
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        if timezone.now() <= date < APPEAL_HISTORY_OPEN_VALID_TO:
+            return self.current().filter(valid_from__lt=date)
+        return self.alias(validity=get_appeal_history_validity_range()).filter(
+            valid_from__isnull=False,
+            validity__contains=models.Value(date, output_field=models.DateTimeField()),
+        )
+
+
 class AppealHistory(models.Model):
     """AppealHistory results"""
 
@@ -2067,6 +2112,8 @@ class AppealHistory(models.Model):
         editable=False,
     )
 
+    objects = AppealHistoryQuerySet.as_manager()
+
     class Meta:
         ordering = (
             "-start_date",
@@ -2074,6 +2121,15 @@ class AppealHistory(models.Model):
         )
         verbose_name = _("appealhistory")
         verbose_name_plural = _("appealhistories")
+        indexes = [
+            GistIndex(get_appeal_history_validity_range(), name="api_appealhistory_validity_idx"),
+            models.Index(
+                fields=["valid_from"],
+                condition=Q(valid_to=APPEAL_HISTORY_OPEN_VALID_TO),
+                name="api_appealhistory_current_idx",
+            ),
+            models.Index(fields=["aid"], name="api_appealhistory_aid_idx"),
+        ]
 
     def record_type(self):
         return "APPEALHISTORY"
@@ -2082,6 +2138,38 @@ class AppealHistory(models.Model):
         return self.aid
 
 
+class AppealKeyFigureRollup(models.Model):
+    """
+    Per day snapshot of the appeal key figures for a scope (global, region or country)
+    NOTE: Maintained by api.key_figures, the current day is refreshed when appeals change
+    """
+
+    class Scope(models.IntegerChoices):
+        GLOBAL = 0, _("Global")
+        REGION = 1, _("Region")
+        COUNTRY = 2, _("Country")
+
+    scope = models.IntegerField(choices=Scope.choices, verbose_name=_("scope"))
+    # NOTE: 0 is used for GLOBAL scope
+    scope_id = models.IntegerField(verbose_name=_("scope id"), default=0)
+    day = models.DateField(verbose_name=_("day"))
+    # Figures used by the key-figures header (AppealHistory)
+    header_figures = models.JSONField(verbose_name=_("header figures"), default=dict)
+    # Figures used by the country page (AppealHistory), Only for the current day
+    country_figures = models.JSONField(verbose_name=_("country figures"), default=dict)
+    # Figures used by the area aggregate (Appeal), Only for the current day
+    area_figures = models.JSONField(verbose_name=_("area figures"), default=dict)
+    computed_at = models.DateTimeField(verbose_name=_("computed at"))
+
+    class Meta:
+        verbose_name = _("appeal key figure rollup")
+        verbose_name_plural = _("appeal key figure rollups")
+        unique_together = ("scope", "scope_id", "day")
+
+    def __str__(self):
+        return f"{self.get_scope_display()} - {self.scope_id} - {self.day}"
+
+
 @reversion.register()
 class AppealDocument(models.Model):
     # Don't set `auto_now_add` so we can modify it on save
@@ -2490,6 +2578,10 @@ class FieldReport(models.Model):
             "-created_at",
             "-updated_at",
         )
+        indexes = [
+            # Used by the cursor pagination (See FieldReportViewset.cursor_ordering)
+            models.Index(fields=["-created_at", "-id"], name="api_fieldreport_created_id_idx"),
+        ]
         verbose_name = _("field report")
         verbose_name_plural = _("field reports")
 
@@ -2586,10 +2678,10 @@ class FieldReport(models.Model):
 
     @staticmethod
     def get_for(user, queryset=None):
-        countries_qs = (
-            UserCountry.objects.filter(user=user).values("country").union(Profile.objects.filter(user=user).values("country"))
-        )
-        return queryset.exclude(Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(countries__in=countries_qs))
+        from .access_scope import get_user_access_scope
+
+        country_ids = get_user_access_scope(user).country_ids
+        return queryset.exclude(Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(countries__in=country_ids))
 
     def __str__(self):
         summary = self.summary if self.summary is not None else "Summary not available"
@@ -2783,6 +2875,8 @@ class EmergencyOperationsBase(models.Model):
     # Raw data from the scraper
     raw_file_name = models.TextField(null=True, blank=True)
     raw_file_url = models.TextField(null=True, blank=True)
+    # sha256 of the PDF, used by scrape_pdfs to skip already scraped documents
+    raw_file_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     raw_appeal_number = models.TextField(verbose_name=_("appeal number (raw)"), null=True, blank=True)
     raw_date_of_issue = models.TextField(verbose_name=_("date of issue (raw)"), null=True, blank=True)
     raw_glide_number = models.TextField(verbose_name=_("glide number (raw)"), null=True, blank=True)
@@ -3358,6 +3452,8 @@ class Export(models.Model):
         on_delete=models.SET_NULL,
     )
     per_country = models.IntegerField(verbose_name=_("Per Country Id"), null=True, blank=True)
+    # NOTE: Exports with the same fingerprint have the same content, see api.export_cache
+    fingerprint = models.CharField(verbose_name=_("Fingerprint"), max_length=64, null=True, blank=True, db_index=True)
 
     def __str__(self):
         return f"{self.url} - {self.token}"
@@ -1,14 +1,19 @@
 import json
-import pathlib
-import tempfile
-import time
+import threading
+from collections import OrderedDict
 
+from celery.signals import worker_process_shutdown
 from django.conf import settings
 from django.core.files.base import ContentFile
+from playwright.sync_api import Error as PlaywrightError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+from .logger import logger
 from .utils import DebugPlaywright
 
+NETWORK_IDLE_TIMEOUT = 15_000
+
 footer_template = """
         <div class="footer" style="width: 100%;font-size: 8px;color: #FEFEFE; bottom: 10px; position: absolute;">
         <div style="float: left; margin-top: 10px; margin-left: 40px;">
@@ -37,11 +42,8 @@ footer_template = """
     """  # noqa
 
 
-def build_storage_state(tmp_dir, user, token, language="en"):
-    temp_file = pathlib.Path(tmp_dir, "storage_state.json")
-    temp_file.touch()
-
-    state = {
+def build_storage_state(user, token, language="en"):
+    return {
         "origins": [
             {
                 "origin": settings.GO_WEB_INTERNAL_URL + "/",
@@ -63,9 +65,98 @@ def build_storage_state(tmp_dir, user, token, language="en"):
             }
         ]
     }
-    with open(temp_file, "w") as f:
-        json.dump(state, f)
-    return temp_file
+
+
+class BrowserSession:
+    """
+    Long-lived connection to the playwright server with authenticated contexts (LRU) for re-use
+    NOTE: Playwright sync API objects can't be shared across threads, use get_browser_session()
+    """
+
+    def __init__(self):
+        self.playwright = None
+        self.browser = None
+        self.contexts: OrderedDict = OrderedDict()
+
+    def get_browser(self):
+        if self.browser is None or not self.browser.is_connected():
+            self.close()
+            self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.connect(settings.PLAYWRIGHT_SERVER_URL)
+        return self.browser
+
+    def get_context(self, user, token, language):
+        browser = self.get_browser()
+        # New token (or user/language) -> New authenticated context
+        key = (user.id, token.key, language)
+        context = self.contexts.pop(key, None)
+        if context is None:
+            context = browser.new_context(storage_state=build_storage_state(user, token, language))
+        self.contexts[key] = context
+        while len(self.contexts) > settings.PLAYWRIGHT_CONTEXT_POOL_SIZE:
+            _, old_context = self.contexts.popitem(last=False)
+            self._close(old_context)
+        return context
+
+    @staticmethod
+    def _close(resource):
+        try:
+            resource.close()
+        except PlaywrightError:
+            pass
+
+    def close(self):
+        for context in self.contexts.values():
+            self._close(context)
+        self.contexts.clear()
+        if self.browser is not None:
+            self._close(self.browser)
+            self.browser = None
+        if self.playwright is not None:
+            self.playwright.stop()
+            self.playwright = None
+
+
+_local = threading.local()
+# Sessions of all the threads, closed when the worker process shuts down
+_browser_sessions: list[BrowserSession] = []
+_browser_sessions_lock = threading.Lock()
+
+
+def get_browser_session() -> BrowserSession:
+    """Browser session of the current (celery worker) thread"""
+    if getattr(_local, "browser_session", None) is None:
+        session = BrowserSession()
+        with _browser_sessions_lock:
+            _browser_sessions.append(session)
+        _local.browser_session = session
+    return _local.browser_session
+
+
+@worker_process_shutdown.connect
+def close_browser_sessions(**kwargs):
+    with _browser_sessions_lock:
+        sessions = list(_browser_sessions)
+        _browser_sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception:
+            logger.warning("Failed to close the browser session", exc_info=True)
+
+
+def wait_for_pdf_preview(page, timeout):
+    page.wait_for_selector(
+        "#pdf-preview-ready",
+        state="attached",
+        timeout=timeout,
+    )
+    # Images/Maps can still be loading after the preview is ready
+    try:
+        page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT)
+    except PlaywrightTimeoutError:
+        logger.warning(f"Network is still not idle after {NETWORK_IDLE_TIMEOUT}ms, continuing: {page.url}")
+    page.evaluate("document.fonts.ready")
 
 
 def render_pdf_from_url(
@@ -80,42 +171,29 @@ def render_pdf_from_url(
     Renders a URL to PDF using Playwright.
     Returns a Django ContentFile.
     """
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        storage_state = build_storage_state(
-            tmp_dir=tmp_dir,
-            user=user,
-            token=token,
-            language=language,
-        )
-
-        with sync_playwright() as playwright:
-            browser = playwright.chromium.connect(settings.PLAYWRIGHT_SERVER_URL)
-
-            try:
-                context = browser.new_context(storage_state=storage_state)
-                page = context.new_page()
-
-                if settings.DEBUG_PLAYWRIGHT:
-                    DebugPlaywright.debug(page)
-
-                page.goto(url, timeout=timeout)
-                time.sleep(5)
-                # NOTE: Use wait_for_load_state instead of sleep?
-                # page.wait_for_load_state("networkidle", timeout=timeout)
-                page.wait_for_selector(
-                    "#pdf-preview-ready",
-                    state="attached",
-                    timeout=timeout,
-                )
-
-                pdf_bytes = page.pdf(
-                    display_header_footer=True,
-                    prefer_css_page_size=True,
-                    print_background=True,
-                    footer_template=footer_template,
-                    header_template="<p></p>",
-                )
-            finally:
-                browser.close()
+    session = get_browser_session()
+    try:
+        context = session.get_context(user, token, language)
+        page = context.new_page()
+        try:
+            if settings.DEBUG_PLAYWRIGHT:
+                DebugPlaywright.debug(page)
+
+            page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+            wait_for_pdf_preview(page, timeout)
+
+            pdf_bytes = page.pdf(
+                display_header_footer=True,
+                prefer_css_page_size=True,
+                print_background=True,
+                footer_template=footer_template,
+                header_template="<p></p>",
+            )
+        finally:
+            page.close()
+    except PlaywrightError:
+        # Start with a new connection for the next render
+        session.close()
+        raise
 
     return ContentFile(pdf_bytes)
@@ -1,6 +1,6 @@
 import json
-from datetime import datetime
 
+from django.contrib.auth.models import Group, User
 from django.db import transaction
 from django.db.models import Q
 from django.db.models.signals import (
@@ -22,7 +22,21 @@ from middlewares.middlewares import get_username
 from utils.elasticsearch import create_es_index, delete_es_index, update_es_index
 from utils.erp import push_fr_data
 
-from .models import Appeal, AppealFilter, AppealHistory
+from .access_scope import (
+    clear_all_user_access_scopes,
+    clear_user_access_scope,
+    clear_user_access_scope_memo,
+)
+from .key_figures import schedule_key_figure_rollup_refresh
+from .models import (
+    APPEAL_HISTORY_OPEN_VALID_TO,
+    Appeal,
+    AppealFilter,
+    AppealHistory,
+    Profile,
+    UserCountry,
+)
+from .response_cache import invalidate_response_cache
 
 MODEL_TYPES = {
     "api.action": "Action",
@@ -114,6 +128,55 @@ def create_global_reversion_log(versions, revision):
             )
 
 
+@receiver(post_save)
+@receiver(post_delete)
+@receiver(m2m_changed)
+def invalidate_response_cache_receiver(sender, **kwargs):
+    invalidate_response_cache(sender, **kwargs)
+
+
+@receiver(post_save, sender=UserCountry)
+@receiver(post_delete, sender=UserCountry)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def clear_user_access_scope_on_country_change(sender, instance, **kwargs):
+    if sender._meta.get_field("user").is_cached(instance):
+        clear_user_access_scope_memo(instance.user)
+    user_id = instance.user_id
+    transaction.on_commit(lambda: clear_user_access_scope(user_id))
+
+
+@receiver(post_save, sender=User)
+def clear_user_access_scope_on_user_change(sender, instance, **kwargs):
+    # Eg: is_superuser is changed
+    clear_user_access_scope_memo(instance)
+    user_id = instance.pk
+    transaction.on_commit(lambda: clear_user_access_scope(user_id))
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_user_access_scope_on_permission_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        clear_user_access_scope_memo(instance)
+        user_id = instance.pk
+        transaction.on_commit(lambda: clear_user_access_scope(user_id))
+    elif pk_set:
+        user_ids = list(pk_set)
+        transaction.on_commit(lambda: clear_user_access_scope(*user_ids))
+    else:
+        # Permission/Group cleared from all the users
+        transaction.on_commit(clear_all_user_access_scopes)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def clear_user_access_scopes_on_group_permission_change(sender, action, **kwargs):
+    if action.startswith("post_"):
+        transaction.on_commit(clear_all_user_access_scopes)
+
+
 @receiver(post_revision_commit)
 def post_revision_commit_receiver(sender, revision, versions, **kwargs):
     transaction.on_commit(lambda: create_global_reversion_log(versions, revision))
@@ -215,6 +278,9 @@ def add_update_appeal_history(sender, instance, created, **kwargs):
     ]
     now = timezone.now()
     changed = False
+    # Key figures (AppealKeyFigureRollup) of the affected scopes
+    rollup_country_ids = {instance.country_id}
+    rollup_region_ids = {instance.region_id, instance.country.region_id}
 
     if created:  # Appeal Insert
         AppealHistory.objects.create(
@@ -224,7 +290,7 @@ def add_update_appeal_history(sender, instance, created, **kwargs):
             amount_funded=instance.amount_funded,
             valid_from=now,
             # TODO: use coalesce to fill valid_to instead of defining here.
-            valid_to=datetime(2200, 1, 1, tzinfo=timezone.utc),
+            valid_to=APPEAL_HISTORY_OPEN_VALID_TO,
             start_date=instance.start_date,
             end_date=instance.end_date,
             appeal=instance,
@@ -237,6 +303,7 @@ def add_update_appeal_history(sender, instance, created, **kwargs):
             code=instance.code,
             triggering_amount=instance.triggering_amount,
         )
+        schedule_key_figure_rollup_refresh(rollup_country_ids, rollup_region_ids)
 
     else:
         # Appeal Update
@@ -247,6 +314,12 @@ def add_update_appeal_history(sender, instance, created, **kwargs):
                 # Watched fields are not changed
                 changed = True
 
+        # NOTE: Area figures uses fields which are not watched (eg: amount_funded)
+        if appeal_history and appeal_history.country_id != instance.country_id:
+            rollup_country_ids.add(appeal_history.country_id)
+            rollup_region_ids.add(appeal_history.country.region_id)
+        schedule_key_figure_rollup_refresh(rollup_country_ids, rollup_region_ids)
+
         if not changed:
             # Watched fields are not changed
             return
@@ -262,7 +335,7 @@ def add_update_appeal_history(sender, instance, created, **kwargs):
             amount_funded=instance.amount_funded,
             valid_from=now,
             # TODO: use coalesce to fill valid_to instead of defining here.
-            valid_to=datetime(2200, 1, 1, tzinfo=timezone.utc),
+            valid_to=APPEAL_HISTORY_OPEN_VALID_TO,
             start_date=instance.start_date,
             end_date=instance.end_date,
             appeal=instance,
@@ -0,0 +1,202 @@
+import hashlib
+import typing
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.translation import get_language
+
+from main.utils import get_cache_counters, increment_cache_counter
+
+from .access_scope import get_user_access_scope
+
+RESPONSE_CACHE_KEY_PREFIX = "api-response-cache"
+
+# Resource -> (Path prefix, Models which change the responses of the resource)
+# NOTE: Changes which don't send signals (eg: queryset.update, bulk_create) are only visible after API_RESPONSE_CACHE_SECONDS
+RESPONSE_CACHE_RESOURCES = {
+    "event": (
+        "/api/v2/event/",
+        [
+            "api.Event",
+            "api.EventContact",
+            "api.EventFeaturedDocument",
+            "api.EventLink",
+            "api.KeyFigure",
+            "api.Snippet",
+            "api.SituationReport",
+            "api.FieldReport",
+            "api.Appeal",
+            "api.AppealDocument",
+            "api.Country",
+            "api.District",
+            "api.Region",
+            "api.DisasterType",
+        ],
+    ),
+    "appeal": (
+        "/api/v2/appeal/",
+        [
+            "api.Appeal",
+            "api.AppealHistory",
+            "api.AppealKeyFigureRollup",
+            "api.Event",
+            "api.Country",
+            "api.Region",
+            "api.DisasterType",
+        ],
+    ),
+    "field-report": (
+        "/api/v2/field-report/",
+        [
+            "api.FieldReport",
+            "api.FieldReportContact",
+            "api.ActionsTaken",
+            "api.Source",
+            "api.ExternalPartner",
+            "api.SupportedActivity",
+            "api.Event",
+            "api.Country",
+            "api.District",
+            "api.Region",
+            "api.DisasterType",
+        ],
+    ),
+    "country": (
+        "/api/v2/country/",
+        [
+            "api.Country",
+            "api.CountryContact",
+            "api.CountryLink",
+            "api.CountryKeyFigure",
+            "api.CountrySnippet",
+            "api.CountryDirectory",
+            "api.CountryKeyDocument",
+            "api.CountrySupportingPartner",
+            "api.CountryCapacityStrengthening",
+            "api.CountryOrganizationalCapacity",
+            "api.CountryICRCPresence",
+            "api.NSDInitiatives",
+            "api.Region",
+            "api.Event",
+            "api.Appeal",
+            "api.AppealKeyFigureRollup",
+            "api.FieldReport",
+            "databank.CountryOverview",
+            "country_plan.CountryPlan",
+        ],
+    ),
+    "region": (
+        "/api/v2/region/",
+        [
+            "api.Region",
+            "api.RegionContact",
+            "api.RegionLink",
+            "api.RegionKeyFigure",
+            "api.RegionSnippet",
+            "api.RegionEmergencySnippet",
+            "api.RegionPreparednessSnippet",
+            "api.RegionProfileSnippet",
+            "api.Country",
+            "country_plan.CountryPlan",
+        ],
+    ),
+}
+
+MODEL_RESOURCES = defaultdict(set)
+for _resource, (_, _model_labels) in RESPONSE_CACHE_RESOURCES.items():
+    for _model_label in _model_labels:
+        MODEL_RESOURCES[_model_label].add(_resource)
+
+
+class VisibilityTier:
+    # Same branches as ReadOnlyVisibilityViewsetMixin
+    PUBLIC = "public"
+    MEMBER = "member"
+    IFRC = "ifrc"
+
+
+def is_response_cache_enabled() -> bool:
+    return bool(settings.API_RESPONSE_CACHE_SECONDS) and not settings.DISABLE_API_CACHE
+
+
+def get_response_cache_resource(request) -> typing.Optional[str]:
+    if request.method != "GET" or not is_response_cache_enabled():
+        return None
+    for resource, (path_prefix, _) in RESPONSE_CACHE_RESOURCES.items():
+        if request.path.startswith(path_prefix):
+            return resource
+    return None
+
+
+def get_visibility_tier(user) -> typing.Tuple[str, str]:
+    """
+    Visibility tier of the user and a hash of the user's countries (Used by the IFRC_NS visibility)
+    Users with the same tier and countries get the same responses
+    """
+    access_scope = get_user_access_scope(user)
+    if access_scope.is_public_only:
+        return VisibilityTier.PUBLIC, ""
+    if access_scope.is_ifrc:
+        return VisibilityTier.IFRC, ""
+    countries_hash = hashlib.sha1(",".join(map(str, access_scope.country_ids)).encode()).hexdigest()[:16]
+    return VisibilityTier.MEMBER, countries_hash
+
+
+def _get_version_key(resource: str) -> str:
+    return f"{RESPONSE_CACHE_KEY_PREFIX}-version:{resource}"
+
+
+def get_response_cache_key(request, user, resource: str) -> str:
+    tier, countries_hash = get_visibility_tier(user)
+    version = cache.get(_get_version_key(resource), 0)
+    request_hash = hashlib.sha256("\n".join([request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]).encode()).hexdigest()
+    return f"{RESPONSE_CACHE_KEY_PREFIX}:{resource}:{version}:{tier}:{countries_hash}:{get_language()}:{request_hash}"
+
+
+def get_cached_response(key: str, resource: str) -> typing.Optional[HttpResponse]:
+    cached = cache.get(key)
+    increment_cache_counter(f"{RESPONSE_CACHE_KEY_PREFIX}-{'miss' if cached is None else 'hit'}:{resource}")
+    if cached is None:
+        return None
+    content_type, content = cached
+    response = HttpResponse(content, content_type=content_type)
+    response["X-Response-Cache"] = "HIT"
+    return response
+
+
+def set_cached_response(key: str, response) -> None:
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return
+    cache.set(key, (response.get("Content-Type"), response.content), settings.API_RESPONSE_CACHE_SECONDS)
+
+
+def invalidate_response_cache(sender, instance=None, model=None, **kwargs):
+    """
+    Signal receiver (post_save, post_delete, m2m_changed): new version for the resources of the model
+    The responses cached with the previous version are no longer used (and expire)
+    """
+    if not is_response_cache_enabled():
+        return
+    resources = set()
+    for model_class in (sender, type(instance), model):
+        if model_class is not None and hasattr(model_class, "_meta"):
+            resources.update(MODEL_RESOURCES.get(model_class._meta.label, set()))
+    if resources:
+        transaction.on_commit(
+            lambda: [increment_cache_counter(_get_version_key(resource)) for resource in sorted(resources)],
+        )
+
+
+def get_response_cache_metrics() -> dict:
+    metrics = {}
+    for resource in RESPONSE_CACHE_RESOURCES:
+        counters = get_cache_counters(
+            hit=f"{RESPONSE_CACHE_KEY_PREFIX}-hit:{resource}",
+            miss=f"{RESPONSE_CACHE_KEY_PREFIX}-miss:{resource}",
+        )
+        total = counters["hit"] + counters["miss"]
+        metrics[resource] = {**counters, "hit_ratio": round(counters["hit"] / total, 3) if total else None}
+    return metrics
@@ -0,0 +1,13 @@
+# Text blocks of an EPoA, with typos to use the fuzzy search
+EPOA_TEXTS = [
+    "Emergency Plan of Action (EPoA) Mozambique: Tropical Cyclone Idai",
+    "DREF operation n° MDRMZ014 Glide n°: TC-2019-000021-MOZ",
+    "Date of issue: 15 March 2019 Expected time frame: 3 months",
+    "Expected end date: 15 June 2019 Category allocated to the of the disaster or crisis: Yellow",
+    "DREF alocated: CHF 350,000 Total number of people affected: 600,000",
+    "Number of people to be asisted: 25,000 Operation start date: 14 March 2019",
+    "Page 2",
+    "Helth Male: 10,000 Female: 12,000 Requirements (CHF): 60,000 People targeted: 22,000",
+    "Shelter Male: 5,000 Female: 5,500 Requirements (CHF): 90,000 People targeted: 10,500",
+    "Water, sanitation and hygene Male: 8,000 Female: 8,500 Requirements (CHF): 75,000",
+]
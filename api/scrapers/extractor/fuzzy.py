@@ -0,0 +1,226 @@
+import functools
+import re
+import typing
+
+import numpy as np
+from fuzzywuzzy import fuzz
+
+LCS_WORD_BITS = 64
+LCS_WORD_MASK = (1 << LCS_WORD_BITS) - 1
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_window_pattern(pattern: str) -> typing.Optional[re.Pattern]:
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+def to_words(value: int, words_n: int) -> typing.List[int]:
+    return [(value >> (LCS_WORD_BITS * i)) & LCS_WORD_MASK for i in range(words_n)]
+
+
+def count_bits(values: np.ndarray) -> np.ndarray:
+    """Number of set bits of each row of uint64 words"""
+    return POPCOUNT_TABLE[np.ascontiguousarray(values, dtype="<u8").view(np.uint8)].sum(axis=1)
+
+
+class BitParallelLCS:
+    """
+    Longest common subsequence of a pattern and many strings at once (Hyyro, 2004)
+    After reading (the first characters of) a string, the number of zeros in the first i bits of v
+    is the LCS of pattern[:i] and the characters read
+    """
+
+    def __init__(self, pattern: str, rows_n: int):
+        self.pattern = pattern
+        self.words_n = max(1, -(-len(pattern) // LCS_WORD_BITS))
+        self.pattern_chars = np.array(sorted({ord(char) for char in pattern}), dtype=np.int64)
+        self.pattern_masks = np.array(
+            [
+                to_words(sum(1 << i for i, char in enumerate(pattern) if ord(char) == code), self.words_n)
+                for code in self.pattern_chars.tolist()
+            ],
+            dtype=np.uint64,
+        ).reshape(-1, self.words_n)
+        self.pattern_mask = np.array(to_words((1 << len(pattern)) - 1, self.words_n), dtype=np.uint64)
+        self.v = np.array([to_words((1 << len(pattern)) - 1, self.words_n)] * rows_n, dtype=np.uint64).reshape(-1, self.words_n)
+
+    def get_char_masks(self, chars: np.ndarray) -> np.ndarray:
+        """Positions of each character in the pattern as words (0 for the other characters and the padding)"""
+        char_indexes = np.minimum(np.searchsorted(self.pattern_chars, chars), len(self.pattern_chars) - 1)
+        return np.where(
+            (self.pattern_chars[char_indexes] == chars)[..., None],
+            self.pattern_masks[char_indexes],
+            np.uint64(0),
+        )
+
+    def read(self, masks: np.ndarray):
+        """Read the next character of each string (as returned by get_char_masks)"""
+        u = self.v & masks
+        # v = (v + u) | (v - u), NOTE: u is a subset of v, so v - u = v & ~u
+        added = np.empty_like(self.v)
+        carry = np.zeros(len(self.v), dtype=np.uint64)
+        for word in range(self.words_n):
+            word_sum = self.v[:, word] + u[:, word]
+            word_carry = word_sum < self.v[:, word]
+            added[:, word] = word_sum + carry
+            carry = (word_carry | (added[:, word] < word_sum)).astype(np.uint64)
+        self.v = added | (self.v & ~u)
+
+    def get_lcs_lengths(self) -> np.ndarray:
+        """LCS of the pattern and the characters read"""
+        return len(self.pattern) - count_bits(self.v & self.pattern_mask)
+
+    def get_prefix_lcs_lengths(self) -> np.ndarray:
+        """LCS of pattern[:i + 1] and the characters read, for each i"""
+        bits = np.unpackbits(np.ascontiguousarray(self.v, dtype="<u8").view(np.uint8), axis=1, bitorder="little")
+        return np.cumsum(1 - bits[:, : len(self.pattern)], axis=1)
+
+
+class FuzzyWindowIndex:
+    """
+    Windows (token n-grams) of the text blocks of a document, used to fuzzy search the keys (eg: "Date of launch:")
+
+    Same result as scoring each window with fuzz.partial_ratio and keeping the first best window
+    (in the order of the text blocks), but all the windows are first scored in batch with an upper bound
+    (See get_score_upper_bounds) and only the windows which can still beat the best window are scored
+    using fuzz.partial_ratio.
+
+    NOTE: Like the previous implementation, partial_ratio compares the str() of the list of tokens
+    """
+
+    def __init__(self, texts: typing.List[str]):
+        self.texts = texts
+        self.tokens = [text.split() for text in texts]
+        self._windows = {}
+
+    def get_windows(self, n: int) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Windows of n tokens: (text_index, token index) and the index of their str() in the unique windows
+        Unique windows: str() length and reversed str() characters (0 padded)
+        NOTE: The last window of each text block is not used (Same as the previous implementation)
+        """
+        if n not in self._windows:
+            positions = [(text_index, index) for text_index, tokens in enumerate(self.tokens) for index in range(len(tokens) - n)]
+            unique_windows = {}
+            window_indexes = [
+                unique_windows.setdefault(str(self.tokens[text_index][index : index + n]), len(unique_windows))
+                for text_index, index in positions
+            ]
+            lengths = np.array([len(window_repr) for window_repr in unique_windows], dtype=np.int64)
+            reversed_chars = np.zeros((len(unique_windows), lengths.max(initial=0)), dtype=np.int64)
+            for row, window_repr in enumerate(unique_windows):
+                reversed_chars[row, : len(window_repr)] = [ord(char) for char in reversed(window_repr)]
+            self._windows[n] = (
+                np.array(positions, dtype=np.int64).reshape(-1, 2),
+                np.array(window_indexes, dtype=np.int64),
+                lengths,
+                reversed_chars,
+            )
+        return self._windows[n]
+
+    @staticmethod
+    def get_score_upper_bounds(lengths: np.ndarray, reversed_chars: np.ndarray, search_text: typing.List[str]) -> np.ndarray:
+        """
+        Upper bound of fuzz.partial_ratio(window, search_text) for each window
+
+        partial_ratio is the best ratio of the shorter string (length a) and substrings of the longer string
+        (ratio = 2 * LCS / total length), the substrings are either:
+        - of length a: ratio <= LCS / a
+        - suffixes of length k < a: ratio <= 2 * LCS(shorter, suffix) / (a + k)
+        The LCS of the suffixes are computed using the reversed strings
+        """
+        search_repr = str(search_text)
+        search_n = len(search_repr)
+        lcs = BitParallelLCS(search_repr[::-1], len(lengths))
+        windows_longer = lengths > search_n
+        shorter_lengths = np.minimum(lengths, search_n)
+        upper_bounds = np.zeros(len(lengths))
+
+        # Window is the longer string: LCS of the search text and the suffixes of the window
+        char_masks = lcs.get_char_masks(reversed_chars)
+        for k in range(1, reversed_chars.shape[1] + 1):
+            lcs.read(char_masks[:, k - 1])
+            if k < search_n and windows_longer.any():
+                suffix_bounds = 2 * lcs.get_lcs_lengths() / (search_n + k)
+                upper_bounds = np.where(windows_longer & (k <= lengths), np.maximum(upper_bounds, suffix_bounds), upper_bounds)
+        upper_bounds = np.maximum(upper_bounds, lcs.get_lcs_lengths() / np.maximum(shorter_lengths, 1))
+
+        # Search text is the longer string: LCS of the suffixes of the search text and the window
+        k = np.arange(1, search_n + 1)
+        suffix_bounds = 2 * lcs.get_prefix_lcs_lengths() / (shorter_lengths[:, None] + k)
+        suffix_bounds[windows_longer[:, None] | (k >= lengths[:, None])] = 0
+        upper_bounds = np.maximum(upper_bounds, suffix_bounds.max(axis=1, initial=0))
+
+        return np.ceil(upper_bounds * 100)
+
+    def search(self, search_texts: typing.List[typing.List[str]], prune: bool = True) -> dict:
+        """
+        Best window for the search texts (list of tokens)
+        Windows are ordered by text block, search text and position (first best window wins)
+        prune: Use the upper bounds to skip the windows (False: score all the windows, used for benchmarking)
+        """
+        candidates = []
+        for search_text_index, search_text in enumerate(search_texts):
+            positions, window_indexes, lengths, reversed_chars = self.get_windows(len(search_text))
+            if not len(positions):
+                continue
+            if prune:
+                upper_bounds = self.get_score_upper_bounds(lengths, reversed_chars, search_text)[window_indexes]
+            else:
+                upper_bounds = np.full(len(positions), 100)
+            candidates.append(
+                np.column_stack(
+                    [
+                        upper_bounds,
+                        positions[:, 0],
+                        np.full(len(positions), search_text_index),
+                        positions[:, 1],
+                    ]
+                ).astype(np.int64)
+            )
+        if not candidates:
+            return {}
+        candidates = np.concatenate(candidates)
+        # Highest upper bound first, then in the order of the windows
+        candidates = candidates[np.lexsort((candidates[:, 3], candidates[:, 2], candidates[:, 1], -candidates[:, 0]))]
+
+        ratio = 0
+        best_order = None
+        field_meta = {}
+        # NOTE: Same windows are repeated in the documents (eg: headers and footers)
+        scores = {}
+        for upper_bound, text_index, search_text_index, index in candidates.tolist():
+            if upper_bound < ratio or upper_bound == 0:
+                break
+            order = (text_index, search_text_index, index)
+            if upper_bound == ratio and order > best_order:
+                continue
+            search_text = search_texts[search_text_index]
+            real_text = self.tokens[text_index][index : index + len(search_text)]
+            score_key = (search_text_index, tuple(real_text))
+            if not prune or score_key not in scores:
+                scores[score_key] = fuzz.partial_ratio(real_text, search_text)
+            new_ratio = scores[score_key]
+            if new_ratio < ratio or (new_ratio == ratio and (not ratio or order > best_order)):
+                continue
+            text = self.texts[text_index]
+            pattern = compile_window_pattern(" ".join(real_text))
+            search = pattern and pattern.search(text)
+            if search:
+                start, end = search.span()
+                ratio = new_ratio
+                best_order = order
+                field_meta = {
+                    "text_index": text_index,
+                    "text": text,
+                    "start_index": start,
+                    "end_index": end,
+                    "score": ratio,
+                    "real_text": real_text,
+                    "search_text": search_text,
+                }
+        return field_meta
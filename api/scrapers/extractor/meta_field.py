@@ -1,13 +1,13 @@
 import re
 
-from fuzzywuzzy import fuzz
-
 from api.scrapers.config import (  # get_sector_misc_keys,
     M_EXTRACTORS,
     M_KEYS,
     get_meta_misc_keys,
 )
 
+from .fuzzy import FuzzyWindowIndex
+
 
 class MetaFieldExtractor:
     def __init__(self, texts, fields):
@@ -44,38 +44,10 @@ class MetaFieldExtractor:
                     break
 
     def fuzzy_find_remainig_key(self):
-        def _search(key):
-            ratio = 0
-            field_meta = {}
-            for text_index, text in enumerate(self.texts):
-                texts = text.split()
-                search_text = key.split()
-                search_text_n = len(search_text)
-                for index in range(0, len(texts) - search_text_n):
-                    real_text = texts[index : index + search_text_n]
-                    new_ratio = fuzz.partial_ratio(real_text, search_text)
-                    if not new_ratio > ratio:
-                        continue
-                    try:
-                        search = re.search(" ".join(real_text), text)
-                        if search:
-                            start, end = search.span()
-                            ratio = new_ratio
-                            field_meta = {
-                                "text_index": text_index,
-                                "text": text,
-                                "start_index": start,
-                                "end_index": end,
-                                "score": ratio,
-                                "real_text": real_text,
-                                "search_text": search_text,
-                            }
-                    except re.error:
-                        pass
-            return field_meta
+        window_index = FuzzyWindowIndex(self.texts)
 
         def search(key, field_meta):
-            new_field_meta = _search(key)
+            new_field_meta = window_index.search([key.split()])
             if new_field_meta["score"] > field_meta.get("score", 0):
                 field_meta = new_field_meta
             return field_meta
@@ -5,6 +5,8 @@ from fuzzywuzzy import fuzz
 # from common import json_preety
 from api.scrapers.config import S_KEYS, SF_KEYS  # M_EXTRACTORS,; get_sector_misc_keys,
 
+from .fuzzy import FuzzyWindowIndex
+
 
 class SectorFieldExtractor:
     def __init__(self, texts, sectors, fields):
@@ -45,40 +47,12 @@ class SectorFieldExtractor:
                         break
 
     def fuzzy_find_remainig_sectors(self):
-        def _search(key):
-            ratio = 0
-            sector_meta = {}
-            for text_index, text in enumerate(self.texts):
-                texts = text.split()
-                for field in SF_KEYS:
-                    for field_key in SF_KEYS[field]:
-                        search_text = "{} {}".format(key, field_key).split()
-                        search_text_n = len(search_text)
-                        for index in range(0, len(texts) - search_text_n):
-                            real_text = texts[index : index + search_text_n]
-                            new_ratio = fuzz.partial_ratio(real_text, search_text)
-                            if not new_ratio > ratio:
-                                continue
-                            try:
-                                search = re.search(" ".join(real_text), text)
-                                if search:
-                                    start, end = search.span()
-                                    ratio = new_ratio
-                                    sector_meta = {
-                                        "text_index": text_index,
-                                        "text": text,
-                                        "start_index": start,
-                                        "end_index": end,
-                                        "score": ratio,
-                                        "real_text": real_text,
-                                        "search_text": search_text,
-                                    }
-                            except re.error:
-                                pass
-            return sector_meta
+        window_index = FuzzyWindowIndex(self.texts)
 
         def search(key, sector_meta):
-            new_sector_meta = _search(key)
+            new_sector_meta = window_index.search(
+                ["{} {}".format(key, field_key).split() for field in SF_KEYS for field_key in SF_KEYS[field]]
+            )
             if new_sector_meta["score"] > sector_meta.get("score", 0):
                 sector_meta = new_sector_meta
             return sector_meta
@@ -0,0 +1,61 @@
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from haystack.query import SearchQuerySet
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """
+    Process wide pool used to run haystack queries concurrently.
+    NOTE: haystack keeps the backend (and its Elasticsearch connection) per thread,
+    so re-using the same worker threads across requests also re-uses their connections.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.HAYSTACK_SEARCH_MAX_WORKERS,
+                    thread_name_prefix="haystack-search",
+                )
+    return _executor
+
+
+class SearchQueryBatch:
+    """
+    Collect multiple SearchQuerySet and evaluate them together
+
+    Each query is still a separate Elasticsearch request, but they are sent concurrently
+    so the latency is the slowest query instead of the sum of all the queries.
+
+    Usage:
+        batch = SearchQueryBatch()
+        batch.add("regions", SearchQuerySet().models(Region).filter(...), limit=50)
+        results = batch.execute()
+        results["regions"]  # -> list[SearchResult]
+    """
+
+    def __init__(self):
+        self.queries: dict[str, typing.Tuple[SearchQuerySet, int]] = {}
+
+    def add(self, key: str, queryset: SearchQuerySet, limit: int):
+        self.queries[key] = (queryset, limit)
+
+    @staticmethod
+    def _fetch(queryset: SearchQuerySet, limit: int) -> list:
+        # NOTE: Slicing fetches the results in a single request (iterating fetches them in chunks)
+        return list(queryset[:limit])
+
+    def execute(self) -> dict[str, list]:
+        if not self.queries:
+            return {}
+        if len(self.queries) == 1 or settings.HAYSTACK_SEARCH_MAX_WORKERS <= 1:
+            return {key: self._fetch(queryset, limit) for key, (queryset, limit) in self.queries.items()}
+        executor = get_search_executor()
+        futures = {key: executor.submit(self._fetch, queryset, limit) for key, (queryset, limit) in self.queries.items()}
+        return {key: future.result() for key, future in futures.items()}
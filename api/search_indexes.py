@@ -1,8 +1,43 @@
+from django.db.models import Q
 from haystack import indexes
 
 from api.models import Appeal, Country, District, Event, FieldReport, Region
 
 
+class UpdatedFieldIndexMixin:
+    """
+    Allows update_index --age/--start/--end to only index the recently updated records
+    updated_field: Last modified timestamp of the model
+    related_updated_fields: Timestamps of the related records which are also included in the index document
+    """
+
+    updated_field: str
+    related_updated_fields: tuple = ()
+
+    def get_updated_field(self):
+        return self.updated_field
+
+    def build_queryset(self, using=None, start_date=None, end_date=None):
+        if not self.related_updated_fields or not (start_date or end_date):
+            return super().build_queryset(using=using, start_date=start_date, end_date=end_date)
+
+        updated_q = Q()
+        for field in (self.updated_field, *self.related_updated_fields):
+            field_q = Q()
+            if start_date:
+                field_q &= Q(**{f"{field}__gte": start_date})
+            if end_date:
+                field_q &= Q(**{f"{field}__lte": end_date})
+            updated_q |= field_q
+        model = self.get_model()
+        # NOTE: Using a subquery, joins with the related records can duplicate the rows
+        return (
+            self.index_queryset(using=using)
+            .filter(pk__in=model.objects.filter(updated_q).values("pk"))
+            .order_by(model._meta.pk.name)
+        )
+
+
 class RegionIndex(indexes.SearchIndex, indexes.Indexable):
     text = indexes.EdgeNgramField(document=True, use_template=True)
     name = indexes.EdgeNgramField(model_attr="get_name_display")
@@ -40,10 +75,13 @@ class DistrictIndex(indexes.SearchIndex, indexes.Indexable):
         return District
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.all()
+        return self.get_model().objects.select_related("country")
 
 
-class AppealIndex(indexes.Indexable, indexes.SearchIndex):
+class AppealIndex(UpdatedFieldIndexMixin, indexes.Indexable, indexes.SearchIndex):
+    updated_field = "modified_at"
+    related_updated_fields = ("event__updated_at",)
+
     text = indexes.EdgeNgramField(document=True, use_template=True)
     name = indexes.EdgeNgramField(model_attr="name")
     visibility = indexes.CharField(model_attr="event__visibility", null=True)
@@ -61,10 +99,14 @@ class AppealIndex(indexes.Indexable, indexes.SearchIndex):
         return Appeal
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.all()
+        return self.get_model().objects.select_related("event", "country")
 
 
-class EmergenciesIndex(indexes.Indexable, indexes.SearchIndex):
+class EmergenciesIndex(UpdatedFieldIndexMixin, indexes.Indexable, indexes.SearchIndex):
+    updated_field = "updated_at"
+    # NOTE: amount_requested/amount_funded are from the appeals
+    related_updated_fields = ("appeals__modified_at",)
+
     text = indexes.EdgeNgramField(document=True, use_template=True)
     name = indexes.EdgeNgramField(model_attr="name")
     visibility = indexes.CharField(model_attr="visibility", null=True)
@@ -108,10 +150,13 @@ class EmergenciesIndex(indexes.Indexable, indexes.SearchIndex):
         return [appeal.get_atype_display() for appeal in obj.appeals.all()]
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.all()
+        return self.get_model().objects.select_related("dtype").prefetch_related("countries", "appeals")
 
 
-class FieldReportIndex(indexes.Indexable, indexes.SearchIndex):
+class FieldReportIndex(UpdatedFieldIndexMixin, indexes.Indexable, indexes.SearchIndex):
+    updated_field = "updated_at"
+    related_updated_fields = ("event__updated_at",)
+
     text = indexes.EdgeNgramField(document=True, use_template=True)
     name = indexes.EdgeNgramField(model_attr="summary")
     visibility = indexes.CharField(model_attr="visibility", null=True)
@@ -129,7 +174,7 @@ class FieldReportIndex(indexes.Indexable, indexes.SearchIndex):
         return FieldReport
 
     def index_queryset(self, using=None):
-        return self.get_model().objects.all()
+        return self.get_model().objects.select_related("event").prefetch_related("countries")
 
     def prepare_countries(self, obj):
         return [country.name for country in obj.countries.all()]
@@ -11,6 +11,7 @@ from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 # from api.utils import pdf_exporter
+from api.export_cache import get_export_fingerprint, use_cached_export
 from api.tasks import generate_export_pdf
 from api.utils import CountryValidator, RegionValidator, generate_eap_export_url
 from deployments.models import EmergencyProject, Personnel, PersonnelDeployment
@@ -2577,7 +2578,16 @@ class ExportSerializer(serializers.ModelSerializer):
     class Meta:
         model = Export
         fields = "__all__"
-        read_only_fields = ("pdf_file", "token", "requested_at", "completed_at", "status", "requested_by", "url")
+        read_only_fields = (
+            "pdf_file",
+            "token",
+            "requested_at",
+            "completed_at",
+            "status",
+            "requested_by",
+            "url",
+            "fingerprint",
+        )
 
     def validate_pdf_file(self, pdf_file):
         validate_file_type(pdf_file)
@@ -2663,13 +2673,18 @@ class ExportSerializer(serializers.ModelSerializer):
         if is_pga:
             validated_data["url"] += "?is_pga=true"
         validated_data["requested_by"] = user
+        language = django_get_language()
+        validated_data["fingerprint"] = get_export_fingerprint(export_type, export_id, validated_data["url"], language)
         export = super().create(validated_data)
         if export.url:
             export.status = Export.ExportStatus.PENDING
             export.requested_at = timezone.now()
             export.save(update_fields=["status", "requested_at"])
 
-            language = django_get_language()
+            # Nothing changed since the last export, re-use the PDF
+            if use_cached_export(export):
+                return export
+
             transaction.on_commit(lambda: generate_export_pdf.delay(export.id, title, language))
         return export
 
@@ -5,8 +5,10 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
+from api.export_cache import use_cached_export
 from api.playwright import render_pdf_from_url
 from main.utils import logger_context
+from utils.elasticsearch import bulk_es_actions
 
 from .logger import logger
 from .models import Export
@@ -30,6 +32,9 @@ def generate_export_pdf(export_id, title, set_user_language="en"):
     export = Export.objects.get(id=export_id)
     user = User.objects.get(id=export.requested_by.id)
     token = Token.objects.filter(user=user).last()
+    # An export with the same content could have been completed while this one was queued
+    if use_cached_export(export, count_miss=False):
+        return
     logger.info(f"Starting export: {export.pk}")
 
     try:
@@ -59,3 +64,8 @@ def generate_export_pdf(export_id, title, set_user_language="en"):
         export.status = Export.ExportStatus.ERRORED
         export.save(update_fields=["status"])
     logger.info(f"End export: {export.pk}")
+
+
+@shared_task
+def index_elasticsearch_actions(actions):
+    bulk_es_actions(actions)
@@ -1,3 +1,4 @@
+import datetime
 from unittest.mock import patch
 
 from django.contrib.admin.sites import AdminSite
@@ -84,6 +85,34 @@ class AppealTest(APITestCase):
         self.assertIsNone(response["event"])
         self.assertIsNotNone(response["country"])
 
+    def test_appeal_history_as_of(self):
+        now = timezone.now()
+        country = models.Country.objects.get(name="country")
+        history = [
+            models.AppealHistory.objects.create(
+                aid="test2",
+                country=country,
+                valid_from=now - datetime.timedelta(days=days_from),
+                valid_to=now - datetime.timedelta(days=days_to) if days_to else models.APPEAL_HISTORY_OPEN_VALID_TO,
+            )
+            for days_from, days_to in [(30, 20), (20, 10), (10, None)]
+        ]
+        qs = models.AppealHistory.objects.filter(aid="test2")
+        for date, expected in [
+            (now - datetime.timedelta(days=40), []),
+            (now - datetime.timedelta(days=25), [history[0]]),
+            # valid_from/valid_to are excluded
+            (now - datetime.timedelta(days=20), []),
+            (now - datetime.timedelta(days=15), [history[1]]),
+            (now - datetime.timedelta(days=5), [history[2]]),
+            (now + datetime.timedelta(days=5), [history[2]]),
+            (models.APPEAL_HISTORY_OPEN_VALID_TO, []),
+        ]:
+            self.assertEqual(list(qs.as_of(date)), expected)
+            self.assertEqual(list(qs.as_of(date)), list(qs.filter(valid_from__lt=date, valid_to__gt=date)))
+        self.assertEqual(list(qs.as_of(now.isoformat())), [history[2]])
+        self.assertEqual(list(qs.current()), [history[2]])
+
 
 class FieldReportTest(TestCase):
 
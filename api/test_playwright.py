@@ -0,0 +1,96 @@
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase, override_settings
+from playwright.sync_api import Error as PlaywrightError
+
+from api import playwright as api_playwright
+
+
+@override_settings(PLAYWRIGHT_CONTEXT_POOL_SIZE=2)
+class BrowserSessionTest(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = SimpleNamespace(id=1, username="jon@dave.com", first_name="Jon", last_name="Mon")
+        self.browser = MagicMock()
+        self.browser.is_connected.return_value = True
+        self.browser.new_context.side_effect = self._new_context
+        self.playwright = MagicMock()
+        self.playwright.chromium.connect.return_value = self.browser
+        patcher = patch("api.playwright.sync_playwright")
+        patcher.start().return_value.start.return_value = self.playwright
+        self.addCleanup(patcher.stop)
+        # Start every test with a new session for this thread
+        api_playwright._local.browser_session = None
+        self.addCleanup(api_playwright.close_browser_sessions)
+
+    @staticmethod
+    def _new_context(storage_state):
+        context = MagicMock(storage_state=storage_state)
+        context.new_page.return_value.pdf.return_value = b"%PDF-1.4"
+        return context
+
+    @staticmethod
+    def _token(key):
+        return SimpleNamespace(key=key)
+
+    def _render(self, token):
+        return api_playwright.render_pdf_from_url(url="https://go.ifrc.org/", user=self.user, token=token)
+
+    def _context_token(self, context):
+        user_data = context.storage_state["origins"][0]["localStorage"][0]["value"]
+        return json.loads(user_data)["token"]
+
+    def test_context_reuse(self):
+        token = self._token("token-1")
+        self._render(token)
+        self._render(token)
+
+        self.playwright.chromium.connect.assert_called_once()
+        self.browser.new_context.assert_called_once()
+        (context,) = api_playwright._local.browser_session.contexts.values()
+        self.assertEqual(self._context_token(context), "token-1")
+        # A new page per render, closed after the render
+        self.assertEqual(context.new_page.call_count, 2)
+        self.assertEqual(context.new_page.return_value.close.call_count, 2)
+
+    def test_new_login_after_expired_session(self):
+        self._render(self._token("token-1"))
+        # Token expired: new token -> New authenticated context
+        self._render(self._token("token-2"))
+        self.assertEqual(self.browser.new_context.call_count, 2)
+        contexts = list(api_playwright._local.browser_session.contexts.values())
+        self.assertEqual([self._context_token(context) for context in contexts], ["token-1", "token-2"])
+
+        # Least recently used contexts are closed (PLAYWRIGHT_CONTEXT_POOL_SIZE)
+        self._render(self._token("token-3"))
+        contexts[0].close.assert_called_once()
+
+        # Disconnected browser: Reconnect and log in again
+        self.browser.is_connected.return_value = False
+        self._render(self._token("token-3"))
+        self.assertEqual(self.playwright.chromium.connect.call_count, 2)
+        self.assertEqual(self.browser.new_context.call_count, 4)
+
+    def test_playwright_error_closes_session(self):
+        self.browser.new_context.side_effect = PlaywrightError("Target closed")
+        with self.assertRaises(PlaywrightError):
+            self._render(self._token("token-1"))
+        self.browser.close.assert_called_once()
+        self.playwright.stop.assert_called_once()
+
+    def test_close_browser_sessions(self):
+        self._render(self._token("token-1"))
+
+        # Session of another worker thread
+        thread = threading.Thread(target=self._render, args=(self._token("token-2"),))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(api_playwright._browser_sessions), 2)
+        api_playwright.close_browser_sessions()
+        self.assertEqual(api_playwright._browser_sessions, [])
+        self.assertEqual(self.browser.close.call_count, 2)
+        self.assertEqual(self.playwright.stop.call_count, 2)
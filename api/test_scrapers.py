@@ -1,10 +1,36 @@
+import datetime
+import hashlib
 import time
+from collections import defaultdict
+from io import StringIO
+from unittest.mock import patch
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.crypto import get_random_string
 
+from api.factories.country import CountryFactory
+from api.factories.event import EventFactory
 from api.management.commands.index_and_notify import Command as Notify
+from api.management.commands.scrape_pdfs import EPOA_FIELDS, SECTOR_FIELDS, SECTORS
+from api.management.commands.scrape_pdfs import Command as ScrapePdfs
+from api.management.commands.sync_molnix import (
+    MolnixLookups,
+    add_tags,
+    get_unique_tags,
+    sync_deployments,
+    sync_open_positions,
+)
+from api.scrapers.config import M_KEYS, S_KEYS, SF_KEYS
+from api.scrapers.extractor import MetaFieldExtractor, SectorFieldExtractor
+from api.scrapers.extractor.fixtures import EPOA_TEXTS
+from api.scrapers.extractor.fuzzy import FuzzyWindowIndex
+from api.weekly_digest import WeeklyDigestBuilder
+from deployments.models import ERU, ERUOwner, MolnixTag, Personnel, PersonnelDeployment
 from notifications.models import (
     Country,
     DisasterType,
@@ -12,9 +38,10 @@ from notifications.models import (
     Region,
     Subscription,
     SubscriptionType,
+    SurgeAlert,
 )
 
-from .models import Appeal, FieldReport
+from .models import Appeal, AppealType, EmergencyOperationsDataset, Event, FieldReport
 
 
 def get_user():
@@ -172,6 +199,25 @@ class FieldReportNotificationTest(TestCase):
         self.assertEqual(len(emails), 2)
         self.assertEqual(emails.sort(), [user1.email, user2.email].sort())
 
+    def test_subscribers_query_count(self):
+        region = Region.objects.get(name=1)
+        dtype = DisasterType.objects.get(name="d1")
+        for i in range(5):
+            report = FieldReport.objects.create(rid=f"test-{i}", dtype=dtype)
+            report.countries.add(Country.objects.create(name=f"c-{i}", region=region))
+        user = get_user()
+        Subscription.objects.create(user=user, rtype=RecordType.NEW_EMERGENCIES, stype=SubscriptionType.NEW)
+        Subscription.objects.create(user=user, region=region, rtype=RecordType.REGION, lookup_id="r%s" % region.id)
+        notify = Notify()
+        # Subscriptions, country regions, record countries and record disaster types
+        with self.assertNumQueries(4):
+            emails = notify.gather_subscribers(
+                FieldReport.objects.filter(created_at__gte=notify.diff_9_minutes()),
+                RecordType.NEW_EMERGENCIES,
+                SubscriptionType.NEW,
+            )
+        self.assertEqual(emails, [user.email])
+
 
 class AppealNotificationTest(TestCase):
     def setUp(self):
@@ -225,6 +271,161 @@ class AppealNotificationTest(TestCase):
         self.assertEqual(emails[0], user.email)
 
 
+class WeeklyDigestTest(TestCase):
+    def setUp(self):
+        self.now = datetime.datetime.now(datetime.timezone.utc)
+        self.country = Country.objects.create(name="Nepal", society_name="Nepal Red Cross Society")
+        self.dtype = dtype = DisasterType.objects.create(name="Flood", summary="Flood")
+        self.event = Event.objects.create(name="Flood 1", disaster_start_date=self.now, dtype=dtype, is_featured=True)
+        self.event_without_figures = Event.objects.create(
+            name="Flood 2", disaster_start_date=self.now, dtype=dtype, is_featured=True
+        )
+        Event.objects.filter(pk=self.event.pk).update(updated_at=self.now - datetime.timedelta(days=1))
+        Event.objects.create(name="Flood 3", disaster_start_date=self.now, dtype=dtype)
+        self.event.refresh_from_db()
+        self.event_without_figures.refresh_from_db()
+
+        future = self.now + datetime.timedelta(days=30)
+        self.dref = Appeal.objects.create(
+            aid="digest-1",
+            code="digest-1",
+            name="DREF",
+            atype=AppealType.DREF,
+            country=self.country,
+            event=self.event,
+            amount_requested=1000000,
+            amount_funded=500000,
+            num_beneficiaries=1000000,
+            end_date=future,
+        )
+        self.appeal = Appeal.objects.create(
+            aid="digest-2",
+            code="digest-2",
+            name="Emergency appeal",
+            atype=AppealType.APPEAL,
+            country=self.country,
+            event=self.event,
+            amount_requested=3000000,
+            amount_funded=1500000,
+            num_beneficiaries=2000000,
+            end_date=future,
+        )
+        # Closed appeal: Only in the latest ops
+        self.closed_appeal = Appeal.objects.create(
+            aid="digest-3",
+            code="digest-3",
+            name="Closed appeal",
+            atype=AppealType.INTL,
+            country=self.country,
+            amount_requested=5000000,
+            end_date=self.now - datetime.timedelta(days=1),
+        )
+        eru_owner = ERUOwner.objects.create(national_society_country=self.country)
+        ERU.objects.create(eru_owner=eru_owner, event=self.event, units=2)
+        ERU.objects.create(eru_owner=eru_owner, event=self.event, units=3)
+        deployment = PersonnelDeployment.objects.create(country_deployed_to=self.country, event_deployed_to=self.event)
+        PersonnelDeployment.objects.create(country_deployed_to=self.country, event_deployed_to=self.event)
+        self.personnel = Personnel.objects.create(
+            type=Personnel.TypeChoices.RR,
+            deployment=deployment,
+            country_from=self.country,
+            name="Person 1",
+            role="Coordinator",
+            start_date=self.now,
+        )
+        self.field_report = FieldReport.objects.create(rid="digest", dtype=dtype, summary="Field report 1")
+        self.field_report.countries.add(self.country)
+        # NOTE: Summary and created_at are set on save
+        self.field_report.refresh_from_db()
+
+    def get_digest(self):
+        return WeeklyDigestBuilder(since=self.now - datetime.timedelta(days=7), now=self.now).build()
+
+    def test_weekly_digest(self):
+        # Same output as the previous per-row digest of index_and_notify
+        appeals = {appeal.pk: appeal for appeal in Appeal.objects.all()}
+        self.assertEqual(
+            self.get_digest(),
+            {
+                "active_dref": 1,
+                "active_ea": 1,
+                "funding_coverage": 50.0,
+                "budget": 4.0,
+                "population": 3.0,
+                "highlighted_ops": [
+                    {
+                        "hl_id": self.event_without_figures.id,
+                        "hl_name": "Flood 2",
+                        "hl_last_update": self.event_without_figures.updated_at,
+                        "hl_people": "--",
+                        "hl_funding": "--",
+                        "hl_deployed_eru": "--",
+                        "hl_deployed_sp": 0,
+                        "hl_coverage": "--",
+                    },
+                    {
+                        "hl_id": self.event.id,
+                        "hl_name": "Flood 1",
+                        "hl_last_update": self.event.updated_at,
+                        "hl_people": 3000000,
+                        "hl_funding": 4000000,
+                        "hl_deployed_eru": 5,
+                        "hl_deployed_sp": 2,
+                        "hl_coverage": 0.5,
+                    },
+                ],
+                "latest_ops": [
+                    {
+                        "op_event_id": appeal.event_id,
+                        "op_country": "Nepal",
+                        "op_name": appeal.name,
+                        "op_created_at": appeals[appeal.pk].created_at,
+                        "op_funding": float(appeal.amount_requested),
+                    }
+                    for appeal in [self.closed_appeal, self.appeal, self.dref]
+                ],
+                "latest_deployments": [
+                    {
+                        "operation": "Flood 1",
+                        "event_url": f"{settings.GO_WEB_URL}/emergencies/{self.event.id}",
+                        "society_from": "Nepal Red Cross Society",
+                        "name": "Person 1",
+                        "role": "Coordinator",
+                        "start_date": self.personnel.start_date,
+                        "end_date": None,
+                    }
+                ],
+                "latest_field_reports": [
+                    {
+                        "id": self.field_report.id,
+                        "country": "Nepal",
+                        "summary": self.field_report.summary,
+                        "created_at": self.field_report.created_at,
+                    }
+                ],
+            },
+        )
+
+    def test_weekly_digest_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_digest()
+        # More featured events, operations, deployments and field reports: Same number of queries
+        for i in range(5):
+            event = Event.objects.create(name=f"Event {i}", disaster_start_date=self.now, is_featured=True)
+            Appeal.objects.create(aid=f"more-{i}", code=f"more-{i}", name="Appeal", atype=1, country=self.country, event=event)
+            Personnel.objects.create(
+                type=Personnel.TypeChoices.RR,
+                deployment=PersonnelDeployment.objects.create(country_deployed_to=self.country, event_deployed_to=event),
+                country_from=self.country,
+                start_date=self.now,
+            )
+            FieldReport.objects.create(rid=f"more-{i}", dtype=self.dtype).countries.add(self.country)
+        with self.assertNumQueries(len(queries)):
+            digest = self.get_digest()
+        self.assertEqual(len(digest["highlighted_ops"]), 7)
+        self.assertEqual(len(digest["latest_field_reports"]), 6)
+
+
 class FilterJustCreatedTest(TestCase):
     def setUp(self):
         # create two appeals, modify one 2 seconds later.
@@ -242,3 +443,256 @@ class FilterJustCreatedTest(TestCase):
         filtered = notify.filter_just_created(Appeal.objects.filter(created_at__gte=notify.diff_9_minutes()))
         self.assertEqual(len(filtered), 1)
         self.assertEqual(filtered[0].aid, "test2")
+
+
+class FieldExtractorTest(TestCase):
+    def test_meta_field_extractor(self):
+        m_texts = EPOA_TEXTS[: EPOA_TEXTS.index("Page 2")]
+        extractor = MetaFieldExtractor(m_texts, EPOA_FIELDS)
+        _, m_data = extractor.extract_fields()
+        self.assertEqual(m_data["appealNumber"], "n° MDRMZ014")
+        self.assertEqual(m_data["drefAllocated"], "CHF 350,000")
+        self.assertEqual(m_data["numOfPeopleToBeAssisted"], "25,000")
+        self.assertEqual(
+            {field: meta["score"] for field, meta in extractor.field_meta.items() if meta["score"] < 100},
+            {
+                "appealNumber": 90,
+                "appealLaunchDate": 79,
+                "expectedTimeFrame": 90,
+                "drefAllocated": 95,
+                "numOfPeopleToBeAssisted": 98,
+            },
+        )
+
+    def test_sector_field_extractor(self):
+        extractor = SectorFieldExtractor(EPOA_TEXTS, SECTORS, SECTOR_FIELDS)
+        _, s_data = extractor.extract_fields()
+        self.assertEqual(s_data["health"]["female"], "12,000")
+        self.assertEqual(s_data["waterSanitationAndHygiene"]["male"], "8,000")
+        self.assertEqual(
+            {sector: meta["score"] for sector, meta in extractor.sector_meta.items()},
+            {"shelter": 100, "health": 94, "waterSanitationAndHygiene": 98},
+        )
+
+    def test_fuzzy_window_index_pruning(self):
+        # Pruned search should find the same windows as scoring all the windows
+        window_index = FuzzyWindowIndex(EPOA_TEXTS)
+        search_texts = [
+            *[[key.split()] for keys in M_KEYS.values() for key in keys],
+            *[
+                ["{} {}".format(sector_key, field_key).split() for field in SF_KEYS for field_key in SF_KEYS[field]]
+                for sector_keys in S_KEYS.values()
+                for sector_key in sector_keys
+            ],
+        ]
+        for search_text in search_texts:
+            self.assertEqual(window_index.search(search_text), window_index.search(search_text, prune=False))
+
+
+class ScrapePdfsTest(TestCase):
+    PDF_CONTENTS = {
+        "https://example.com/epoa-1.pdf": b"%PDF-epoa-1",
+        # Same document published under another URL
+        "https://example.com/epoa-1-copy.pdf": b"%PDF-epoa-1",
+        "https://example.com/epoa-2.pdf": b"%PDF-epoa-2",
+    }
+
+    def get_command(self, batch_size=100):
+        command = ScrapePdfs()
+        command.workers = 1
+        command.download_workers = 2
+        command.batch_size = batch_size
+        command.worker_stats = defaultdict(lambda: {"documents": 0, "pages": 0, "seconds": 0.0})
+        command.skipped_count = 0
+        return command
+
+    @staticmethod
+    def read_pdf_into_memory(command, url):
+        return ScrapePdfsTest.PDF_CONTENTS[url]
+
+    @staticmethod
+    def convert_pdf_to_text_blocks(pdf_content):
+        return {"worker": "test", "pages": 2, "seconds": 0.5, "texts": EPOA_TEXTS}
+
+    @staticmethod
+    def get_documents(command, pdf_type):
+        if pdf_type != "epoa":
+            return []
+        return [[url, f"{url.rsplit('/', 1)[1]}", pdf_type] for url in ScrapePdfsTest.PDF_CONTENTS]
+
+    @staticmethod
+    def get_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def test_scrape_documents_skips_known_hashes(self):
+        EmergencyOperationsDataset.objects.create(
+            raw_file_url="https://example.com/old-epoa-2.pdf",
+            raw_file_hash=self.get_hash(b"%PDF-epoa-2"),
+        )
+        command = self.get_command()
+        known_hashes = command.get_known_hashes("epoa")
+        self.assertEqual(known_hashes, {self.get_hash(b"%PDF-epoa-2")})
+
+        documents = [[url, "document.pdf", "epoa"] for url in self.PDF_CONTENTS]
+        with (
+            patch.object(ScrapePdfs, "read_pdf_into_memory", self.read_pdf_into_memory),
+            patch("api.management.commands.scrape_pdfs.convert_pdf_to_text_blocks", self.convert_pdf_to_text_blocks),
+        ):
+            results = list(command.scrape_documents(documents, known_hashes))
+
+        # Already scraped content and the second copy of the same content are skipped
+        self.assertEqual(len(results), 1)
+        doc, content_hash, texts = results[0]
+        self.assertIn(doc[0], ["https://example.com/epoa-1.pdf", "https://example.com/epoa-1-copy.pdf"])
+        self.assertEqual(content_hash, self.get_hash(b"%PDF-epoa-1"))
+        self.assertEqual(texts, EPOA_TEXTS)
+        self.assertEqual(command.skipped_count, 2)
+        self.assertEqual(dict(command.worker_stats), {"test": {"documents": 1, "pages": 2, "seconds": 0.5}})
+
+    def test_save_records(self):
+        command = self.get_command(batch_size=2)
+        records = [
+            EmergencyOperationsDataset(raw_file_url=f"https://example.com/epoa-{i}.pdf", raw_file_hash=f"hash-{i}")
+            for i in range(5)
+        ]
+        # Not null violation: fails the batch (and only this record when saved one by one)
+        records[2].is_validated = None
+
+        with CaptureQueriesContext(connection) as queries:
+            errors = command.save_records("EPoA", records)
+
+        # Batches of 2 records, the failing batch is saved one by one: [0, 1], [2, 3] (failed), 2 (failed), 3, [4]
+        inserts = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 5)
+        self.assertEqual(errors, ["Save to DB failed for: https://example.com/epoa-2.pdf"])
+        self.assertEqual(
+            sorted(EmergencyOperationsDataset.objects.values_list("raw_file_hash", flat=True)),
+            ["hash-0", "hash-1", "hash-3", "hash-4"],
+        )
+
+    def test_scrape_pdfs(self):
+        with (
+            patch.object(ScrapePdfs, "get_documents", self.get_documents),
+            patch.object(ScrapePdfs, "read_pdf_into_memory", self.read_pdf_into_memory),
+            patch("api.management.commands.scrape_pdfs.convert_pdf_to_text_blocks", self.convert_pdf_to_text_blocks),
+        ):
+            call_command("scrape_pdfs", stdout=StringIO())
+            self.assertEqual(
+                sorted(EmergencyOperationsDataset.objects.values_list("raw_file_hash", flat=True)),
+                sorted([self.get_hash(b"%PDF-epoa-1"), self.get_hash(b"%PDF-epoa-2")]),
+            )
+            epoa = EmergencyOperationsDataset.objects.get(raw_file_hash=self.get_hash(b"%PDF-epoa-2"))
+            self.assertEqual(epoa.raw_file_url, "https://example.com/epoa-2.pdf")
+            self.assertEqual(epoa.raw_dref_allocated, "CHF 350,000")
+            self.assertEqual(epoa.raw_health_female, "12,000")
+
+            # Nothing changed: every document is skipped, no duplicated records
+            stdout = StringIO()
+            call_command("scrape_pdfs", stdout=stdout)
+            self.assertEqual(EmergencyOperationsDataset.objects.count(), 2)
+            self.assertIn("Skipped unchanged documents: 3", stdout.getvalue())
+
+
+class FakeMolnixApi:
+    def get_tag_groups(self, id):
+        return [{"id": 1, "name": "Sectors", "created_at": "2023-01-01T00:00:00Z", "updated_at": "2023-01-01T00:00:00Z"}]
+
+    def get_position(self, id):
+        return None
+
+    def get_deployment(self, id):
+        return None
+
+
+class SyncMolnixTest(TestCase):
+    MOLNIX_COUNTRIES = {1: "NP"}
+
+    def setUp(self):
+        self.country = CountryFactory(iso="NP", independent=True, society_name="Nepal Red Cross Society")
+        self.event = EventFactory(countries=[self.country])
+
+    def get_molnix_data(self, count, position_name="Position", title="WASH Coordinator"):
+        tags = [
+            {"id": 10, "name": f"OP-{self.event.id}", "description": "", "type": "regular"},
+            {"id": 11, "name": "WASH", "description": None, "type": "regular"},
+        ]
+        positions = [
+            {
+                "id": 100 + i,
+                "tags": tags,
+                "country_id": 1,
+                "name": f"{position_name} {i}",
+                "status": "active",
+                "opens": "2024-01-01T00:00:00Z",
+                "closes": "2024-02-01T00:00:00Z",
+                "start": "2024-02-15T00:00:00Z",
+                "end": "2024-05-15T00:00:00Z",
+            }
+            for i in range(count)
+        ]
+        deployments = [
+            {
+                "id": 200 + i,
+                "position_id": 100 + i,
+                "tags": tags,
+                "appraisals": [],
+                "person": {"fullname": f"Person {i}", "sex": "Female"},
+                "contact": {"addresses": [{"city": "Kathmandu"}]},
+                "hidden": 0,
+                "draft": 0,
+                "start": "2024-02-15T00:00:00Z",
+                "end": "2024-05-15T00:00:00Z",
+                "title": title,
+                "country_id": 1,
+                "incoming": {"name": "Nepal Red Cross Society"},
+            }
+            for i in range(count)
+        ]
+        return positions, deployments
+
+    def sync(self, count, **kwargs):
+        api = FakeMolnixApi()
+        positions, deployments = self.get_molnix_data(count, **kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            tags_by_molnix_id = add_tags(get_unique_tags(deployments, positions), api)
+            lookups = MolnixLookups(self.MOLNIX_COUNTRIES, tags_by_molnix_id, [*positions, *deployments])
+            sync_open_positions(positions, api, lookups)
+            sync_deployments(deployments, api, lookups)
+        return len(queries)
+
+    def test_sync_molnix(self):
+        self.sync(5)
+        self.assertEqual(MolnixTag.objects.count(), 2)
+        self.assertEqual(MolnixTag.objects.get(molnix_id=11).tag_category, "molnix_sector")
+        self.assertEqual(SurgeAlert.objects.filter(event=self.event, country=self.country).count(), 5)
+        personnel = Personnel.objects.get(molnix_id=200)
+        self.assertEqual(personnel.surge_alert.molnix_id, 100)
+        self.assertEqual(personnel.country_from, self.country)
+        self.assertEqual(personnel.deployment.event_deployed_to, self.event)
+        self.assertEqual(set(personnel.molnix_tags.values_list("molnix_id", flat=True)), {10, 11})
+
+        # Personnel/Positions no longer in Molnix
+        self.sync(2)
+        self.assertEqual(Personnel.objects.filter(is_active=True).count(), 2)
+        self.assertEqual(Personnel.objects.filter(molnix_status="deleted").count(), 3)
+
+    def test_sync_molnix_updates_translated_fields(self):
+        self.sync(2)
+        self.assertEqual(SurgeAlert.objects.get(molnix_id=100).message_en, "Position 0")
+        self.assertEqual(Personnel.objects.get(molnix_id=200).role_en, "WASH Coordinator")
+
+        # Position renamed and deployment title changed in Molnix
+        self.sync(2, position_name="Shelter Officer", title="Shelter Coordinator")
+        alert = SurgeAlert.objects.get(molnix_id=100)
+        self.assertEqual(alert.message, "Shelter Officer 0")
+        self.assertEqual(alert.message_en, "Shelter Officer 0")
+        personnel = Personnel.objects.get(molnix_id=200)
+        self.assertEqual(personnel.role, "Shelter Coordinator")
+        self.assertEqual(personnel.role_en, "Shelter Coordinator")
+
+    def test_sync_molnix_queries(self):
+        # Once the records exist, the number of queries doesn't depend on the number of deployments
+        self.sync(2)
+        queries_count = self.sync(2)
+        self.sync(20)
+        self.assertEqual(self.sync(20), queries_count)
@@ -3,12 +3,15 @@ import re
 import uuid
 from unittest.mock import patch
 
+import haystack
 from django.contrib.auth.models import User
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import override_settings
 from django.urls import reverse
+from haystack.models import SearchResult
 
 import api.models as models
+from api.access_scope import get_user_access_scope
 from api.factories.event import (
     AppealFactory,
     AppealType,
@@ -387,6 +390,37 @@ class EventApiTest(APITestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(len(resp.json()["links"]), 5)
 
+    def test_event_cursor_pagination(self):
+        events = EventFactory.create_batch(5, parent_event=None)
+        expected_ids = [event.id for event in sorted(events, key=lambda event: (event.created_at, event.id), reverse=True)]
+
+        # Offset pagination is still the default
+        resp = self.client.get("/api/v2/event/", {"limit": 2, "offset": 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["count"], 5)
+
+        resp = self.client.get("/api/v2/event/", {"cursor": "", "limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        first_page = resp.json()
+        self.assertEqual(first_page["count"], 5)
+        self.assertIsNone(first_page["previous"])
+        self.assertEqual([event["id"] for event in first_page["results"]], expected_ids[:2])
+
+        second_page = self.client.get(first_page["next"]).json()
+        self.assertEqual([event["id"] for event in second_page["results"]], expected_ids[2:4])
+        last_page = self.client.get(second_page["next"] + "&count=false").json()
+        self.assertIsNone(last_page["count"])
+        self.assertIsNone(last_page["next"])
+        self.assertEqual([event["id"] for event in last_page["results"]], expected_ids[4:])
+
+        previous_page = self.client.get(last_page["previous"]).json()
+        self.assertEqual([event["id"] for event in previous_page["results"]], expected_ids[2:4])
+        previous_page = self.client.get(previous_page["previous"]).json()
+        self.assertEqual([event["id"] for event in previous_page["results"]], expected_ids[:2])
+        self.assertIsNone(previous_page["previous"])
+
+        self.assertEqual(self.client.get("/api/v2/event/", {"cursor": "invalid"}).status_code, 404)
+
 
 class SituationReportTypeTest(APITestCase):
 
@@ -571,6 +605,115 @@ class VisibilityTest(APITestCase):
         self.client.force_authenticate(user=None)
 
 
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    API_RESPONSE_CACHE_SECONDS=60,
+)
+class VisibilityTierResponseCacheTest(APITestCase):
+    def test_event_list_response_cache(self):
+        EventFactory.create(parent_event=None, visibility=VisibilityChoices.MEMBERSHIP)
+        url = "/api/v2/event/"
+
+        response = self.client.get(url)
+        self.assertNotIn("X-Response-Cache", response)
+        self.assertEqual(response.json()["count"], 0)
+        # Same visibility tier: served from the cache
+        response = self.client.get(url)
+        self.assertEqual(response["X-Response-Cache"], "HIT")
+        self.assertEqual(response.json()["count"], 0)
+
+        # Other visibility tier: not served from the anonymous responses
+        self.authenticate()
+        response = self.client.get(url)
+        self.assertNotIn("X-Response-Cache", response)
+        self.assertEqual(response.json()["count"], 1)
+        self.assertEqual(self.client.get(url)["X-Response-Cache"], "HIT")
+
+        # Invalidated by the changes of the resource
+        self.client.credentials()
+        with self.captureOnCommitCallbacks(execute=True):
+            EventFactory.create(parent_event=None, visibility=VisibilityChoices.PUBLIC)
+        response = self.client.get(url)
+        self.assertNotIn("X-Response-Cache", response)
+        self.assertEqual(response.json()["count"], 1)
+
+
+class HayStackSearchTest(APITestCase):
+    # Sort used by each model before the queries were batched
+    EXPECTED_SORT_BY = {
+        "deployments.project": ["-_score", "-start_date"],
+        "notifications.surgealert": ["-_score", "-start_date"],
+        "api.fieldreport": ["-_score", "-created_at"],
+        "api.event": ["-_score"],
+        "deployments.eru": ["-_score"],
+        "deployments.personnel": ["-_score"],
+        "api.country": ["-_score"],
+        "api.district": ["-_score"],
+        "flash_update.flashupdate": ["-_score"],
+    }
+
+    def _mocked_search(self, sort_by_collector):
+        def _search(backend, query_string, **kwargs):
+            (model,) = kwargs["models"]
+            label = model._meta.label_lower
+            sort_by_collector[label] = kwargs.get("sort_by")
+            app_label, model_name = label.split(".")
+            if label not in ["deployments.project", "notifications.surgealert"]:
+                return {"results": [], "hits": 0}
+            # Elasticsearch returns the hits already sorted
+            results = [
+                SearchResult(app_label, model_name, pk, score, id=f"{label}.{pk}", name=f"{model_name}-{pk}")
+                for pk, score in [(3, 2.5), (1, 1.5), (2, 1.5)]
+            ]
+            return {"results": results, "hits": len(results)}
+
+        return _search
+
+    def test_search_batch(self):
+        backend_class = type(haystack.connections["default"].get_backend())
+        responses = []
+        for max_workers in [1, 4]:
+            sort_by = {}
+            with (
+                override_settings(HAYSTACK_SEARCH_MAX_WORKERS=max_workers),
+                patch.object(backend_class, "search", new=self._mocked_search(sort_by)),
+            ):
+                response = self.client.get("/api/v1/search/", {"keyword": "nepal"})
+            self.assert_200(response)
+            self.assertEqual(sort_by, {**self.EXPECTED_SORT_BY, "api.region": None})
+            responses.append(response.json())
+
+        serial_response, batched_response = responses
+        self.assertEqual(serial_response, batched_response)
+        for key in ["projects", "surge_alerts"]:
+            self.assertEqual([item["id"] for item in batched_response[key]], [3, 1, 2])
+            self.assertEqual([item["score"] for item in batched_response[key]], [2.5, 1.5, 1.5])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class UserAccessScopeTest(APITestCase):
+    def test_user_access_scope_cache(self):
+        region = models.Region.objects.create(name=1)
+        country = models.Country.objects.create(name="country", region=region)
+        user = UserFactory.create()
+
+        scope = get_user_access_scope(user)
+        self.assertEqual((scope.is_ifrc, scope.country_ids, scope.region_ids), (False, (), ()))
+        # Cached across the requests (new user instance)
+        request_user = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_access_scope(request_user), scope)
+
+        # Invalidated by the UserCountry and permission changes
+        with self.captureOnCommitCallbacks(execute=True):
+            models.UserCountry.objects.create(user=user, country=country)
+        scope = get_user_access_scope(User.objects.get(pk=user.pk))
+        self.assertEqual((scope.is_ifrc, scope.country_ids, scope.region_ids), (False, (country.pk,), (region.pk,)))
+        with self.captureOnCommitCallbacks(execute=True):
+            user.user_permissions.add(self.ifrc_permission)
+        self.assertTrue(get_user_access_scope(User.objects.get(pk=user.pk)).is_ifrc)
+
+
 # class FieldReportsVisibilityTestCase(APITestCase):
 #     fixtures = ['DisasterTypes',]
 #     def setUp(self):
@@ -951,6 +1094,102 @@ class AppealTest(APITestCase):
             self.assertEqual(response.data["active_drefs"], 1)
             self.assertEqual(response.data["active_appeals"], 3)
 
+    def test_appeal_header_figures_rollup(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        region = models.Region.objects.create(name=1)
+        country = models.Country.objects.create(name="Nepal", iso3="NPL", region=region)
+        url = "/api/v2/appeal/aggregated"
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AppealFactory.create(
+                code="DREF-1",
+                atype=AppealType.DREF,
+                amount_requested=100,
+                start_date=now - datetime.timedelta(days=2),
+                end_date=now + datetime.timedelta(days=10),
+                country=country,
+            )
+        self.assertTrue(
+            models.AppealKeyFigureRollup.objects.filter(
+                scope=models.AppealKeyFigureRollup.Scope.COUNTRY,
+                scope_id=country.id,
+                day=now.date(),
+            ).exists()
+        )
+        for params in [{}, {"country": country.id}, {"region": region.id}, {"iso3": "npl"}]:
+            response = self.client.get(url, params)
+            self.assert_200(response)
+            self.assertEqual(response.data["active_drefs"], 1, params)
+            self.assertEqual(response.data["active_appeals"], 0, params)
+            self.assertEqual(response.data["amount_requested_dref_included"], 100, params)
+
+        # Rollup is refreshed when an appeal is added
+        with self.captureOnCommitCallbacks(execute=True):
+            AppealFactory.create(
+                code="APPEAL-1",
+                atype=AppealType.APPEAL,
+                amount_requested=1000,
+                start_date=now - datetime.timedelta(days=2),
+                end_date=now + datetime.timedelta(days=10),
+                country=country,
+            )
+        response = self.client.get(url, {"country": country.id})
+        self.assertEqual(response.data["active_drefs"], 1)
+        self.assertEqual(response.data["active_appeals"], 1)
+        self.assertEqual(response.data["amount_requested"], 1000)
+        self.assertEqual(response.data["amount_requested_dref_included"], 1100)
+
+        # Past days are answered from their own snapshot
+        response = self.client.get(url, {"country": country.id, "date": (now - datetime.timedelta(days=5)).date().isoformat()})
+        self.assertEqual(response.data["active_drefs"], 0)
+        self.assertEqual(response.data["active_appeals"], 0)
+
+    def test_appeal_key_figure_rollup_storage(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        country = models.Country.objects.create(name="Nepal", iso3="NPL")
+        Rollup = models.AppealKeyFigureRollup
+        AppealFactory.create(
+            code="DREF-1",
+            atype=AppealType.DREF,
+            start_date=now - datetime.timedelta(days=2),
+            end_date=now + datetime.timedelta(days=10),
+            country=country,
+        )
+        past_day = (now - datetime.timedelta(days=5)).date()
+
+        # Unknown scopes and past days are computed without saving
+        for url, params in [
+            ("/api/v2/appeal/aggregated", {"country": country.id + 1000}),
+            ("/api/v2/appeal/aggregated", {"country": country.id, "date": past_day.isoformat()}),
+            ("/api/v1/aggregate_area/", {"type": "region", "id": 1000}),
+        ]:
+            self.assert_200(self.client.get(url, params))
+        self.assertFalse(Rollup.objects.filter(scope_id=country.id + 1000).exists())
+        self.assertFalse(Rollup.objects.filter(day=past_day).exists())
+        self.assertFalse(Rollup.objects.filter(scope=Rollup.Scope.REGION).exists())
+
+        # Current day of the existing scopes is stored and recomputed once stale
+        response = self.client.get("/api/v2/appeal/aggregated", {"country": country.id})
+        self.assertEqual(response.data["active_drefs"], 1)
+        rollup = Rollup.objects.get(scope=Rollup.Scope.COUNTRY, scope_id=country.id, day=now.date())
+        # NOTE: Not refreshed by the receivers (eg: appeals ending during the day)
+        Rollup.objects.filter(pk=rollup.pk).update(header_figures={}, computed_at=now - datetime.timedelta(hours=1))
+        response = self.client.get("/api/v2/appeal/aggregated", {"country": country.id})
+        self.assertEqual(response.data["active_drefs"], 1)
+        rollup.refresh_from_db()
+        self.assertGreater(rollup.computed_at, now - datetime.timedelta(minutes=1))
+
+        # Past day rollup stored during the day is recomputed
+        Rollup.objects.create(
+            scope=Rollup.Scope.COUNTRY,
+            scope_id=country.id,
+            day=past_day,
+            header_figures={"active_drefs": 100},
+            computed_at=now - datetime.timedelta(days=5),
+        )
+        response = self.client.get("/api/v2/appeal/aggregated", {"country": country.id, "date": past_day.isoformat()})
+        self.assertEqual(response.data["active_drefs"], 0)
+
 
 class RegionSnippetVisibilityTest(APITestCase):
     def setUp(self):
@@ -10,8 +10,7 @@ from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
 from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.db.models import Case, Count, F, Q, Sum, When
-from django.db.models.fields import IntegerField
+from django.db.models import Count, Q, Sum
 from django.db.models.functions import TruncMonth, TruncYear
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect
@@ -19,6 +18,7 @@ from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.crypto import get_random_string
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views import View
 from django.views.generic.edit import FormView
@@ -63,19 +63,21 @@ from main.permissions import DenyGuestUserPermission
 from notifications.models import Subscription, SurgeAlert
 from notifications.notification import send_notification
 from registrations.models import Pending, Recovery
+from utils.elasticsearch import get_es_index_metrics
 
 from .esconnection import ES_CLIENT
+from .export_cache import get_export_cache_metrics
 from .indexes import ES_PAGE_NAME
-from .logger import logger
-from .models import (
-    Appeal,
-    AppealHistory,
-    AppealType,
-    CronJob,
-    Event,
-    FieldReport,
-    Snippet,
+from .key_figures import (
+    aggregate_figures,
+    get_appeal_history_qs,
+    get_header_figure_aggregates,
+    get_key_figure_rollup,
 )
+from .logger import logger
+from .models import Appeal, AppealKeyFigureRollup, CronJob, Event, FieldReport, Snippet
+from .response_cache import get_response_cache_metrics
+from .search import SearchQueryBatch
 from .utils import is_user_ifrc
 
 
@@ -156,251 +158,140 @@ class EsPageSearch(APIView):
 
 @extend_schema_view(get=extend_schema(parameters=[SearchInputSerializer], responses=SearchSerializer))
 class HayStackSearch(APIView):
+    RESULT_LIMIT = 50
+
+    def get_visibility_filter(self):
+        """
+        Visibility filter applied to the visibility aware models (None: no filter is required)
+        """
+        if self.request.user.is_authenticated:
+            if is_user_ifrc(self.request.user):
+                return None
+            return ~SQ(visibility="IFRC Only")
+        return SQ(visibility="Public")
+
+    def get_search_batch(self, phrase):
+        batch = SearchQueryBatch()
+        limit = self.RESULT_LIMIT
+        visibility_filter = self.get_visibility_filter()
+        is_authenticated = self.request.user.is_authenticated
+
+        def _with_visibility(query):
+            if visibility_filter is None:
+                return query
+            return query & visibility_filter
+
+        batch.add(
+            "projects",
+            SearchQuerySet()
+            .models(Project)
+            .filter(_with_visibility(SQ(event_name__content=phrase) | SQ(name__content=phrase) | SQ(iso3__contains=phrase)))
+            .order_by("-_score", "-start_date"),
+            limit,
+        )
+        if is_authenticated:
+            emergency_query = SQ(name__content=phrase) | SQ(countries__content=phrase)
+            if visibility_filter is None:
+                emergency_query |= SQ(iso3__content=phrase)
+            else:
+                emergency_query |= SQ(country__iso3__content=phrase)
+        else:
+            emergency_query = SQ(name__content=phrase) | SQ(iso3__content=phrase)
+        batch.add(
+            "emergencies",
+            SearchQuerySet().models(Event).filter(_with_visibility(emergency_query)).order_by("-_score"),
+            limit,
+        )
+        # NOTE: Field reports are merged with flash updates and sorted by score, so only the top scored ones are required
+        batch.add(
+            "field_reports",
+            SearchQuerySet()
+            .models(FieldReport)
+            .filter(_with_visibility(SQ(name__content=phrase) | SQ(iso3__content=phrase)))
+            .order_by("-_score", "-created_at"),
+            limit,
+        )
+        # NOTE: Visibility is only applied to iso3 here (operator precedence) to keep the existing behaviour
+        surge_deployments_query = SQ(event_name__content=phrase) | SQ(country__contains=phrase)
+        if visibility_filter is None:
+            surge_deployments_query |= SQ(iso3__contains=phrase)
+        else:
+            surge_deployments_query |= SQ(iso3__contains=phrase) & visibility_filter
+        batch.add(
+            "surge_deployments",
+            SearchQuerySet().models(ERU).filter(surge_deployments_query).order_by("-_score"),
+            limit,
+        )
+        batch.add(
+            "rapid_response_deployments",
+            SearchQuerySet()
+            .models(Personnel)
+            .filter(
+                _with_visibility(
+                    SQ(deploying_country_name__contains=phrase)
+                    | SQ(deployed_to_country_name__contains=phrase)
+                    | SQ(event_name__content=phrase)
+                )
+                & SQ(end_date__gt=datetime.now())
+            )
+            .order_by("-_score"),
+            limit,
+        )
+        batch.add(
+            "surge_alerts",
+            SearchQuerySet()
+            .models(SurgeAlert)
+            .filter(
+                _with_visibility(SQ(event_name__content=phrase) | SQ(country_name__contains=phrase) | SQ(iso3__contains=phrase))
+                & ~SQ(status="archived")
+            )
+            .order_by("-_score", "-start_date"),
+            limit,
+        )
+        batch.add(
+            "regions",
+            SearchQuerySet().models(Region).filter(SQ(name__startswith=phrase)),
+            limit,
+        )
+        batch.add(
+            "countries",
+            SearchQuerySet()
+            .models(Country)
+            .filter(SQ(name__contains=phrase, independent="true", is_deprecated="false") | SQ(iso3__contains=phrase))
+            .order_by("-_score"),
+            limit,
+        )
+        batch.add(
+            "district_province_response",
+            SearchQuerySet().models(District).filter(SQ(name__contains=phrase) | SQ(iso3__contains=phrase)).order_by("-_score"),
+            limit,
+        )
+        batch.add(
+            "flash_updates",
+            SearchQuerySet()
+            .models(FlashUpdate)
+            .filter(SQ(name__contains=phrase) | SQ(iso3__contains=phrase))
+            .order_by("-_score"),
+            limit,
+        )
+        return batch
 
     def get(self, request):
         phrase = request.GET.get("keyword", None)
         if phrase is None:
             return bad_request("Must include a `keyword`")
 
+        search_results = {}
         if phrase:
             phrase = phrase.lower()
-            if self.request.user.is_authenticated:
-                if is_user_ifrc(self.request.user):
-                    project_response = (
-                        SearchQuerySet()
-                        .models(Project)
-                        .filter(SQ(event_name__content=phrase) | SQ(name__content=phrase) | SQ(iso3__contains=phrase))
-                        .order_by("-_score")
-                    )
-                    emergency_response = (
-                        SearchQuerySet()
-                        .models(Event)
-                        .filter(SQ(name__content=phrase) | SQ(iso3__content=phrase) | SQ(countries__content=phrase))
-                        .order_by("-_score")
-                    )
-                    fieldreport_response = (
-                        SearchQuerySet()
-                        .models(FieldReport)
-                        .filter(SQ(name__content=phrase) | SQ(iso3__content=phrase))
-                        .order_by("-_score")
-                    )
-                    surge_deployments = (
-                        SearchQuerySet()
-                        .models(ERU)
-                        .filter(SQ(event_name__content=phrase) | SQ(country__contains=phrase) | SQ(iso3__contains=phrase))
-                        .order_by("-_score")
-                    )
-                    rapid_response_deployments = (
-                        SearchQuerySet()
-                        .models(Personnel)
-                        .filter(
-                            (
-                                SQ(deploying_country_name__contains=phrase)
-                                | SQ(deployed_to_country_name__contains=phrase)
-                                | SQ(event_name__content=phrase)
-                            )
-                            & SQ(end_date__gt=datetime.now())
-                        )
-                        .order_by("-_score")
-                    )
-                    surge_alert_response = (
-                        SearchQuerySet()
-                        .models(SurgeAlert)
-                        .filter(
-                            (SQ(event_name__content=phrase) | SQ(country_name__contains=phrase) | SQ(iso3__contains=phrase))
-                            & ~SQ(status="archived")
-                        )
-                        .order_by("-_score")
-                    )
-                else:
-                    project_response = (
-                        SearchQuerySet()
-                        .models(Project)
-                        .filter(
-                            (SQ(event_name__content=phrase) | SQ(name__content=phrase) | SQ(iso3__contains=phrase))
-                            & ~SQ(visibility="IFRC Only")
-                        )
-                        .order_by("-_score")
-                    )
-                    emergency_response = (
-                        SearchQuerySet()
-                        .models(Event)
-                        .filter(
-                            (SQ(name__content=phrase) | SQ(country__iso3__content=phrase) | SQ(countries__content=phrase))
-                            & ~SQ(visibility="IFRC Only")
-                        )
-                        .order_by("-_score")
-                    )
-                    fieldreport_response = (
-                        SearchQuerySet()
-                        .models(FieldReport)
-                        .filter((SQ(name__content=phrase) | SQ(iso3__content=phrase)) & ~SQ(visibility="IFRC Only"))
-                        .order_by("-_score")
-                    )
-                    surge_deployments = (
-                        SearchQuerySet()
-                        .models(ERU)
-                        .filter(
-                            SQ(event_name__content=phrase)
-                            | SQ(country__contains=phrase)
-                            | SQ(iso3__contains=phrase) & ~SQ(visibility="IFRC Only")
-                        )
-                        .order_by("-_score")
-                    )
-                    rapid_response_deployments = (
-                        SearchQuerySet()
-                        .models(Personnel)
-                        .filter(
-                            (
-                                SQ(deploying_country_name__contains=phrase)
-                                | SQ(deployed_to_country_name__contains=phrase)
-                                | SQ(event_name__content=phrase)
-                            )
-                            & ~SQ(visibility="IFRC Only")
-                            & SQ(end_date__gt=datetime.now())
-                        )
-                        .order_by("-_score")
-                    )
-                    surge_alert_response = (
-                        SearchQuerySet()
-                        .models(SurgeAlert)
-                        .filter(
-                            (SQ(event_name__content=phrase) | SQ(country_name__contains=phrase) | SQ(iso3__contains=phrase))
-                            & ~SQ(visibility="IFRC Only")
-                            & ~SQ(status="archived")
-                        )
-                        .order_by("-_score")
-                    )
+            # All the queries are sent to Elasticsearch together
+            search_results = self.get_search_batch(phrase).execute()
 
-            else:
-                project_response = (
-                    SearchQuerySet()
-                    .models(Project)
-                    .filter(
-                        (SQ(event_name__content=phrase) | SQ(name__content=phrase) | SQ(iso3__contains=phrase))
-                        & SQ(visibility="Public")
-                    )
-                    .order_by("-_score")
-                )
-                emergency_response = (
-                    SearchQuerySet()
-                    .models(Event)
-                    .filter((SQ(name__content=phrase) | SQ(iso3__content=phrase)) & SQ(visibility="Public"))
-                    .order_by("-_score")
-                )
-                fieldreport_response = (
-                    SearchQuerySet()
-                    .models(FieldReport)
-                    .filter((SQ(name__content=phrase) | SQ(iso3__content=phrase)) & SQ(visibility="Public"))
-                    .order_by("-_score")
-                )
-                surge_deployments = (
-                    SearchQuerySet()
-                    .models(ERU)
-                    .filter(
-                        SQ(event_name__content=phrase)
-                        | SQ(country__contains=phrase)
-                        | SQ(iso3__contains=phrase) & SQ(visibility="Public")
-                    )
-                    .order_by("-_score")
-                )
-                rapid_response_deployments = (
-                    SearchQuerySet()
-                    .models(Personnel)
-                    .filter(
-                        (
-                            SQ(deploying_country_name__contains=phrase)
-                            | SQ(deployed_to_country_name__contains=phrase)
-                            | SQ(event_name__content=phrase)
-                        )
-                        & SQ(visibility="Public")
-                        & SQ(end_date__gt=datetime.now())
-                    )
-                    .order_by("-_score")
-                )
-                surge_alert_response = (
-                    SearchQuerySet()
-                    .models(SurgeAlert)
-                    .filter(
-                        (SQ(event_name__content=phrase) | SQ(country_name__contains=phrase) | SQ(iso3__contains=phrase))
-                        & SQ(visibility="Public")
-                        & ~SQ(status="archived")
-                    )
-                    .order_by("-_score")
-                )
+        def _get(key):
+            return search_results.get(key, [])
 
-            region_response = SearchQuerySet().models(Region).filter(SQ(name__startswith=phrase))
-            country_response = (
-                SearchQuerySet()
-                .models(Country)
-                .filter(SQ(name__contains=phrase, independent="true", is_deprecated="false") | SQ(iso3__contains=phrase))
-                .order_by("-_score")
-            )
-            # appeal_response = SearchQuerySet().models(Appeal).filter(
-            #     SQ(name__content=phrase) | SQ(code__content=phrase) | SQ(iso3__content=phrase)
-            # ).order_by('-_score')
-
-            district_province_response = (
-                SearchQuerySet()
-                .models(District)
-                .filter(SQ(name__contains=phrase) | SQ(iso3__contains=phrase))
-                .order_by("-_score")
-            )
-            flash_update_response = (
-                SearchQuerySet()
-                .models(FlashUpdate)
-                .filter(SQ(name__contains=phrase) | SQ(iso3__contains=phrase))
-                .order_by("-_score")
-            )
-            # dref_response = SearchQuerySet().models(Dref).filter(
-            #     SQ(name__contains=phrase) | SQ(code__contains=phrase) | SQ(iso3__contains=phrase)
-            # ).order_by('-_score')
-            # dref_operational_update_response = SearchQuerySet().models(DrefOperationalUpdate).filter(
-            #     SQ(name__contains=phrase) | SQ(code__contains=phrase) | SQ(iso3__contains=phrase)
-            # ).order_by('-_score')
-
-            # appeals_list = []
-            # dref = [
-            #     {
-            #         "id": int(data.id.split(".")[-1]),
-            #         "name": data.name,
-            #         "created_at": data.created_at,
-            #         "type": "Dref",
-            #         "score": data.score,
-            #         "country_name": data.country_name,
-            #         "country_id": data.country_id,
-            #         "code": data.code
-            #     } for data in dref_response
-            # ]
-            # appeals_list.extend(dref)
-            # dref_op = [
-            #     {
-            #         "id": int(data.id.split(".")[-1]),
-            #         "name": data.name,
-            #         "created_at": data.created_at,
-            #         "type": "Operational Update",
-            #         "score": data.score,
-            #         "country_name": data.country_name,
-            #         "country_id": data.country_id,
-            #         "code": data.code
-            #     } for data in dref_operational_update_response
-            # ]
-            # appeals_list.extend(dref_op)
-            # appeal_data = [
-            #     {
-            #         "id": int(data.id.split(".")[-1]),
-            #         "name": data.name,
-            #         "code": data.code,
-            #         "country": data.country_name,
-            #         "country_id": data.country_id,
-            #         "start_date": data.start_date,
-            #         "score": data.score,
-            #         "type": "Appeal",
-            #     } for data in appeal_response
-            # ]
-            # appeals_list.extend(appeal_data)
-            field_report = []
-            flash_update = [
+        field_report = [
+            *[
                 {
                     "id": int(data.id.split(".")[-1]),
                     "name": data.name,
@@ -408,10 +299,9 @@ class HayStackSearch(APIView):
                     "type": "Flash Update",
                     "score": data.score,
                 }
-                for data in flash_update_response
-            ]
-            field_report.extend(flash_update)
-            field_reports_data = [
+                for data in _get("flash_updates")
+            ],
+            *[
                 {
                     "id": int(data.id.split(".")[-1]),
                     "name": data.name,
@@ -419,13 +309,11 @@ class HayStackSearch(APIView):
                     "type": "Field Report",
                     "score": data.score,
                 }
-                for data in fieldreport_response.order_by("-created_at")
-            ]
-            field_report.extend(field_reports_data)
-        result = {
-            "regions": [
-                {"id": int(data.id.split(".")[-1]), "name": data.name, "score": data.score} for data in region_response[:50]
+                for data in _get("field_reports")
             ],
+        ]
+        result = {
+            "regions": [{"id": int(data.id.split(".")[-1]), "name": data.name, "score": data.score} for data in _get("regions")],
             "district_province_response": [
                 {
                     "id": int(data.id.split(".")[-1]),
@@ -434,7 +322,7 @@ class HayStackSearch(APIView):
                     "country": data.country_name,
                     "country_id": data.country_id,
                 }
-                for data in district_province_response[:50]
+                for data in _get("district_province_response")
             ],
             "countries": [
                 {
@@ -444,7 +332,7 @@ class HayStackSearch(APIView):
                     "iso3": data.iso3,
                     "score": data.score,
                 }
-                for data in country_response[:50]
+                for data in _get("countries")
             ],
             "emergencies": [
                 {
@@ -460,7 +348,7 @@ class HayStackSearch(APIView):
                     "appeals": [{"id": id, "atype": atype} for id, atype in zip(data.appeals_id or [], data.appeals_type or [])],
                     "severity_level": data.severity_level,
                 }
-                for data in emergency_response[:50]
+                for data in _get("emergencies")
             ],
             "surge_alerts": [
                 {
@@ -478,7 +366,7 @@ class HayStackSearch(APIView):
                     "surge_type": data.surge_type,
                     "country_id": data.country_id,
                 }
-                for data in surge_alert_response.order_by("-start_date")[:50]
+                for data in _get("surge_alerts")
             ],
             "projects": [
                 {
@@ -496,7 +384,7 @@ class HayStackSearch(APIView):
                     "event_id": data.event_id,
                     "national_society_id": data.reporting_ns_id,
                 }
-                for data in project_response.order_by("-start_date")[:50]
+                for data in _get("projects")
             ],
             "surge_deployments": [
                 {
@@ -512,10 +400,9 @@ class HayStackSearch(APIView):
                     "deployed_country_id": data.country_id,
                     "deployed_country_name": data.country_name,
                 }
-                for data in surge_deployments[:50]
+                for data in _get("surge_deployments")
             ],
-            "reports": sorted(field_report, key=lambda d: d["score"], reverse=True)[:50],
-            # "emergency_planning": sorted(appeals_list, key=lambda d: d["score"], reverse=True)[:50],
+            "reports": sorted(field_report, key=lambda d: d["score"], reverse=True)[: self.RESULT_LIMIT],
             "rapid_response_deployments": [
                 {
                     "id": int(data.id.split(".")[-1]),
@@ -532,7 +419,7 @@ class HayStackSearch(APIView):
                     "event_id": data.event_id,
                     "score": data.score,
                 }
-                for data in rapid_response_deployments[:50]
+                for data in _get("rapid_response_deployments")
             ],
         }
         return Response(SearchSerializer(result).data)
@@ -553,6 +440,9 @@ class Brief(APIView):
         res["base64_img"] = e + s + r + u
         res["events_in_future"] = f
         res["cronjob_err"] = c
+        res["es_index_buffer"] = get_es_index_metrics()
+        res["pdf_export_cache"] = get_export_cache_metrics()
+        res["api_response_cache"] = get_response_cache_metrics()
         res["maintenance_mode"] = settings.DJANGO_READ_ONLY
         res["git_last_tag"] = settings.LAST_GIT_TAG
         res["git_last_commit"] = settings.SENTRY_CONFIG["release"][0:8]
@@ -621,66 +511,57 @@ class AggregateHeaderFigures(APIView):
     Used mainly for the key-figures header and by FDRS
     """
 
+    @staticmethod
+    def get_rollup_scope(iso3, country, region):
+        """
+        Returns (scope, scope_id) if the figures can be served from AppealKeyFigureRollup
+        """
+        provided_filters = [value for value in [iso3, country, region] if value]
+        if len(provided_filters) > 1:
+            return None
+        if iso3:
+            country_ids = list(Country.objects.filter(iso3__iexact=iso3).values_list("id", flat=True)[:2])
+            if len(country_ids) != 1:
+                return None
+            return AppealKeyFigureRollup.Scope.COUNTRY, country_ids[0]
+        try:
+            if country:
+                return AppealKeyFigureRollup.Scope.COUNTRY, int(country)
+            if region:
+                return AppealKeyFigureRollup.Scope.REGION, int(region)
+        except ValueError:
+            return None
+        return AppealKeyFigureRollup.Scope.GLOBAL, 0
+
     def get(self, request):
         iso3 = request.GET.get("iso3", None)
         country = request.GET.get("country", None)
         region = request.GET.get("region", None)
+        date = request.GET.get("date", None)
 
-        now = timezone.now()
-        date = request.GET.get("date", now)
-        appeal_conditions = (
-            (Q(atype=AppealType.APPEAL) | Q(atype=AppealType.INTL)) & Q(end_date__gte=date) & Q(start_date__lte=date)
-        )
-
-        all_appealhistory = AppealHistory.objects.select_related("appeal").filter(
-            valid_from__lt=date, valid_to__gt=date, appeal__code__isnull=False
-        )
-
+        # NOTE: Point-in-time queries are served from the per-day snapshots
+        day = None
+        if date:
+            try:
+                parsed_date = parse_datetime(date) or parse_date(date)
+            except ValueError:
+                parsed_date = None
+            day = parsed_date.date() if isinstance(parsed_date, datetime) else parsed_date
+        rollup_scope = self.get_rollup_scope(iso3, country, region)
+        if rollup_scope is not None and (not date or day):
+            scope, scope_id = rollup_scope
+            rollup = get_key_figure_rollup(scope, scope_id, day=day)
+            return Response(AggregateHeaderFiguresSerializer(rollup.header_figures).data)
+
+        date = date or timezone.now()
+        all_appealhistory = get_appeal_history_qs(date)
         if iso3:
             all_appealhistory = all_appealhistory.filter(country__iso3__iexact=iso3)
         if country:
             all_appealhistory = all_appealhistory.filter(country__id=country)
         if region:
             all_appealhistory = all_appealhistory.filter(country__region__id=region)
-        appeals_aggregated = all_appealhistory.annotate(
-            # Active Appeals with DREF type
-            actd=Count(
-                Case(
-                    When(Q(atype=AppealType.DREF) & Q(end_date__gte=date) & Q(start_date__lte=date), then=1),
-                    output_field=IntegerField(),
-                )
-            ),
-            # Active Appeals with type Emergency Appeal or International Appeal
-            acta=Count(Case(When(appeal_conditions, then=1), output_field=IntegerField())),
-            # Total Appeals count which are not DREF
-            tota=Count(Case(When(Q(atype=AppealType.APPEAL) | Q(atype=AppealType.INTL), then=1), output_field=IntegerField())),
-            # Active Appeals' target population
-            tarp=Sum(
-                Case(
-                    When(Q(end_date__gte=date) & Q(start_date__lte=date), then=F("num_beneficiaries")),
-                    output_field=IntegerField(),
-                )
-            ),
-            # Active Appeals' requested amount, which are not DREF
-            amor=Case(When(appeal_conditions, then=F("amount_requested")), output_field=IntegerField()),
-            amordref=Case(
-                When(Q(end_date__gte=date) & Q(start_date__lte=date), then=F("amount_requested")), output_field=IntegerField()
-            ),
-            # Active Appeals' funded amount, which are not DREF
-            amof=Case(When(appeal_conditions, then=F("amount_funded")), output_field=IntegerField()),
-            amofdref=Case(
-                When(Q(end_date__gte=date) & Q(start_date__lte=date), then=F("amount_funded")), output_field=IntegerField()
-            ),
-        ).aggregate(
-            active_drefs=Sum("actd"),
-            active_appeals=Sum("acta"),
-            total_appeals=Sum("tota"),
-            target_population=Sum("tarp"),
-            amount_requested=Sum("amor"),
-            amount_requested_dref_included=Sum("amordref"),
-            amount_funded=Sum("amof"),
-            amount_funded_dref_included=Sum("amofdref"),
-        )
+        appeals_aggregated = aggregate_figures(all_appealhistory, get_header_figure_aggregates(date))
 
         return Response(AggregateHeaderFiguresSerializer(appeals_aggregated).data)
 
@@ -696,16 +577,12 @@ class AreaAggregate(APIView):
         elif not region_id:
             return bad_request("`id` must be a region id")
 
-        aggregate = (
-            Appeal.objects.filter(**{region_type: region_id})
-            .annotate(count_id=Count("id"))
-            .aggregate(
-                num_beneficiaries=Sum("num_beneficiaries"),
-                amount_requested=Sum("amount_requested"),
-                amount_funded=Sum("amount_funded"),
-                count=Sum("count_id"),
-            )
-        )
+        try:
+            scope_id = int(region_id)
+        except ValueError:
+            return bad_request("`id` must be a region id")
+        scope = AppealKeyFigureRollup.Scope.COUNTRY if region_type == "country" else AppealKeyFigureRollup.Scope.REGION
+        aggregate = get_key_figure_rollup(scope, scope_id).area_figures
 
         return Response(AreaAggregateSerializer(aggregate).data)
 
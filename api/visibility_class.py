@@ -3,8 +3,8 @@ from rest_framework import viewsets
 
 from deployments.models import Project
 
-from .models import Profile, UserCountry, VisibilityCharChoices, VisibilityChoices
-from .utils import is_user_ifrc  # filter_visibility_by_auth (would be better)
+from .access_scope import get_user_access_scope
+from .models import VisibilityCharChoices, VisibilityChoices
 
 
 # TODO: This class can be used only with tailored "get_for" method in the relevant model !!!
@@ -17,8 +17,9 @@ class ReadOnlyVisibilityViewsetMixin:
         if queryset.model == Project:
             choices = VisibilityCharChoices
 
-        if self.request.user.is_authenticated and not self.request.user.profile.limit_access_to_guest:
-            if is_user_ifrc(self.request.user):
+        access_scope = get_user_access_scope(self.request.user)
+        if not access_scope.is_public_only:
+            if access_scope.is_ifrc:
                 return queryset
             else:
                 return queryset.model.get_for(self.request.user, queryset=queryset).exclude(visibility=choices.IFRC)
@@ -37,18 +38,14 @@ class ReadOnlyVisibilityViewset(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         # FIXME: utils.py:43
         # filter_visibility_by_auth(user=self.request.user, visibility_model_class=self.visibility_model_class)
-        if self.request.user.is_authenticated and not self.request.user.profile.limit_access_to_guest:
-            if is_user_ifrc(self.request.user):
+        access_scope = get_user_access_scope(self.request.user)
+        if not access_scope.is_public_only:
+            if access_scope.is_ifrc:
                 return self.visibility_model_class.objects.all()
             else:
                 if self.visibility_model_class.__name__ == "FieldReport" or self.visibility_model_class.__name__ == "Event":
                     return self.visibility_model_class.objects.exclude(visibility=VisibilityChoices.IFRC).exclude(
-                        Q(visibility=VisibilityChoices.IFRC_NS)
-                        & ~Q(
-                            countries__id__in=UserCountry.objects.filter(user=self.request.user.id)
-                            .values_list("country", flat=True)
-                            .union(Profile.objects.filter(user=self.request.user.id).values_list("country", flat=True))
-                        )
+                        Q(visibility=VisibilityChoices.IFRC_NS) & ~Q(countries__id__in=access_scope.country_ids)
                     )
                 else:
                     return self.visibility_model_class.objects.exclude(visibility=VisibilityChoices.IFRC)
@@ -0,0 +1,154 @@
+import datetime
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+
+from deployments.models import ERU, Personnel, PersonnelDeployment
+
+from .models import Appeal, AppealType, Event, FieldReport
+
+
+class WeeklyDigestBuilder:
+    """
+    Data of the weekly digest email
+    NOTE: Every section uses a constant number of queries (no per-row lookups)
+    """
+
+    def __init__(self, since: datetime.datetime, now: datetime.datetime):
+        self.since = since
+        self.now = now
+
+    def get_key_figures(self):
+        active = Q(end_date__gt=self.now)
+        appeal_or_intl = Q(atype__in=[AppealType.APPEAL, AppealType.INTL])
+        figures = Appeal.objects.aggregate(
+            digest_dref=Count("id", filter=active & Q(atype=AppealType.DREF)),
+            digest_ea=Count("id", filter=active & Q(atype=AppealType.APPEAL)),
+            digest_fund_requested=Sum("amount_requested", filter=active & appeal_or_intl),
+            digest_fund_funded=Sum("amount_funded", filter=active & appeal_or_intl),
+            digest_budget=Sum("amount_requested", filter=active),
+            digest_population=Sum("num_beneficiaries", filter=active),
+        )
+        amount_req = figures["digest_fund_requested"] or 0
+        amount_fund = figures["digest_fund_funded"] or 0
+        return {
+            "active_dref": figures["digest_dref"],
+            "active_ea": figures["digest_ea"],
+            "funding_coverage": float(round(amount_fund / amount_req, 3) * 100) if amount_req != 0 else 0,
+            "budget": round((figures["digest_budget"] or 0) / 1000000, 2),
+            "population": round((figures["digest_population"] or 0) / 1000000, 2),
+        }
+
+    def get_highlights(self):
+        events = list(Event.objects.filter(is_featured=True, updated_at__gte=self.since).order_by("-updated_at"))
+        event_ids = [ev.id for ev in events]
+
+        appeal_figures = {
+            row["event_id"]: row
+            for row in Appeal.objects.filter(event_id__in=event_ids)
+            .values("event_id")
+            .annotate(
+                hl_amount_requested=Sum("amount_requested"),
+                hl_amount_funded=Sum("amount_funded"),
+                hl_people=Sum("num_beneficiaries"),
+            )
+            .order_by()
+        }
+        eru_units = dict(
+            ERU.objects.filter(event_id__in=event_ids)
+            .values("event_id")
+            .annotate(hl_units=Sum("units"))
+            .order_by()
+            .values_list("event_id", "hl_units")
+        )
+        deployment_counts = dict(
+            PersonnelDeployment.objects.filter(event_deployed_to_id__in=event_ids)
+            .values("event_deployed_to_id")
+            .annotate(hl_count=Count("id"))
+            .order_by()
+            .values_list("event_deployed_to_id", "hl_count")
+        )
+
+        ret_highlights = []
+        for ev in events:
+            figures = appeal_figures.get(ev.id, {})
+            amount_requested = figures.get("hl_amount_requested") or "--"
+            amount_funded = figures.get("hl_amount_funded") or "--"
+            coverage = "--"
+
+            if amount_funded != "--" and amount_requested != "--":
+                coverage = round(amount_funded / amount_requested, 1) if amount_requested != 0 else 0
+
+            ret_highlights.append(
+                {
+                    "hl_id": ev.id,
+                    "hl_name": ev.name,
+                    "hl_last_update": ev.updated_at,
+                    "hl_people": figures.get("hl_people") or "--",
+                    "hl_funding": amount_requested,
+                    "hl_deployed_eru": eru_units.get(ev.id) or "--",
+                    "hl_deployed_sp": deployment_counts.get(ev.id, 0),
+                    "hl_coverage": coverage,
+                }
+            )
+        return ret_highlights
+
+    def get_latest_ops(self):
+        ops = Appeal.objects.filter(created_at__gte=self.since).select_related("country").order_by("-created_at")
+        return [
+            {
+                "op_event_id": op.event_id,
+                "op_country": op.country.name if op.country_id else "",
+                "op_name": op.name,
+                "op_created_at": op.created_at,
+                "op_funding": float(op.amount_requested),
+            }
+            for op in ops
+        ]
+
+    def get_latest_deployments(self):
+        personnel_list = (
+            Personnel.objects.filter(start_date__gte=self.since)
+            .select_related("deployment__event_deployed_to", "country_from")
+            .order_by("start_date")
+        )
+        ret_data = []
+        for pers in personnel_list:
+            event = pers.deployment.event_deployed_to
+            country_from = pers.country_from
+            ret_data.append(
+                {
+                    "operation": event.name if event else "",
+                    "event_url": ("{}/emergencies/{}".format(settings.GO_WEB_URL, event.id) if event else settings.GO_WEB_URL),
+                    "society_from": country_from.society_name if country_from else "",
+                    "name": pers.name,
+                    "role": pers.role,
+                    "start_date": pers.start_date,
+                    "end_date": pers.end_date,
+                }
+            )
+        return ret_data
+
+    def get_latest_field_reports(self):
+        fr_list = FieldReport.objects.filter(created_at__gte=self.since).prefetch_related("countries").order_by("-created_at")
+        ret_fr_list = []
+        for fr in fr_list:
+            countries = list(fr.countries.all())
+            ret_fr_list.append(
+                {
+                    "id": fr.id,
+                    "country": countries[0].name if countries else None,
+                    "summary": fr.summary,
+                    "created_at": fr.created_at,
+                }
+            )
+        return ret_fr_list
+
+    def build(self):
+        return {
+            **self.get_key_figures(),
+            "highlighted_ops": self.get_highlights(),
+            "latest_ops": self.get_latest_ops(),
+            "latest_deployments": self.get_latest_deployments(),
+            "latest_field_reports": self.get_latest_field_reports(),
+        }
@@ -1,6 +1,11 @@
 import datetime
 import logging
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import requests
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from sentry_sdk.crons import monitor
@@ -10,6 +15,7 @@ from databank.models import CountryOverview
 from main.sentry import SentryMonitor
 
 from .sources import FDRS, FTS_HPC, INFORM, RELIEFWEB, START_NETWORK, WB
+from .sources.utils import SOURCE_ERRORS, log_source_error
 
 logger = logging.getLogger(__name__)
 
@@ -25,22 +31,168 @@ SOURCES = [
     )
 ]
 
+# Fields written by the sources (See <source>.OVERVIEW_FIELDS and <source>.COUNTRY_FIELDS)
+OVERVIEW_FIELDS = [
+    "script_modified_at",
+    *[field for source, _ in SOURCES for field in getattr(source, "OVERVIEW_FIELDS", [])],
+]
+COUNTRY_FIELDS = [field for source, _ in SOURCES for field in getattr(source, "COUNTRY_FIELDS", [])]
+
+
+def fetch_source_data(source, country, session):
+    """
+    Run <source>.fetch for the country (in a worker thread)
+    Returns (data, error traceback, seconds)
+    """
+    start = time.monotonic()
+    try:
+        return source.fetch(country, session=session), None, time.monotonic() - start
+    except Exception:
+        return None, traceback.format_exc(), time.monotonic() - start
+
 
 class Command(BaseCommand):
-    def load(self):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrent",
+            action="store_true",
+            help=(
+                "Fetch the per country data of the sources concurrently (with a shared session)"
+                " and write the country overviews using bulk_update"
+            ),
+        )
+        parser.add_argument("--workers", type=int, default=8, help="Number of concurrent requests (with --concurrent)")
+
+    def get_session(self, workers):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def load_countries(self, source_prefetch_data):
+        index, country_count = 1, Country.objects.count()
+        print("\nLoading Sources data for each country to GO DB:: ")
+        for country in Country.objects.prefetch_related("countryoverview").all():
+            print("\t -> ({}/{}) {}".format(index, country_count, str(country)))
+            overview = (
+                country.countryoverview
+                if hasattr(country, "countryoverview")
+                else CountryOverview.objects.create(country=country)
+            )
+            overview.script_modified_at = timezone.now()
+            for source, name in SOURCES:
+                if hasattr(source, "load"):
+                    print(f"\t\t -> {name}", end="")
+                    # Load For each country
+                    source_data = source_prefetch_data.get(source.__name__)
+                    start = time.monotonic()
+                    source.load(country, overview, source_data)
+                    self.report[name]["load"] += time.monotonic() - start
+                    print(f" [{datetime.timedelta(seconds=time.monotonic() - start)}]")
+            overview.save()
+            if COUNTRY_FIELDS:
+                country.save(update_fields=COUNTRY_FIELDS)
+            index += 1
+        return country_count
+
+    def load_countries_concurrently(self, source_prefetch_data, workers):
+        """
+        Same as load_countries, but
+        - The per country HTTP requests of the sources (See <source>.fetch) run on a bounded thread pool
+        - The data of the sources are merged in memory and written with a bulk_update per model
+        """
+        countries = list(Country.objects.select_related("countryoverview"))
+        new_overviews = [CountryOverview(country=country) for country in countries if not hasattr(country, "countryoverview")]
+        CountryOverview.objects.bulk_create(new_overviews)
+        for overview in new_overviews:
+            overview.country.countryoverview = overview
+
+        # NOTE: Sources without prefetched data are not loaded
+        fetch_sources = [
+            (source, name)
+            for source, name in SOURCES
+            if hasattr(source, "fetch")
+            and not (hasattr(source, "prefetch") and source_prefetch_data.get(source.__name__) is None)
+        ]
+        print(f"\nFetching per country data using {workers} workers:: {', '.join(name for _, name in fetch_sources)}")
+        fetched_data = {}
+        session = self.get_session(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(fetch_source_data, source, country, session): (name, country)
+                for source, name in fetch_sources
+                for country in countries
+            }
+            for future in as_completed(futures):
+                name, country = futures[future]
+                data, error_traceback, seconds = future.result()
+                self.report[name]["fetch"] += seconds
+                if error_traceback is None:
+                    fetched_data[(name, country.pk)] = data
+                else:
+                    log_source_error(name, "fetch", country, error_traceback=error_traceback)
+
+        print("\nMerging Sources data for each country:: ")
+        now = timezone.now()
+        for country in countries:
+            overview = country.countryoverview
+            overview.script_modified_at = now
+            for source, name in SOURCES:
+                if not hasattr(source, "load"):
+                    continue
+                kwargs = {}
+                if hasattr(source, "fetch"):
+                    if (name, country.pk) not in fetched_data:
+                        continue
+                    kwargs["fetched"] = fetched_data[(name, country.pk)]
+                start = time.monotonic()
+                source.load(country, overview, source_prefetch_data.get(source.__name__), **kwargs)
+                self.report[name]["load"] += time.monotonic() - start
+
+        start = time.monotonic()
+        CountryOverview.objects.bulk_update([country.countryoverview for country in countries], OVERVIEW_FIELDS, batch_size=50)
+        if COUNTRY_FIELDS:
+            Country.objects.bulk_update(countries, COUNTRY_FIELDS, batch_size=500)
+        print(f"\t -> Saved {len(countries)} country overviews [{datetime.timedelta(seconds=time.monotonic() - start)}]")
+        return len(countries)
+
+    def log_report(self, countries_count):
+        """Log the time spent and the errors by source to the cronjob"""
+        lines = []
+        for _, name in SOURCES:
+            timing = self.report[name]
+            lines.append(
+                f"{name}: prefetch {timing['prefetch']:.2f}s, fetch {timing['fetch']:.2f}s (worker time),"
+                f" load {timing['load']:.2f}s, errors: {SOURCE_ERRORS[name]}"
+            )
+        CronJob.sync_cron(
+            {
+                "name": "ingest_databank",
+                "message": "Done loading sources for {} countries\n\n{}".format(countries_count, "\n".join(lines)),
+                "num_result": countries_count,
+                "status": CronJobStatus.WARNED if any(SOURCE_ERRORS[name] for _, name in SOURCES) else CronJobStatus.SUCCESSFUL,
+            }
+        )
+        print("\n" + "\n".join(lines))
+
+    def load(self, concurrent=False, workers=8):
         """
         Load data for Databank from specified sources
         """
         source_prefetch_data = {}
+        self.report = defaultdict(lambda: defaultdict(float))
+        SOURCE_ERRORS.clear()
 
         # Prefetch Data
         try:
             print("\nPrefetching from sources:: ")
             for source, name in SOURCES:
                 if hasattr(source, "prefetch"):
-                    start = datetime.datetime.now()
+                    start = time.monotonic()
                     print(f"\t -> {name}", end="")
                     prefetch_response = source.prefetch()
+                    self.report[name]["prefetch"] += time.monotonic() - start
                     if prefetch_response is not None:
                         source_prefetch_data[source.__name__], item_count, sources = prefetch_response
                         # Log success prefetch
@@ -52,7 +204,7 @@ class Command(BaseCommand):
                                 "status": CronJobStatus.SUCCESSFUL,
                             }
                         )
-                    print(f" [{datetime.datetime.now() - start}]")
+                    print(f" [{datetime.timedelta(seconds=time.monotonic() - start)}]")
         except Exception as ex:
             CronJob.sync_cron(
                 {
@@ -67,40 +219,17 @@ class Command(BaseCommand):
             print("\nLoading Sources data into GO DB:: ")
             for source, name in SOURCES:
                 if hasattr(source, "global_load"):
+                    start = time.monotonic()
                     print(f"\t -> {name}", end="")
                     source.global_load(source_prefetch_data.get(source.__name__))
-                    print(f" [{datetime.datetime.now() - start}]")
-
-            index, country_count = 1, Country.objects.count()
-            print("\nLoading Sources data for each country to GO DB:: ")
-            for country in Country.objects.prefetch_related("countryoverview").all():
-                print("\t -> ({}/{}) {}".format(index, country_count, str(country)))
-                overview = (
-                    country.countryoverview
-                    if hasattr(country, "countryoverview")
-                    else CountryOverview.objects.create(country=country)
-                )
-                overview.script_modified_at = timezone.now()
-                for source, name in SOURCES:
-                    if hasattr(source, "load"):
-                        print(f"\t\t -> {name}", end="")
-                        # Load For each country
-                        source_data = source_prefetch_data.get(source.__name__)
-                        start = datetime.datetime.now()
-                        source.load(country, overview, source_data)
-                        print(f" [{datetime.datetime.now() - start}]")
-                overview.save()
-                index += 1
-            # This source can not be checked/logged via prefetch, that is why we do it here, after the "load".
-            if name == "FTS_HPC":
-                CronJob.sync_cron(
-                    {
-                        "name": name,
-                        "message": f"Done querying {name} data feeds",
-                        "num_result": index,
-                        "status": CronJobStatus.SUCCESSFUL,
-                    }
-                )
+                    self.report[name]["load"] += time.monotonic() - start
+                    print(f" [{datetime.timedelta(seconds=time.monotonic() - start)}]")
+
+            if concurrent:
+                countries_count = self.load_countries_concurrently(source_prefetch_data, workers)
+            else:
+                countries_count = self.load_countries(source_prefetch_data)
+            self.log_report(countries_count)
         except Exception as ex:
             CronJob.sync_cron(
                 {
@@ -113,5 +242,5 @@ class Command(BaseCommand):
     @monitor(monitor_slug=SentryMonitor.INGEST_DATABANK)
     def handle(self, *args, **kwargs):
         start = datetime.datetime.now()
-        self.load()
+        self.load(concurrent=kwargs["concurrent"], workers=kwargs["workers"])
         print("Total time: ", datetime.datetime.now() - start)
@@ -90,6 +90,13 @@ FDRS_INDICATORS = (
     + [indicator for indicator, _ in FDRS_VOLUNTEERS_DISAGGREGATION_INDICATORS_FIELD_MAP]
     + [indicator for indicator, _ in FDRS_STAFF_DISAGGREGATION_INDICATORS_FIELD_MAP]
 )
+OVERVIEW_FIELDS = [
+    *[field.field.name for fields in FDRS_INDICATORS_FIELD_MAP.values() for field in fields],
+    *[field.field.name for _, field in FDRS_VOLUNTEERS_DISAGGREGATION_INDICATORS_FIELD_MAP],
+    CO.fdrs_volunteer_data_year.field.name,
+    *[field.field.name for _, field in FDRS_STAFF_DISAGGREGATION_INDICATORS_FIELD_MAP],
+    CO.fdrs_staff_data_year.field.name,
+]
 
 
 # To fetch NS ID
@@ -213,5 +220,3 @@ def load(country, overview, fdrs_data):
             country_iso=country_iso,
             overview=overview,
         )
-
-    overview.save()
@@ -18,6 +18,7 @@ HEADERS = {
     # TODO: USE Crendentils here
     # 'Authorization': 'Basic {}'.format(base64_encode(settings.HPC_CREDENTIAL))
 }
+OVERVIEW_FIELDS = ["fts_data"]
 
 
 @catch_error()
@@ -50,21 +51,36 @@ def prefetch():
     return gho_data, len(gho_data), GOOGLE_SHEET_URL
 
 
-@catch_error()
-def load(country, overview, gho_data):
-    if country.iso is None or gho_data is None:
+def fetch(country, session=requests):
+    """
+    FTS and emergency data of the country
+    NOTE: Without database access, ingest_databank --concurrent calls it from a thread pool (with a shared session)
+    """
+    if country.iso is None:
         return
     pcountry = get_country_by_iso2(country.iso)
     if pcountry is None:
         return
-    fts_data = requests.get(FTS_URL.format(pcountry.alpha_3), headers=HEADERS)
-    emg_data = requests.get(EMERGENCY_URL.format(pcountry.alpha_3), headers=HEADERS)
+    fts_data = session.get(FTS_URL.format(pcountry.alpha_3), headers=HEADERS)
+    emg_data = session.get(EMERGENCY_URL.format(pcountry.alpha_3), headers=HEADERS)
 
     fts_data.raise_for_status()
     emg_data.raise_for_status()
 
-    fts_data = fts_data.json()
-    emg_data = emg_data.json()
+    return fts_data.json(), emg_data.json()
+
+
+@catch_error()
+def load(country, overview, gho_data, fetched=None):
+    """
+    fetched: Data returned by fetch (fetched here if not provided)
+    """
+    if country.iso is None or gho_data is None:
+        return
+    pcountry = get_country_by_iso2(country.iso)
+    if pcountry is None:
+        return
+    fts_data, emg_data = fetched or fetch(country)
 
     c_data = {}
 
@@ -107,6 +123,5 @@ def load(country, overview, gho_data):
         }
         for year, values in c_data.items()
     ]
-    overview.save()
 
     # Instead of here the CronJob success logging was placed to ingest_databank.py, because here it is in a loop
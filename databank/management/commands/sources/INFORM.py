@@ -9,6 +9,7 @@ INFORM_API_ENDPOINT = (
         ",".join([indicator for indicator, _ in InformIndicator.CHOICES])
     )
 )
+OVERVIEW_FIELDS = ["inform_indicators"]
 
 
 @catch_error()
@@ -50,4 +51,3 @@ def load(country, overview, inform_data):
         return
 
     overview.inform_indicators = inform_data[country.iso.upper()]
-    overview.save()
@@ -13,6 +13,7 @@ logger = logging.getLogger(__name__)
 
 DISASTER_API = f"https://api.reliefweb.int/v1/disasters?appname={settings.RELIEF_WEB_APP_NAME}"
 RELIEFWEB_DATETIME_FORMAT = "%Y-%m-%d"
+OVERVIEW_FIELDS = ["past_crises_events", "past_epidemics"]
 
 
 def parse_date(date):
@@ -210,4 +211,3 @@ def load(country, overview, relief_data):
         }
         for index, data in enumerate(relief_data["epidemics"].get(iso2) or [])
     ]
-    overview.save()
@@ -8,6 +8,7 @@ from .utils import catch_error, get_country_by_name
 
 API_ENDPOINT = "https://startnetwork.org/api/v1/start-fund-all-alerts"
 DATE_FORMATS = ("%d %b %Y - %H:%S", "%m/%d/%Y %H:%M")
+OVERVIEW_FIELDS = ["start_network_data"]
 
 
 def parse_amount(amount_in_string):
@@ -65,4 +66,3 @@ def load(country, overview, data):
         return
 
     overview.start_network_data = data[country.iso.upper()]
-    overview.save()
@@ -9,6 +9,7 @@ from .utils import catch_error, get_country_by_iso3
 
 logger = logging.getLogger(__name__)
 API_ENDPOINT = "https://api.worldbank.org/v2/country/ALL/indicator/SP.POP.TOTL"
+COUNTRY_FIELDS = ["wb_population", "wb_year"]
 
 
 @catch_error()
@@ -65,7 +66,8 @@ def global_load(wd_data):
     if wd_data is None:
         return
 
-    for district in District.objects.all():
+    districts = []
+    for district in District.objects.only("id", "code", "wb_population", "wb_year"):
         if not district.code:
             continue
         pop, year = wd_data.get(district.code.upper()) or (None, None)
@@ -73,7 +75,8 @@ def global_load(wd_data):
             continue
         district.wb_population = pop
         district.wb_year = year
-        district.save(update_fields=["wb_population", "wb_year"])
+        districts.append(district)
+    District.objects.bulk_update(districts, ["wb_population", "wb_year"], batch_size=500)
 
 
 @catch_error()
@@ -86,4 +89,3 @@ def load(country, overview, wd_data):
         return
     country.wb_population = pop
     country.wb_year = year
-    country.save(update_fields=["wb_population", "wb_year"])
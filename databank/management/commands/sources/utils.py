@@ -1,3 +1,4 @@
+import collections
 import logging
 import traceback
 
@@ -8,6 +9,36 @@ from api.models import Country, CronJob, CronJobStatus
 
 logger = logging.getLogger(__name__)
 
+# Number of errors by source (reset and reported by ingest_databank)
+SOURCE_ERRORS = collections.Counter()
+
+
+def log_source_error(source_name, func_name, country=None, error_message=None, error_traceback=None):
+    """
+    Log the error of a source to the cronjob
+    error_traceback: Traceback of an error from another thread (default: the current exception)
+    """
+    SOURCE_ERRORS[source_name] += 1
+    CronJob.sync_cron(
+        {
+            "name": source_name,
+            "message": (
+                f"Error querying {source_name}."
+                + (f" For Country: {country}." if country else "")
+                + "\n\n"
+                + (error_traceback or traceback.format_exc())
+            ),
+            "status": CronJobStatus.ERRONEOUS,
+        }
+    )
+    logger.error(
+        f"Failed to load <{source_name}:{func_name}>"
+        + (f"For Country: {country}" if country else "")
+        + (f" {error_message}" if error_message else "")
+        + (f"\n{error_traceback}" if error_traceback else ""),
+        exc_info=error_traceback is None,
+    )
+
 
 # Custom error catch (for catching errors only)
 # Make sure country is provided in first argument only
@@ -21,24 +52,7 @@ def catch_error(error_message=None):
                     return func(*args, **kwargs)
             except Exception:
                 # Log error to cronjob
-                CronJob.sync_cron(
-                    {
-                        "name": source_name,
-                        "message": (
-                            f"Error querying {source_name}."
-                            + (f" For Country: {country}." if country else "")
-                            + "\n\n"
-                            + traceback.format_exc()
-                        ),
-                        "status": CronJobStatus.ERRONEOUS,
-                    }
-                )
-                logger.error(
-                    f"Failed to load <{source_name}:{func.__name__}>"
-                    + (f"For Country: {country}" if country else "")
-                    + (f" {error_message}" if error_message else ""),
-                    exc_info=True,
-                )
+                log_source_error(source_name, func.__name__, country, error_message)
 
         _caller.__name__ = func.__name__
         _caller.__module__ = func.__module__
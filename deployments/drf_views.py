@@ -27,7 +27,9 @@ from api.utils import bad_request
 from api.view_filters import ListFilter
 from api.visibility_class import ReadOnlyVisibilityViewsetMixin
 from deployments.permissions import ERUReadinessPermission
+from main.pagination import LimitOffsetOrCursorPagination
 from main.permissions import DenyGuestUserPermission
+from main.renderers import StreamingCSVListMixin
 from main.serializers import CsvListMixin
 from main.utils import is_tableau
 
@@ -284,12 +286,14 @@ class PersonnelFilter(filters.FilterSet):
         }
 
 
-class PersonnelViewset(viewsets.ReadOnlyModelViewSet):
+class PersonnelViewset(StreamingCSVListMixin, viewsets.ReadOnlyModelViewSet):
     authentication_classes = (TokenAuthentication,)
     # Some figures are shown on the home page also, and not only authenticated users should see them.
     # permission_classes = (IsAuthenticated,)
     queryset = Personnel.objects.all()
     filterset_class = PersonnelFilter
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ("-pk",)
     ordering_fields = (
         "start_date",
         "end_date",
@@ -609,6 +613,7 @@ class RegionalProjectViewset(viewsets.ReadOnlyModelViewSet):
 class ProjectViewset(
     RevisionMixin,
     CsvListMixin,
+    StreamingCSVListMixin,
     ReadOnlyVisibilityViewsetMixin,
     viewsets.ModelViewSet,
 ):
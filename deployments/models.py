@@ -16,9 +16,7 @@ from api.models import (
     District,
     Event,
     GeneralDocument,
-    Profile,
     Region,
-    UserCountry,
     VisibilityCharChoices,
 )
 
@@ -706,11 +704,11 @@ class Project(models.Model):
     # FIXME: Is this used?
     @staticmethod
     def get_for(user, queryset=None):
-        countries_qs = (
-            UserCountry.objects.filter(user=user).values("country").union(Profile.objects.filter(user=user).values("country"))
-        )
+        from api.access_scope import get_user_access_scope
+
+        country_ids = get_user_access_scope(user).country_ids
         return queryset.exclude(
-            Q(visibility=VisibilityCharChoices.IFRC_NS) & ~Q(project_country__in=countries_qs) & ~Q(reporting_ns__in=countries_qs)
+            Q(visibility=VisibilityCharChoices.IFRC_NS) & ~Q(project_country__in=country_ids) & ~Q(reporting_ns__in=country_ids)
         )
 
 
@@ -326,7 +326,7 @@ class TestProjectAPI(SnapshotTestCase):
         self.authenticate()
         resp = self.client.get(url)
         self.assert_200(resp)
-        self.assertMatchSnapshot(resp.content.decode("utf-8"))
+        self.assertMatchSnapshot(b"".join(resp.streaming_content).decode("utf-8"))
 
     def test_project_csv_api(self):
         _country = country.CountryFactory(name="country-1", society_name="society-name-1")
@@ -365,7 +365,7 @@ class TestProjectAPI(SnapshotTestCase):
         url = "/api/v2/project/?format=csv"
         resp = self.client.get(url)
         self.assert_200(resp)
-        self.assertMatchSnapshot(resp.content.decode("utf-8"))
+        self.assertMatchSnapshot(b"".join(resp.streaming_content).decode("utf-8"))
 
     def test_global_project_api(self):
         country_1 = country.CountryFactory()
@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class DrefConfig(AppConfig):
     name = "dref"
     verbose_name = _("dref")
+
+    def ready(self):
+        import dref.receivers  # noqa: F401
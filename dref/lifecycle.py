@@ -0,0 +1,133 @@
+import functools
+import operator
+import typing
+from collections import defaultdict
+
+from django.db import models
+
+from dref.models import Dref, DrefFinalReport, DrefLifecycle, DrefOperationalUpdate
+
+# Stage -> (Model, operation start date field, operation end date field)
+# NOTE: Same date fields as used by the Dref3ViewSet start/end_date_of_operation filters
+STAGE_MODELS = {
+    DrefLifecycle.Stage.APPLICATION: (Dref, "date_of_approval", "end_date"),
+    DrefLifecycle.Stage.OPERATIONAL_UPDATE: (DrefOperationalUpdate, "new_operational_start_date", "new_operational_end_date"),
+    DrefLifecycle.Stage.FINAL_REPORT: (DrefFinalReport, "operation_start_date", "operation_end_date"),
+}
+
+LIFECYCLE_UPDATE_FIELDS = [
+    "stage",
+    "status",
+    "type_of_dref",
+    "country",
+    "region",
+    *[f"{stage}_{field}" for stage in STAGE_MODELS for field in ("start_date", "end_date", "count")],
+    *[f"approved_{stage}_count" for stage in STAGE_MODELS],
+    "modified_at",
+]
+
+
+def _build_lifecycle(appeal_code: str, records: typing.List[typing.Tuple[str, dict]]) -> DrefLifecycle:
+    """
+    records: (stage, values) of the appeal code in the lifecycle order
+    (Application, Operational Updates, Final Report, each ordered by created_at)
+    """
+    approved_records = [record for record in records if record[1]["status"] == Dref.Status.APPROVED]
+    current_stage, current = (approved_records or records)[-1]
+    application = next((values for stage, values in records if stage == DrefLifecycle.Stage.APPLICATION), current)
+
+    lifecycle = DrefLifecycle(
+        appeal_code=appeal_code,
+        stage=current_stage,
+        status=current["status"],
+        type_of_dref=application["type_of_dref"],
+        country_id=current["national_society_id"],
+        region_id=current["national_society__region_id"],
+    )
+    for stage, values in records:
+        setattr(lifecycle, f"{stage}_start_date", values["lifecycle_start_date"])
+        setattr(lifecycle, f"{stage}_end_date", values["lifecycle_end_date"])
+        setattr(lifecycle, f"{stage}_count", getattr(lifecycle, f"{stage}_count") + 1)
+        if values["status"] == Dref.Status.APPROVED:
+            setattr(lifecycle, f"approved_{stage}_count", getattr(lifecycle, f"approved_{stage}_count") + 1)
+    return lifecycle
+
+
+def refresh_dref_lifecycles(appeal_codes: typing.Iterable[typing.Optional[str]]):
+    """
+    Create/Update/Delete the DrefLifecycle of the given appeal codes
+    Uses a query per stage and a single upsert, independent of the number of appeal codes
+    """
+    appeal_codes = {appeal_code for appeal_code in appeal_codes if appeal_code}
+    if not appeal_codes:
+        return
+
+    records_by_appeal_code = defaultdict(list)
+    for stage, (model, start_date_field, end_date_field) in STAGE_MODELS.items():
+        for values in (
+            model.objects.filter(appeal_code__in=appeal_codes)
+            .order_by("created_at")
+            .values(
+                "appeal_code",
+                "status",
+                "type_of_dref",
+                "national_society_id",
+                "national_society__region_id",
+                lifecycle_start_date=models.F(start_date_field),
+                lifecycle_end_date=models.F(end_date_field),
+            )
+        ):
+            records_by_appeal_code[values["appeal_code"]].append((stage, values))
+
+    DrefLifecycle.objects.bulk_create(
+        [_build_lifecycle(appeal_code, records) for appeal_code, records in records_by_appeal_code.items()],
+        update_conflicts=True,
+        unique_fields=["appeal_code"],
+        update_fields=LIFECYCLE_UPDATE_FIELDS,
+    )
+    DrefLifecycle.objects.filter(appeal_code__in=appeal_codes - records_by_appeal_code.keys()).delete()
+
+
+def rebuild_dref_lifecycles(chunk_size: int = 500) -> int:
+    appeal_codes = set()
+    for model, _, _ in STAGE_MODELS.values():
+        appeal_codes.update(
+            model.objects.exclude(appeal_code__isnull=True)
+            .exclude(appeal_code="")
+            .values_list("appeal_code", flat=True)
+            .distinct()
+            .order_by()
+        )
+    appeal_codes = sorted(appeal_codes)
+    for i in range(0, len(appeal_codes), chunk_size):
+        refresh_dref_lifecycles(appeal_codes[i : i + chunk_size])
+    DrefLifecycle.objects.exclude(appeal_code__in=appeal_codes).delete()
+    return len(appeal_codes)
+
+
+def get_lifecycle_records_count(stages: typing.Iterable[str], approved_only: bool) -> models.Expression:
+    """Number of records of the given stages of a lifecycle (As shown by the Dref3ViewSet)"""
+    prefix = "approved_" if approved_only else ""
+    return functools.reduce(operator.add, [models.F(f"{prefix}{stage}_count") for stage in stages])
+
+
+def paginate_lifecycles(
+    queryset: models.QuerySet[DrefLifecycle],
+    offset: int,
+    limit: typing.Optional[int],
+) -> typing.Tuple[typing.List[str], int]:
+    """
+    Paginate the records of the lifecycles (ordered by appeal code) in SQL
+    NOTE: queryset needs the records_count annotation (See get_lifecycle_records_count)
+    Returns the appeal codes of the requested page and the number of records to skip from their records
+    """
+    queryset = queryset.annotate(
+        records_until=models.Window(models.Sum("records_count"), order_by=models.F("appeal_code").asc()),
+    ).filter(records_until__gt=offset)
+    if limit is not None:
+        queryset = queryset.filter(records_until__lt=offset + limit + models.F("records_count"))
+    page = list(queryset.values_list("appeal_code", "records_until", "records_count"))
+    if not page:
+        return [], 0
+    _, records_until, records_count = page[0]
+    return [appeal_code for appeal_code, _, _ in page], offset - (records_until - records_count)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dref.lifecycle import rebuild_dref_lifecycles
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DREF lifecycle read model (used by the dref3 listing) from the DREF records"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500, help="Number of appeal codes refreshed at once")
+
+    def handle(self, *args, **options):
+        count = rebuild_dref_lifecycles(chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} DREF lifecycles"))
@@ -0,0 +1,169 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:40
+
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def rebuild_lifecycles(apps, schema_editor):
+    """
+    Create the DrefLifecycle of the existing appeal codes (Same as dref.lifecycle.rebuild_dref_lifecycles)
+    NOTE: Inlined to use the historical models
+    """
+    DrefLifecycle = apps.get_model("dref", "DrefLifecycle")
+    approved_status = 4  # Dref.Status.APPROVED
+    # Stage -> (Model, operation start date field, operation end date field)
+    stage_models = {
+        "application": (apps.get_model("dref", "Dref"), "date_of_approval", "end_date"),
+        "operational_update": (
+            apps.get_model("dref", "DrefOperationalUpdate"),
+            "new_operational_start_date",
+            "new_operational_end_date",
+        ),
+        "final_report": (apps.get_model("dref", "DrefFinalReport"), "operation_start_date", "operation_end_date"),
+    }
+
+    # Records of each appeal code in the lifecycle order (Application, Operational Updates, Final Report)
+    records_by_appeal_code = defaultdict(list)
+    for stage, (model, start_date_field, end_date_field) in stage_models.items():
+        for values in (
+            model.objects.exclude(appeal_code__isnull=True)
+            .exclude(appeal_code="")
+            .order_by("created_at")
+            .values(
+                "appeal_code",
+                "status",
+                "type_of_dref",
+                "national_society_id",
+                "national_society__region_id",
+                lifecycle_start_date=models.F(start_date_field),
+                lifecycle_end_date=models.F(end_date_field),
+            )
+            .iterator()
+        ):
+            records_by_appeal_code[values["appeal_code"]].append((stage, values))
+
+    lifecycles = []
+    for appeal_code, records in records_by_appeal_code.items():
+        approved_records = [record for record in records if record[1]["status"] == approved_status]
+        current_stage, current = (approved_records or records)[-1]
+        application = next((values for stage, values in records if stage == "application"), current)
+        lifecycle = DrefLifecycle(
+            appeal_code=appeal_code,
+            stage=current_stage,
+            status=current["status"],
+            type_of_dref=application["type_of_dref"],
+            country_id=current["national_society_id"],
+            region_id=current["national_society__region_id"],
+        )
+        for stage, values in records:
+            setattr(lifecycle, f"{stage}_start_date", values["lifecycle_start_date"])
+            setattr(lifecycle, f"{stage}_end_date", values["lifecycle_end_date"])
+            setattr(lifecycle, f"{stage}_count", getattr(lifecycle, f"{stage}_count") + 1)
+            if values["status"] == approved_status:
+                setattr(lifecycle, f"approved_{stage}_count", getattr(lifecycle, f"approved_{stage}_count") + 1)
+        lifecycles.append(lifecycle)
+    DrefLifecycle.objects.bulk_create(lifecycles, batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0233_export_fingerprint"),
+        ("dref", "0088_remove_identifiedneed_title_ar_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DrefLifecycle",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("appeal_code", models.CharField(max_length=255, unique=True, verbose_name="appeal code")),
+                (
+                    "stage",
+                    models.CharField(
+                        choices=[
+                            ("application", "Application"),
+                            ("operational_update", "Operational Update"),
+                            ("final_report", "Final Report"),
+                        ],
+                        max_length=32,
+                        verbose_name="stage",
+                    ),
+                ),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[(1, "Draft"), (2, "Finalizing"), (3, "Finalized"), (4, "Approved"), (5, "Failed")],
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "type_of_dref",
+                    models.IntegerField(
+                        blank=True,
+                        choices=[(0, "Imminent"), (1, "Assessment"), (2, "Response"), (3, "Loan")],
+                        null=True,
+                        verbose_name="dref type",
+                    ),
+                ),
+                ("application_start_date", models.DateField(blank=True, null=True, verbose_name="application start date")),
+                ("application_end_date", models.DateField(blank=True, null=True, verbose_name="application end date")),
+                (
+                    "operational_update_start_date",
+                    models.DateField(blank=True, null=True, verbose_name="operational update start date"),
+                ),
+                (
+                    "operational_update_end_date",
+                    models.DateField(blank=True, null=True, verbose_name="operational update end date"),
+                ),
+                ("final_report_start_date", models.DateField(blank=True, null=True, verbose_name="final report start date")),
+                ("final_report_end_date", models.DateField(blank=True, null=True, verbose_name="final report end date")),
+                ("application_count", models.PositiveIntegerField(default=0, verbose_name="application count")),
+                ("operational_update_count", models.PositiveIntegerField(default=0, verbose_name="operational update count")),
+                ("final_report_count", models.PositiveIntegerField(default=0, verbose_name="final report count")),
+                ("approved_application_count", models.PositiveIntegerField(default=0, verbose_name="approved application count")),
+                (
+                    "approved_operational_update_count",
+                    models.PositiveIntegerField(default=0, verbose_name="approved operational update count"),
+                ),
+                (
+                    "approved_final_report_count",
+                    models.PositiveIntegerField(default=0, verbose_name="approved final report count"),
+                ),
+                ("modified_at", models.DateTimeField(auto_now=True, verbose_name="modified at")),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="api.country",
+                        verbose_name="country",
+                    ),
+                ),
+                (
+                    "region",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="api.region",
+                        verbose_name="region",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Dref Lifecycle",
+                "verbose_name_plural": "Dref Lifecycles",
+                "ordering": ("appeal_code",),
+                "indexes": [
+                    models.Index(fields=["status"], name="dref_drefli_status_83e2ae_idx"),
+                    models.Index(fields=["type_of_dref"], name="dref_drefli_type_of_c80e0b_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(rebuild_lifecycles, reverse_code=migrations.RunPython.noop),
+    ]
@@ -11,7 +11,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from pdf2image import convert_from_bytes
 
-from api.models import Country, DisasterType, District, FieldReport
+from api.models import Country, DisasterType, District, FieldReport, Region
 from deployments.models import Sector
 from main.fields import SecureFileField
 
@@ -1694,3 +1694,59 @@ class DrefFinalReport(models.Model):
         if status == Dref.Status.APPROVED:
             return queryset.filter(status=Dref.Status.APPROVED)
         return queryset
+
+
+class DrefLifecycle(models.Model):
+    """
+    Read model of the DREF lifecycle (Application -> Operational Updates -> Final Report) of an appeal code
+    NOTE: Kept in sync using dref.lifecycle.refresh_dref_lifecycles (See dref.receivers)
+    """
+
+    class Stage(models.TextChoices):
+        APPLICATION = "application", _("Application")
+        OPERATIONAL_UPDATE = "operational_update", _("Operational Update")
+        FINAL_REPORT = "final_report", _("Final Report")
+
+    appeal_code = models.CharField(verbose_name=_("appeal code"), max_length=255, unique=True)
+    # Current stage: The latest approved stage (or the latest stage if none is approved)
+    stage = models.CharField(verbose_name=_("stage"), max_length=32, choices=Stage.choices)
+    status = models.IntegerField(verbose_name=_("status"), choices=Dref.Status.choices)
+    type_of_dref = models.IntegerField(verbose_name=_("dref type"), choices=Dref.DrefType.choices, null=True, blank=True)
+    country = models.ForeignKey(
+        Country, verbose_name=_("country"), null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    region = models.ForeignKey(
+        Region, verbose_name=_("region"), null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
+    # Operation dates of each stage (latest record of the stage)
+    application_start_date = models.DateField(verbose_name=_("application start date"), null=True, blank=True)
+    application_end_date = models.DateField(verbose_name=_("application end date"), null=True, blank=True)
+    operational_update_start_date = models.DateField(verbose_name=_("operational update start date"), null=True, blank=True)
+    operational_update_end_date = models.DateField(verbose_name=_("operational update end date"), null=True, blank=True)
+    final_report_start_date = models.DateField(verbose_name=_("final report start date"), null=True, blank=True)
+    final_report_end_date = models.DateField(verbose_name=_("final report end date"), null=True, blank=True)
+
+    # Number of records of each stage, used to paginate the records of the lifecycles
+    application_count = models.PositiveIntegerField(verbose_name=_("application count"), default=0)
+    operational_update_count = models.PositiveIntegerField(verbose_name=_("operational update count"), default=0)
+    final_report_count = models.PositiveIntegerField(verbose_name=_("final report count"), default=0)
+    approved_application_count = models.PositiveIntegerField(verbose_name=_("approved application count"), default=0)
+    approved_operational_update_count = models.PositiveIntegerField(
+        verbose_name=_("approved operational update count"), default=0
+    )
+    approved_final_report_count = models.PositiveIntegerField(verbose_name=_("approved final report count"), default=0)
+
+    modified_at = models.DateTimeField(verbose_name=_("modified at"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Dref Lifecycle")
+        verbose_name_plural = _("Dref Lifecycles")
+        ordering = ("appeal_code",)
+        indexes = [
+            models.Index(fields=["status"]),
+            models.Index(fields=["type_of_dref"]),
+        ]
+
+    def __str__(self):
+        return f"{self.appeal_code} - {self.get_stage_display()}"
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from dref.lifecycle import refresh_dref_lifecycles
+from dref.models import Dref, DrefFinalReport, DrefOperationalUpdate
+
+
+@receiver(pre_save, sender=Dref)
+@receiver(pre_save, sender=DrefOperationalUpdate)
+@receiver(pre_save, sender=DrefFinalReport)
+def track_dref_lifecycle_appeal_code(sender, instance, **kwargs):
+    # NOTE: The lifecycle of the previous appeal code also needs to be refreshed if it's changed
+    instance._previous_appeal_code = None
+    if instance.pk:
+        instance._previous_appeal_code = sender.objects.filter(pk=instance.pk).values_list("appeal_code", flat=True).first()
+
+
+@receiver(post_save, sender=Dref)
+@receiver(post_save, sender=DrefOperationalUpdate)
+@receiver(post_save, sender=DrefFinalReport)
+@receiver(post_delete, sender=Dref)
+@receiver(post_delete, sender=DrefOperationalUpdate)
+@receiver(post_delete, sender=DrefFinalReport)
+def update_dref_lifecycle(sender, instance, **kwargs):
+    refresh_dref_lifecycles([instance.appeal_code, getattr(instance, "_previous_appeal_code", None)])
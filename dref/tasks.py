@@ -1,11 +1,12 @@
 import logging
+from collections import defaultdict
 
 from celery import shared_task
 from django.apps import apps
 from django.template.loader import render_to_string
 
-from api.utils import get_model_name
-from lang.tasks import translate_model_fields
+from lang.tasks import ModelTranslator
+from main.lock import RedisLockKey, redis_lock
 from main.translation import TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME
 from notifications.notification import send_notification
 
@@ -66,13 +67,26 @@ def process_dref_translation(model_name, instance_pk):
     try:
         model = apps.get_model(model_name)
         instance = model.objects.get(pk=instance_pk)
-        logger.info(f"Starting translation for model: ({model_name}) ID: ({instance_pk})")
-        translate_model_fields(model_name, instance_pk)
-        logger.info(f"Translating related objects for model: ({model_name}) ID: ({instance_pk})")
-        _translate_related_objects(instance)
-        instance.status = Dref.Status.FINALIZED
-        instance.translation_module_original_language = "en"
-        instance.save(update_fields=["status", "translation_module_original_language"])
+        with redis_lock(key=RedisLockKey.MODEL_TRANSLATION, id=instance_pk, model_name=model_name) as acquired:
+            if not acquired:
+                # NOTE: The related objects are translated (and the instance finalized) by the task holding the lock
+                logger.warning(f"Translation is already in progress for {model_name} with pk={instance_pk}.")
+                return
+            logger.info(f"Starting translation for model: ({model_name}) ID: ({instance_pk})")
+            related_objects = _get_related_objects(instance)
+            # NOTE: The instance and its related objects are translated together (See ModelTranslator.translate_objects_fields)
+            translated_fields = ModelTranslator().translate_objects_fields([instance, *related_objects], save=False)
+            logger.info(f"Saving related objects for model: ({model_name}) ID: ({instance_pk})")
+            _save_related_objects(related_objects, "en", translated_fields)
+            instance.status = Dref.Status.FINALIZED
+            instance.translation_module_original_language = "en"
+            instance.save(
+                update_fields=[
+                    "status",
+                    "translation_module_original_language",
+                    *sorted(translated_fields.get(type(instance), [])),
+                ]
+            )
         logger.info(f"Successfully finalized: ({model_name}) ID: ({instance_pk})")
     except Exception:
         if instance is not None:
@@ -82,33 +96,15 @@ def process_dref_translation(model_name, instance_pk):
         return False
 
 
-def _translate_related_objects(
-    instance,
-    visited=None,
-    auto_translate=True,
-    language="en",
-):
+def _get_related_objects(instance, visited=None):
     """
-    Sync the relateable translation fields for the given model instance.
-    This function ensures that the translation fields are updated correctly
-    based on the current language settings.
-
-    Args:
-        instance: The model instance whose related objects need to be translated.
-        visited: A set to keep track of visited instances to avoid infinite recursion.
-        auto_translate: A boolean indicating whether to auto-translate related objects.
-        language: The language code to set for the original language field.
-
+    Returns the related objects (TRANSLATABLE_RELATED_MODELS) of the given model instance, recursively.
+    Each object is returned once, even if it is related to multiple objects.
     """
-
     if visited is None:
-        visited = set()
-
-    instance_id = id(instance)
-    if instance_id in visited:
-        return
-    visited.add(instance_id)
+        visited = {(type(instance), instance.pk)}
 
+    related_objects = []
     for field in instance._meta.get_fields():
         if not field.is_relation or field.auto_created:
             continue
@@ -121,20 +117,53 @@ def _translate_related_objects(
         if related_value is None:
             continue
 
-        if not field.many_to_many:
-            if hasattr(related_value, TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME):
-                model_name = get_model_name(type(related_value))
-                if auto_translate:
-                    translate_model_fields(model_name, related_value.id)
-                related_value.translation_module_original_language = language
-                related_value.save(update_fields=["translation_module_original_language"])
-                _translate_related_objects(related_value, visited, auto_translate, language)
-        else:
-            for related_obj in related_value.all():
-                if hasattr(related_obj, TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME):
-                    model_name = get_model_name(type(related_obj))
-                    if auto_translate:
-                        translate_model_fields(model_name, related_obj.id)
-                    related_obj.translation_module_original_language = language
-                    related_obj.save(update_fields=["translation_module_original_language"])
-                    _translate_related_objects(related_obj, visited, auto_translate, language)
+        for related_obj in related_value.all() if field.many_to_many else [related_value]:
+            if not hasattr(related_obj, TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME):
+                continue
+            key = (type(related_obj), related_obj.pk)
+            if key in visited:
+                continue
+            visited.add(key)
+            related_objects.append(related_obj)
+            related_objects.extend(_get_related_objects(related_obj, visited))
+    return related_objects
+
+
+def _save_related_objects(related_objects, language, translated_fields=None):
+    """
+    Set the original language of the related objects and save them with one bulk_update per model
+    translated_fields: Fields translated by ModelTranslator.translate_objects_fields
+    """
+    translated_fields = translated_fields or {}
+    objects_by_model = defaultdict(list)
+    for related_obj in related_objects:
+        related_obj.translation_module_original_language = language
+        objects_by_model[type(related_obj)].append(related_obj)
+    for related_model, objs in objects_by_model.items():
+        related_model.objects.bulk_update(
+            objs,
+            [TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME, *sorted(translated_fields.get(related_model, []))],
+        )
+
+
+def _translate_related_objects(
+    instance,
+    auto_translate=True,
+    language="en",
+):
+    """
+    Sync the relateable translation fields for the given model instance.
+    This function ensures that the translation fields are updated correctly
+    based on the current language settings.
+
+    Args:
+        instance: The model instance whose related objects need to be translated.
+        auto_translate: A boolean indicating whether to auto-translate related objects.
+        language: The language code to set for the original language field.
+
+    """
+    related_objects = _get_related_objects(instance)
+    translated_fields = None
+    if auto_translate:
+        translated_fields = ModelTranslator().translate_objects_fields(related_objects, save=False)
+    _save_related_objects(related_objects, language, translated_fields)
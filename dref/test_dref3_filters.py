@@ -9,7 +9,7 @@ from dref.factories.dref import (
     DrefFinalReportFactory,
     DrefOperationalUpdateFactory,
 )
-from dref.models import Dref
+from dref.models import Dref, DrefLifecycle
 from main.test_case import APITestCase
 
 User = get_user_model()
@@ -247,3 +247,28 @@ class Dref3FilterTests(APITestCase):
         op_row = [r for r in data_after_fr if r["stage"].startswith("Operational Update")][0]
         assert op_row["is_latest_stage"] is False
         assert fr_row["is_latest_stage"] is True
+
+    def test_lifecycle_pagination(self):
+        lifecycle = DrefLifecycle.objects.get(appeal_code="APPEAL_A")
+        assert lifecycle.stage == DrefLifecycle.Stage.FINAL_REPORT
+        assert (lifecycle.application_count, lifecycle.operational_update_count, lifecycle.final_report_count) == (1, 1, 1)
+        assert lifecycle.region_id == self.region1.id
+
+        self.op_a1.status = Dref.Status.APPROVED
+        self.op_a1.save(update_fields=["status"])
+        lifecycle.refresh_from_db()
+        assert lifecycle.stage == DrefLifecycle.Stage.OPERATIONAL_UPDATE
+        assert lifecycle.status == Dref.Status.APPROVED
+
+        self.authenticate(self.superuser)
+        full = self.client.get(self.url).json()
+        assert [row["appeal_id"] for row in full] == ["APPEAL_A"] * 3 + ["APPEAL_B"] * 2
+        # Pages split the records of an appeal code
+        for limit in (1, 2, 4):
+            rows = []
+            for offset in range(0, len(full) + 1, limit):
+                resp = self.client.get(self.url, {"limit": limit, "offset": offset})
+                self.assertEqual(resp.status_code, status.HTTP_200_OK)
+                assert len(resp.json()) <= limit
+                rows.extend(resp.json())
+            assert [row["id"] for row in rows] == [row["id"] for row in full]
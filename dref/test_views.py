@@ -8,6 +8,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
 from django.core import management
+from django.core.cache import cache
+from django.test import override_settings
 from rest_framework import status
 
 from api.models import Country, DisasterType, District, Region, RegionName
@@ -19,6 +21,8 @@ from dref.factories.dref import (
     DrefFileFactory,
     DrefFinalReportFactory,
     DrefOperationalUpdateFactory,
+    IdentifiedNeedFactory,
+    NationalSocietyActionFactory,
     ProposedActionActivitiesFactory,
     ProposedActionFactory,
 )
@@ -29,7 +33,9 @@ from dref.models import (
     DrefOperationalUpdate,
     ProposedAction,
 )
-from dref.tasks import send_dref_email
+from dref.tasks import process_dref_translation, send_dref_email
+from lang.translation import DummyTranslator
+from main.lock import RedisLockKey, redis_lock
 from main.test_case import APITestCase
 
 
@@ -1586,6 +1592,66 @@ class DrefTestCase(APITestCase):
         self.assert_200(response)
         self.assertEqual(response.data["status"], Dref.Status.FINALIZED)
 
+    def test_process_dref_translation(self):
+        user1 = UserFactory.create()
+        dref = DrefFactory.create(title="Test Title", created_by=user1, status=Dref.Status.APPROVED)
+        op_update = DrefOperationalUpdateFactory.create(
+            dref=dref,
+            status=Dref.Status.DRAFT,
+            operational_update_number=1,
+            translation_module_original_language="fr",
+            title_fr="Titre en français",
+        )
+        # Same text in multiple related objects
+        needs = IdentifiedNeedFactory.create_batch(2, description_fr="Besoin identifié")
+        national_society_action = NationalSocietyActionFactory.create(description_fr="Action de la société nationale")
+        op_update.needs_identified.add(*needs)
+        op_update.national_society_actions.add(national_society_action)
+
+        with patch.object(DummyTranslator, "translate_text", autospec=True, side_effect=DummyTranslator.translate_text) as mock:
+            process_dref_translation(get_model_name(DrefOperationalUpdate), op_update.pk)
+        calls = [(call.args[1], call.args[2]) for call in mock.call_args_list]
+        self.assertEqual(len(calls), len(set(calls)))
+        self.assertIn(("Besoin identifié", "en"), calls)
+
+        op_update.refresh_from_db()
+        self.assertEqual(op_update.status, Dref.Status.FINALIZED)
+        self.assertEqual(op_update.translation_module_original_language, "en")
+        self.assertEqual(op_update.title_en, 'Titre en français translated to "en" using source language "fr"')
+        for obj in [*needs, national_society_action]:
+            obj.refresh_from_db()
+            self.assertEqual(obj.translation_module_original_language, "en")
+            self.assertEqual(
+                obj.description_es,
+                f'{obj.description_fr} translated to "es" using source language "fr"',
+            )
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_process_dref_translation_in_progress(self):
+        user1 = UserFactory.create()
+        dref = DrefFactory.create(title="Test Title", created_by=user1, status=Dref.Status.APPROVED)
+        op_update = DrefOperationalUpdateFactory.create(
+            dref=dref,
+            status=Dref.Status.FINALIZING,
+            operational_update_number=1,
+            translation_module_original_language="fr",
+            title_fr="Titre en français",
+        )
+        need = IdentifiedNeedFactory.create(description_fr="Besoin identifié")
+        op_update.needs_identified.add(need)
+
+        model_name = get_model_name(DrefOperationalUpdate)
+        # NOTE: main.lock uses the cache configured at import
+        with patch("main.lock.cache", cache), patch.object(DummyTranslator, "translate_text") as mock:
+            # Translated by another task: the related objects aren't translated concurrently
+            with redis_lock(key=RedisLockKey.MODEL_TRANSLATION, id=op_update.pk, model_name=model_name):
+                process_dref_translation(model_name, op_update.pk)
+        mock.assert_not_called()
+        op_update.refresh_from_db()
+        self.assertEqual(op_update.status, Dref.Status.FINALIZING)
+        need.refresh_from_db()
+        self.assertIsNone(need.description_en)
+
     def test_optimistic_lock_in_final_report(self):
         user1 = UserFactory.create()
         dref = DrefFactory.create(
@@ -5,6 +5,7 @@ from collections import defaultdict
 import django.utils.timezone as timezone
 from django.contrib.auth.models import Permission
 from django.db import models, transaction
+from django.db.models.functions import Upper
 from django.http import HttpResponse
 from django.templatetags.static import static
 from django.utils.translation import gettext
@@ -30,7 +31,14 @@ from dref.filter_set import (
     DrefOperationalUpdateFilter,
     DrefShareUserFilterSet,
 )
-from dref.models import Dref, DrefFile, DrefFinalReport, DrefOperationalUpdate
+from dref.lifecycle import get_lifecycle_records_count, paginate_lifecycles
+from dref.models import (
+    Dref,
+    DrefFile,
+    DrefFinalReport,
+    DrefLifecycle,
+    DrefOperationalUpdate,
+)
 from dref.permissions import ApproveDrefPermission
 from dref.serializers import (
     AddDrefUserSerializer,
@@ -464,83 +472,22 @@ class Dref3ViewSet(RevisionMixin, viewsets.ModelViewSet):  # type: ignore[misc]
         name_map = {s.name.lower(): s.value for s in Dref.Status}
         return label_map.get(str(raw).lower()) or name_map.get(str(raw).lower())
 
-    def list(self, request):
-        # === First approach – would be nice to work like this, but recent definitons are more complex than that:
-        # # Aggregate all appeal-codes from the three models
-        # drefs = Dref.objects.all()
-        # ops = DrefOperationalUpdate.objects.all()
-        # finals = DrefFinalReport.objects.all()
-        # data = Dref3Serializer(list(drefs) + list(ops) + list(finals), many=True).data
-        # return response.Response(data)
-
-        # === Second approach:
-        # Get appeal_codes – then self.retrieve
+    def _normalize_stage(self, stage_val):
+        """Canonical stage name of the serialized stage label (eg: "Operational Update 2" -> operational_update)"""
+        normalized_stage = stage_val.lower()
+        if normalized_stage.startswith("operational update"):
+            normalized_stage = "operational_update"
+        elif normalized_stage == "final report":
+            normalized_stage = "final_report"
+        return normalized_stage
 
-        stage_filter = self._parse_stage_filter(request.query_params.get("stage"))
-        codes_qs_dref = Dref.objects.exclude(appeal_code="").values_list("appeal_code", flat=True).distinct()
-        codes_qs_op = DrefOperationalUpdate.objects.exclude(appeal_code="").values_list("appeal_code", flat=True).distinct()
-        codes_qs_final = DrefFinalReport.objects.exclude(appeal_code="").values_list("appeal_code", flat=True).distinct()
-
-        # Filtering by appeal_code prefix
-        appeal_code_prefix = request.query_params.get("appeal_code_prefix")
-        if appeal_code_prefix:
-            codes_qs_dref = codes_qs_dref.filter(appeal_code__startswith=appeal_code_prefix)
-            codes_qs_op = codes_qs_op.filter(appeal_code__startswith=appeal_code_prefix)
-            codes_qs_final = codes_qs_final.filter(appeal_code__startswith=appeal_code_prefix)
-
-        # region filter
-        region_param = request.query_params.get("region")
-        if region_param:
-            try:
-                region_id = int(region_param)
-            except ValueError:
-                region_id = None
-            if region_id:
-                codes_qs_dref = codes_qs_dref.filter(national_society__region_id=region_id)
-                codes_qs_op = codes_qs_op.filter(national_society__region_id=region_id)
-                codes_qs_final = codes_qs_final.filter(national_society__region_id=region_id)
-
-        # country iso3
-        iso3_param = request.query_params.get("country_iso3")
-        if iso3_param:
-            iso3 = iso3_param.strip().upper()
-            codes_qs_dref = codes_qs_dref.filter(national_society__iso3__iexact=iso3)
-            codes_qs_op = codes_qs_op.filter(national_society__iso3__iexact=iso3)
-            codes_qs_final = codes_qs_final.filter(national_society__iso3__iexact=iso3)
-
-        # appeal_type => type_of_dref
-        appeal_type_param = request.query_params.get("appeal_type")
-        if appeal_type_param:
-            try:
-                appeal_type_int = int(appeal_type_param)
-                codes_qs_dref = codes_qs_dref.filter(type_of_dref=appeal_type_int)
-                codes_qs_op = codes_qs_op.filter(dref__type_of_dref=appeal_type_int)
-                codes_qs_final = codes_qs_final.filter(dref__type_of_dref=appeal_type_int)
-            except ValueError:
-                pass
-
-        # operation_status => status
-        op_status_int = self._status_to_int(request.query_params.get("operation_status"))
-        if op_status_int is not None:
-            codes_qs_dref = codes_qs_dref.filter(status=op_status_int)
-            codes_qs_op = codes_qs_op.filter(status=op_status_int)
-            codes_qs_final = codes_qs_final.filter(status=op_status_int)
-
-        # start/end date of operation
-        start_date_param = request.query_params.get("start_date_of_operation")
-        if start_date_param:
-            # Dref has no operation_start_date; approximate with date_of_approval for application stage records.
-            codes_qs_dref = codes_qs_dref.filter(date_of_approval__gte=start_date_param)
-            codes_qs_op = codes_qs_op.filter(new_operational_start_date__gte=start_date_param)
-            codes_qs_final = codes_qs_final.filter(operation_start_date__gte=start_date_param)
-        end_date_param = request.query_params.get("end_date_of_operation")
-        if end_date_param:
-            codes_qs_dref = codes_qs_dref.filter(end_date__lte=end_date_param)
-            codes_qs_op = codes_qs_op.filter(new_operational_end_date__lte=end_date_param)
-            codes_qs_final = codes_qs_final.filter(operation_end_date__lte=end_date_param)
+    def get_lifecycle_queryset(self, request, stages):
+        """Lifecycles (one per appeal code) matching the filters, with the records_count annotation"""
+        query_params = request.query_params
+        user = request.user
 
         # appeal_id direct (DB primary key)
-        appeal_id_param = request.query_params.get("appeal_id")
+        appeal_id_param = query_params.get("appeal_id")
         if appeal_id_param:
             try:
                 pk_val = int(appeal_id_param)
@@ -553,83 +500,96 @@ class Dref3ViewSet(RevisionMixin, viewsets.ModelViewSet):  # type: ignore[misc]
                     if obj and obj.appeal_code:
                         codes = [obj.appeal_code]
                         break
+            queryset = DrefLifecycle.objects.filter(appeal_code__in=codes)
         else:
-            codes_sets = []
-            if not stage_filter or "application" in stage_filter:
-                codes_sets.append(set(codes_qs_dref))
-            if not stage_filter or "operational_update" in stage_filter:
-                codes_sets.append(set(codes_qs_op))
-            if not stage_filter or "final_report" in stage_filter:
-                codes_sets.append(set(codes_qs_final))
-            combined = set()
-            for s in codes_sets:
-                combined.update([c for c in s if c])
-            codes = sorted(combined)
-
-        # Additional date range filters (applied to root Dref only where fields exist)
-        date_range_fields = [
-            "event_date",
-            "ns_respond_date",
-            "government_requested_assistance_date",
-            "ns_request_date",
-            "submission_to_geneva",
-            "date_of_approval",
-            "publishing_date",
-            "hazard_date_and_location",
-            "end_date",
-        ]
-        for field in date_range_fields:
-            from_param = request.query_params.get(f"{field}_from")
-            to_param = request.query_params.get(f"{field}_to")
-            if from_param:
-                codes_qs_dref = codes_qs_dref.filter(**{f"{field}__gte": from_param})
-            if to_param:
-                codes_qs_dref = codes_qs_dref.filter(**{f"{field}__lte": to_param})
-
-        # Exclude codes for non-superusers
-        if not self._has_full_access(self.request.user):
+            queryset = DrefLifecycle.objects.all()
+
+            # Filtering by appeal_code prefix
+            appeal_code_prefix = query_params.get("appeal_code_prefix")
+            if appeal_code_prefix:
+                queryset = queryset.filter(appeal_code__startswith=appeal_code_prefix)
+
+            # region filter
+            region_param = query_params.get("region")
+            if region_param:
+                try:
+                    region_id = int(region_param)
+                except ValueError:
+                    region_id = None
+                if region_id:
+                    queryset = queryset.filter(region=region_id)
+
+            # country iso3
+            iso3_param = query_params.get("country_iso3")
+            if iso3_param:
+                queryset = queryset.filter(country__iso3__iexact=iso3_param.strip().upper())
+
+            # appeal_type => type_of_dref
+            appeal_type_param = query_params.get("appeal_type")
+            if appeal_type_param:
+                try:
+                    queryset = queryset.filter(type_of_dref=int(appeal_type_param))
+                except ValueError:
+                    pass
+
+            # operation_status => status
+            op_status_int = self._status_to_int(query_params.get("operation_status"))
+            if op_status_int is not None:
+                queryset = queryset.filter(status=op_status_int)
+
+            # start/end date of operation: any of the selected stages
+            # NOTE: Dref has no operation_start_date; approximated with date_of_approval for the application stage.
+            start_date_param = query_params.get("start_date_of_operation")
+            end_date_param = query_params.get("end_date_of_operation")
+            if start_date_param or end_date_param:
+                dates_q = models.Q()
+                for stage in stages:
+                    stage_q = models.Q(**{f"{stage}_count__gt": 0})
+                    if start_date_param:
+                        stage_q &= models.Q(**{f"{stage}_start_date__gte": start_date_param})
+                    if end_date_param:
+                        stage_q &= models.Q(**{f"{stage}_end_date__lte": end_date_param})
+                    dates_q |= stage_q
+                queryset = queryset.filter(dates_q)
+
+        # Light users: only published records are visible
+        has_full_access = self._has_full_access(user)
+        if not has_full_access:
             excluded_codes = self._excluded_codes()
             if excluded_codes:
-                codes = [c for c in codes if c and c.upper() not in excluded_codes]
+                queryset = queryset.alias(upper_appeal_code=Upper("appeal_code")).exclude(upper_appeal_code__in=excluded_codes)
 
-        data = []
-        old_kwargs = getattr(self, "kwargs", {}).copy()
-        self.kwargs = {self.lookup_field: codes}
-        resp = self.retrieve(request)
+        return queryset.annotate(
+            records_count=get_lifecycle_records_count(stages, approved_only=not has_full_access),
+        ).filter(records_count__gt=0)
 
-        if resp.status_code == 200:
-            for item in resp.data if isinstance(resp.data, list) else [resp.data]:
+    def get_lifecycle_records(self, codes, stage_filter):
+        """Serialized records of the lifecycles of the given appeal codes (in the same order)"""
+        instances_by_appeal_code = self.get_objects_by_appeal_code(codes)
+        prefetched_appeal_by_code = {
+            appeal.code: appeal for appeal in Appeal.objects.only("code", "event_id").filter(code__in=codes).all()
+        }
+        silents = self._excluded_codes()
+
+        data = []
+        for code in codes:
+            for item in self.handle_retrieve(code, instances_by_appeal_code.get(code, []), prefetched_appeal_by_code):
                 if stage_filter:
-                    stage_val = None
-                    if isinstance(item, dict):
-                        stage_val = item.get("stage") or item.get("Stage")
-                    if stage_val:
-                        normalized_stage = stage_val.lower()
-                        if normalized_stage.startswith("operational update"):
-                            normalized_stage = "operational_update"
-                        elif normalized_stage == "final report":
-                            normalized_stage = "final_report"
-                        elif normalized_stage == "application":
-                            normalized_stage = "application"
-
-                        if normalized_stage not in stage_filter:
-                            continue
-                    else:
-                        # If stage filter present and we cannot determine stage, skip
+                    stage_val = item.get("stage") or item.get("Stage")
+                    # If stage filter present and we cannot determine stage, skip
+                    if not stage_val or self._normalize_stage(stage_val) not in stage_filter:
                         continue
+                item["public"] = item["appeal_id"] not in silents
                 data.append(item)
-        self.kwargs = old_kwargs  # Restore old kwargs
+        return data
 
-        silents = self._excluded_codes()
-        # TODO: Is this required, isn't this already done?
-        for row in data:
-            row["public"] = row["appeal_id"] not in silents
+    def list(self, request):
+        # Filter and paginate the lifecycles (one row per appeal code) in SQL,
+        # then serialize only the DREF records of the requested page
+        stage_filter = self._parse_stage_filter(request.query_params.get("stage"))
+        stages = [stage for stage in DrefLifecycle.Stage.values if not stage_filter or stage in stage_filter]
+        lifecycles = self.get_lifecycle_queryset(request, stages)
 
-        # numeric id filter (?id=3 or ?id=3,7)
-        id_param = request.query_params.get("id")
-        if id_param:
-            if wanted_ids := {i.strip() for i in str(id_param).split(",")}:
-                data = [row for row in data if row.get("id") in wanted_ids]
         # pagination
         try:
             limit = int(request.query_params.get("limit")) if request.query_params.get("limit") else None
@@ -639,11 +599,27 @@ class Dref3ViewSet(RevisionMixin, viewsets.ModelViewSet):  # type: ignore[misc]
             offset = int(request.query_params.get("offset")) if request.query_params.get("offset") else 0
         except ValueError:
             offset = 0
-        if offset or limit is not None:
-            end = offset + limit if limit is not None else None
-            data_paginated = data[offset:end]
+        paginate = bool(offset or limit is not None)
+
+        id_param = request.query_params.get("id")
+        user = request.user
+        # NOTE: records_count is exact for the superusers and the light users (only approved records).
+        # Other full access users see the records filtered by filter_dref_queryset_by_user_access
+        if paginate and not id_param and (user.is_superuser or not self._has_full_access(user)):
+            codes, skip = paginate_lifecycles(lifecycles, offset, limit)
+            data = self.get_lifecycle_records(codes, stage_filter)
+            data_paginated = data[skip : skip + limit if limit is not None else None]
         else:
-            data_paginated = data
+            data = self.get_lifecycle_records(list(lifecycles.values_list("appeal_code", flat=True)), stage_filter)
+            # numeric id filter (?id=3 or ?id=3,7)
+            if id_param:
+                if wanted_ids := {i.strip() for i in str(id_param).split(",")}:
+                    data = [row for row in data if row.get("id") in wanted_ids]
+            if paginate:
+                end = offset + limit if limit is not None else None
+                data_paginated = data[offset:end]
+            else:
+                data_paginated = data
 
         export_param = request.query_params.get("export")
         if export_param and export_param.lower() == "csv":
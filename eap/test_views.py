@@ -8,6 +8,7 @@ from django.contrib.auth.models import Group, Permission
 from django.core import management
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
+from django.utils import timezone
 from django.utils.translation import get_language as django_get_language
 
 from api.factories.country import CountryFactory
@@ -2335,6 +2336,62 @@ class EAPPDFExportTestCase(APITestCase):
             django_get_language(),
         )
 
+    @mock.patch("api.serializers.generate_export_pdf.delay")
+    def test_export_cache(self, mock_generate_url):
+        eap_registration = EAPRegistrationFactory.create(
+            eap_type=EAPType.SIMPLIFIED_EAP,
+            country=self.country,
+            national_society=self.national_society,
+            disaster_type=self.disaster_type,
+            created_by=self.user,
+            modified_by=self.user,
+        )
+        simplified_eap = SimplifiedEAPFactory.create(
+            eap_registration=eap_registration,
+            created_by=self.user,
+            modified_by=self.user,
+            budget_file=EAPFileFactory._create_file(
+                created_by=self.user,
+                modified_by=self.user,
+            ),
+        )
+        eap_registration.latest_simplified_eap = simplified_eap
+        eap_registration.save()
+
+        data = {
+            "export_type": Export.ExportType.SIMPLIFIED_EAP,
+            "export_id": eap_registration.id,
+        }
+        self.authenticate(self.user)
+
+        with self.capture_on_commit_callbacks(execute=True):
+            response = self.client.post(self.url, data, format="json")
+        self.assert_201(response)
+        self.assertEqual(mock_generate_url.call_count, 1)
+        export = Export.objects.get(id=response.data["id"])
+        self.assertIsNotNone(export.fingerprint)
+        # Mark as rendered
+        export.pdf_file.name = "pdf-export/eap.pdf"
+        export.status = Export.ExportStatus.COMPLETED
+        export.save()
+
+        # Nothing changed: PDF is re-used
+        with self.capture_on_commit_callbacks(execute=True):
+            response = self.client.post(self.url, data, format="json")
+        self.assert_201(response)
+        self.assertEqual(response.data["status"], Export.ExportStatus.COMPLETED)
+        self.assertEqual(mock_generate_url.call_count, 1)
+        self.assertEqual(Export.objects.get(id=response.data["id"]).pdf_file.name, "pdf-export/eap.pdf")
+
+        # EAP was modified: new PDF is rendered
+        simplified_eap.modified_at = timezone.now()
+        simplified_eap.save(update_fields=["modified_at"])
+        with self.capture_on_commit_callbacks(execute=True):
+            response = self.client.post(self.url, data, format="json")
+        self.assert_201(response)
+        self.assertEqual(response.data["status"], Export.ExportStatus.PENDING)
+        self.assertEqual(mock_generate_url.call_count, 2)
+
 
 class EAPFullTestCase(APITestCase):
     def setUp(self):
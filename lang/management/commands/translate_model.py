@@ -2,7 +2,7 @@ import logging
 
 from django.core.management import BaseCommand
 
-from lang.tasks import ModelTranslator
+from lang.tasks import TRANSLATION_BACKFILL_CHUNK_SIZE, ModelTranslator
 
 
 class Command(BaseCommand):
@@ -18,10 +18,36 @@ class Command(BaseCommand):
             action="store_true",
             help="Show characters counts only",
         )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Dispatch the pending instances to celery chunks, resuming from the last dispatched id",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            metavar="N",
+            type=int,
+            default=TRANSLATION_BACKFILL_CHUNK_SIZE,
+            help="how many instances to translate for each celery chunk (backfill)",
+        )
+        parser.add_argument(
+            "--max-chunks", metavar="N", type=int, default=None, help="how many celery chunks to dispatch (backfill)"
+        )
+        parser.add_argument(
+            "--reset-checkpoints",
+            action="store_true",
+            help="Start the backfill from the first instance",
+        )
 
     def handle(self, *args, **options):
         logging.getLogger("").setLevel(logging.INFO)
         if options.get("show_counts_only"):
             ModelTranslator.show_characters_counts()
+        elif options.get("backfill"):
+            ModelTranslator().run_backfill(
+                chunk_size=options["chunk_size"],
+                max_chunks=options["max_chunks"],
+                reset_checkpoints=options["reset_checkpoints"],
+            )
         else:
             ModelTranslator().run(batch_size=options.pop("batch_size"))
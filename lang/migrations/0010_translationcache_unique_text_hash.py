@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lang", "0009_remove_translationcache_lang_transl_text_4a497b_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="translationcache",
+            name="lang_transl_text_ha_7b6786_idx",
+        ),
+        migrations.AlterUniqueTogether(
+            name="translationcache",
+            unique_together={("text_hash", "source_language", "dest_language")},
+        ),
+    ]
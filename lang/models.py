@@ -48,10 +48,8 @@ class TranslationCache(models.Model):
     last_used = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        unique_together = ("text", "source_language", "dest_language")
-        indexes = [
-            models.Index(fields=["text_hash", "source_language", "dest_language"]),
-        ]
+        # NOTE: Using the hash, the texts can be longer than the btree index limit (cached per chunk, See IfrcTranslator)
+        unique_together = ("text_hash", "source_language", "dest_language")
 
     def __str__(self):
         return f"{self.source_language}>{self.dest_language} – {self.table_field}: {self.text[:30]}..."
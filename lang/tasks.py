@@ -1,17 +1,24 @@
+import datetime
 import logging
+import time
 import typing
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from functools import reduce
 
 from celery import shared_task
 from django.apps import apps as django_apps
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import connections, models
 from django.db.models import Q, Sum
 from django.db.models.functions import Length
 from modeltranslation import settings as mt_settings
 from modeltranslation.translator import translator
 from modeltranslation.utils import build_localized_fieldname
 
+from api.utils import get_model_name
 from main.celery import Queues
 from main.lock import RedisLockKey, redis_lock
 from main.translation import (
@@ -19,11 +26,30 @@ from main.translation import (
     TRANSLATOR_SKIP_FIELD_NAME,
     skip_auto_translation,
 )
+from main.utils import get_cache_counters, increment_cache_counter
 
-from .translation import AVAILABLE_LANGUAGES, get_translator_class
+from .translation import (
+    AVAILABLE_LANGUAGES,
+    flush_translation_cache_usage,
+    get_translator_class,
+)
 
 logger = logging.getLogger(__name__)
 
+# Concurrent translation calls (See ModelTranslator.translate_objects_fields)
+TRANSLATION_MAX_WORKERS = 8
+
+# Backfill (See ModelTranslator.run_backfill)
+TRANSLATION_BACKFILL_CHUNK_SIZE = 50
+TRANSLATION_BACKFILL_CHECKPOINT_KEY = "translation-backfill-checkpoint:{model_name}"
+# Dispatched chunks not finished yet, expires in case a chunk is lost (eg: worker killed)
+TRANSLATION_BACKFILL_IN_FLIGHT_KEY = "translation-backfill-in-flight:{model_name}"
+TRANSLATION_BACKFILL_IN_FLIGHT_TIMEOUT = 60 * 60 * 24  # 1 day (in seconds)
+TRANSLATION_BACKFILL_CHARACTERS_KEY = "translation-backfill-characters"
+TRANSLATION_BACKFILL_DURATION_MS_KEY = "translation-backfill-duration-ms"
+# Estimated cost of one translated character (AWS)
+TRANSLATION_COST_PER_CHARACTER = 0.000015
+
 
 class ModelTranslator:
     def __init__(self):
@@ -33,23 +59,57 @@ class ModelTranslator:
     def translator(self):
         return self.default_translator
 
-    def translate_fields_object(self, obj, field):
+    def _get_pending_translations(self, obj, field):
+        """
+        Returns (initial_value, initial_lang, table_field, {lang: lang_field}) for the empty translations of the field
+        """
         initial_lang = getattr(obj, TRANSLATOR_ORIGINAL_LANGUAGE_FIELD_NAME)
         initial_value = getattr(obj, build_localized_fieldname(field, initial_lang), None)
         if not initial_value or not initial_lang:
-            return
+            return None
 
         model = type(obj)
         table_field = f"{model._meta.app_label}:{model._meta.model_name}:{field}"
-        field_max_length = model._meta.get_field(field).max_length
-
         pending_langs = {
             lang: build_localized_fieldname(field, lang)
             for lang in AVAILABLE_LANGUAGES
             if not getattr(obj, build_localized_fieldname(field, lang), None)
         }
         if not pending_langs:
+            return None
+        return initial_value, initial_lang, table_field, pending_langs
+
+    @staticmethod
+    def _set_translation(obj, field, lang_field, translated) -> bool:
+        model = type(obj)
+        if translated is None:
+            logger.warning(
+                "Translation failed for %s.%s pk=%s",
+                model.__name__,
+                lang_field,
+                obj.pk,
+            )
+            return False
+
+        field_max_length = model._meta.get_field(field).max_length
+        if field_max_length and len(translated) > field_max_length:
+            logger.warning(
+                "Translation exceeds max_length (%d) for %s.%s pk=%s",
+                field_max_length,
+                model.__name__,
+                lang_field,
+                obj.pk,
+            )
+            translated = translated[:field_max_length]
+
+        setattr(obj, lang_field, translated)
+        return True
+
+    def translate_fields_object(self, obj, field):
+        pending = self._get_pending_translations(obj, field)
+        if pending is None:
             return
+        initial_value, initial_lang, table_field, pending_langs = pending
 
         cached = self.translator.get_cached_translations(
             initial_value,
@@ -69,27 +129,84 @@ class ModelTranslator:
                     table_field=table_field,
                 )
 
-            if translated is None:
-                logger.warning(
-                    "Translation failed for %s.%s pk=%s",
-                    model.__name__,
-                    lang_field,
-                    obj.pk,
-                )
-                continue
+            if self._set_translation(obj, field, lang_field, translated):
+                yield lang_field
 
-            if field_max_length and len(translated) > field_max_length:
-                logger.warning(
-                    "Translation exceeds max_length (%d) for %s.%s pk=%s",
-                    field_max_length,
-                    model.__name__,
-                    lang_field,
-                    obj.pk,
+    def translate_objects_fields(
+        self,
+        objs: typing.Iterable[models.Model],
+        save: bool = True,
+        max_workers: int = TRANSLATION_MAX_WORKERS,
+    ) -> typing.Dict[typing.Type[models.Model], typing.Set[str]]:
+        """
+        Translate the fields of multiple objects (eg: DREF and its related objects)
+        - The (object, field, language) texts are collected first, identical texts are translated once
+        - The cache is looked up once per text, the remaining texts are translated concurrently (max_workers)
+        - save: one bulk_update per model, otherwise the caller saves the objects
+        Returns the translated fields by model
+        """
+        # (text, source_language, dest_language) -> [(obj, field, lang_field), ...]
+        jobs = defaultdict(list)
+        table_fields = {}
+        objs_by_model = defaultdict(dict)
+        for obj in objs:
+            if skip_auto_translation(obj):
+                continue
+            model = type(obj)
+            objs_by_model[model][obj.pk] = obj
+            for field in self.get_translatable_fields(model):
+                pending = self._get_pending_translations(obj, field)
+                if pending is None:
+                    continue
+                initial_value, initial_lang, table_field, pending_langs = pending
+                table_fields.setdefault((initial_value, initial_lang), table_field)
+                for lang, lang_field in pending_langs.items():
+                    jobs[(initial_value, initial_lang, lang)].append((obj, field, lang_field))
+
+        translations = {}
+        dest_languages_by_text = defaultdict(list)
+        for text, source_language, dest_language in jobs:
+            dest_languages_by_text[(text, source_language)].append(dest_language)
+        cached = self.translator.get_cached_translations_in_bulk(
+            [
+                (text, dest_languages, source_language, table_fields[(text, source_language)])
+                for (text, source_language), dest_languages in dest_languages_by_text.items()
+            ]
+        )
+        for (text, source_language), cached_translations in cached.items():
+            for dest_language, translated in cached_translations.items():
+                translations[(text, source_language, dest_language)] = translated
+
+        def _translate(key):
+            text, source_language, dest_language = key
+            try:
+                return self.translator.translate_text(
+                    text,
+                    dest_language,
+                    source_language=source_language,
+                    table_field=table_fields[(text, source_language)],
                 )
-                translated = translated[:field_max_length]
-
-            setattr(obj, lang_field, translated)
-            yield lang_field
+            finally:
+                # NOTE: The translators can use the database (cache), the connections are per thread
+                connections.close_all()
+
+        pending_keys = [key for key in jobs if key not in translations]
+        logger.info(f"Texts to translate: {len(jobs)}, cached: {len(translations)}, calls: {len(pending_keys)}")
+        if pending_keys:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                translations.update(zip(pending_keys, executor.map(_translate, pending_keys)))
+
+        translated_fields = defaultdict(set)
+        for key, targets in jobs.items():
+            for obj, field, lang_field in targets:
+                if self._set_translation(obj, field, lang_field, translations.get(key)):
+                    translated_fields[type(obj)].add(lang_field)
+
+        if save:
+            for model, fields in translated_fields.items():
+                model.objects.bulk_update(objs_by_model[model].values(), sorted(fields))
+        flush_translation_cache_usage()
+        return translated_fields
 
     @staticmethod
     def _get_filter(translation_fields):
@@ -134,6 +251,57 @@ class ModelTranslator:
         skipped_fields = set(getattr(translation_options, "skip_fields", []))
         return [field for field in translation_options.fields.keys() if field not in skipped_fields]
 
+    @classmethod
+    def get_pending_queryset(cls, model, translatable_fields):
+        return model.objects.filter(
+            cls._get_filter(translatable_fields),
+            # Skip which are flagged by user
+            **{TRANSLATOR_SKIP_FIELD_NAME: False},
+        )
+
+    @staticmethod
+    def get_backfill_checkpoint(model) -> int:
+        return cache.get(TRANSLATION_BACKFILL_CHECKPOINT_KEY.format(model_name=get_model_name(model)), 0)
+
+    @staticmethod
+    def set_backfill_checkpoint(model, pk: int):
+        cache.set(TRANSLATION_BACKFILL_CHECKPOINT_KEY.format(model_name=get_model_name(model)), pk, None)
+
+    @staticmethod
+    def get_backfill_in_flight_chunks(model) -> int:
+        # NOTE: Negative if chunks finished after the key expired
+        return max(cache.get(TRANSLATION_BACKFILL_IN_FLIGHT_KEY.format(model_name=get_model_name(model)), 0), 0)
+
+    @classmethod
+    def add_backfill_in_flight_chunk(cls, model):
+        """Decremented by translate_model_fields_backfill_chunk once done"""
+        key = TRANSLATION_BACKFILL_IN_FLIGHT_KEY.format(model_name=get_model_name(model))
+        if not cls.get_backfill_in_flight_chunks(model):
+            cache.set(key, 0, TRANSLATION_BACKFILL_IN_FLIGHT_TIMEOUT)
+        cache.incr(key)
+        cache.touch(key, TRANSLATION_BACKFILL_IN_FLIGHT_TIMEOUT)
+
+    @staticmethod
+    def get_backfill_characters_per_second() -> typing.Optional[float]:
+        counters = get_cache_counters(
+            characters=TRANSLATION_BACKFILL_CHARACTERS_KEY,
+            duration_ms=TRANSLATION_BACKFILL_DURATION_MS_KEY,
+        )
+        if not counters["duration_ms"]:
+            return None
+        return counters["characters"] * 1000 / counters["duration_ms"]
+
+    def get_pending_characters_count(self, objs) -> int:
+        """Characters sent for translation (source text x pending languages)"""
+        count = 0
+        for obj in objs:
+            for field in self.get_translatable_fields(type(obj)):
+                pending = self._get_pending_translations(obj, field)
+                if pending is not None:
+                    initial_value, _, _, pending_langs = pending
+                    count += len(initial_value) * len(pending_langs)
+        return count
+
     def translate_model_fields(self, obj, translatable_fields=None):
         if skip_auto_translation(obj):
             return
@@ -163,6 +331,7 @@ class ModelTranslator:
 
             qs = model.objects.filter(cls._get_filter(translatable_fields))
             logger.info(f"\tFields: {translatable_fields}")
+            logger.info(f"\tBackfill checkpoint (last dispatched id): {cls.get_backfill_checkpoint(model)}")
             logger.info("\tTotal characters:")
 
             for field in translatable_fields:
@@ -172,8 +341,16 @@ class ModelTranslator:
                 )
                 total_count += count
                 logger.info(f"\t\t {field} - {count}")
+        remaining_characters = (len(AVAILABLE_LANGUAGES) - 1) * total_count
         logger.info(f"Total Count: {total_count}")
-        logger.info(f"Estimated Cost (AWS): {(len(AVAILABLE_LANGUAGES) - 1) * total_count * 0.000015}")
+        logger.info(f"Estimated Cost (AWS): {remaining_characters * TRANSLATION_COST_PER_CHARACTER}")
+        # Throughput of the backfill chunks (See translate_model_fields_backfill_chunk)
+        characters_per_second = cls.get_backfill_characters_per_second()
+        if characters_per_second:
+            logger.info(f"Backfill throughput: {characters_per_second:.1f} characters/second (per worker)")
+            logger.info(
+                f"Estimated remaining time: {datetime.timedelta(seconds=int(remaining_characters / characters_per_second))}"
+            )
 
     def run(self, batch_size=None, only_models: typing.Optional[typing.List[models.Model]] = None):
         """
@@ -193,11 +370,7 @@ class ModelTranslator:
                 continue
 
             # Process recent entities first
-            qs = model.objects.filter(
-                self._get_filter(translatable_fields),
-                # Skip which are flagged by user
-                **{TRANSLATOR_SKIP_FIELD_NAME: False},
-            ).order_by("-id")
+            qs = self.get_pending_queryset(model, translatable_fields).order_by("-id")
             qs_count = qs.count()
             index = 1
             logger.info(f"\tFields: {translatable_fields}")
@@ -215,6 +388,57 @@ class ModelTranslator:
                 logger.info(f"\t\t ({index}/{qs_count}) - {obj}")
                 self.translate_model_fields(obj, translatable_fields)
                 index += 1
+        flush_translation_cache_usage()
+
+    def run_backfill(
+        self,
+        chunk_size: int = TRANSLATION_BACKFILL_CHUNK_SIZE,
+        max_chunks: typing.Optional[int] = None,
+        only_models: typing.Optional[typing.List[models.Model]] = None,
+        reset_checkpoints: bool = False,
+    ):
+        """
+        Dispatch the pending instances to translate_model_fields_backfill_chunk tasks (translated concurrently)
+        The id of the last dispatched instance is saved per model: the next run resumes from there.
+        Once a model is done and its dispatched chunks are finished, the checkpoint is reset
+        (The failed and skipped instances are retried by the next pass)
+        max_chunks: how many chunks to dispatch in total. None will be all
+        """
+        translatable_models = self.get_translatable_models(only_models=only_models)
+        dispatched_chunks = 0
+        for model in sorted(translatable_models, key=get_model_name):
+            translatable_fields = self.get_translatable_fields(model)
+            if not translatable_fields:
+                continue
+            if reset_checkpoints:
+                self.set_backfill_checkpoint(model, 0)
+
+            model_name = get_model_name(model)
+            checkpoint = self.get_backfill_checkpoint(model)
+            qs = self.get_pending_queryset(model, translatable_fields).filter(pk__gt=checkpoint).order_by("pk")
+            if max_chunks is not None:
+                qs = qs[: (max_chunks - dispatched_chunks) * chunk_size]
+            pks = list(qs.values_list("pk", flat=True))
+            if not pks:
+                in_flight_chunks = self.get_backfill_in_flight_chunks(model)
+                if in_flight_chunks:
+                    logger.info(f"{model_name}: waiting for {in_flight_chunks} dispatched chunks to reset the checkpoint")
+                elif checkpoint:
+                    logger.info(f"{model_name}: pass completed, resetting the checkpoint ({checkpoint})")
+                    self.set_backfill_checkpoint(model, 0)
+                continue
+
+            logger.info(f"{model_name}: dispatching {len(pks)} instances after id {checkpoint}")
+            for index in range(0, len(pks), chunk_size):
+                chunk_pks = pks[index : index + chunk_size]
+                self.add_backfill_in_flight_chunk(model)
+                translate_model_fields_backfill_chunk.delay(model_name, chunk_pks)
+                self.set_backfill_checkpoint(model, chunk_pks[-1])
+                dispatched_chunks += 1
+            if max_chunks is not None and dispatched_chunks >= max_chunks:
+                break
+        logger.info(f"Dispatched chunks: {dispatched_chunks}")
+        return dispatched_chunks
 
 
 @shared_task(queue=Queues.CRONJOB)
@@ -236,6 +460,7 @@ def translate_model_fields(model_name, pk):
             logger.warning(f"Translation is already in progress for {model_name} with pk={pk}.")
             return
         ModelTranslator().translate_model_fields(obj)
+        flush_translation_cache_usage()
         logger.info(f"Translation success for {model_name} with pk={pk}.")
 
 
@@ -248,3 +473,48 @@ def translate_model_fields_in_bulk(model_name, pks):
     )
     for obj in qs:
         ModelTranslator().translate_model_fields(obj)
+    flush_translation_cache_usage()
+
+
+@shared_task(queue=Queues.CRONJOB)
+def translate_remaining_models_fields_backfill(max_chunks=20):
+    # Disabled in DEBUG/Development
+    if settings.DEBUG:
+        logger.warning("DEGUB is enabled.. Skipping translate_remaining_models_fields_backfill")
+        return
+    ModelTranslator().run_backfill(max_chunks=max_chunks)
+
+
+def _translate_model_fields_backfill_chunk(model_name, pks):
+    model = django_apps.get_model(model_name)
+    with ExitStack() as stack:
+        # Same lock as translate_model_fields: the instances being translated by another task are skipped
+        locked_pks = []
+        for pk in pks:
+            if stack.enter_context(redis_lock(key=RedisLockKey.MODEL_TRANSLATION, id=pk, model_name=model_name)):
+                locked_pks.append(pk)
+            else:
+                logger.warning(f"Translation is already in progress for {model_name} with pk={pk}. Skipping.")
+        objs = list(
+            model.objects.filter(
+                pk__in=locked_pks,
+                **{TRANSLATOR_SKIP_FIELD_NAME: False},
+            )
+        )
+        model_translator = ModelTranslator()
+        characters_count = model_translator.get_pending_characters_count(objs)
+        start = time.perf_counter()
+        model_translator.translate_objects_fields(objs)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+    increment_cache_counter(TRANSLATION_BACKFILL_CHARACTERS_KEY, characters_count)
+    increment_cache_counter(TRANSLATION_BACKFILL_DURATION_MS_KEY, duration_ms)
+    logger.info(f"Backfill chunk {model_name} ({pks[0]}-{pks[-1]}): {characters_count} characters in {duration_ms}ms")
+
+
+@shared_task(queue=Queues.HEAVY)
+def translate_model_fields_backfill_chunk(model_name, pks):
+    try:
+        _translate_model_fields_backfill_chunk(model_name, pks)
+    finally:
+        # See ModelTranslator.run_backfill
+        increment_cache_counter(TRANSLATION_BACKFILL_IN_FLIGHT_KEY.format(model_name=model_name), -1)
@@ -5,13 +5,22 @@ import pytest
 from django.conf import settings
 from django.contrib.auth.models import Permission
 from django.core import management
+from django.core.cache import cache
 from django.test import override_settings
 
 from deployments.factories.user import UserFactory
-from lang.translation import IfrcTranslator
+from dref.factories.dref import IdentifiedNeedFactory
+from dref.models import IdentifiedNeed
+from lang.tasks import (
+    TRANSLATION_BACKFILL_CHARACTERS_KEY,
+    ModelTranslator,
+    translate_model_fields_backfill_chunk,
+)
+from lang.translation import IfrcTranslator, flush_translation_cache_usage
+from main.lock import RedisLockKey, redis_lock
 from main.test_case import APITestCase
 
-from .models import String
+from .models import String, TranslationCache
 from .serializers import LanguageBulkActionSerializer
 
 
@@ -226,6 +235,74 @@ class LangTest(APITestCase):
         self.assertEqual(resp.status_code, 200)
 
 
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ModelTranslatorBackfillTest(APITestCase):
+    @mock.patch("lang.tasks.translate_model_fields_backfill_chunk.delay", side_effect=translate_model_fields_backfill_chunk)
+    def test_run_backfill(self, chunk_mock):
+        needs = [
+            IdentifiedNeedFactory.create(description_fr=f"Besoin {index}", translation_module_original_language="fr")
+            for index in range(3)
+        ]
+        model_translator = ModelTranslator()
+
+        # Resumed from the last dispatched instance
+        assert model_translator.run_backfill(chunk_size=2, max_chunks=1, only_models=[IdentifiedNeed]) == 1
+        chunk_mock.assert_called_once_with("dref.IdentifiedNeed", [needs[0].pk, needs[1].pk])
+        assert ModelTranslator.get_backfill_checkpoint(IdentifiedNeed) == needs[1].pk
+        assert model_translator.run_backfill(chunk_size=2, only_models=[IdentifiedNeed]) == 1
+        chunk_mock.assert_called_with("dref.IdentifiedNeed", [needs[2].pk])
+        for need in needs:
+            need.refresh_from_db()
+            assert need.description_en == f'{need.description_fr} translated to "en" using source language "fr"'
+
+        # Nothing pending: the checkpoint is reset for the next pass
+        assert model_translator.run_backfill(chunk_size=2, only_models=[IdentifiedNeed]) == 0
+        assert ModelTranslator.get_backfill_checkpoint(IdentifiedNeed) == 0
+        # Characters sent for translation (3 texts x 3 languages)
+        assert cache.get(TRANSLATION_BACKFILL_CHARACTERS_KEY) == sum(len(need.description_fr) * 3 for need in needs)
+
+    @mock.patch("lang.tasks.translate_model_fields_backfill_chunk.delay")
+    def test_run_backfill_in_flight_chunks(self, chunk_mock):
+        needs = [
+            IdentifiedNeedFactory.create(description_fr=f"Besoin {index}", translation_module_original_language="fr")
+            for index in range(3)
+        ]
+        model_translator = ModelTranslator()
+
+        assert model_translator.run_backfill(chunk_size=2, only_models=[IdentifiedNeed]) == 2
+        assert ModelTranslator.get_backfill_checkpoint(IdentifiedNeed) == needs[2].pk
+        assert ModelTranslator.get_backfill_in_flight_chunks(IdentifiedNeed) == 2
+
+        # Dispatched chunks not finished: the checkpoint is kept (no instances dispatched twice)
+        assert model_translator.run_backfill(chunk_size=2, only_models=[IdentifiedNeed]) == 0
+        assert ModelTranslator.get_backfill_checkpoint(IdentifiedNeed) == needs[2].pk
+
+        for args in chunk_mock.call_args_list:
+            translate_model_fields_backfill_chunk(*args.args)
+        assert ModelTranslator.get_backfill_in_flight_chunks(IdentifiedNeed) == 0
+        assert model_translator.run_backfill(chunk_size=2, only_models=[IdentifiedNeed]) == 0
+        assert ModelTranslator.get_backfill_checkpoint(IdentifiedNeed) == 0
+
+    def test_backfill_chunk_skips_locked_instances(self):
+        needs = [
+            IdentifiedNeedFactory.create(description_fr=f"Besoin {index}", translation_module_original_language="fr")
+            for index in range(2)
+        ]
+        # NOTE: main.lock uses the cache configured at import
+        with mock.patch("main.lock.cache", cache):
+            with redis_lock(key=RedisLockKey.MODEL_TRANSLATION, id=needs[0].pk, model_name="dref.IdentifiedNeed"):
+                translate_model_fields_backfill_chunk("dref.IdentifiedNeed", [need.pk for need in needs])
+
+            # Locked (eg: by translate_model_fields): skipped, retried by the next pass
+            needs[0].refresh_from_db()
+            assert needs[0].description_en is None
+            needs[1].refresh_from_db()
+            assert needs[1].description_en == 'Besoin 1 translated to "en" using source language "fr"'
+            # The locks are released
+            with redis_lock(key=RedisLockKey.MODEL_TRANSLATION, id=needs[1].pk, model_name="dref.IdentifiedNeed") as acquired:
+                assert acquired
+
+
 class TranslatorMockTest(unittest.TestCase):
 
     @pytest.mark.django_db
@@ -266,6 +343,33 @@ class TranslatorMockTest(unittest.TestCase):
             with override_settings(TESTING=False):
                 assert ifrc_translator.translate_text("hello", "es") == "Hola"
 
+    @pytest.mark.django_db
+    @mock.patch("lang.translation.requests")
+    def test_ifrc_translator_cache(self, requests_mock):
+        requests_mock.post.return_value.json.return_value = [{"translations": [{"text": "<p>Hola</p>", "to": "es"}]}]
+        text = "<p>Hello</p><p>World</p>"
+        with override_settings(
+            TESTING=False,
+            AZURE_TRANSL_LIMIT=15,
+            IFRC_TRANSLATION_DOMAIN="http://example.org",
+            IFRC_TRANSLATION_HEADER_API_KEY="dummy-api-header-key",
+        ):
+            ifrc_translator = IfrcTranslator()
+            assert ifrc_translator.split_text(text) == ["<p>Hello</p>", "<p>World</p>"]
+            # Oversized texts are translated and cached per chunk
+            assert ifrc_translator.translate_text(text, "es", "en", table_field="a") == "<p>Hola</p><p>Hola</p>"
+            assert requests_mock.post.call_count == 2
+            assert ifrc_translator.translate_text(text, "es", "en", table_field="b") == "<p>Hola</p><p>Hola</p>"
+            assert requests_mock.post.call_count == 2
+            assert ifrc_translator.get_cached_translations_in_bulk(
+                [(text, ["es", "fr"], "en", "a"), ("<p>Hello</p>", ["es"], "en", "a")]
+            ) == {(text, "en"): {"es": "<p>Hola</p><p>Hola</p>"}, ("<p>Hello</p>", "en"): {"es": "<p>Hola</p>"}}
+
+        # Hit accounting is written when flushed
+        flush_translation_cache_usage()
+        cache = TranslationCache.objects.get(text="<p>Hello</p>", dest_language="es")
+        assert (cache.num_calls, cache.other_fields) == (3, True)
+
     def test_ifrc_translator_detect_text_content_type(self):
         valid_htmls = [
             # Defined using the behaviour of aws.
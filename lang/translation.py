@@ -1,12 +1,15 @@
 import hashlib
 import logging
 import threading
+import time
+import typing
+from collections import defaultdict
 
 import boto3
 import requests
 from bs4 import BeautifulSoup
 from django.conf import settings
-from django.db.models import BooleanField, Case, F, Value, When
+from django.db.models import F
 from django.utils import timezone
 from django.utils.module_loading import import_string
 
@@ -22,14 +25,116 @@ IFRC_TRANSLATION_CALL_COUNT = 0
 IFRC_TRANSLATION_CALL_LOCK = threading.Lock()
 
 
+# TranslationCache stats (num_calls, last_used, other_fields) are written when flushed
+TRANSLATION_CACHE_USAGE_FLUSH_INTERVAL = 60  # seconds
+TRANSLATION_CACHE_USAGE_MAX_PENDING = 1000
+
+
 def sha256_hash(text):
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
+class TranslationCacheUsageBuffer:
+    """
+    Write-behind buffer for the TranslationCache stats, instead of one or two UPDATEs per cache hit
+    Flushed periodically (when a hit is added) and after the translation tasks (See lang.tasks)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.num_calls = defaultdict(int)
+        self.other_fields_ids = set()
+        self.last_used = None
+        self.last_flush_at = time.monotonic()
+
+    def add(self, cache_id, other_fields=False):
+        with self.lock:
+            self.num_calls[cache_id] += 1
+            if other_fields:
+                self.other_fields_ids.add(cache_id)
+            self.last_used = timezone.now()
+            should_flush = (
+                len(self.num_calls) >= TRANSLATION_CACHE_USAGE_MAX_PENDING
+                or time.monotonic() - self.last_flush_at >= TRANSLATION_CACHE_USAGE_FLUSH_INTERVAL
+            )
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            num_calls, other_fields_ids, last_used = self.num_calls, self.other_fields_ids, self.last_used
+            self._reset()
+        if not num_calls:
+            return
+        # One UPDATE per distinct hit count
+        ids_by_num_calls = defaultdict(list)
+        for cache_id, count in num_calls.items():
+            ids_by_num_calls[count].append(cache_id)
+        try:
+            for count, cache_ids in ids_by_num_calls.items():
+                TranslationCache.objects.filter(id__in=cache_ids).update(
+                    last_used=last_used,
+                    num_calls=F("num_calls") + count,
+                )
+            if other_fields_ids:
+                TranslationCache.objects.filter(id__in=other_fields_ids, other_fields=False).update(other_fields=True)
+        except Exception:
+            # NOTE: Stats only
+            logger.warning("Failed to flush the translation cache usage", exc_info=True)
+
+
+translation_cache_usage = TranslationCacheUsageBuffer()
+
+
+def flush_translation_cache_usage():
+    translation_cache_usage.flush()
+
+
+def get_translation_cache_entries(
+    keys: typing.Iterable[typing.Tuple[str, str, str]],
+) -> typing.Dict[typing.Tuple[str, str, str], TranslationCache]:
+    """
+    Cache entries of (text_hash, source_language, dest_language) keys, using one query
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    qs = TranslationCache.objects.filter(
+        text_hash__in={text_hash for text_hash, _, _ in keys},
+        source_language__in={source_language for _, source_language, _ in keys},
+        dest_language__in={dest_language for _, _, dest_language in keys},
+    ).only("id", "text_hash", "source_language", "dest_language", "translated_text", "table_field")
+    entries = {}
+    for entry in qs:
+        key = (entry.text_hash, entry.source_language, entry.dest_language)
+        if key in keys:
+            entries[key] = entry
+    return entries
+
+
 class BaseTranslator:
     def get_cached_translations(self, text, dest_languages, source_language=None, table_field=""):
         return {}
 
+    def get_cached_translations_in_bulk(self, items):
+        """
+        items: [(text, dest_languages, source_language, table_field), ...]
+        Returns {(text, source_language): {dest_language: translated_text}}
+        """
+        translations = {}
+        for text, dest_languages, source_language, table_field in items:
+            if cached := self.get_cached_translations(
+                text,
+                dest_languages,
+                source_language=source_language,
+                table_field=table_field,
+            ):
+                translations[(text, source_language)] = cached
+        return translations
+
     def _fake_translation(self, text, dest_language, source_language, table_field=""):
         """
         This is only used for test
@@ -110,29 +215,28 @@ class IfrcTranslator(BaseTranslator):
             truncate_here += len(tag)
         return truncate_here
 
-    def translate_text(self, text, dest_language, source_language=None, table_field=""):
-        if settings.TESTING:
-            # NOTE: Mocking for test purpose
-            return self._fake_translation(text, dest_language, source_language)
-
+    @classmethod
+    def split_text(cls, text, limit=None) -> typing.List[str]:
+        """
+        A workaround to handle oversized HTML+CSS texts, usually tables:
+        Split the text at the last </table> (or </p>) before the limit (AZURE_TRANSL_LIMIT)
+        """
+        limit = limit or settings.AZURE_TRANSL_LIMIT
+        chunks = []
+        while len(text) > limit:
+            truncate_here = cls.find_last_slashtable(text, limit)
+            if truncate_here == -1:
+                truncate_here = cls.find_last_slashp(text, limit)
+            if truncate_here == -1:
+                truncate_here = limit
+            chunks.append(text[:truncate_here])
+            text = text[truncate_here:]
+        chunks.append(text)
+        return chunks
+
+    def _translate_chunk(self, text, dest_language, source_language=None, table_field=""):
         global IFRC_TRANSLATION_CALL_COUNT
 
-        # A workaround to handle oversized HTML+CSS texts, usually tables:
-        textTail = ""
-        if len(text) > settings.AZURE_TRANSL_LIMIT:
-            truncate_here = self.find_last_slashtable(text, settings.AZURE_TRANSL_LIMIT)
-            if truncate_here != -1:
-                textTail = text[truncate_here:]
-                text = text[:truncate_here]
-            else:
-                truncate_here = self.find_last_slashp(text, settings.AZURE_TRANSL_LIMIT)
-                if truncate_here != -1:
-                    textTail = text[truncate_here:]
-                    text = text[:truncate_here]
-                else:
-                    textTail = text[settings.AZURE_TRANSL_LIMIT :]
-                    text = text[: settings.AZURE_TRANSL_LIMIT]
-
         payload = {
             "text": text,
             "from": source_language,
@@ -143,32 +247,6 @@ class IfrcTranslator(BaseTranslator):
             # So only sending if html
             payload["textType"] = "html"
 
-        # Try cache at first (for shorter texts)
-        use_cache = len(text) < 300
-
-        if use_cache:
-            text_hash = sha256_hash(text)
-            cache = TranslationCache.objects.filter(
-                text_hash=text_hash,
-                source_language=source_language or "",  # source_language can be "detected"
-                dest_language=dest_language,
-            ).first()
-            if cache:
-                cache_other_fields = cache.table_field != table_field
-                TranslationCache.objects.filter(id=cache.pk).update(
-                    last_used=timezone.now(),
-                    num_calls=F("num_calls") + 1,
-                    other_fields=Case(
-                        When(other_fields=True, then=Value(True)),
-                        default=Value(cache_other_fields),
-                        output_field=BooleanField(),
-                    ),
-                )
-                logger.info(
-                    f"Translation cache hit, {source_language}>{dest_language} {table_field} – {cache.num_calls}: {text[:30]}... "
-                )
-                return cache.translated_text
-
         with IFRC_TRANSLATION_CALL_LOCK:
             IFRC_TRANSLATION_CALL_COUNT += 1
             logger.info(f"IFRC translation API call count: {IFRC_TRANSLATION_CALL_COUNT}")
@@ -180,52 +258,88 @@ class IfrcTranslator(BaseTranslator):
         )
 
         # Not using == 200 – it would break tests with MagicMock name=requests.post() results
-        if response.status_code != 500:
-            translated = response.json()[0]["translations"][0]["text"]
-
-            # Cache the translation if original text was short enough
-            if use_cache:
-                obj, created = TranslationCache.objects.get_or_create(
-                    text=text,
-                    text_hash=text_hash,
-                    source_language=source_language or "",  # source_language can be "detected"
-                    dest_language=dest_language,
-                    defaults={
-                        "translated_text": translated,
-                        "table_field": table_field or "",
-                        "last_used": timezone.now(),
-                    },
-                )
-                if not created:
-                    TranslationCache.objects.filter(pk=obj.pk).update(
-                        last_used=timezone.now(),
-                        num_calls=F("num_calls") + 1,
-                    )
-            return translated + textTail
+        if response.status_code == 500:
+            return None
+        translated = response.json()[0]["translations"][0]["text"]
+
+        obj, created = TranslationCache.objects.get_or_create(
+            text_hash=sha256_hash(text),
+            source_language=source_language or "",  # source_language can be "detected"
+            dest_language=dest_language,
+            defaults={
+                "text": text,
+                "translated_text": translated,
+                "table_field": table_field or "",
+                "last_used": timezone.now(),
+            },
+        )
+        if not created:
+            translation_cache_usage.add(obj.pk)
+        return translated
 
-    def get_cached_translations(self, text, dest_languages, source_language=None, table_field=""):
-        if not dest_languages or len(text) >= 300:
-            return {}
-
-        text_hash = sha256_hash(text)
-        source_language = source_language or ""
-        caches = TranslationCache.objects.filter(
-            text_hash=text_hash,
-            source_language=source_language,
-            dest_language__in=dest_languages,
+    def translate_text(self, text, dest_language, source_language=None, table_field=""):
+        if settings.TESTING:
+            # NOTE: Mocking for test purpose
+            return self._fake_translation(text, dest_language, source_language)
+
+        # Oversized texts are translated (and cached) per chunk
+        chunks = self.split_text(text)
+        chunk_hashes = [sha256_hash(chunk) for chunk in chunks]
+        source_language_key = source_language or ""  # source_language can be "detected"
+        cache_entries = get_translation_cache_entries(
+            (chunk_hash, source_language_key, dest_language) for chunk_hash in chunk_hashes
         )
-        cache_by_lang = {cache.dest_language: cache for cache in caches}
-        if not cache_by_lang:
-            return {}
-        cache_ids = [cache.id for cache in cache_by_lang.values()]
-        TranslationCache.objects.filter(id__in=cache_ids).update(
-            last_used=timezone.now(),
-            num_calls=F("num_calls") + 1,
+
+        translated_chunks = {}
+        for chunk, chunk_hash in zip(chunks, chunk_hashes):
+            if chunk_hash in translated_chunks:
+                continue
+            cache = cache_entries.get((chunk_hash, source_language_key, dest_language))
+            if cache:
+                translation_cache_usage.add(cache.pk, other_fields=cache.table_field != table_field)
+                logger.info(f"Translation cache hit, {source_language}>{dest_language} {table_field}: {chunk[:30]}... ")
+                translated_chunks[chunk_hash] = cache.translated_text
+                continue
+            translated = self._translate_chunk(chunk, dest_language, source_language=source_language, table_field=table_field)
+            if translated is None:
+                return None
+            translated_chunks[chunk_hash] = translated
+        return "".join(translated_chunks[chunk_hash] for chunk_hash in chunk_hashes)
+
+    def get_cached_translations(self, text, dest_languages, source_language=None, table_field=""):
+        return self.get_cached_translations_in_bulk([(text, dest_languages, source_language, table_field)]).get(
+            (text, source_language), {}
         )
-        TranslationCache.objects.filter(id__in=cache_ids, other_fields=False).exclude(table_field=table_field).update(
-            other_fields=True,
+
+    def get_cached_translations_in_bulk(self, items):
+        """
+        Cached translations of multiple texts and languages, using one query
+        A text is cached if all of its chunks are cached (See split_text)
+        """
+        items = [
+            (text, dest_languages, source_language, table_field, [sha256_hash(chunk) for chunk in self.split_text(text)])
+            for text, dest_languages, source_language, table_field in items
+            if text and dest_languages
+        ]
+        cache_entries = get_translation_cache_entries(
+            (chunk_hash, source_language or "", dest_language)
+            for _, dest_languages, source_language, _, chunk_hashes in items
+            for dest_language in dest_languages
+            for chunk_hash in chunk_hashes
         )
-        return {lang: cache.translated_text for lang, cache in cache_by_lang.items()}
+
+        translations = {}
+        for text, dest_languages, source_language, table_field, chunk_hashes in items:
+            for dest_language in dest_languages:
+                entries = [cache_entries.get((chunk_hash, source_language or "", dest_language)) for chunk_hash in chunk_hashes]
+                if not all(entries):
+                    continue
+                for entry in entries:
+                    translation_cache_usage.add(entry.pk, other_fields=entry.table_field != table_field)
+                translations.setdefault((text, source_language), {})[dest_language] = "".join(
+                    entry.translated_text for entry in entries
+                )
+        return translations
 
 
 def get_translator_class():
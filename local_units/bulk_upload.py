@@ -202,6 +202,8 @@ class BaseBulkUpload(Generic[ContextType]):
         self.failed_count: int = 0
         self.bulk_manager: BulkCreateManager = BulkCreateManager(chunk_size=500)
         self.error_writer: Optional[ErrorWriter] = None
+        # NOTE: Shared by the serializers of all the rows (lookup maps, related instances, country boundaries)
+        self.serializer_context: dict = {"related_instances": {}}
 
     def get_context(self) -> ContextType:
         raise NotImplementedError("Subclasses must implement get_context method.")
@@ -221,13 +223,17 @@ class BaseBulkUpload(Generic[ContextType]):
         return True
 
     def process_row(self, data: Dict[str, Any]) -> bool:
-        serializer = self.serializer_class(data=data)
+        serializer = self.serializer_class(data=data, context=self.serializer_context)
         if serializer.is_valid():
             self.bulk_manager.add(LocalUnit(**serializer.validated_data))
             return True
         self.error_detail = serializer.errors
         return False
 
+    def done(self) -> None:
+        """Save the remaining rows"""
+        self.bulk_manager.done()
+
     def run(self) -> None:
         header_row_index = 2
         data_row_index = header_row_index + 2
@@ -283,7 +289,7 @@ class BaseBulkUpload(Generic[ContextType]):
                     if self.failed_count > 0:
                         raise BulkUploadError()
 
-                    self.bulk_manager.done()
+                    self.done()
                     self._finalize_success()
 
                 workbook.close()
@@ -382,6 +388,8 @@ class BulkUploadHealthData(BaseBulkUpload[LocalUnitUploadContext]):
         self.health_field_names = get_model_field_names(
             HealthData,
         )
+        # Validated rows waiting to be saved: (HealthData, many-to-many ids, LocalUnit data)
+        self.health_rows: list[tuple[HealthData, dict[str, list[int]], dict[str, any]]] = []
 
     def get_context(self) -> LocalUnitUploadContext:
         return LocalUnitUploadContext(
@@ -410,12 +418,50 @@ class BulkUploadHealthData(BaseBulkUpload[LocalUnitUploadContext]):
         health_data = {k: data.get(k) for k in data.keys() if k in self.health_field_names}
 
         if health_data:
-            health_serializer = HealthDataBulkUploadSerializer(data=health_data)
+            health_serializer = HealthDataBulkUploadSerializer(data=health_data, context=self.serializer_context)
             if not health_serializer.is_valid():
                 self.error_detail = health_serializer.errors
                 return False
-            health_instance = health_serializer.save()
             for k in health_data.keys():
                 data.pop(k, None)
-            data["health"] = health_instance.pk
-            return super().process_row(data)
+            serializer = self.serializer_class(data=data, context=self.serializer_context)
+            if not serializer.is_valid():
+                self.error_detail = serializer.errors
+                return False
+            health_instance, m2m_data = health_serializer.build_instance()
+            self.health_rows.append((health_instance, m2m_data, serializer.validated_data))
+            if len(self.health_rows) >= self.bulk_manager.chunk_size:
+                self._save_health_rows()
+            return True
+
+    def _save_health_rows(self) -> None:
+        """
+        Save the pending rows using a fixed number of queries:
+        HealthData, one per many-to-many field and LocalUnit
+        """
+        health_rows, self.health_rows = self.health_rows, []
+        if not health_rows or self.failed_count > 0:
+            # NOTE: Nothing is saved if any row failed
+            return
+
+        health_instances = HealthData.objects.bulk_create([health_instance for health_instance, _, _ in health_rows])
+
+        for field in HealthData._meta.many_to_many:
+            through_model = field.remote_field.through
+            source_attname = through_model._meta.get_field(field.m2m_field_name()).attname
+            target_attname = through_model._meta.get_field(field.m2m_reverse_field_name()).attname
+            through_model.objects.bulk_create(
+                [
+                    through_model(**{source_attname: health_instance.pk, target_attname: target_id})
+                    for health_instance, (_, m2m_data, _) in zip(health_instances, health_rows)
+                    # NOTE: dict.fromkeys removes the duplicates while keeping the order
+                    for target_id in dict.fromkeys(m2m_data.get(field.name) or [])
+                ]
+            )
+
+        for health_instance, (_, _, local_unit_data) in zip(health_instances, health_rows):
+            self.bulk_manager.add(LocalUnit(**local_unit_data, health=health_instance))
+
+    def done(self) -> None:
+        self._save_health_rows()
+        super().done()
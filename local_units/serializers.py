@@ -39,6 +39,30 @@ from .models import (
 )
 
 
+class CountryBoundaryMixin:
+    """
+    Boundary of the country (CountryGeoms) to validate the location of the local units
+    """
+
+    def get_country_boundary(self, country) -> MultiPolygon:
+        # NOTE: Cached in the context, parsing the country geometry is slow for the bulk upload rows
+        country_boundaries = self.context.setdefault("country_boundaries", {})
+        if country.pk not in country_boundaries:
+            country_json = json.loads(country.countrygeoms.geom.geojson)
+            coordinates = country_json["coordinates"]
+            # Convert to Shapely Polygons
+            polygons = []
+            for polygon_coords in coordinates:
+                exterior = polygon_coords[0]
+                interiors = polygon_coords[1:] if len(polygon_coords) > 1 else []
+                polygon = Polygon(exterior, interiors)
+                polygons.append(polygon)
+
+            # Create a Shapely MultiPolygon
+            country_boundaries[country.pk] = MultiPolygon(polygons)
+        return country_boundaries[country.pk]
+
+
 class LocationSerializer(serializers.Serializer):
     lat = serializers.FloatField(required=True)
     lng = serializers.FloatField(required=True)
@@ -262,7 +286,7 @@ changing the serializer might effect the data of previous_data
 """
 
 
-class PrivateLocalUnitDetailSerializer(NestedCreateMixin, NestedUpdateMixin):
+class PrivateLocalUnitDetailSerializer(CountryBoundaryMixin, NestedCreateMixin, NestedUpdateMixin):
     country_details = LocalUnitCountrySerializer(source="country", read_only=True)
     type_details = LocalUnitTypeSerializer(source="type", read_only=True)
     level_details = LocalUnitLevelSerializer(source="level", read_only=True)
@@ -365,19 +389,7 @@ class PrivateLocalUnitDetailSerializer(NestedCreateMixin, NestedUpdateMixin):
         lng = location_json.get("lng")
         input_point = Point(lng, lat)
         if country.bbox:
-            country_json = json.loads(country.countrygeoms.geom.geojson)
-            coordinates = country_json["coordinates"]
-            # Convert to Shapely Polygons
-            polygons = []
-            for polygon_coords in coordinates:
-                exterior = polygon_coords[0]
-                interiors = polygon_coords[1:] if len(polygon_coords) > 1 else []
-                polygon = Polygon(exterior, interiors)
-                polygons.append(polygon)
-
-            # Create a Shapely MultiPolygon
-            shapely_multipolygon = MultiPolygon(polygons)
-            if not input_point.within(shapely_multipolygon):
+            if not input_point.within(self.get_country_boundary(country)):
                 raise serializers.ValidationError(
                     {"location_json": gettext("Input coordinates is outside country %s boundary" % country.name)}
                 )
@@ -393,19 +405,7 @@ class PrivateLocalUnitDetailSerializer(NestedCreateMixin, NestedUpdateMixin):
         lng = location_json.get("lng")
         input_point = Point(lng, lat)
         if country.bbox:
-            country_json = json.loads(country.countrygeoms.geom.geojson)
-            coordinates = country_json["coordinates"]
-            # Convert to Shapely Polygons
-            polygons = []
-            for polygon_coords in coordinates:
-                exterior = polygon_coords[0]
-                interiors = polygon_coords[1:] if len(polygon_coords) > 1 else []
-                polygon = Polygon(exterior, interiors)
-                polygons.append(polygon)
-
-            # Create a Shapely MultiPolygon
-            shapely_multipolygon = MultiPolygon(polygons)
-            if not input_point.within(shapely_multipolygon):
+            if not input_point.within(self.get_country_boundary(country)):
                 raise serializers.ValidationError(
                     {"location_json": gettext("Input coordinates is outside country %s boundary" % country.name)}
                 )
@@ -792,7 +792,25 @@ class LocalUnitTemplateFilesSerializer(serializers.Serializer):
 # NOTE: The `HealthDataBulkUploadSerializer` is used to validate the data for bulk upload of local unit health care type.
 
 
+class BulkUploadRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Caches the related instances in the serializer context
+    NOTE: Bulk upload uses the same context for all the rows, avoiding a query per related field per row
+    """
+
+    def to_internal_value(self, data):
+        related_instances = self.context.get("related_instances")
+        if related_instances is None:
+            return super().to_internal_value(data)
+        key = (self.get_queryset().model, data)
+        if key not in related_instances:
+            related_instances[key] = super().to_internal_value(data)
+        return related_instances[key]
+
+
 class HealthDataBulkUploadSerializer(NestedCreateMixin):
+    serializer_related_field = BulkUploadRelatedField
+
     class Meta:
         model = HealthData
         fields = "__all__"
@@ -806,16 +824,21 @@ class HealthDataBulkUploadSerializer(NestedCreateMixin):
         """Only load model lookups when needed"""
         if self._maps_loaded:
             return
-        self.affiliation_map = self._build_map(Affiliation)
-        self.functionality_map = self._build_map(Functionality)
-        self.facilitytype_map = self._build_map(FacilityType)
-        self.primaryhcc_map = self._build_map(PrimaryHCC)
-        self.hospitaltype_map = self._build_map(HospitalType)
-
-        self.generalmedicalservice_map = self._build_map(GeneralMedicalService)
-        self.specializedmedicalservice_map = self._build_map(SpecializedMedicalService)
-        self.bloodservice_map = self._build_map(BloodService)
-        self.professionaltrainingfacility_map = self._build_map(ProfessionalTrainingFacility)
+        # NOTE: Shared using the context, bulk upload uses the same context for all the rows
+        if "health_data_maps" not in self.context:
+            self.context["health_data_maps"] = {
+                "affiliation_map": self._build_map(Affiliation),
+                "functionality_map": self._build_map(Functionality),
+                "facilitytype_map": self._build_map(FacilityType),
+                "primaryhcc_map": self._build_map(PrimaryHCC),
+                "hospitaltype_map": self._build_map(HospitalType),
+                "generalmedicalservice_map": self._build_map(GeneralMedicalService),
+                "specializedmedicalservice_map": self._build_map(SpecializedMedicalService),
+                "bloodservice_map": self._build_map(BloodService),
+                "professionaltrainingfacility_map": self._build_map(ProfessionalTrainingFacility),
+            }
+        for name, mapping in self.context["health_data_maps"].items():
+            setattr(self, name, mapping)
         self._maps_loaded = True
 
     def _build_map(self, model):
@@ -912,9 +935,21 @@ class HealthDataBulkUploadSerializer(NestedCreateMixin):
             getattr(instance, field).set(ids)
         return instance
 
+    def build_instance(self) -> tuple[HealthData, dict[str, list[int]]]:
+        """
+        Unsaved instance and the many-to-many ids of the validated data
+        NOTE: Used by the bulk upload to save the rows using bulk_create
+        """
+        validated_data = dict(self.validated_data)
+        m2m_data = dict(self._m2m_data)
+        for field in HealthData._meta.many_to_many:
+            if field.name in validated_data:
+                m2m_data[field.name] = [obj.pk for obj in validated_data.pop(field.name) or []]
+        return HealthData(**validated_data), m2m_data
+
 
 # NOTE: The `LocalUnitBulkUploadDetailSerializer` is used to validate the data for bulk upload of local units.
-class LocalUnitBulkUploadDetailSerializer(serializers.ModelSerializer):
+class LocalUnitBulkUploadDetailSerializer(CountryBoundaryMixin, serializers.ModelSerializer):
     location = serializers.CharField(required=False)
     latitude = serializers.FloatField(write_only=True, required=False)
     longitude = serializers.FloatField(write_only=True, required=False)
@@ -923,13 +958,17 @@ class LocalUnitBulkUploadDetailSerializer(serializers.ModelSerializer):
     level = serializers.CharField(required=False, allow_null=True)
     health = serializers.PrimaryKeyRelatedField(queryset=HealthData.objects.all(), required=False, allow_null=True)
 
+    serializer_related_field = BulkUploadRelatedField
+
     class Meta:
         model = LocalUnit
         fields = "__all__"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.level_map = {lvl.name.lower(): lvl for lvl in LocalUnitLevel.objects.all()}
+        if "level_map" not in self.context:
+            self.context["level_map"] = {lvl.name.lower(): lvl for lvl in LocalUnitLevel.objects.all()}
+        self.level_map = self.context["level_map"]
 
     def validate_date_of_data(self, value: str):
         today = datetime.today().strftime("%Y-%m-%d")
@@ -981,19 +1020,7 @@ class LocalUnitBulkUploadDetailSerializer(serializers.ModelSerializer):
 
         input_point = Point(longitude, latitude)
         if country.bbox:
-            country_json = json.loads(country.countrygeoms.geom.geojson)
-            coordinates = country_json["coordinates"]
-            # Convert to Shapely Polygons
-            polygons = []
-            for polygon_coords in coordinates:
-                exterior = polygon_coords[0]
-                interiors = polygon_coords[1:] if len(polygon_coords) > 1 else []
-                polygon = Polygon(exterior, interiors)
-                polygons.append(polygon)
-
-            # Create a Shapely MultiPolygon
-            shapely_multipolygon = MultiPolygon(polygons)
-            if not input_point.within(shapely_multipolygon):
+            if not input_point.within(self.get_country_boundary(country)):
                 raise serializers.ValidationError(
                     {"location": gettext("Input coordinates is outside country %s boundary" % country.name)}
                 )
@@ -521,6 +521,50 @@ class TestLocalUnitCreate(APITestCase):
         request_change = LocalUnitChangeRequest.objects.all()
         self.assertEqual(request_change.count(), 1)
 
+    def test_create_update_local_unit_country_boundary(self):
+        country = CountryFactory.create(
+            name="Afghanistan",
+            iso3="AFG",
+            record_type=CountryType.COUNTRY,
+            region=self.region,
+            bbox=Polygon(((60.0, 29.0), (75.0, 29.0), (75.0, 38.0), (60.0, 38.0), (60.0, 29.0))),
+        )
+        CountryGeoms.objects.create(country=country, geom=MultiPolygon(country.bbox))
+        level = LocalUnitLevel.objects.create(level=1, name="Code 1")
+        data = {
+            "english_branch_name": "Kabul branch",
+            "type": self.local_unit_type.id,
+            "country": country.id,
+            "draft": False,
+            "level": level.id,
+            "date_of_data": "2024-05-13",
+            "update_reason_overview": "Moved",
+            # Outside of the country boundary
+            "location_json": {"lat": 42.066667, "lng": 19.983333},
+        }
+        self.client.force_authenticate(self.root_user)
+        response = self.client.post("/api/v2/local-units/", data=data, format="json")
+        self.assert_400(response)
+        self.assertIn("location_json", response.data)
+
+        data["location_json"] = {"lat": 34.5, "lng": 69.2}
+        response = self.client.post("/api/v2/local-units/", data=data, format="json")
+        self.assert_201(response)
+        local_unit_id = response.data["id"]
+        response = self.client.post(f"/api/v2/local-units/{local_unit_id}/validate/")
+        self.assert_200(response)
+
+        data["location_json"] = {"lat": -15.79, "lng": -47.88}
+        response = self.client.put(f"/api/v2/local-units/{local_unit_id}/", data=data, format="json")
+        self.assert_400(response)
+        self.assertIn("location_json", response.data)
+
+        data["location_json"] = {"lat": 31.6, "lng": 65.7}
+        response = self.client.put(f"/api/v2/local-units/{local_unit_id}/", data=data, format="json")
+        self.assert_200(response)
+        local_unit = LocalUnit.objects.get(id=local_unit_id)
+        self.assertEqual((local_unit.location.x, local_unit.location.y), (65.7, 31.6))
+
     def test_create_update_local_unit_health(self):
         region = Region.objects.create(name=2)
         country = Country.objects.create(name="Philippines", iso3="PHL", iso="PH", region=region)
@@ -1749,6 +1793,35 @@ class BulkUploadHealthDataTests(TestCase):
         cls.assertEqual(LocalUnit.objects.count(), 3)
         cls.assertEqual(HealthData.objects.count(), 3)
 
+    def test_bulk_upload_health_links_local_units_and_services(cls):
+        """
+        Should link each new LocalUnit to its HealthData and save the many-to-many services.
+        """
+        cls.bulk_upload = LocalUnitBulkUploadFactory.create(
+            country=cls.country2,
+            local_unit_type=cls.local_unit_type,
+            triggered_by=cls.user,
+            file=cls.create_upload_file(),
+            status=LocalUnitBulkUpload.Status.PENDING,
+        )
+        runner = BulkUploadHealthData(cls.bulk_upload)
+        runner.run()
+        cls.bulk_upload.refresh_from_db()
+        cls.assertEqual(cls.bulk_upload.status, LocalUnitBulkUpload.Status.SUCCESS)
+
+        local_units = LocalUnit.objects.filter(country=cls.country2)
+        cls.assertEqual(local_units.count(), 3)
+        cls.assertEqual(local_units.filter(health__isnull=True).count(), 0)
+        cls.assertEqual(len(set(local_units.values_list("health", flat=True))), 3)
+        for health_data in HealthData.objects.all():
+            cls.assertEqual(list(health_data.general_medical_services.all()), [cls.general_medical_services])
+            cls.assertEqual(
+                list(health_data.specialized_medical_beyond_primary_level.all()),
+                [cls.specialized_medical_beyond_primary_level],
+            )
+            cls.assertEqual(list(health_data.blood_services.all()), [cls.blood_services])
+            cls.assertEqual(list(health_data.professional_training_facilities.all()), [cls.professional_training_facilities])
+
     def test_empty_health_template_file(cls):
         """
         Test upload file is empty
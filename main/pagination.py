@@ -0,0 +1,172 @@
+import base64
+import binascii
+import functools
+import json
+import operator
+import typing
+from collections import OrderedDict
+
+from django.db import models
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class LimitOffsetOrCursorPagination(LimitOffsetPagination):
+    """
+    LimitOffsetPagination (default) with an opt-in keyset (cursor) mode
+
+    Cursor mode is used when the cursor query param is provided (empty value for the first page), eg:
+    - ?cursor=&limit=100
+    - ?cursor=<next/previous cursor of the previous response>
+    The records are ordered by view.cursor_ordering (a unique and indexed key, eg: ("-created_at", "-id"))
+    instead of the ordering query param, and each page is fetched using a filter on that key instead of an OFFSET.
+    The count (COUNT(*) of the filtered records) can be skipped using ?count=false
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    default_cursor_ordering = ("-pk",)
+    invalid_cursor_message = "Invalid cursor"
+
+    cursor_mode = False
+
+    @staticmethod
+    def encode_cursor(position: list, reverse: bool) -> str:
+        value = json.dumps({"p": position, "r": reverse}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(value.encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> typing.Tuple[typing.Optional[list], bool]:
+        if not cursor:
+            return None, False
+        try:
+            value = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            position, reverse = value["p"], bool(value.get("r", False))
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def get_field_name(field: str) -> str:
+        return field.lstrip("-")
+
+    @staticmethod
+    def invert_ordering(ordering: typing.Iterable[str]) -> typing.List[str]:
+        return [field[1:] if field.startswith("-") else f"-{field}" for field in ordering]
+
+    @classmethod
+    def get_keyset_filter(cls, ordering: typing.List[str], position: list) -> models.Q:
+        """
+        Records after the position, for ordering (-a, -b): a < x OR (a = x AND b < y)
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            conditions.append(
+                models.Q(
+                    **{cls.get_field_name(previous_field): value for previous_field, value in zip(ordering[:index], position)},
+                    **{f"{cls.get_field_name(field)}__{lookup}": position[index]},
+                )
+            )
+        return functools.reduce(operator.or_, conditions)
+
+    def get_position(self, instance) -> list:
+        position = []
+        for field in self.ordering:
+            value = getattr(instance, self.get_field_name(field))
+            position.append(value.isoformat() if hasattr(value, "isoformat") else value)
+        return position
+
+    def is_count_required(self, request) -> bool:
+        return request.query_params.get(self.count_query_param, "true").lower() not in ("false", "0")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view=view)
+        return self.paginate_queryset_by_cursor(queryset, request, view=view)
+
+    def paginate_queryset_by_cursor(self, queryset, request, view=None):
+        self.cursor_mode = True
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.ordering = list(getattr(view, "cursor_ordering", self.default_cursor_ordering))
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        self.count = self.get_count(queryset) if self.is_count_required(request) else None
+
+        ordering = self.invert_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+        # NOTE: One extra record to know if there is a next page (previous page when going backward)
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor, self.previous_cursor = None, None
+        if results:
+            first, last = self.get_position(results[0]), self.get_position(results[-1])
+            if reverse:
+                self.previous_cursor = self.encode_cursor(first, True) if has_more else None
+                self.next_cursor = self.encode_cursor(last, False)
+            else:
+                self.previous_cursor = self.encode_cursor(first, True) if position is not None else None
+                self.next_cursor = self.encode_cursor(last, False) if has_more else None
+        elif reverse:
+            # Nothing before the position: link to the first page
+            self.next_cursor = ""
+        return results
+
+    def get_cursor_link(self, cursor: typing.Optional[str]) -> typing.Optional[str]:
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if self.cursor_mode:
+            return self.get_cursor_link(self.next_cursor)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.cursor_mode:
+            return self.get_cursor_link(self.previous_cursor)
+        return super().get_previous_link()
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            *super().get_schema_operation_parameters(view),
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use the keyset (cursor) pagination: empty for the first page, then the next/previous cursors.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set false to skip the count (cursor pagination only).",
+                "schema": {"type": "boolean"},
+            },
+        ]
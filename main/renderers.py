@@ -0,0 +1,125 @@
+import itertools
+import typing
+
+import unicodecsv as csv
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework_csv.misc import Echo
+from rest_framework_csv.renderers import PaginatedCSVRenderer
+
+STREAMING_CSV_CHUNK_SIZE = 500
+
+
+def get_header_accessor(header: str, level_sep: str = ".") -> typing.Callable[[typing.Any], typing.Any]:
+    """
+    Accessor of the value of a CSV header (eg: "country_to.name", "annual_splits.0.year") in a serialized row
+    Same value as CSVRenderer.flatten_item(row).get(header), without flattening the whole row
+    """
+    keys = header.split(level_sep) if header else []
+
+    def accessor(row):
+        value = row
+        for key in keys:
+            if isinstance(value, dict):
+                if key not in value:
+                    return None
+                value = value[key]
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                return None
+        # NOTE: dict/list values are flattened into other columns
+        if isinstance(value, (dict, list)):
+            return None
+        return value
+
+    return accessor
+
+
+class StreamingPaginatedCSVRenderer(PaginatedCSVRenderer):
+    """
+    PaginatedCSVRenderer which can also write the rows to a StreamingHttpResponse (See StreamingCSVListMixin)
+    When the header is provided (renderer_context["header"]), the rows are flattened using the header accessors
+    """
+
+    def get_rows(self, rows: typing.Iterable[dict]) -> typing.Iterable[dict]:
+        """Rows written to the CSV (Used by the subclasses to split the rows)"""
+        return rows
+
+    def tablize(self, data, header=None, labels=None):
+        if not header:
+            yield from super().tablize(data, header=header, labels=labels)
+            return
+        yield [labels.get(field, field) for field in header] if labels else header
+        accessors = [get_header_accessor(field, self.level_sep) for field in header]
+        for item in data:
+            yield [accessor(item) for accessor in accessors]
+
+    def stream(self, get_rows: typing.Callable[[], typing.Iterable[dict]], renderer_context: dict) -> typing.Iterator[bytes]:
+        """
+        Same output as render, line by line
+        get_rows: returns a new iterator of the serialized rows
+        """
+        writer_opts = renderer_context.get("writer_opts", self.writer_opts or {})
+        header = renderer_context.get("header", self.header)
+        labels = renderer_context.get("labels", self.labels)
+        encoding = renderer_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        if not header:
+            # NOTE: Without a header, the columns are the fields of all the rows: requires a first pass over the rows
+            header = sorted({field for row in self.get_rows(get_rows()) for field in self.flatten_item(row)})
+            if not header:
+                return
+
+        csv_writer = csv.writer(Echo(), encoding=encoding, **writer_opts)
+        for row in self.tablize(self.get_rows(get_rows()), header=header, labels=labels):
+            yield csv_writer.writerow(row)
+
+
+class StreamingCSVListMixin:
+    """
+    Write the CSV list (?format=csv) to a StreamingHttpResponse
+    The records are fetched and serialized by chunks, instead of serializing and rendering the whole page in memory
+    NOTE: Same output as the CSV renderer (limit/offset are still applied), but without the count query
+    """
+
+    streaming_csv_chunk_size = STREAMING_CSV_CHUNK_SIZE
+
+    def get_streaming_csv_queryset(self, queryset):
+        """Records of the requested page, None if the page can't be streamed"""
+        paginator = self.paginator
+        if paginator is None:
+            return queryset
+        if not isinstance(paginator, LimitOffsetPagination):
+            return None
+        # Cursor mode (See main.pagination.LimitOffsetOrCursorPagination)
+        if getattr(paginator, "cursor_query_param", None) in self.request.query_params:
+            return None
+        limit = paginator.get_limit(self.request)
+        if limit is None:
+            return queryset
+        offset = paginator.get_offset(self.request)
+        return queryset[offset : offset + limit]
+
+    def list(self, request, *args, **kwargs):
+        renderer = getattr(request, "accepted_renderer", None)
+        if not isinstance(renderer, StreamingPaginatedCSVRenderer):
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_streaming_csv_queryset(self.filter_queryset(self.get_queryset()))
+        if queryset is None:
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.get_serializer_class()
+        serializer_context = self.get_serializer_context()
+        chunk_size = self.streaming_csv_chunk_size
+
+        def get_rows():
+            records = queryset.iterator(chunk_size=chunk_size)
+            while chunk := list(itertools.islice(records, chunk_size)):
+                yield from serializer_class(chunk, many=True, context=serializer_context).data
+
+        return StreamingHttpResponse(
+            renderer.stream(get_rows, self.get_renderer_context()),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
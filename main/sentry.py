@@ -131,6 +131,7 @@ class SentryMonitor(models.TextChoices):
     NOTIFY_VALIDATORS = "notify_validators", "0 0 * * *"
     OAUTH_CLEARTOKENS = "oauth_cleartokens", "0 1 * * *"
     EAP_SUBMISSION_REMINDER = "eap_submission_reminder", "0 0 * * *"
+    REFRESH_APPEAL_KEY_FIGURES = "refresh_appeal_key_figures", "40 * * * *"
 
     @staticmethod
     def load_cron_data() -> typing.List[typing.Tuple[str, str]]:
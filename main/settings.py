@@ -68,6 +68,8 @@ env = environ.Env(
     EMAIL_USER=(str, None),
     EMAIL_PASS=(str, None),
     DEBUG_EMAIL=(bool, False),  # This was 0/1 before
+    EMAIL_OUTBOX_BATCH_SIZE=(int, 50),
+    EMAIL_OUTBOX_MAX_ATTEMPTS=(int, 5),
     # TEST_EMAILS=(list, ['im@ifrc.org']), # maybe later
     # Translation
     # Translator Available:
@@ -87,6 +89,7 @@ env = environ.Env(
     CACHE_REDIS_URL=str,
     CACHE_TEST_REDIS_URL=(str, None),
     CACHE_MIDDLEWARE_SECONDS=(int, None),
+    API_RESPONSE_CACHE_SECONDS=(int, None),
     # MOLNIX
     MOLNIX_API_BASE=(str, "https://api.ifrc-staging.rpm.molnix.com/api/"),
     MOLNIX_USERNAME=(str, None),
@@ -100,12 +103,16 @@ env = environ.Env(
     HPC_CREDENTIAL=(str, None),
     APPLICATION_INSIGHTS_INSTRUMENTATION_KEY=(str, None),
     DEBUG_PLAYWRIGHT=(bool, False),
+    PLAYWRIGHT_CONTEXT_POOL_SIZE=(int, 4),  # Authenticated browser contexts kept open per worker thread
     # Pytest (Only required when running tests)
     PYTEST_XDIST_WORKER=(str, None),
     # Elastic-Cache
     ELASTIC_SEARCH_HOST=(str, None),
     ELASTIC_SEARCH_INDEX=(str, "new_index"),
     ELASTIC_SEARCH_TEST_INDEX=(str, "new_test_index"),  # This will be used and cleared by test
+    ELASTIC_SEARCH_INDEX_ASYNC=(bool, False),  # Send buffered index actions using celery
+    ELASTIC_SEARCH_INDEX_BUFFER_CHUNK_SIZE=(int, 500),
+    HAYSTACK_SEARCH_MAX_WORKERS=(int, 10),  # Concurrent search queries per process (Global search)
     # FTP
     GO_FTPHOST=(str, None),
     GO_FTPUSER=(str, None),
@@ -206,6 +213,7 @@ ALLOWED_HOSTS = [
 SECRET_KEY = env("DJANGO_SECRET_KEY")
 DEBUG = env("DJANGO_DEBUG")
 DEBUG_PLAYWRIGHT = env("DEBUG_PLAYWRIGHT")
+PLAYWRIGHT_CONTEXT_POOL_SIZE = env("PLAYWRIGHT_CONTEXT_POOL_SIZE")
 GO_ENVIRONMENT = env("GO_ENVIRONMENT")
 
 # See if we are inside a test environment
@@ -297,7 +305,7 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_RENDERER_CLASSES": (
         "rest_framework.renderers.JSONRenderer",
-        "rest_framework_csv.renderers.PaginatedCSVRenderer",
+        "main.renderers.StreamingPaginatedCSVRenderer",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
@@ -320,6 +328,7 @@ MIDDLEWARE = [
     "django.middleware.locale.LocaleMiddleware",
     # 'middlewares.middlewares.LocaleMiddleware',
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "middlewares.cache.VisibilityTierCacheMiddleware",
     # 'middlewares.cache.UpdateCacheForUserMiddleware',
     "django.middleware.common.CommonMiddleware",
     # 'middlewares.cache.FetchFromCacheForUserMiddleware',
@@ -327,6 +336,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "middlewares.middlewares.RequestMiddleware",
+    "middlewares.middlewares.ElasticsearchIndexBufferMiddleware",
     "reversion.middleware.RevisionMiddleware",
 ]
 
@@ -582,6 +592,8 @@ EMAIL_PORT = env("EMAIL_PORT")
 EMAIL_USER = env("EMAIL_USER")
 EMAIL_PASS = env("EMAIL_PASS")
 DEBUG_EMAIL = env("DEBUG_EMAIL")
+EMAIL_OUTBOX_BATCH_SIZE = env("EMAIL_OUTBOX_BATCH_SIZE")  # Emails sent per notifications.tasks.send_outbox_emails batch
+EMAIL_OUTBOX_MAX_ATTEMPTS = env("EMAIL_OUTBOX_MAX_ATTEMPTS")  # Retried with exponential backoff until then
 # TEST_EMAILS = env('TEST_EMAILS') # maybe later
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 104857600  # default 2621440, 2.5MB -> 100MB
@@ -737,6 +749,8 @@ TEST_DIR = os.path.join(BASE_DIR, "main/test_files")
 ELASTIC_SEARCH_HOST = env("ELASTIC_SEARCH_HOST")
 ELASTIC_SEARCH_INDEX = env("ELASTIC_SEARCH_INDEX")
 ELASTIC_SEARCH_TEST_INDEX = env("ELASTIC_SEARCH_TEST_INDEX")
+ELASTIC_SEARCH_INDEX_ASYNC = env("ELASTIC_SEARCH_INDEX_ASYNC")
+ELASTIC_SEARCH_INDEX_BUFFER_CHUNK_SIZE = env("ELASTIC_SEARCH_INDEX_BUFFER_CHUNK_SIZE")
 
 # FTP
 GO_FTPHOST = env("GO_FTPHOST")
@@ -793,6 +807,7 @@ HAYSTACK_CONNECTIONS = {
 }
 
 HAYSTACK_LIMIT_TO_REGISTERED_MODELS = False
+HAYSTACK_SEARCH_MAX_WORKERS = env("HAYSTACK_SEARCH_MAX_WORKERS")
 
 SUSPEND_SIGNALS = True
 
@@ -816,6 +831,8 @@ REDIS_DEFAULT_LOCK_EXPIRE = 60 * 10  # Lock expires in 10min (in seconds)
 if env("CACHE_MIDDLEWARE_SECONDS"):
     CACHE_MIDDLEWARE_SECONDS = env("CACHE_MIDDLEWARE_SECONDS")  # Planned: 600 for staging, 60 from prod
 DISABLE_API_CACHE = env("DISABLE_API_CACHE")
+# Cache of the API responses per visibility tier (Disabled if not set, See api.response_cache)
+API_RESPONSE_CACHE_SECONDS = env("API_RESPONSE_CACHE_SECONDS")
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "IFRC-GO API",
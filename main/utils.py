@@ -7,6 +7,7 @@ from tempfile import NamedTemporaryFile, _TemporaryFileWrapper
 import requests
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db import models, router
 from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import exceptions
@@ -14,6 +15,8 @@ from rest_framework.negotiation import DefaultContentNegotiation
 from reversion.models import Version
 from reversion.revisions import _get_options
 
+from api.logger import logger
+
 
 def is_tableau(request):
     """Checking the request for the 'tableau' parameter
@@ -186,6 +189,21 @@ def logger_context(data):
     return {"context": data}
 
 
+def increment_cache_counter(key, value=1):
+    """Counter (shared across processes) used for monitoring, failures are only logged"""
+    if not value:
+        return
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, value)
+    except Exception:
+        logger.warning(f"Failed to update counter: {key}", exc_info=True)
+
+
+def get_cache_counters(**keys):
+    return {name: cache.get(key, 0) for name, key in keys.items()}
+
+
 def sort_dict_recursively(d):
     if isinstance(d, dict):
         return {k: sort_dict_recursively(d[k]) for k in sorted(d)}
@@ -3,6 +3,13 @@ from django.middleware.cache import FetchFromCacheMiddleware, UpdateCacheMiddlew
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 
+from api.response_cache import (
+    get_cached_response,
+    get_response_cache_key,
+    get_response_cache_resource,
+    set_cached_response,
+)
+
 
 def check_if_user_is_anonymous(request):
     try:
@@ -36,3 +43,28 @@ class FetchFromCacheForUserMiddleware(FetchFromCacheMiddleware):
         if key_prefix := get_cache_key_prefix(request):
             self.key_prefix = key_prefix
             return super().process_request(request)
+
+
+class VisibilityTierCacheMiddleware:
+    """
+    Cache the GET responses of the resources in api.response_cache.RESPONSE_CACHE_RESOURCES
+    per visibility tier (and user countries) instead of per user: also used for the authenticated requests
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        resource = get_response_cache_resource(request)
+        if resource is None:
+            return self.get_response(request)
+        try:
+            user = APIView().initialize_request(request).user
+        except AuthenticationFailed:
+            return self.get_response(request)
+        key = get_response_cache_key(request, user, resource)
+        if response := get_cached_response(key, resource):
+            return response
+        response = self.get_response(request)
+        set_cached_response(key, response)
+        return response
@@ -2,6 +2,8 @@ import threading
 
 from django.http import HttpResponse
 
+from utils.elasticsearch import es_index_buffer
+
 # from reversion.middleware import RevisionMiddleware
 
 
@@ -51,6 +53,19 @@ class RequestMiddleware:
         return self.get_response(request)
 
 
+class ElasticsearchIndexBufferMiddleware:
+    """
+    Collect the elasticsearch index actions of a request and send them once the response is ready
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with es_index_buffer():
+            return self.get_response(request)
+
+
 # Without this class the 'request revision' still works fine.
 # TODO: how to make it effective?
 # class BypassRevisionMiddleware(RevisionMiddleware):
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0015_rename_molnix_status_surgealert_molnix_status_old"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailOutbox",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("subject", models.TextField(verbose_name="subject")),
+                ("html", models.TextField(verbose_name="html")),
+                ("mailtype", models.CharField(blank=True, max_length=600, verbose_name="mail type")),
+                ("to_addresses", models.JSONField(default=list, verbose_name="to addresses")),
+                ("cc_addresses", models.JSONField(default=list, verbose_name="cc addresses")),
+                (
+                    "status",
+                    models.IntegerField(
+                        choices=[(0, "Pending"), (1, "Sending"), (2, "Sent"), (3, "Failed")], default=0, verbose_name="status"
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0, verbose_name="attempts")),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now, verbose_name="next attempt at")),
+                ("last_error", models.TextField(blank=True, verbose_name="last error")),
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created at")),
+                ("sent_at", models.DateTimeField(blank=True, null=True, verbose_name="sent at")),
+            ],
+            options={
+                "verbose_name": "email outbox",
+                "verbose_name_plural": "email outbox",
+                "indexes": [models.Index(fields=["status", "next_attempt_at"], name="notificatio_status_1fc719_idx")],
+            },
+        ),
+    ]
@@ -320,3 +320,35 @@ class NotificationGUID(models.Model):
     )
     email_type = models.CharField(max_length=600, null=True, blank=True)
     to_list = models.TextField(null=True, blank=True)
+
+
+class EmailOutbox(models.Model):
+    """Emails waiting to be sent by the notifications.tasks.send_outbox_emails consumer"""
+
+    class Status(models.IntegerChoices):
+        PENDING = 0, _("Pending")
+        SENDING = 1, _("Sending")
+        SENT = 2, _("Sent")
+        FAILED = 3, _("Failed")
+
+    subject = models.TextField(verbose_name=_("subject"))
+    html = models.TextField(verbose_name=_("html"))
+    mailtype = models.CharField(verbose_name=_("mail type"), max_length=600, blank=True)
+    to_addresses = models.JSONField(verbose_name=_("to addresses"), default=list)
+    cc_addresses = models.JSONField(verbose_name=_("cc addresses"), default=list)
+    status = models.IntegerField(verbose_name=_("status"), choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(verbose_name=_("attempts"), default=0)
+    next_attempt_at = models.DateTimeField(verbose_name=_("next attempt at"), default=timezone.now)
+    last_error = models.TextField(verbose_name=_("last error"), blank=True)
+    created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True)
+    sent_at = models.DateTimeField(verbose_name=_("sent at"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("email outbox")
+        verbose_name_plural = _("email outbox")
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_status_display()} - {self.subject}"
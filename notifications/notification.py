@@ -1,59 +1,90 @@
 import base64
 import smtplib
 import threading
+import typing
+from datetime import timedelta
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 import requests
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import strip_tags
 
 from api.logger import logger
 from api.models import CronJob, CronJobStatus
-from notifications.models import NotificationGUID
+from notifications.models import EmailOutbox, NotificationGUID
 
 EMAIL_TO = "no-reply@ifrc.org"
 IS_PROD = settings.GO_ENVIRONMENT == "production"
 
 
-class SendMail(threading.Thread):
-    def __init__(self, recipients, msg, **kwargs):
-        self.recipients = recipients
-        self.msg = msg
-        super(SendMail, self).__init__(**kwargs)
+# Sending attempts are retried with an exponential backoff: 1m, 2m, 4m, ... (max 1h)
+OUTBOX_RETRY_BASE_DELAY = 60
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+EMAIL_API_TIMEOUT = 30
+SMTP_TIMEOUT = 30
+# Longest time to send one email: API call, then SMTP (connect, ehlo, starttls, ehlo, login, sendmail) reconnected once
+OUTBOX_EMAIL_SENDING_TIMEOUT = timedelta(seconds=EMAIL_API_TIMEOUT + 2 * 6 * SMTP_TIMEOUT)
 
-    def run(self):
-        try:
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
-            server.ehlo()
-            if settings.EMAIL_USE_TLS:
-                server.starttls()
-            server.ehlo()
-            succ = server.login(settings.EMAIL_USER, settings.EMAIL_PASS)
-            if "successful" not in str(succ[1]):
-                cron_rec = {
-                    "name": "notification",
-                    "message": "Error contacting " + settings.EMAIL_HOST + " smtp server for notifications",
-                    "status": CronJobStatus.ERRONEOUS,
-                }
-                CronJob.sync_cron(cron_rec)
-            if len(self.recipients) > 0:
-                server.sendmail(settings.EMAIL_USER, self.recipients, self.msg.as_string())
-            server.quit()
-            logger.info("E-mails were sent successfully.")
-        except Exception as exc:
-            logger.error("Could not send emails with Python smtlib", exc_info=True)
-            ex = ""
-            try:
-                ex = str(exc.args)
-            except Exception as exctwo:
-                logger.warning(exctwo.args)
+# HTTP session and SMTP connection are re-used by the same (worker) thread
+_local = threading.local()
+
+
+def get_http_session() -> requests.Session:
+    if getattr(_local, "http_session", None) is None:
+        _local.http_session = requests.Session()
+    return _local.http_session
+
+
+class SMTPConnection:
+    """SMTP session kept open across emails, (re)connected when required"""
+
+    def __init__(self):
+        self.server = None
+
+    def connect(self):
+        server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=SMTP_TIMEOUT)
+        server.ehlo()
+        if settings.EMAIL_USE_TLS:
+            server.starttls()
+        server.ehlo()
+        succ = server.login(settings.EMAIL_USER, settings.EMAIL_PASS)
+        if "successful" not in str(succ[1]):
             cron_rec = {
                 "name": "notification",
-                "message": "Error sending out email with Python smtplib: {}".format(ex),
+                "message": "Error contacting " + settings.EMAIL_HOST + " smtp server for notifications",
                 "status": CronJobStatus.ERRONEOUS,
             }
             CronJob.sync_cron(cron_rec)
+        self.server = server
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.server = None
+
+    def sendmail(self, recipients, msg):
+        if self.server is None:
+            self.connect()
+        try:
+            self.server.sendmail(settings.EMAIL_USER, recipients, msg.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # Idle connection was closed by the server, reconnect once
+            self.close()
+            self.connect()
+            self.server.sendmail(settings.EMAIL_USER, recipients, msg.as_string())
+
+
+def get_smtp_connection() -> SMTPConnection:
+    if getattr(_local, "smtp_connection", None) is None:
+        _local.smtp_connection = SMTPConnection()
+    return _local.smtp_connection
 
 
 def construct_msg(cc_addresses, subject, html):
@@ -74,6 +105,8 @@ def construct_msg(cc_addresses, subject, html):
 
 
 def clean_emails(emails):
+    if isinstance(emails, str):
+        emails = [emails]
     return [e for e in emails if isinstance(e, str) and e.strip()]
 
 
@@ -101,13 +134,7 @@ def send_notification(subject, recipients, html, mailtype="", cc_recipients=None
         print(f"\n{html}\n")
         print("-" * 22, "EMAIL END -", "-" * 22)
 
-    if settings.FORCE_USE_SMTP:
-        logger.info("Forcing SMPT usage for sending emails.")
-        msg = construct_msg(cc_addresses, subject, html)
-        SendMail(addresses, msg).start()
-        return
-
-    if "?" not in settings.EMAIL_API_ENDPOINT:  # a.k.a dirty disabling email sending
+    if not settings.FORCE_USE_SMTP and "?" not in settings.EMAIL_API_ENDPOINT:  # a.k.a dirty disabling email sending
         return
 
     #    if not IS_PROD:
@@ -128,19 +155,42 @@ def send_notification(subject, recipients, html, mailtype="", cc_recipients=None
     #            elif eml and (eml in recipients):
     #                to_addresses.append(eml)
 
-    recipients_as_string = ",".join(to_addresses)
-    cc_recipients_as_string = ",".join(cc_addresses)
-    if not recipients_as_string:
-        if len(to_addresses) > 0:
-            warn_msg = "Recipients failed to be converted to string, 1st rec.: {}".format(to_addresses[0])
-            logger.info(warn_msg)
-            # Save the warning into the CronJob logs too
-            cron_error = {"name": "index_and_notify", "message": warn_msg, "status": CronJobStatus.WARNED}
-            CronJob.sync_cron(cron_error)
-        else:
-            logger.info("Recipients string is empty")
+    if not settings.FORCE_USE_SMTP and not to_addresses:
+        logger.info("Recipients string is empty")
         return  # If there are no recipients it's unnecessary to send out the email
 
+    email = EmailOutbox.objects.create(
+        subject=subject,
+        html=html,
+        mailtype=mailtype or "",
+        to_addresses=to_addresses,
+        cc_addresses=cc_addresses,
+    )
+    from notifications.tasks import send_outbox_emails
+
+    # Sent by the celery consumer, the caller doesn't wait for the email sender API/SMTP server
+    transaction.on_commit(lambda: send_outbox_emails.delay())
+    return email
+
+
+def send_with_smtp(email: EmailOutbox):
+    msg = construct_msg(email.cc_addresses, email.subject, email.html)
+    get_smtp_connection().sendmail(email.to_addresses + email.cc_addresses, msg)
+    logger.info("E-mails were sent successfully.")
+
+
+def deliver_email(email: EmailOutbox):
+    """Send the email using the email sender API (fallback: SMTP). Raises if the email couldn't be sent"""
+    if settings.FORCE_USE_SMTP:
+        logger.info("Forcing SMPT usage for sending emails.")
+        send_with_smtp(email)
+        return
+
+    to_addresses = email.to_addresses
+    recipients_as_string = ",".join(to_addresses)
+    cc_recipients_as_string = ",".join(email.cc_addresses)
+    subject = email.subject
+
     # Encode with base64 into bytes, then converting it back to strings for the JSON
     payload = {
         "FromAsBase64": str(base64.b64encode(settings.EMAIL_USER.encode("utf-8")), "utf-8"),
@@ -148,7 +198,7 @@ def send_notification(subject, recipients, html, mailtype="", cc_recipients=None
         "CcAsBase64": str(base64.b64encode(cc_recipients_as_string.encode("utf-8")), "utf-8"),
         "BccAsBase64": str(base64.b64encode(recipients_as_string.encode("utf-8")), "utf-8"),
         "SubjectAsBase64": str(base64.b64encode(subject.encode("utf-8")), "utf-8"),
-        "BodyAsBase64": str(base64.b64encode(html.encode("utf-8")), "utf-8"),
+        "BodyAsBase64": str(base64.b64encode(email.html.encode("utf-8")), "utf-8"),
         "IsBodyHtml": True,
         "TemplateName": "",
         "TemplateLanguage": "",
@@ -157,11 +207,15 @@ def send_notification(subject, recipients, html, mailtype="", cc_recipients=None
         payload["ToAsBase64"] = payload["BccAsBase64"]  # if 1 addressee, no BCC anonimization needed.
         payload["BccAsBase64"] = ""
 
-    # The response contains the GUID (res.text)
-    res = requests.post(settings.EMAIL_API_ENDPOINT, json=payload)
-    res_text = res.text.replace('"', "")
+    try:
+        # The response contains the GUID (res.text)
+        res = get_http_session().post(settings.EMAIL_API_ENDPOINT, json=payload, timeout=EMAIL_API_TIMEOUT)
+    except requests.RequestException:
+        logger.error("Could not reach the e-mail sender API", exc_info=True)
+        res = None
 
-    if res.status_code == 200:
+    if res is not None and res.status_code == 200:
+        res_text = res.text.replace('"', "")
         logger.info("Subject: {subject}, Recipients: {recs}".format(subject=subject, recs=recipients_as_string))
 
         logger.info("GUID: {}".format(res_text))
@@ -169,20 +223,73 @@ def send_notification(subject, recipients, html, mailtype="", cc_recipients=None
         # if the actual sending has failed or not.
         NotificationGUID.objects.create(
             api_guid=res_text,
-            email_type=mailtype,
+            email_type=email.mailtype,
             to_list=f"To: {EMAIL_TO}; Cc: {cc_recipients_as_string}; Bcc: {recipients_as_string}",
         )
 
         logger.info("E-mails were sent successfully.")
-    else:
+        return
+
+    if res is not None:
         logger.error(
             f"Email send failed using API, status code: ({res.status_code})",
             extra={
                 "content": res.content,
             },
         )
-        # Try sending with Python smtplib, if reaching the API fails
         logger.warning(f"Authorization/authentication failed ({res.status_code}) to the e-mail sender API.")
-        msg = construct_msg(cc_addresses, subject, html)
-        SendMail(addresses, msg).start()
-    return res.text
+    # Try sending with Python smtplib, if reaching the API fails
+    send_with_smtp(email)
+
+
+def claim_outbox_emails(batch_size) -> typing.List[EmailOutbox]:
+    """
+    Lock a batch of due emails for this consumer (concurrent consumers skip them)
+    Emails claimed by a consumer which didn't finish (e.g. worker killed) are picked up again once the whole batch
+    could have been sent (So that a batch still being sent isn't claimed again)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[EmailOutbox.Status.PENDING, EmailOutbox.Status.SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        EmailOutbox.objects.filter(pk__in=[email.pk for email in emails]).update(
+            status=EmailOutbox.Status.SENDING,
+            next_attempt_at=now + OUTBOX_EMAIL_SENDING_TIMEOUT * len(emails),
+        )
+    return emails
+
+
+def send_outbox_email(email: EmailOutbox) -> bool:
+    email.attempts += 1
+    try:
+        deliver_email(email)
+    except Exception as exc:
+        get_smtp_connection().close()
+        email.last_error = str(exc)[:2000]
+        if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Could not send email: {email.pk}, giving up after {email.attempts} attempts", exc_info=True)
+            email.status = EmailOutbox.Status.FAILED
+            cron_rec = {
+                "name": "notification",
+                "message": "Error sending out email: {}".format(email.last_error),
+                "status": CronJobStatus.ERRONEOUS,
+            }
+            CronJob.sync_cron(cron_rec)
+        else:
+            logger.warning(f"Could not send email: {email.pk}, attempt: {email.attempts}", exc_info=True)
+            email.status = EmailOutbox.Status.PENDING
+            delay = min(OUTBOX_RETRY_BASE_DELAY * 2 ** (email.attempts - 1), OUTBOX_RETRY_MAX_DELAY)
+            email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+        return False
+
+    email.status = EmailOutbox.Status.SENT
+    email.sent_at = timezone.now()
+    email.save(update_fields=["attempts", "status", "sent_at"])
+    return True
@@ -0,0 +1,46 @@
+import uuid
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from api.logger import logger
+from notifications.models import EmailOutbox
+from notifications.notification import claim_outbox_emails, send_outbox_email
+
+OUTBOX_RETRY_SCHEDULED_CACHE_KEY = "notifications-email-outbox-retry-scheduled"
+
+
+@shared_task
+def send_outbox_emails(retry_token=None):
+    """
+    Drain the email outbox in batches
+    retry_token: set for the scheduled retry run, which clears its schedule so that it can schedule the next one
+    """
+    if retry_token is not None and cache.get(OUTBOX_RETRY_SCHEDULED_CACHE_KEY) == retry_token:
+        cache.delete(OUTBOX_RETRY_SCHEDULED_CACHE_KEY)
+
+    sent = failed = 0
+    while emails := claim_outbox_emails(settings.EMAIL_OUTBOX_BATCH_SIZE):
+        for email in emails:
+            if send_outbox_email(email):
+                sent += 1
+            else:
+                failed += 1
+    logger.info(f"Email outbox: {sent} sent, {failed} failed")
+
+    # Schedule a single run for the next retry
+    next_attempt_at = EmailOutbox.objects.filter(
+        status__in=[EmailOutbox.Status.PENDING, EmailOutbox.Status.SENDING],
+    ).aggregate(
+        next_attempt_at=Min("next_attempt_at")
+    )["next_attempt_at"]
+    if next_attempt_at is None:
+        return
+    countdown = max((next_attempt_at - timezone.now()).total_seconds(), 0)
+    retry_token = uuid.uuid4().hex
+    # NOTE: Expires in case the scheduled run is lost (e.g. worker killed), the next run schedules a new one
+    if cache.add(OUTBOX_RETRY_SCHEDULED_CACHE_KEY, retry_token, timeout=countdown + 60):
+        send_outbox_emails.apply_async(kwargs={"retry_token": retry_token}, countdown=countdown)
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta
+from unittest import mock
 
 from django.conf import settings
+from django.test import override_settings
 from django.utils import timezone
 from modeltranslation.utils import build_localized_fieldname
 
@@ -11,7 +13,19 @@ from lang.serializers import TranslatedModelSerializerMixin
 from main.test_case import APITestCase
 from notifications.factories import SurgeAlertFactory
 from notifications.management.commands.ingest_alerts import categories, timeformat
-from notifications.models import SurgeAlert, SurgeAlertStatus, SurgeAlertType
+from notifications.models import (
+    EmailOutbox,
+    SurgeAlert,
+    SurgeAlertStatus,
+    SurgeAlertType,
+)
+from notifications.notification import (
+    OUTBOX_EMAIL_SENDING_TIMEOUT,
+    claim_outbox_emails,
+    send_notification,
+    send_outbox_email,
+)
+from notifications.tasks import send_outbox_emails
 
 
 class NotificationTestCase(APITestCase):
@@ -215,3 +229,77 @@ class SurgeAlertFilteringTest(APITestCase):
         response = _fetch(dict({"molnix_status": _to_csv(SurgeAlertStatus.STOOD_DOWN, SurgeAlertStatus.OPEN)}))
         self.assertEqual(response["count"], 2)
         self.assertEqual(response["results"][0]["molnix_status"], SurgeAlertStatus.STOOD_DOWN)
+
+
+@override_settings(
+    EMAIL_USER="go@example.com",
+    EMAIL_API_ENDPOINT="https://email.example.com/send?key=1",
+    FORCE_USE_SMTP=False,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+)
+class EmailOutboxTest(APITestCase):
+    @mock.patch("notifications.tasks.send_outbox_emails.delay")
+    def test_send_notification_enqueues(self, send_outbox_emails_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            email = send_notification("Subject", ["a@example.com", ""], "<p>Body</p>", "test")
+        self.assertEqual(email.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(email.to_addresses, ["a@example.com"])
+        send_outbox_emails_delay.assert_called_once()
+
+    @mock.patch("notifications.notification.deliver_email", side_effect=Exception("API and SMTP are down"))
+    def test_retry_with_backoff(self, deliver_email):
+        email = EmailOutbox.objects.create(subject="Subject", html="<p>Body</p>", to_addresses=["a@example.com"])
+
+        self.assertEqual(claim_outbox_emails(10), [email])
+        self.assertEqual(claim_outbox_emails(10), [])  # Already claimed
+        self.assertFalse(send_outbox_email(email))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        self.assertFalse(send_outbox_email(email))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.Status.FAILED)
+
+        deliver_email.side_effect = None
+        email = EmailOutbox.objects.create(subject="Subject", html="<p>Body</p>", to_addresses=["a@example.com"])
+        self.assertTrue(send_outbox_email(email))
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailOutbox.Status.SENT)
+
+    def test_claim_timeout(self):
+        emails = [
+            EmailOutbox.objects.create(subject="Subject", html="<p>Body</p>", to_addresses=["a@example.com"]) for _ in range(3)
+        ]
+        now = timezone.now()
+        self.assertEqual(len(claim_outbox_emails(10)), 3)
+        # Not claimed again by another consumer while the whole batch can still be being sent
+        for email in emails:
+            email.refresh_from_db()
+            self.assertEqual(email.status, EmailOutbox.Status.SENDING)
+            self.assertGreaterEqual(email.next_attempt_at, now + OUTBOX_EMAIL_SENDING_TIMEOUT * 3)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        EMAIL_OUTBOX_MAX_ATTEMPTS=5,
+    )
+    @mock.patch("notifications.tasks.send_outbox_emails.apply_async")
+    @mock.patch("notifications.notification.deliver_email", side_effect=Exception("API and SMTP are down"))
+    def test_retry_schedule(self, deliver_email, apply_async):
+        email = EmailOutbox.objects.create(subject="Subject", html="<p>Body</p>", to_addresses=["a@example.com"])
+        send_outbox_emails()
+        apply_async.assert_called_once()
+        retry_kwargs = apply_async.call_args.kwargs["kwargs"]
+
+        # A retry is already scheduled
+        send_outbox_emails()
+        apply_async.assert_called_once()
+
+        # The scheduled retry schedules the next backoff step
+        EmailOutbox.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        send_outbox_emails(**retry_kwargs)
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 2)
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertNotEqual(apply_async.call_args.kwargs["kwargs"], retry_kwargs)
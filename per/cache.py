@@ -3,7 +3,9 @@ import json
 import typing
 
 import django_filters
+from django.core.cache import cache
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 from django.db.models import Count, Prefetch
 
 from per.models import (
@@ -12,6 +14,16 @@ from per.models import (
     OpsLearningSectorCacheResponse,
 )
 
+# Snapshot of PerMapDataView (Invalidated when an Overview, PerAssessment or FormPrioritization is saved)
+PER_MAP_DATA_CACHE_KEY = "per-map-data"
+# NOTE: Other related changes (eg: component titles, country names) are picked up after the timeout
+PER_MAP_DATA_CACHE_TIMEOUT = 60 * 60
+
+
+def invalidate_per_map_data():
+    # NOTE: After commit, so that a concurrent request doesn't cache the data of the uncommitted transaction
+    transaction.on_commit(lambda: cache.delete(PER_MAP_DATA_CACHE_KEY))
+
 
 class OpslearningSummaryCacheHelper:
     @staticmethod
@@ -3,10 +3,11 @@ from collections import OrderedDict
 from rest_framework.utils.serializer_helpers import ReturnDict
 from rest_framework_csv.renderers import PaginatedCSVRenderer
 
+from main.renderers import StreamingPaginatedCSVRenderer
 from main.settings import SEP
 
 
-class NarrowCSVRenderer(PaginatedCSVRenderer):
+class NarrowCSVRenderer(StreamingPaginatedCSVRenderer):
     """
     The aim of this custom renderer: to avoid flattening of multiple values.
     (Flattening means: displaying lists as value.0, value.1, value.2)
@@ -29,22 +30,24 @@ class NarrowCSVRenderer(PaginatedCSVRenderer):
                     for i, d in enumerate(data):
                         data2.append(",".join(str(v) for v in d.values()) + "\n")
                     return data2
-            data2 = []
-            for i, d in enumerate(data):
-                for orgn in d["organization"].split(SEP):
-                    for sect in d["sector"].split(SEP):
-                        for pcom in d["per_component"].split(SEP):
-                            row = OrderedDict()
-                            for k, v in d.items():
-                                if k == "organization":
-                                    row[k] = orgn
-                                elif k == "sector":
-                                    row[k] = sect
-                                elif k == "per_component":
-                                    row[k] = pcom
-                                else:
-                                    row[k] = v
-                            data2.append(row)
+            data2 = list(self.get_rows(data))
             return super(PaginatedCSVRenderer, self).render(data2, *args, **kwargs)
 
         return super(PaginatedCSVRenderer, self).render(data, *args, **kwargs)
+
+    def get_rows(self, rows):
+        for d in rows:
+            for orgn in d["organization"].split(SEP):
+                for sect in d["sector"].split(SEP):
+                    for pcom in d["per_component"].split(SEP):
+                        row = OrderedDict()
+                        for k, v in d.items():
+                            if k == "organization":
+                                row[k] = orgn
+                            elif k == "sector":
+                                row[k] = sect
+                            elif k == "per_component":
+                                row[k] = pcom
+                            else:
+                                row[k] = v
+                        yield row
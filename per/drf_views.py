@@ -2,6 +2,7 @@ from datetime import datetime
 
 import pytz
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Count, F, Prefetch, Q
 from django.http import HttpResponse
@@ -23,8 +24,13 @@ from rest_framework.settings import api_settings
 from api.models import AppealDocument, Country, Region
 from deployments.models import SectorTag
 from main.permissions import DenyGuestUserMutationPermission, DenyGuestUserPermission
+from main.renderers import StreamingCSVListMixin
 from main.utils import SpreadSheetContentNegotiation
-from per.cache import OpslearningSummaryCacheHelper
+from per.cache import (
+    PER_MAP_DATA_CACHE_KEY,
+    PER_MAP_DATA_CACHE_TIMEOUT,
+    OpslearningSummaryCacheHelper,
+)
 from per.filter_set import (
     PerDocumentFilter,
     PerOverviewFilter,
@@ -708,11 +714,53 @@ class PerMapDataView(views.APIView):
     """
 
     def get(self, request):
-        latest_overviews = (
+        items = cache.get(PER_MAP_DATA_CACHE_KEY)
+        if items is None:
+            items = self.get_map_data()
+            cache.set(PER_MAP_DATA_CACHE_KEY, items, PER_MAP_DATA_CACHE_TIMEOUT)
+        return Response({"results": items})
+
+    @staticmethod
+    def get_map_data():
+        latest_overviews = list(
             Overview.objects.order_by("country_id", "-assessment_number", "-date_of_assessment")
             .distinct("country_id")
             .select_related("country", "type_of_assessment", "country__region")
         )
+        overview_ids = [ov.id for ov in latest_overviews]
+        # First assessment/prioritization (by id) of each overview, fetched for all the overviews at once
+        assessment_by_overview = {
+            assessment.overview_id: assessment
+            for assessment in PerAssessment.objects.filter(overview__in=overview_ids)
+            .order_by("overview_id", "id")
+            .distinct("overview_id")
+            .prefetch_related(
+                Prefetch(
+                    "area_responses",
+                    queryset=AreaResponse.objects.prefetch_related(
+                        Prefetch(
+                            "component_response",
+                            queryset=FormComponentResponse.objects.select_related("component", "component__area", "rating"),
+                        )
+                    ),
+                )
+            )
+        }
+        prioritization_by_overview = {
+            prioritization.overview_id: prioritization
+            for prioritization in FormPrioritization.objects.filter(overview__in=overview_ids)
+            .order_by("overview_id", "id")
+            .distinct("overview_id")
+            .prefetch_related(
+                Prefetch(
+                    "prioritized_action_responses",
+                    queryset=FormPrioritizationComponent.objects.exclude(component_id=14).select_related(
+                        "component", "component__area"
+                    ),
+                )
+            )
+        }
+
         items = []
         for ov in latest_overviews:
             # Compute normalized phase display from int value or existing string
@@ -724,21 +772,7 @@ class PerMapDataView(views.APIView):
             climate_considerations = False
             urban_considerations = False
             migration_considerations = False
-            latest_assessment = (
-                PerAssessment.objects.filter(overview_id=getattr(ov, "id", None))
-                .prefetch_related(
-                    Prefetch(
-                        "area_responses",
-                        queryset=AreaResponse.objects.prefetch_related(
-                            Prefetch(
-                                "component_response",
-                                queryset=FormComponentResponse.objects.select_related("component", "component__area", "rating"),
-                            )
-                        ),
-                    )
-                )
-                .first()
-            )
+            latest_assessment = assessment_by_overview.get(ov.id)
             if latest_assessment:
                 for ar in latest_assessment.area_responses.all():
                     for cr in ar.component_response.all():
@@ -775,11 +809,9 @@ class PerMapDataView(views.APIView):
 
             # Prioritized components (workplan/prioritization)
             prioritized_components = []
-            fp = FormPrioritization.objects.filter(overview_id=getattr(ov, "id", None)).first()
+            fp = prioritization_by_overview.get(ov.id)
             if fp:
-                for pac in fp.prioritized_action_responses.exclude(component_id=14).select_related(
-                    "component", "component__area"
-                ):
+                for pac in fp.prioritized_action_responses.all():
                     pc_comp = pac.component
                     pc_area = pc_comp.area if pc_comp else None
                     area_num_val2 = getattr(pc_area, "area_num", None)
@@ -843,7 +875,7 @@ class PerMapDataView(views.APIView):
                     "components": components,
                 }
             )
-        return Response({"results": items})
+        return items
 
 
 class PerAssessmentsProcessedView(views.APIView):
@@ -1230,7 +1262,7 @@ class OpsLearningFilter(filters.FilterSet):
         )
 
 
-class OpsLearningViewset(viewsets.ModelViewSet):
+class OpsLearningViewset(StreamingCSVListMixin, viewsets.ModelViewSet):
     """
     A simple ViewSet for viewing and editing OpsLearning records.
     """
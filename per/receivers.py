@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from per.cache import invalidate_per_map_data
+from per.models import FormPrioritization, Overview, PerAssessment
+
+
+@receiver(post_save, sender=Overview)
+@receiver(post_save, sender=PerAssessment)
+@receiver(post_save, sender=FormPrioritization)
+@receiver(post_delete, sender=Overview)
+@receiver(post_delete, sender=PerAssessment)
+@receiver(post_delete, sender=FormPrioritization)
+def invalidate_per_map_data_cache(sender, **kwargs):
+    invalidate_per_map_data()
@@ -2,6 +2,8 @@ import json
 from unittest import mock
 
 from django.core import management
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from api.factories.country import CountryFactory
 from api.factories.region import RegionFactory
@@ -19,7 +21,8 @@ from per.factories import (
     SectorTagFactory,
 )
 
-from .models import WorkPlanStatus
+from .drf_views import PerMapDataView
+from .models import FormPrioritizationComponent, WorkPlanStatus
 
 
 class PerTestCase(APITestCase):
@@ -161,6 +164,28 @@ class PerTestCase(APITestCase):
         response = self.client.post(url, data=data, format="json")
         self.assert_400(response)
 
+    def test_per_map_data(self):
+        def create_country_overview():
+            overview = OverviewFactory.create(country=CountryFactory.create())
+            prioritization = FormPrioritizationFactory.create(overview=overview)
+            prioritization.prioritized_action_responses.add(
+                FormPrioritizationComponent.objects.create(component=FormComponentFactory.create(), is_prioritized=True)
+            )
+
+        create_country_overview()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(PerMapDataView.get_map_data()), 1)
+
+        # Same number of queries for more countries
+        for _ in range(3):
+            create_country_overview()
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(len(PerMapDataView.get_map_data()), 4)
+
+        response = self.client.get("/api/v2/per-map-data")
+        self.assert_200(response)
+        self.assertEqual(len(response.json()["results"]), 4)
+
     def test_overview_date_of_assessment(self):
         country = CountryFactory.create()
         data = {
@@ -1,8 +1,28 @@
+import contextlib
+import itertools
+import json
+import threading
+import typing
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
 from elasticsearch.helpers import bulk
 
 from api.esconnection import ES_CLIENT
 from api.indexes import ES_PAGE_NAME
 from api.logger import logger
+from main.utils import get_cache_counters, increment_cache_counter
+
+ES_INDEX_FLUSHED_METRIC_KEY = "elasticsearch-index-buffer-flushed"
+ES_INDEX_FAILED_METRIC_KEY = "elasticsearch-index-buffer-failed"
+# Index being built by index_elasticsearch --reindex, live actions are also sent to it (See bulk_es_actions)
+ES_REINDEX_TARGET_CACHE_KEY = "elasticsearch-reindex-target"
+ES_REINDEX_TARGET_CACHE_TIMEOUT = 60 * 60 * 6  # Cleared by the command, this is only used if the command is killed
+
+_local = threading.local()
+_commit_action_sequence = itertools.count(1)
 
 
 def log_errors(errors):
@@ -11,21 +31,229 @@ def log_errors(errors):
         logger.error("[%s]" % ", ".join(map(str, errors)))
 
 
+def get_es_index_metrics() -> dict:
+    """Number of documents flushed/failed by the ESIndexBuffer (across all the processes)"""
+    return get_cache_counters(flushed=ES_INDEX_FLUSHED_METRIC_KEY, failed=ES_INDEX_FAILED_METRIC_KEY)
+
+
+def set_es_reindex_target(index_name: typing.Optional[str]):
+    if index_name is None:
+        cache.delete(ES_REINDEX_TARGET_CACHE_KEY)
+        return
+    cache.set(ES_REINDEX_TARGET_CACHE_KEY, index_name, ES_REINDEX_TARGET_CACHE_TIMEOUT)
+
+
+def _get_reindex_target_actions(actions: typing.List[dict]) -> typing.List[dict]:
+    """
+    Copy of the actions for the index being rebuilt
+    - update -> upsert (The document might not be indexed yet by the rebuild)
+    NOTE: The rebuild uses create, so the documents written here are not overwritten with older data
+    """
+    reindex_target = cache.get(ES_REINDEX_TARGET_CACHE_KEY)
+    if not reindex_target:
+        return []
+    target_actions = []
+    for action in actions:
+        if action.get("_index") != ES_PAGE_NAME:
+            continue
+        target_action = {**action, "_index": reindex_target}
+        if action["_op_type"] == "update":
+            target_action["doc_as_upsert"] = True
+        target_actions.append(target_action)
+    return target_actions
+
+
+def bulk_es_actions(actions: typing.List[dict]) -> typing.Tuple[int, int]:
+    """
+    Send the actions to Elasticsearch using a single bulk request
+    Returns (flushed, failed) document counts
+    """
+    if not actions:
+        return 0, 0
+    try:
+        flushed, errors = bulk(client=ES_CLIENT, actions=actions, raise_on_error=False)
+        log_errors(errors)
+        failed = len(errors)
+    except Exception:
+        logger.error("Could not reach Elasticsearch server or index was missing.", exc_info=True)
+        flushed, failed = 0, len(actions)
+    logger.info(f"Elasticsearch bulk: {flushed} flushed, {failed} failed")
+    increment_cache_counter(ES_INDEX_FLUSHED_METRIC_KEY, flushed)
+    increment_cache_counter(ES_INDEX_FAILED_METRIC_KEY, failed)
+    target_actions = _get_reindex_target_actions(actions)
+    if target_actions:
+        try:
+            # NOTE: Deleting the documents not indexed yet by the rebuild returns not found errors, these are expected
+            bulk(client=ES_CLIENT, actions=target_actions, raise_on_error=False)
+        except Exception:
+            logger.warning("Could not send the actions to the index being rebuilt.", exc_info=True)
+    return flushed, failed
+
+
+def _merge_es_actions(previous: typing.Optional[dict], action: dict) -> dict:
+    """
+    Combine two actions of the same document into one
+    - delete always wins
+    - create/index + update -> create/index with the latest document
+    - delete + create/update -> index (the document still exists until the delete is flushed)
+    - otherwise the latest action is used
+    """
+    if previous is None or action["_op_type"] == "delete":
+        return action
+    if action["_op_type"] == "update" and previous["_op_type"] in ("create", "index", "delete"):
+        return {
+            **{key: value for key, value in action.items() if key.startswith("_")},
+            **action["doc"],
+            "_op_type": "index" if previous["_op_type"] == "delete" else previous["_op_type"],
+        }
+    if action["_op_type"] == "create" and previous["_op_type"] == "delete":
+        return {**action, "_op_type": "index"}
+    return action
+
+
+class ESIndexBuffer:
+    """
+    Collect elasticsearch actions and send them using a single bulk request
+    Actions for the same document (_id = instance.es_id()) are deduplicated
+    """
+
+    def __init__(self, chunk_size: typing.Optional[int] = None, use_celery: typing.Optional[bool] = None):
+        self.chunk_size = chunk_size or settings.ELASTIC_SEARCH_INDEX_BUFFER_CHUNK_SIZE
+        self.use_celery = settings.ELASTIC_SEARCH_INDEX_ASYNC if use_celery is None else use_celery
+        self.actions: typing.Dict[str, dict] = {}
+
+    def __len__(self):
+        return len(self.actions)
+
+    def add(self, action: dict):
+        _id = action["_id"]
+        self.actions[_id] = _merge_es_actions(self.actions.get(_id), action)
+        if len(self.actions) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.actions:
+            return
+        actions = list(self.actions.values())
+        self.actions = {}
+        if self.use_celery:
+            from api.tasks import index_elasticsearch_actions
+
+            # NOTE: Make sure the payload is JSON serializable (dates, decimals, etc)
+            index_elasticsearch_actions.delay(json.loads(json.dumps(actions, cls=DjangoJSONEncoder)))
+            return
+        bulk_es_actions(actions)
+
+
+def _get_active_buffer() -> typing.Optional[ESIndexBuffer]:
+    buffers = getattr(_local, "buffers", None)
+    if buffers:
+        return buffers[-1]
+    return None
+
+
+@contextlib.contextmanager
+def es_index_buffer(**kwargs):
+    """
+    Buffer all the elasticsearch actions (create_es_index, update_es_index, delete_es_index)
+    and flush them using bulk requests on exit (or when chunk_size is reached)
+
+    Usage:
+        with es_index_buffer():
+            for country in Country.objects.all():
+                country.save()
+    """
+    buffer = ESIndexBuffer(**kwargs)
+    if not hasattr(_local, "buffers"):
+        _local.buffers = []
+    _local.buffers.append(buffer)
+    try:
+        yield buffer
+    finally:
+        _local.buffers.remove(buffer)
+        if transaction.get_connection().in_atomic_block:
+            # Pending actions are flushed after the surrounding transaction is committed
+            for action in buffer.actions.values():
+                _enqueue_on_commit(action)
+        else:
+            buffer.flush()
+
+
+def _get_commit_buffer() -> ESIndexBuffer:
+    if not hasattr(_local, "commit_buffer"):
+        _local.commit_buffer = ESIndexBuffer()
+    return _local.commit_buffer
+
+
+def _add_committed_action(action: dict):
+    (_get_active_buffer() or _get_commit_buffer()).add(action)
+
+
+def _flush_commit_buffer():
+    _get_commit_buffer().flush()
+
+
+def _get_common_savepoint_ids(connection) -> typing.List[str]:
+    """Savepoints active for all the actions enqueued in the current transaction (common prefix of the stacks)"""
+    savepoint_ids = list(connection.savepoint_ids)
+    previous_ids = getattr(connection, "es_index_savepoint_ids", None)
+    if previous_ids is None:
+        return savepoint_ids
+    return [sid for sid, _ in itertools.takewhile(lambda ids: ids[0] == ids[1], zip(savepoint_ids, previous_ids))]
+
+
+def _enqueue_on_commit(action: dict):
+    """
+    Add the action to the commit buffer after the transaction is committed
+    NOTE: Callbacks registered inside a rolled back (savepoint) transaction are discarded, so are their actions
+    The buffer is flushed once per transaction, after the actions are added: each action registers a flush callback,
+    only the last registered one flushes (tracked in the connection state). The flush callbacks are only bound to the
+    savepoints common to all the actions, so rolling back a savepoint doesn't discard the flush of the other actions
+    """
+    connection = transaction.get_connection()
+    transaction.on_commit(lambda: _add_committed_action(action))
+
+    flush_sequence = next(_commit_action_sequence)
+    savepoint_ids = _get_common_savepoint_ids(connection)
+    connection.es_index_last_flush = flush_sequence
+    connection.es_index_savepoint_ids = savepoint_ids
+
+    def _flush_on_commit():
+        if getattr(connection, "es_index_last_flush", None) == flush_sequence:
+            connection.es_index_last_flush = None
+            connection.es_index_savepoint_ids = None
+            _flush_commit_buffer()
+
+    transaction.on_commit(_flush_on_commit)
+    # NOTE: on_commit binds the callback to all the active savepoints (run_on_commit: [(savepoint ids, func, robust)])
+    _, func, robust = connection.run_on_commit[-1]
+    connection.run_on_commit[-1] = (set(savepoint_ids), func, robust)
+
+
+def enqueue_es_action(action: dict):
+    """
+    Queue the elasticsearch action
+    - Inside a transaction: After the transaction is committed
+    - Inside es_index_buffer: When the buffer is flushed
+    - Otherwise: Right away
+    """
+    if transaction.get_connection().in_atomic_block:
+        _enqueue_on_commit(action)
+        return
+    buffer = _get_active_buffer()
+    if buffer is not None:
+        buffer.add(action)
+        return
+    bulk_es_actions([action])
+
+
 def delete_es_index(instance):
     """instance needs an es_id()"""
 
     if ES_CLIENT and ES_PAGE_NAME:
         # To make sure it doesn't run for tests
         if hasattr(instance, "es_id"):
-            try:
-                deleted, errors = bulk(
-                    client=ES_CLIENT,
-                    actions=[{"_op_type": "delete", "_index": ES_PAGE_NAME, "_type": "page", "_id": instance.es_id()}],
-                )
-                logger.info(f"Deleted {deleted} records")
-                log_errors(errors)
-            except Exception:
-                logger.error("Could not reach Elasticsearch server or index was already missing.")
+            enqueue_es_action({"_op_type": "delete", "_index": ES_PAGE_NAME, "_type": "page", "_id": instance.es_id()})
         else:
             logger.warning("instance does not have an es_id() method")
 
@@ -50,9 +278,7 @@ def create_es_index(instance):
 
     if ES_CLIENT and ES_PAGE_NAME:
         # To make sure it doesn't run for tests
-        created, errors = bulk(client=ES_CLIENT, actions=[construct_es_data(instance, True)])
-        logger.info(f"Created {created} records")
-        log_errors(errors)
+        enqueue_es_action(construct_es_data(instance, True))
 
 
 def update_es_index(instance):
@@ -60,6 +286,4 @@ def update_es_index(instance):
 
     if ES_CLIENT and ES_PAGE_NAME:
         # To make sure it doesn't run for tests
-        updated, errors = bulk(client=ES_CLIENT, actions=[construct_es_data(instance)])
-        logger.info(f"Updated {updated} records")
-        log_errors(errors)
+        enqueue_es_action(construct_es_data(instance))
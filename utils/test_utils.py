@@ -1,11 +1,14 @@
 import json
 from collections import Counter
-from unittest.mock import patch
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
 import erp
 import reversion
 from django.contrib.contenttypes.models import ContentType
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
 from reversion.errors import RevertError
 from reversion.models import Version
 
@@ -13,11 +16,18 @@ from api.factories import country as countryFactory
 from api.factories import disaster_type as dtFactory
 from api.factories import event as eventFactory
 from api.factories import field_report as fieldReportFactory
+from api.indexes import ES_PAGE_NAME
 from api.models import ERPGUID
 from main.mock import erp_request_side_effect_mock
 from main.utils import DjangoReversionDataFixHelper
 from per.factories import OverviewFactory as PerOverviewFactory
 from per.models import Overview as PerOverview
+from utils.elasticsearch import (
+    ESIndexBuffer,
+    _get_commit_buffer,
+    bulk_es_actions,
+    enqueue_es_action,
+)
 
 
 class ERPTest(TestCase):
@@ -128,3 +138,146 @@ class DjangoReversionDataFixHelperTest(TestCase):
         DjangoReversionDataFixHelper.datetime_fields_to_date(ContentType, Version, PerOverview, [self.field_name])
         self.assert_values({"2022-01-01": 94, None: 1})
         self.confirm_version_data_serialization()
+
+
+class ESIndexBufferTest(TestCase):
+    @staticmethod
+    def _action(op_type, _id, **data):
+        action = {"_op_type": op_type, "_index": "page_all", "_type": "page", "_id": _id}
+        if op_type == "update":
+            action["doc"] = data
+        else:
+            action.update(**data)
+        return action
+
+    @patch("utils.elasticsearch.bulk", return_value=(4, []))
+    def test_actions_are_deduplicated(self, bulk_mock):
+        buffer = ESIndexBuffer(chunk_size=100, use_celery=False)
+        buffer.add(self._action("create", "country-1", name="A"))
+        buffer.add(self._action("update", "country-1", name="B"))
+        buffer.add(self._action("update", "emergency-1", name="C"))
+        buffer.add(self._action("delete", "emergency-1"))
+        buffer.add(self._action("delete", "emergency-2"))
+        buffer.add(self._action("create", "emergency-2", name="D"))
+        buffer.add(self._action("delete", "emergency-3"))
+        buffer.add(self._action("update", "emergency-3", name="E"))
+        self.assertEqual(len(buffer), 4)
+        buffer.flush()
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        actions = {action["_id"]: action for action in bulk_mock.call_args.kwargs["actions"]}
+        self.assertEqual(actions["country-1"]["_op_type"], "create")
+        self.assertEqual(actions["country-1"]["name"], "B")
+        self.assertEqual(actions["emergency-1"]["_op_type"], "delete")
+        self.assertEqual(actions["emergency-2"]["_op_type"], "index")
+        self.assertEqual(actions["emergency-3"]["_op_type"], "index")
+        self.assertEqual(actions["emergency-3"]["name"], "E")
+        self.assertNotIn("doc", actions["emergency-3"])
+        self.assertEqual(len(buffer), 0)
+
+    @patch("utils.elasticsearch.bulk", return_value=(2, []))
+    def test_flush_on_chunk_size(self, bulk_mock):
+        buffer = ESIndexBuffer(chunk_size=2, use_celery=False)
+        buffer.add(self._action("delete", "country-1"))
+        self.assertEqual(bulk_mock.call_count, 0)
+        buffer.add(self._action("delete", "country-2"))
+        self.assertEqual(bulk_mock.call_count, 1)
+
+    @patch("utils.elasticsearch.bulk", return_value=(2, []))
+    def test_actions_are_flushed_once_per_transaction(self, bulk_mock):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_es_action(self._action("delete", "country-1"))
+            try:
+                with transaction.atomic():
+                    enqueue_es_action(self._action("delete", "country-2"))
+                    raise ValueError
+            except ValueError:
+                pass
+            enqueue_es_action(self._action("delete", "country-3"))
+            self.assertEqual(bulk_mock.call_count, 0)
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        self.assertEqual(
+            [action["_id"] for action in bulk_mock.call_args.kwargs["actions"]],
+            ["country-1", "country-3"],
+        )
+
+    @patch("utils.elasticsearch.bulk", return_value=(1, []))
+    def test_rolled_back_last_action_keeps_the_flush(self, bulk_mock):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                enqueue_es_action(self._action("delete", "country-1"))
+            enqueue_es_action(self._action("delete", "country-2"))
+            try:
+                with transaction.atomic():
+                    enqueue_es_action(self._action("delete", "country-3"))
+                    raise ValueError
+            except ValueError:
+                pass
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        self.assertEqual(
+            [action["_id"] for action in bulk_mock.call_args.kwargs["actions"]],
+            ["country-1", "country-2"],
+        )
+        self.assertEqual(len(_get_commit_buffer()), 0)
+
+        # All the actions rolled back: nothing to flush
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    enqueue_es_action(self._action("delete", "country-4"))
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(bulk_mock.call_count, 1)
+        self.assertEqual(len(_get_commit_buffer()), 0)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class IndexElasticsearchReindexTest(TestCase):
+    OLD_INDEX_NAME = f"{ES_PAGE_NAME}_20240101000000"
+
+    def test_reindex_swaps_alias(self):
+        indices_client = MagicMock()
+        indices_client.exists_alias.return_value = True
+        indices_client.get_alias.return_value = {self.OLD_INDEX_NAME: {"aliases": {ES_PAGE_NAME: {}}}}
+        live_action = {"_op_type": "update", "_index": ES_PAGE_NAME, "_type": "page", "_id": "country-1", "doc": {"name": "A"}}
+
+        def _parallel_bulk(client, actions, **kwargs):
+            list(actions)
+            # Change made while the new index is being built
+            bulk_es_actions([live_action])
+            # Document already indexed by the change above
+            yield False, {"create": {"status": 409, "_id": "country-1"}}
+
+        with (
+            patch("api.management.commands.index_elasticsearch.IndicesClient", return_value=indices_client),
+            patch("api.management.commands.index_elasticsearch.parallel_bulk", side_effect=_parallel_bulk),
+            patch("utils.elasticsearch.bulk", return_value=(1, [])) as bulk_mock,
+        ):
+            call_command("index_elasticsearch", "--reindex", stdout=StringIO())
+            sent_actions = [call.kwargs["actions"] for call in bulk_mock.call_args_list]
+            # Rebuild is over, live changes are only sent to the alias
+            bulk_mock.reset_mock()
+            bulk_es_actions([live_action])
+            self.assertEqual(bulk_mock.call_count, 1)
+
+        new_index_name = indices_client.create.call_args.kwargs["index"]
+        self.assertNotEqual(new_index_name, self.OLD_INDEX_NAME)
+        # Live changes are sent to the current index and to the new index
+        self.assertEqual(sent_actions[0], [live_action])
+        self.assertEqual(
+            sent_actions[1],
+            [{**live_action, "_index": new_index_name, "doc_as_upsert": True}],
+        )
+        # Alias is moved to the new index in a single request and the old index is deleted
+        indices_client.update_aliases.assert_called_once_with(
+            body={
+                "actions": [
+                    {"remove": {"indices": [self.OLD_INDEX_NAME], "alias": ES_PAGE_NAME}},
+                    {"add": {"index": new_index_name, "alias": ES_PAGE_NAME}},
+                ]
+            }
+        )
+        indices_client.delete.assert_called_once_with(index=self.OLD_INDEX_NAME)